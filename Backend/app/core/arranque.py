@@ -0,0 +1,134 @@
+# core/arranque.py
+"""
+Preparación de la base de datos al arrancar.
+
+Una sola consulta lee la revisión de Alembic (alembic_version) y la versión
+de los datos iniciales (version_sistema). Si ambas coinciden con las del
+código no se migra ni se revisan los datos iniciales. Si no:
+
+- base vacía: alembic upgrade head y datos iniciales
+- base creada con Base.metadata.create_all (sin alembic_version): se marca
+  en la revisión que corresponde a sus tablas y se aplican las siguientes
+- migraciones o datos iniciales pendientes: se aplican
+
+En PostgreSQL todo esto ocurre bajo un advisory lock: si varios workers
+arrancan a la vez, uno migra y los demás esperan y encuentran la base lista.
+"""
+
+import logging
+import os
+import time
+import zlib
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import func, inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini"))
+CLAVE_BLOQUEO = zlib.crc32(b"arranque:migraciones")
+
+CONSULTA_MARCA = text(
+    "SELECT (SELECT version_num FROM alembic_version LIMIT 1), "
+    "(SELECT datos_iniciales FROM version_sistema WHERE id = 1)"
+)
+
+
+def configuracion_alembic(conexion=None) -> Config:
+    config = Config(ALEMBIC_INI)
+    if conexion is not None:
+        config.attributes["connection"] = conexion
+    return config
+
+
+@lru_cache(maxsize=1)
+def revision_esperada() -> str:
+    """Última revisión de migrations/versions (la que espera el código)"""
+    return ScriptDirectory.from_config(configuracion_alembic()).get_current_head()
+
+
+def leer_marca(engine) -> Tuple[Optional[str], Optional[int]]:
+    """(revisión del esquema, versión de datos iniciales); None donde falte la tabla"""
+    try:
+        with engine.connect() as conexion:
+            revision, datos = conexion.execute(CONSULTA_MARCA).one()
+        return revision, datos
+    except (OperationalError, ProgrammingError):
+        return None, None
+
+
+def preparar_base(engine) -> Dict:
+    """Verifica la marca y, sólo si no coincide, migra y carga los datos iniciales"""
+    from ..initial_data import DATOS_INICIALES_VERSION
+
+    inicio = time.perf_counter()
+    esperada = revision_esperada()
+    revision, datos = leer_marca(engine)
+    resultado = {"revision": revision, "datos_iniciales": datos, "acciones": []}
+
+    if revision != esperada or (datos or 0) < DATOS_INICIALES_VERSION:
+        if revision != esperada and not settings.DB_MIGRAR_AL_ARRANCAR:
+            raise RuntimeError(
+                f"El esquema está en la revisión {revision} y el código espera {esperada}: "
+                f"ejecute 'alembic upgrade head' (o active DB_MIGRAR_AL_ARRANCAR)"
+            )
+        with Session(bind=engine) as db:
+            if db.get_bind().dialect.name == "postgresql":
+                db.execute(text("SELECT pg_advisory_xact_lock(:clave)"), {"clave": CLAVE_BLOQUEO})
+            resultado["acciones"] = _migrar_y_sembrar(db, esperada, DATOS_INICIALES_VERSION)
+            db.commit()
+        resultado["revision"], resultado["datos_iniciales"] = leer_marca(engine)
+
+    resultado["ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    return resultado
+
+
+def _migrar_y_sembrar(db: Session, esperada: str, version_datos: int) -> list:
+    """Dentro del bloqueo: relee el estado (otro worker pudo haberlo dejado listo) y completa lo que falte"""
+    from ..initial_data import inicializar_db
+    from ..models.sistema import VersionSistema
+    from ..utils.db_helpers import insert_para
+
+    acciones = []
+    conexion = db.connection()
+    tablas = set(inspect(conexion).get_table_names())
+    revision = None
+    if "alembic_version" in tablas:
+        revision = conexion.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+    if revision != esperada:
+        config = configuracion_alembic(conexion)
+        if revision is None and "usuarios" in tablas:
+            legada = _revision_de_base_legada(tablas)
+            logger.info(f"🗃️ Base creada sin migraciones: se marca en la revisión {legada}")
+            command.stamp(config, legada)
+            acciones.append(f"marcada en {legada}")
+            revision = legada
+        command.upgrade(config, "head")
+        acciones.append(f"migrada de {revision or 'vacía'} a {esperada}")
+
+    datos = db.scalar(text("SELECT datos_iniciales FROM version_sistema WHERE id = 1"))
+    if (datos or 0) < version_datos:
+        inicializar_db(db, resumen=False)
+        db.execute(
+            insert_para(db, VersionSistema)
+            .values(id=1, datos_iniciales=version_datos)
+            .on_conflict_do_update(
+                index_elements=["id"], set_={"datos_iniciales": version_datos, "actualizado_en": func.now()}
+            )
+        )
+        acciones.append(f"datos iniciales v{version_datos}")
+    return acciones
+
+
+def _revision_de_base_legada(tablas: set) -> str:
+    # job_runs fue lo último que creaba create_all antes de las migraciones (ver 0002)
+    return "0002" if "job_runs" in tablas else "0001"
@@ -0,0 +1,205 @@
+# core/cache_http.py
+"""
+GET condicionales (ETag / If-None-Match) y compresión de respuestas.
+
+- etiqueta(*partes) arma un ETag débil con la versión de los datos que forman
+  la respuesta: el contenido del snapshot de topología, o agregados baratos
+  (cantidad, id máximo, suma de fecha_actualizacion) de las filas que la
+  consulta cargaría. La forma de la respuesta (JSON schema del
+  response_model de la ruta) también entra, así un cambio de schema no deja
+  clientes con respuestas viejas.
+- condicional(request, version) corre antes de la consulta costosa: si el
+  cliente ya tiene esa versión (If-None-Match) la petición termina en 304
+  sin cuerpo; si no, devuelve las cabeceras ETag y Cache-Control para la
+  respuesta. "private, no-cache": el navegador guarda la respuesta pero
+  revalida siempre, son datos autenticados.
+- instalar(app) agrega un middleware ASGI que comprime con brotli (si el
+  paquete está instalado) o gzip las respuestas de un solo cuerpo desde
+  HTTP_COMPRESION_MINIMO_BYTES, según Accept-Encoding. Las de streaming
+  (exportaciones, archivos) pasan tal cual y los cuerpos grandes se comprimen
+  en el threadpool para no frenar el event loop.
+"""
+
+import gzip
+import hashlib
+import json
+from typing import Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from starlette.datastructures import Headers, MutableHeaders
+
+from .config import settings
+from .metricas import metricas
+
+try:  # Opcional: sin el paquete "brotli" sólo se ofrece gzip
+    import brotli
+except ImportError:
+    brotli = None
+
+CALIDAD_BROTLI = 4  # Buen punto para compresión en cada respuesta (11 es para archivos estáticos)
+COMPRIMIR_EN_HILO_DESDE = 256 * 1024  # Bytes: por debajo, comprimir en el loop cuesta menos que el salto de hilo
+TIPOS_COMPRIMIBLES = ("application/json", "application/xml", "application/javascript", "image/svg+xml")
+
+NO_MODIFICADAS = metricas.contador(
+    "http_respuestas_no_modificadas_total", "Peticiones respondidas con 304 por If-None-Match", ("ruta",)
+)
+COMPRESION_BYTES = metricas.contador(
+    "http_compresion_bytes_total", "Bytes de las respuestas comprimidas, antes y después", ("codificacion", "fase")
+)
+
+_forma_por_ruta: Dict[int, str] = {}  # id de la ruta -> huella del JSON schema de su response_model
+
+
+# ---------- ETag ----------
+
+
+def etiqueta(*partes) -> str:
+    """ETag débil a partir de cualquier valor con repr estable (bytes se toman tal cual)"""
+    resumen = hashlib.sha1()
+    for parte in partes:
+        resumen.update(parte if isinstance(parte, bytes) else repr(parte).encode("utf-8"))
+        resumen.update(b"\x00")
+    return f'W/"{resumen.hexdigest()[:24]}"'
+
+
+def _forma(request: Request) -> str:
+    ruta = request.scope.get("route")
+    if ruta is None:
+        return ""
+    forma = _forma_por_ruta.get(id(ruta))
+    if forma is None:
+        modelo = getattr(ruta, "response_model", None)
+        try:
+            esquema = json.dumps(TypeAdapter(modelo).json_schema(), sort_keys=True) if modelo else ""
+        except Exception:
+            esquema = repr(modelo)
+        forma = _forma_por_ruta[id(ruta)] = hashlib.sha1(esquema.encode("utf-8")).hexdigest()[:12]
+    return forma
+
+
+def _coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil (RFC 9110): W/"x" y "x" son la misma versión"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in {candidato.strip().removeprefix("W/") for candidato in if_none_match.split(",")}
+
+
+def condicional(request: Request, version, response: Optional[Response] = None) -> Dict[str, str]:
+    """
+    Corta con 304 si el cliente ya tiene esta versión de los datos. Si no,
+    devuelve las cabeceras (y las deja en `response` si se pasa). Con
+    version None (p. ej. la torre no existe) no hace nada.
+    """
+    if not settings.HTTP_ETAG_ACTIVO or version is None:
+        return {}
+    etag = etiqueta(version, _forma(request))
+    cabeceras = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _coincide(request.headers.get("if-none-match"), etag):
+        NO_MODIFICADAS.inc(getattr(request.scope.get("route"), "path", "sin_ruta"))
+        raise HTTPException(status_code=304, headers=cabeceras)
+    if response is not None:
+        response.headers.update(cabeceras)
+    return cabeceras
+
+
+# ---------- Compresión ----------
+
+
+def elegir_codificacion(aceptadas: str) -> Optional[str]:
+    """br (si hay brotli) o gzip según Accept-Encoding, respetando q=0"""
+    calidades = {}
+    for parte in aceptadas.lower().split(","):
+        nombre, _, parametros = parte.partition(";")
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        calidades[nombre.strip()] = calidad
+    for codificacion in ("br", "gzip") if brotli is not None else ("gzip",):
+        if calidades.get(codificacion, calidades.get("*", 0.0)) > 0:
+            return codificacion
+    return None
+
+
+def comprimir(codificacion: str, cuerpo: bytes, nivel: int) -> bytes:
+    if codificacion == "br":
+        return brotli.compress(cuerpo, quality=CALIDAD_BROTLI)
+    return gzip.compress(cuerpo, compresslevel=nivel, mtime=0)
+
+
+def _comprimible(cabeceras: MutableHeaders) -> bool:
+    if "content-encoding" in cabeceras:
+        return False
+    tipo = cabeceras.get("content-type", "").split(";")[0].strip().lower()
+    return tipo.startswith("text/") or tipo in TIPOS_COMPRIMIBLES
+
+
+class MiddlewareCompresion:
+    """Middleware ASGI puro: comprime respuestas 200 de un solo mensaje de cuerpo"""
+
+    def __init__(self, app, minimo: int, nivel: int):
+        self.app = app
+        self.minimo = minimo
+        self.nivel = nivel
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        codificacion = elegir_codificacion(Headers(scope=scope).get("accept-encoding", ""))
+        if codificacion is None:
+            return await self.app(scope, receive, send)
+        inicio = None
+
+        async def enviar(mensaje):
+            nonlocal inicio
+            if mensaje["type"] == "http.response.start":
+                inicio = mensaje  # Se retiene hasta ver el cuerpo
+                return
+            if inicio is None or mensaje["type"] != "http.response.body":
+                return await send(mensaje)
+            pendiente, inicio = inicio, None
+            cuerpo = mensaje.get("body", b"")
+            cabeceras = MutableHeaders(raw=pendiente["headers"])
+            if (
+                pendiente["status"] != 200
+                or mensaje.get("more_body", False)
+                or len(cuerpo) < self.minimo
+                or not _comprimible(cabeceras)
+            ):
+                await send(pendiente)
+                return await send(mensaje)
+
+            if len(cuerpo) >= COMPRIMIR_EN_HILO_DESDE:
+                comprimido = await run_in_threadpool(comprimir, codificacion, cuerpo, self.nivel)
+            else:
+                comprimido = comprimir(codificacion, cuerpo, self.nivel)
+            COMPRESION_BYTES.inc(codificacion, "original", cantidad=len(cuerpo))
+            COMPRESION_BYTES.inc(codificacion, "comprimido", cantidad=len(comprimido))
+
+            cabeceras["Content-Encoding"] = codificacion
+            cabeceras["Content-Length"] = str(len(comprimido))
+            cabeceras.add_vary_header("Accept-Encoding")
+            etag = cabeceras.get("etag")
+            if etag and not etag.startswith("W/"):  # Otro cuerpo byte a byte: un ETag fuerte ya no vale
+                cabeceras["ETag"] = f"W/{etag}"
+            await send(pendiente)
+            await send({"type": "http.response.body", "body": comprimido})
+
+        await self.app(scope, receive, enviar)
+
+
+def instalar(app: FastAPI):
+    """Middleware de compresión. Llamar antes que los demás middlewares: así queda por dentro y ve el cuerpo
+    tal como sale de la ruta (BaseHTTPMiddleware lo reenvía en varios mensajes)"""
+    if settings.HTTP_COMPRESION_MINIMO_BYTES <= 0:
+        return
+    app.add_middleware(
+        MiddlewareCompresion, minimo=settings.HTTP_COMPRESION_MINIMO_BYTES, nivel=settings.HTTP_COMPRESION_NIVEL
+    )
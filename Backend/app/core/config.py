@@ -12,6 +12,87 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
 
+    # Búsqueda unificada (residentes, usuarios, apartamentos)
+    BUSQUEDA_PRESUPUESTO_MS: int = int(os.getenv("BUSQUEDA_PRESUPUESTO_MS", 200))
+
+    # Cola de validación de pagos: segundos que un administrador retiene los pagos reclamados
+    COLA_VALIDACION_LEASE_SEGUNDOS: int = int(os.getenv("COLA_VALIDACION_LEASE_SEGUNDOS", 300))
+
+    # Estados de cuenta en PDF: carpeta de salida y procesos de renderizado (0 = uno por CPU)
+    ESTADOS_CUENTA_DIR: str = os.getenv("ESTADOS_CUENTA_DIR", "generados/estados_cuenta")
+    ESTADOS_CUENTA_PROCESOS: int = int(os.getenv("ESTADOS_CUENTA_PROCESOS", 0))
+
+    # Programador de jobs: activo en cada worker, segundos entre ciclos y horas hacia atrás para recuperar turnos
+    JOBS_PROGRAMADOR_ACTIVO: bool = os.getenv("JOBS_PROGRAMADOR_ACTIVO", "true").lower() in ("1", "true", "si")
+    JOBS_INTERVALO_SEGUNDOS: int = int(os.getenv("JOBS_INTERVALO_SEGUNDOS", 30))
+    JOBS_VENTANA_RECUPERACION_HORAS: int = int(os.getenv("JOBS_VENTANA_RECUPERACION_HORAS", 72))
+    # Jobs independientes que corren a la vez y tiempo límite por defecto de cada job
+    JOBS_MAX_CONCURRENCIA: int = int(os.getenv("JOBS_MAX_CONCURRENCIA", 4))
+    JOBS_TIMEOUT_SEGUNDOS: int = int(os.getenv("JOBS_TIMEOUT_SEGUNDOS", 600))
+
+    # Tasas históricas: días sin publicación tolerados (fines de semana, feriados) y recarga del índice en memoria
+    TASAS_HISTORICAS_MAX_DIAS_HUECO: int = int(os.getenv("TASAS_HISTORICAS_MAX_DIAS_HUECO", 10))
+    TASAS_HISTORICAS_RECARGA_SEGUNDOS: int = int(os.getenv("TASAS_HISTORICAS_RECARGA_SEGUNDOS", 600))
+
+    # Proveedores de la tasa BCV: lista JSON que reemplaza las fuentes por defecto, tiempo límite por consulta,
+    # circuito por proveedor (fallos seguidos para abrirlo y segundos abierto) y cache en memoria
+    TASAS_PROVEEDORES: str = os.getenv("TASAS_PROVEEDORES", "")
+    TASAS_PROVEEDOR_TIMEOUT_SEGUNDOS: float = float(os.getenv("TASAS_PROVEEDOR_TIMEOUT_SEGUNDOS", 5))
+    TASAS_CIRCUITO_FALLOS: int = int(os.getenv("TASAS_CIRCUITO_FALLOS", 3))
+    TASAS_CIRCUITO_APERTURA_SEGUNDOS: int = int(os.getenv("TASAS_CIRCUITO_APERTURA_SEGUNDOS", 300))
+    TASAS_CACHE_MINUTOS: int = int(os.getenv("TASAS_CACHE_MINUTOS", 30))
+    # Copia en disco de la última tasa válida, usada sin red mientras no supere la antigüedad indicada
+    TASAS_SNAPSHOT_ARCHIVO: str = os.getenv("TASAS_SNAPSHOT_ARCHIVO", "generados/tasa_bcv.json")
+    TASAS_SNAPSHOT_MAX_HORAS: int = int(os.getenv("TASAS_SNAPSHOT_MAX_HORAS", 168))
+
+    # Caches en memoria (topología, índice de búsqueda): segundos entre verificaciones de su versión compartida
+    # entre workers (tabla versiones_cache); 0 verifica en cada lectura
+    CACHE_VERIFICACION_SEGUNDOS: float = float(os.getenv("CACHE_VERIFICACION_SEGUNDOS", 5))
+
+    # Arranque: aplicar migraciones pendientes (alembic upgrade head) si el esquema no está al día
+    DB_MIGRAR_AL_ARRANCAR: bool = os.getenv("DB_MIGRAR_AL_ARRANCAR", "true").lower() in ("1", "true", "si")
+
+    # SQL por petición (cabecera Server-Timing) y detector de N+1: repeticiones de una misma sentencia toleradas
+    # por petición; en modo estricto (desarrollo) la petición falla al superarlas
+    SQL_INSTRUMENTACION_ACTIVA: bool = os.getenv("SQL_INSTRUMENTACION_ACTIVA", "true").lower() in ("1", "true", "si")
+    SQL_REPETICION_MAXIMA: int = int(os.getenv("SQL_REPETICION_MAXIMA", 20))
+    SQL_REPETICION_ESTRICTA: bool = os.getenv("SQL_REPETICION_ESTRICTA", "false").lower() in ("1", "true", "si")
+
+    # Registro de consultas lentas (tabla consultas_lentas, GET /admin/consultas-lentas): umbral en ms (0 lo
+    # desactiva), EXPLAIN de cada patrón de sentencia como mucho una vez cada tantos minutos y días de retención
+    SQL_LENTA_UMBRAL_MS: int = int(os.getenv("SQL_LENTA_UMBRAL_MS", 500))
+    SQL_LENTA_EXPLAIN: bool = os.getenv("SQL_LENTA_EXPLAIN", "true").lower() in ("1", "true", "si")
+    SQL_LENTA_EXPLAIN_MINUTOS: int = int(os.getenv("SQL_LENTA_EXPLAIN_MINUTOS", 10))
+    SQL_LENTA_EXPLAIN_TIMEOUT_SEGUNDOS: int = int(os.getenv("SQL_LENTA_EXPLAIN_TIMEOUT_SEGUNDOS", 30))
+    SQL_LENTA_RETENCION_DIAS: int = int(os.getenv("SQL_LENTA_RETENCION_DIAS", 30))
+
+    # Métricas en formato Prometheus en GET /metrics
+    METRICAS_ACTIVAS: bool = os.getenv("METRICAS_ACTIVAS", "true").lower() in ("1", "true", "si")
+
+    # Respuestas HTTP: ETag por versión de datos en lecturas grandes (304 con If-None-Match) y compresión brotli
+    # (si el paquete está instalado) o gzip de los cuerpos desde HTTP_COMPRESION_MINIMO_BYTES (0 la desactiva)
+    HTTP_ETAG_ACTIVO: bool = os.getenv("HTTP_ETAG_ACTIVO", "true").lower() in ("1", "true", "si")
+    HTTP_COMPRESION_MINIMO_BYTES: int = int(os.getenv("HTTP_COMPRESION_MINIMO_BYTES", 1024))
+    HTTP_COMPRESION_NIVEL: int = int(os.getenv("HTTP_COMPRESION_NIVEL", 5))
+
+    # Logging: nivel, formato ("texto" o "json"), cola hacia el hilo que escribe y muestreo de los mensajes de
+    # bucles (uno de cada LOG_MUESTREO; por logger con "app.services.cargos_service=50,...")
+    LOG_NIVEL: str = os.getenv("LOG_NIVEL", "INFO").upper()
+    LOG_FORMATO: str = os.getenv("LOG_FORMATO", "texto").lower()
+    LOG_COLA_MAXIMA: int = int(os.getenv("LOG_COLA_MAXIMA", 10000))
+    LOG_MUESTREO: int = int(os.getenv("LOG_MUESTREO", 100))
+    LOG_MUESTREO_LOGGERS: str = os.getenv("LOG_MUESTREO_LOGGERS", "")
+
+    # Perfilador por muestreo (GET /admin/perfilador): una petición con X-Perfilar (o ?perfilar=) de un
+    # administrador se muestrea cada PERFILADOR_INTERVALO_MS; el modo global muestrea todo el proceso a
+    # PERFILADOR_GLOBAL_HZ, frenando si su propio costo supera PERFILADOR_SOBRECARGA_MAXIMA (fracción)
+    PERFILADOR_PETICIONES: bool = os.getenv("PERFILADOR_PETICIONES", "true").lower() in ("1", "true", "si")
+    PERFILADOR_INTERVALO_MS: float = float(os.getenv("PERFILADOR_INTERVALO_MS", 2))
+    PERFILADOR_PERFILES_GUARDADOS: int = int(os.getenv("PERFILADOR_PERFILES_GUARDADOS", 20))
+    PERFILADOR_GLOBAL: bool = os.getenv("PERFILADOR_GLOBAL", "true").lower() in ("1", "true", "si")
+    PERFILADOR_GLOBAL_HZ: float = float(os.getenv("PERFILADOR_GLOBAL_HZ", 10))
+    PERFILADOR_SOBRECARGA_MAXIMA: float = float(os.getenv("PERFILADOR_SOBRECARGA_MAXIMA", 0.01))
+
     # Validar que exista la SECRET_KEY
     if not SECRET_KEY:
         raise ValueError("SECRET_KEY no configurada en variables de entorno")
@@ -0,0 +1,151 @@
+# core/instrumentacion_sql.py
+"""
+Instrumentación de SQL por petición y detector de N+1.
+
+Los eventos before/after_cursor_execute del engine anotan, en el contexto de
+la petición HTTP en curso (ContextVar, que anyio copia al hilo de las rutas
+síncronas), cuántas sentencias se ejecutaron, el tiempo total en la base y
+cuántas veces se repitió cada sentencia normalizada (huella: parámetros,
+literales y listas de IN reemplazados por ?).
+
+Cada respuesta lleva la cabecera Server-Timing:
+
+    Server-Timing: db;dur=12.4;desc="14 consultas", app;dur=31.0
+
+Si una misma huella se repite más de SQL_REPETICION_MAXIMA veces se registra
+un aviso con la sentencia (el patrón típico de N+1: una consulta por fila de
+otra consulta) y se agrega `sql-repetida` a Server-Timing. Con
+SQL_REPETICION_ESTRICTA (desarrollo) la petición falla en la repetición
+N+1, antes de confirmar nada, con ConsultasRepetidasError.
+
+Fuera de una petición (jobs, scripts, benchmarks) los eventos no anotan nada.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+
+from .config import settings
+from .metricas import HTTP_CONSULTAS_SQL, HTTP_SQL_SEGUNDOS
+
+logger = logging.getLogger(__name__)
+
+_peticion_actual: ContextVar[Optional["ConsultasPeticion"]] = ContextVar("consultas_peticion", default=None)
+
+_PARAMETRO = re.compile(r"%\(\w+\)s|%s|\?|\$\d+")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+
+
+class ConsultasRepetidasError(RuntimeError):
+    """La misma sentencia se repitió más de SQL_REPETICION_MAXIMA veces en una petición (modo estricto)"""
+
+
+@lru_cache(maxsize=4096)
+def huella(sentencia: str) -> str:
+    """Sentencia normalizada: iguales para la misma consulta con distintos parámetros o largo de IN (...)"""
+    normalizada = _LITERAL.sub("?", _PARAMETRO.sub("?", sentencia))
+    return _ESPACIOS.sub(" ", _LISTA.sub("(?)", normalizada)).strip()
+
+
+class ConsultasPeticion:
+    def __init__(self, maxima_repeticion: int, estricta: bool):
+        self.maxima_repeticion = maxima_repeticion
+        self.estricta = estricta
+        self.total = 0
+        self.segundos_db = 0.0
+        self.huellas: Counter = Counter()
+        self.error: Optional[ConsultasRepetidasError] = None
+        self.scope: Optional[dict] = None  # El de la petición: el router le agrega "route" al resolverla
+
+    def anotar(self, sentencia: str, segundos: float):
+        self.total += 1
+        self.segundos_db += segundos
+        clave = huella(sentencia)
+        self.huellas[clave] += 1
+        if self.estricta and self.huellas[clave] == self.maxima_repeticion + 1:
+            self.error = ConsultasRepetidasError(
+                f"Sentencia repetida más de {self.maxima_repeticion} veces en la petición (N+1): {clave[:300]}"
+            )
+            raise self.error
+
+    def repetidas(self):
+        """[(huella, veces)] de las que superan el máximo, de la más repetida a la menos"""
+        return [(h, n) for h, n in self.huellas.most_common() if n > self.maxima_repeticion]
+
+
+def ruta_actual() -> Optional[str]:
+    """Plantilla de la ruta de la petición en curso (None fuera de una petición o antes del ruteo)"""
+    consultas = _peticion_actual.get()
+    if consultas is None or consultas.scope is None:
+        return None
+    return getattr(consultas.scope.get("route"), "path", None)
+
+
+# El inicio se guarda en el contexto de ejecución de la sentencia (no en la conexión): si la sentencia
+# falla no llega after_cursor_execute, y el contexto se descarta con ella sin dejar nada pendiente
+
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _peticion_actual.get() is not None:
+        context._inicio_instrumentacion = time.perf_counter()
+
+
+def _despues(conn, cursor, statement, parameters, context, executemany):
+    consultas = _peticion_actual.get()
+    inicio = getattr(context, "_inicio_instrumentacion", None)
+    if consultas is not None and inicio is not None:
+        consultas.anotar(statement, time.perf_counter() - inicio)
+
+
+def instalar(app: FastAPI, engine):
+    """Registra los eventos en el engine y el middleware que abre el registro de cada petición"""
+    if not settings.SQL_INSTRUMENTACION_ACTIVA:
+        return
+    event.listen(engine, "before_cursor_execute", _antes)
+    event.listen(engine, "after_cursor_execute", _despues)
+
+    @app.middleware("http")
+    async def instrumentar_sql(request: Request, call_next):
+        consultas = ConsultasPeticion(settings.SQL_REPETICION_MAXIMA, settings.SQL_REPETICION_ESTRICTA)
+        consultas.scope = request.scope
+        marca = _peticion_actual.set(consultas)
+        inicio = time.perf_counter()
+        try:
+            respuesta = await call_next(request)
+        except Exception:
+            if consultas.error is None:
+                raise
+        finally:
+            _peticion_actual.reset(marca)
+        # El error puede llegar envuelto (p. ej. en ResponseValidationError si la carga perezosa ocurrió al
+        # serializar) o atrapado por la ruta: la respuesta se decide aquí
+        if consultas.error is not None:
+            respuesta = JSONResponse(status_code=500, content={"detail": str(consultas.error)})
+        total_ms = (time.perf_counter() - inicio) * 1000
+        db_ms = consultas.segundos_db * 1000
+
+        metricas = [f'db;dur={db_ms:.1f};desc="{consultas.total} consultas"', f"app;dur={total_ms:.1f}"]
+        repetidas = consultas.repetidas()
+        ruta = getattr(request.scope.get("route"), "path", request.url.path)
+        if "route" in request.scope:
+            HTTP_CONSULTAS_SQL.observar(consultas.total, ruta)
+            HTTP_SQL_SEGUNDOS.inc(ruta, cantidad=consultas.segundos_db)
+        if repetidas:
+            metricas.append(f'sql-repetida;desc="{repetidas[0][1]}x"')
+            for sentencia, veces in repetidas[:3]:
+                logger.warning(
+                    f"🔁 {request.method} {ruta}: {veces}x la misma sentencia (posible N+1): {sentencia[:300]}"
+                )
+        logger.debug(f"🗄️ {request.method} {ruta}: {consultas.total} consultas, {db_ms:.1f}/{total_ms:.1f} ms en BD")
+        respuesta.headers["Server-Timing"] = ", ".join(metricas)
+        return respuesta
@@ -0,0 +1,167 @@
+# core/logs.py
+"""
+Configuración de logging de la aplicación: cola, JSON y muestreo.
+
+- Los handlers de la raíz se reemplazan por un QueueHandler: el hilo de la
+  petición (o del job) sólo arma el registro y lo encola; un QueueListener
+  formatea y escribe en su propio hilo. La cola es acotada (LOG_COLA_MAXIMA):
+  si se llena se descartan registros y se cuentan en
+  log_registros_descartados_total, en vez de frenar a quien registra.
+- LOG_FORMATO=json escribe un objeto por línea con la hora, nivel, logger,
+  mensaje, función y línea de origen, ruta HTTP en curso y los campos de
+  `extra=`; "texto" (por defecto) una línea legible.
+- muestreado(logger) envuelve el logger para mensajes de bucles (uno por
+  cargo, por pago...): deja pasar la primera aparición de cada mensaje y
+  luego una de cada N (LOG_MUESTREO, o por logger en LOG_MUESTREO_LOGGERS
+  "app.services.cargos_service=50,..."), con el total de apariciones. Los
+  descartados no llegan a crear el LogRecord.
+
+En los bucles se usan argumentos perezosos ("Cargo %s", cargo.id) en lugar de
+f-strings: con el nivel apagado el mensaje nunca se formatea.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+from .config import settings
+from .instrumentacion_sql import ruta_actual
+from .metricas import metricas
+
+MAX_PLANTILLAS_MUESTREO = 1000
+
+LOGS_DESCARTADOS = metricas.contador(
+    "log_registros_descartados_total", "Registros de log descartados con la cola llena", ("nivel",)
+)
+
+# Atributos propios de LogRecord: lo demás vino en extra= y va al JSON como campo
+_ATRIBUTOS_ESTANDAR = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "ruta"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class ManejadorCola(logging.handlers.QueueHandler):
+    """QueueHandler que no bloquea (descarta con la cola llena) y conserva los campos de extra="""
+
+    def filter(self, record: logging.LogRecord):
+        # En el hilo que registra: la ruta vive en un ContextVar que el hilo del listener no ve
+        record.ruta = ruta_actual()
+        return super().filter(record)
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOGS_DESCARTADOS.inc(record.levelname)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Como el original, pero el traceback va aparte (campo propio en JSON) en lugar de pegado al mensaje
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+class FormatoTexto(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        texto = super().format(record)
+        if getattr(record, "muestreo", 1) > 1:
+            texto += f" [1 de cada {record.muestreo}, {record.apariciones} en total]"
+        return texto
+
+
+class FormatoJSON(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+            "origen": f"{record.module}:{record.funcName}:{record.lineno}",
+            "hilo": record.threadName,
+        }
+        if getattr(record, "ruta", None):
+            datos["ruta"] = record.ruta
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_ESTANDAR:
+                datos[clave] = valor
+        if record.exc_text:
+            datos["excepcion"] = record.exc_text
+        return json.dumps(datos, default=str, ensure_ascii=False)
+
+
+def configurar():
+    """Raíz -> cola -> hilo que escribe en stderr. Idempotente (recargas, varios imports de main)"""
+    global _listener
+    if _listener is not None:
+        return
+    salida = logging.StreamHandler(sys.stderr)
+    salida.setFormatter(FormatoJSON() if settings.LOG_FORMATO == "json" else FormatoTexto())
+
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    raiz.addHandler(ManejadorCola(queue.Queue(maxsize=settings.LOG_COLA_MAXIMA)))
+    raiz.setLevel(settings.LOG_NIVEL)
+
+    _listener = logging.handlers.QueueListener(raiz.handlers[0].queue, salida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(detener)
+
+
+def detener():
+    """Vacía la cola y detiene el hilo del listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _frecuencias() -> Dict[str, int]:
+    frecuencias = {}
+    for par in filter(None, (p.strip() for p in settings.LOG_MUESTREO_LOGGERS.split(","))):
+        nombre, _, cada = par.partition("=")
+        frecuencias[nombre.strip()] = int(cada)
+    return frecuencias
+
+
+class RegistroMuestreado(logging.LoggerAdapter):
+    """Primera aparición de cada mensaje y luego una de cada `cada` (por plantilla, sin formatearla)"""
+
+    def __init__(self, logger: logging.Logger, cada: int):
+        super().__init__(logger, {})
+        self.cada = max(cada, 1)
+        self._apariciones: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def log(self, level, msg, *args, **kwargs):
+        if not self.isEnabledFor(level):
+            return
+        with self._lock:
+            if len(self._apariciones) >= MAX_PLANTILLAS_MUESTREO:  # Alguien pasó un f-string: no crecer sin fin
+                self._apariciones.clear()
+            self._apariciones[msg] += 1
+            apariciones = self._apariciones[msg]
+        if (apariciones - 1) % self.cada:
+            return
+        kwargs["extra"] = {**kwargs.get("extra", {}), "muestreo": self.cada, "apariciones": apariciones}
+        kwargs.setdefault("stacklevel", 2)  # funcName/lineno de quien llamó, no de este método
+        self.logger.log(level, msg, *args, **kwargs)
+
+
+def muestreado(logger: logging.Logger, cada: Optional[int] = None) -> RegistroMuestreado:
+    """Logger para mensajes de bucles calientes"""
+    if cada is None:
+        cada = _frecuencias().get(logger.name, settings.LOG_MUESTREO)
+    return RegistroMuestreado(logger, cada)
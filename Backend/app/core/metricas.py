@@ -0,0 +1,258 @@
+# core/metricas.py
+"""
+Métricas en formato de texto de Prometheus, expuestas en GET /metrics.
+
+Contadores, histogramas y medidores propios (sin prometheus_client): anotar
+una observación es un bisect sobre los límites y una suma bajo un lock, del
+orden de un microsegundo. Los medidores se calculan al momento de la
+consulta (estado del pool, circuitos de los proveedores, proporción de
+aciertos de cada cache), así que no cuestan nada entre consultas.
+
+Se exportan:
+
+- http_peticion_duracion_segundos{metodo,ruta,codigo}: histograma por plantilla de ruta
+  (las rutas no encontradas van juntas en "sin_ruta" para no multiplicar series)
+- http_peticiones_en_curso
+- http_consultas_sql_por_peticion{ruta} y http_sql_segundos_total{ruta} (ver core/instrumentacion_sql.py)
+- http_respuestas_no_modificadas_total{ruta} y http_compresion_bytes_total{codificacion,fase} (ver core/cache_http.py)
+- db_pool_*: tamaño, conexiones en uso, desborde y libres de engine.pool; checkouts y conexiones abiertas
+- sql_consultas_lentas_total{resultado}: sentencias sobre SQL_LENTA_UMBRAL_MS (ver services/consultas_lentas_service.py)
+- job_duracion_segundos{job,estado}: cada turno ejecutado por el programador
+- tasa_proveedor_duracion_segundos{proveedor,resultado}, tasa_proveedor_saltos_total{proveedor} y
+  tasa_proveedor_circuito_abierto{proveedor}
+- log_registros_descartados_total{nivel}: registros que no entraron en la cola de logging (ver core/logs.py)
+- cache_consultas_total{cache,resultado} y cache_aciertos_ratio{cache}: tasa actual, topología,
+  índice de tasas históricas, índice de búsqueda y PDFs de estados de cuenta
+
+Cada worker de uvicorn lleva sus propias métricas: con varios workers, Prometheus
+debe consultar cada proceso (o usar un worker por contenedor).
+"""
+
+import bisect
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Sequence, Tuple
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+
+from .config import settings
+
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_JOBS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _etiquetas(nombres: Sequence[str], valores: Sequence, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _numero(valor: float) -> str:
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self._valores: Dict[Tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *valores, cantidad: float = 1.0):
+        with self._lock:
+            self._valores[valores] += cantidad
+
+    def valor(self, *valores) -> float:
+        return self._valores.get(valores, 0.0)
+
+    def claves(self) -> list:
+        with self._lock:
+            return list(self._valores)
+
+    def lineas(self) -> Iterable[str]:
+        with self._lock:
+            valores = list(self._valores.items())
+        for clave, valor in valores:
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}"
+
+
+class Histograma:
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (), limites=LIMITES_LATENCIA):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self.limites = tuple(limites)
+        self._series: Dict[Tuple, list] = {}  # etiquetas -> [conteo por límite (+Inf al final), suma]
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *valores):
+        posicion = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.limites) + 1), 0.0]
+            serie[0][posicion] += 1
+            serie[1] += valor
+
+    def lineas(self) -> Iterable[str]:
+        with self._lock:
+            series = [(clave, list(conteos), suma) for clave, (conteos, suma) in self._series.items()]
+        for clave, conteos, suma in series:
+            acumulado = 0
+            for limite, conteo in zip(self.limites + (float("inf"),), conteos):
+                acumulado += conteo
+                le = 'le="+Inf"' if limite == float("inf") else f'le="{_numero(limite)}"'
+                yield f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {acumulado}"
+            yield f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}"
+            yield f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {acumulado}"
+
+
+class Medidor:
+    """Valor calculado al consultar /metrics: `funcion` devuelve [(valores de etiquetas, valor)]"""
+
+    tipo = "gauge"
+
+    def __init__(self, nombre: str, ayuda: str, funcion: Callable[[], Iterable], etiquetas: Sequence[str] = ()):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self.funcion = funcion
+
+    def lineas(self) -> Iterable[str]:
+        for clave, valor in self.funcion():
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}"
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas: Dict[str, object] = {}
+
+    def _registrar(self, metrica):
+        # Idempotente: recargar un módulo no duplica la serie
+        return self._metricas.setdefault(metrica.nombre, metrica)
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (), limites=LIMITES_LATENCIA):
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, limites))
+
+    def medidor(self, nombre: str, ayuda: str, funcion: Callable[[], Iterable], etiquetas: Sequence[str] = ()):
+        return self._registrar(Medidor(nombre, ayuda, funcion, etiquetas))
+
+    def exponer(self) -> str:
+        lineas = []
+        for metrica in self._metricas.values():
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.lineas())
+        return "\n".join(lineas) + "\n"
+
+
+# Instancia global
+metricas = RegistroMetricas()
+
+# ---------- Métricas compartidas ----------
+
+HTTP_DURACION = metricas.histograma(
+    "http_peticion_duracion_segundos", "Duración de las peticiones HTTP", ("metodo", "ruta", "codigo")
+)
+HTTP_CONSULTAS_SQL = metricas.histograma(
+    "http_consultas_sql_por_peticion", "Sentencias SQL por petición", ("ruta",), LIMITES_CONSULTAS
+)
+HTTP_SQL_SEGUNDOS = metricas.contador("http_sql_segundos_total", "Tiempo en la base de datos por ruta", ("ruta",))
+JOB_DURACION = metricas.histograma(
+    "job_duracion_segundos", "Duración de cada turno de job ejecutado", ("job", "estado"), LIMITES_JOBS
+)
+PROVEEDOR_DURACION = metricas.histograma(
+    "tasa_proveedor_duracion_segundos", "Latencia de los proveedores de tasa", ("proveedor", "resultado")
+)
+PROVEEDOR_SALTOS = metricas.contador(
+    "tasa_proveedor_saltos_total", "Consultas evitadas con el circuito del proveedor abierto", ("proveedor",)
+)
+CACHE_CONSULTAS = metricas.contador("cache_consultas_total", "Lecturas de cache por resultado", ("cache", "resultado"))
+
+
+def registrar_cache(cache: str, acierto: bool, cantidad: int = 1):
+    if cantidad:
+        CACHE_CONSULTAS.inc(cache, "acierto" if acierto else "fallo", cantidad=cantidad)
+
+
+def _proporcion_aciertos():
+    caches = {cache for cache, _ in CACHE_CONSULTAS.claves()}
+    for cache in sorted(caches):
+        aciertos, fallos = CACHE_CONSULTAS.valor(cache, "acierto"), CACHE_CONSULTAS.valor(cache, "fallo")
+        yield (cache,), aciertos / (aciertos + fallos)
+
+
+metricas.medidor("cache_aciertos_ratio", "Proporción de aciertos de cada cache", _proporcion_aciertos, ("cache",))
+
+
+# ---------- HTTP ----------
+
+
+_en_curso = [0]  # Peticiones HTTP en curso en este worker
+metricas.medidor("http_peticiones_en_curso", "Peticiones HTTP en curso en este worker", lambda: [((), _en_curso[0])])
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI puro (sin BaseHTTPMiddleware): duración por plantilla de ruta y código"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        inicio = time.perf_counter()
+        codigo = [500]
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                codigo[0] = mensaje["status"]
+            await send(mensaje)
+
+        _en_curso[0] += 1  # Un solo hilo (el event loop): no necesita lock
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _en_curso[0] -= 1
+            ruta = getattr(scope.get("route"), "path", "sin_ruta")
+            HTTP_DURACION.observar(time.perf_counter() - inicio, scope["method"], ruta, codigo[0])
+
+
+def _medidores_pool(pool):
+    medidores = {
+        "tamano": ("size", "Conexiones fijas del pool"),
+        "en_uso": ("checkedout", "Conexiones entregadas y aún no devueltas"),
+        "desborde": ("overflow", "Conexiones por encima del tamaño (negativo mientras el pool no se llenó)"),
+        "libres": ("checkedin", "Conexiones abiertas esperando en el pool"),
+    }
+    for sufijo, (metodo, ayuda) in medidores.items():
+        if hasattr(pool, metodo):  # SQLite usa pools sin tamaño fijo
+            metricas.medidor(f"db_pool_{sufijo}", ayuda, lambda m=metodo: [((), getattr(pool, m)())])
+
+    checkouts = metricas.contador("db_pool_checkouts_total", "Conexiones entregadas por el pool")
+    conexiones = metricas.contador("db_pool_conexiones_abiertas_total", "Conexiones nuevas abiertas con la base")
+    event.listen(pool, "checkout", lambda *args: checkouts.inc())
+    event.listen(pool, "connect", lambda *args: conexiones.inc())
+
+
+def instalar(app: FastAPI, engine):
+    """Middleware de duración, métricas del pool y la ruta GET /metrics"""
+    if not settings.METRICAS_ACTIVAS:
+        return
+    app.add_middleware(MiddlewareMetricas)
+    _medidores_pool(engine.pool)
+
+    @app.get("/metrics", include_in_schema=False)
+    def exponer_metricas():
+        return PlainTextResponse(metricas.exponer(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,372 @@
+# core/perfilador.py
+"""
+Perfilador por muestreo, sin dependencias: un hilo lee periódicamente
+sys._current_frames() y cuenta las pilas.
+
+Dos modos, servidos por el mismo hilo:
+
+- Por petición: un administrador agrega la cabecera `X-Perfilar: 1` (o
+  `?perfilar=1`) y esa petición se muestrea cada PERFILADOR_INTERVALO_MS. La
+  respuesta lleva `X-Perfil` con la ruta del perfil guardado (se guardan los
+  últimos PERFILADOR_PERFILES_GUARDADOS); con `svg` en lugar de `1` se
+  responde directamente el gráfico de llamas. Las pilas se atribuyen a la
+  petición por el contexto (contextvars) que está ejecutando cada hilo: el
+  del handle de asyncio en el event loop y el del hilo de anyio en las rutas
+  síncronas, así que otras peticiones concurrentes no se mezclan.
+- Global: todo el proceso (peticiones, jobs del programador) a
+  PERFILADOR_GLOBAL_HZ, acumulando sólo las pilas que pasan por código de
+  app/ y no están esperando (Event.wait, Queue.get, select). El hilo mide lo
+  que tarda cada muestra y espacia las siguientes para que ese costo no
+  supere PERFILADOR_SOBRECARGA_MAXIMA del tiempo (1% por defecto).
+
+Ambos se consultan en /admin/perfilador (routers/admin/perfiles.py). Cada
+worker de uvicorn lleva su propio perfilador.
+"""
+
+import itertools
+import logging
+import os
+import queue
+import selectors
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import Context, ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+
+from .config import settings
+from ..utils.grafico_llamas import grafico_svg, plegadas
+
+logger = logging.getLogger(__name__)
+
+CABECERA = "X-Perfilar"
+PARAMETRO = "perfilar"
+MAX_PILAS_GLOBALES = 5000
+
+_perfil_actual: ContextVar[Optional["PerfilPeticion"]] = ContextVar("perfil_peticion", default=None)
+
+_CARPETA_BACKEND = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_CARPETA_APP = os.path.join(_CARPETA_BACKEND, "app") + os.sep
+# Un hilo cuya hoja está en estos módulos está esperando, no trabajando
+_ARCHIVOS_ESPERA = {threading.__file__, queue.__file__, selectors.__file__}
+
+
+def _codigos_con_contexto() -> Dict[object, str]:
+    """Marcos que ejecutan código dentro de un contextvars.Context, y dónde está ese contexto"""
+    import asyncio.events
+
+    codigos = {asyncio.events.Handle._run.__code__: "self._context"}
+    try:
+        from anyio._backends._asyncio import WorkerThread
+
+        codigos[WorkerThread.run.__code__] = "context"
+    except (ImportError, AttributeError):  # Otra versión de anyio: sólo se perfila el event loop
+        pass
+    return codigos
+
+
+_CODIGOS_CONTEXTO = _codigos_con_contexto()
+
+
+def _es_de_app(etiqueta: str) -> bool:
+    return "(app/" in etiqueta
+
+
+class PerfilPeticion:
+    def __init__(self, id_perfil: int, metodo: str, ruta: str):
+        self.id = id_perfil
+        self.metodo = metodo
+        self.ruta = ruta
+        self.fecha = datetime.now()
+        self.duracion_ms: Optional[float] = None
+        self.muestras = 0
+        self.pilas: Counter = Counter()  # (código raíz, ..., código hoja) -> muestras
+
+    def resumen(self) -> Dict:
+        return {
+            "id": self.id,
+            "metodo": self.metodo,
+            "ruta": self.ruta,
+            "fecha": self.fecha,
+            "duracion_ms": self.duracion_ms,
+            "muestras": self.muestras,
+        }
+
+
+class Perfilador:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._ids = itertools.count(1)
+        self._activos: Dict[int, PerfilPeticion] = {}
+        self._guardados: deque = deque(maxlen=settings.PERFILADOR_PERFILES_GUARDADOS)
+        self._etiquetas: Dict[object, str] = {}
+
+        self.global_activo = False
+        self.pilas_globales: Counter = Counter()
+        self.muestras_globales = 0  # Hilos muestreados con código de app/ en la pila
+        self.muestras_totales = 0  # Veces que se tomó una muestra global
+        self._segundos_muestreo = 0.0
+        self._desde: Optional[float] = None
+        self._fecha_desde: Optional[datetime] = None
+
+    # ---------- Control ----------
+
+    def iniciar_global(self):
+        self.global_activo = True
+        self.reiniciar()
+        self._asegurar_hilo()
+        self._despertar.set()
+        logger.info(
+            f"🔬 Perfilador global activo ({settings.PERFILADOR_GLOBAL_HZ:g} Hz, "
+            f"sobrecarga máxima {settings.PERFILADOR_SOBRECARGA_MAXIMA:.1%})"
+        )
+
+    def detener_global(self):
+        self.global_activo = False
+
+    def reiniciar(self):
+        with self._lock:
+            self.pilas_globales = Counter()
+            self.muestras_globales = self.muestras_totales = 0
+            self._segundos_muestreo = 0.0
+            self._desde, self._fecha_desde = time.perf_counter(), datetime.now()
+
+    def iniciar_perfil(self, metodo: str, ruta: str) -> PerfilPeticion:
+        perfil = PerfilPeticion(next(self._ids), metodo, ruta)
+        with self._lock:
+            self._activos[perfil.id] = perfil
+        self._asegurar_hilo()
+        self._despertar.set()
+        return perfil
+
+    def terminar_perfil(self, perfil: PerfilPeticion):
+        perfil.duracion_ms = round((datetime.now() - perfil.fecha).total_seconds() * 1000, 1)
+        with self._lock:
+            self._activos.pop(perfil.id, None)
+            self._guardados.append(perfil)
+
+    def _asegurar_hilo(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name="perfilador", daemon=True)
+                self._hilo.start()
+
+    # ---------- Muestreo ----------
+
+    def _bucle(self):
+        proxima_global = time.perf_counter()
+        while True:
+            with self._lock:
+                perfiles = list(self._activos.values())
+            if not perfiles and not self.global_activo:
+                self._despertar.wait()
+                self._despertar.clear()
+                continue
+
+            inicio = time.perf_counter()
+            tomar_global = self.global_activo and inicio >= proxima_global
+            if perfiles or tomar_global:
+                self._muestrear(perfiles, tomar_global)
+            if tomar_global:
+                costo = time.perf_counter() - inicio
+                self._segundos_muestreo += costo
+                # Espaciar las muestras para que su costo no pase de la fracción permitida
+                pausa = max(1 / settings.PERFILADOR_GLOBAL_HZ, costo / settings.PERFILADOR_SOBRECARGA_MAXIMA)
+                proxima_global = inicio + pausa
+
+            if perfiles:
+                espera = settings.PERFILADOR_INTERVALO_MS / 1000
+            else:
+                espera = max(proxima_global - time.perf_counter(), 0)
+            if self._despertar.wait(espera):
+                self._despertar.clear()
+
+    def _muestrear(self, perfiles: List[PerfilPeticion], tomar_global: bool):
+        propio = threading.get_ident()
+        if tomar_global:
+            self.muestras_totales += 1
+        for ident, marco in sys._current_frames().items():
+            if ident == propio:
+                continue
+            codigos = []  # De la hoja a la raíz
+            perfil, corte = None, 0
+            while marco is not None:
+                codigo = marco.f_code
+                if perfiles and perfil is None and codigo in _CODIGOS_CONTEXTO:
+                    perfil = self._perfil_del_marco(marco, codigo, perfiles)
+                    corte = len(codigos)
+                codigos.append(codigo)
+                marco = marco.f_back
+            if perfil is not None and corte:
+                perfil.pilas[tuple(reversed(codigos[:corte]))] += 1
+                perfil.muestras += 1
+            if tomar_global:
+                self._anotar_global(codigos)
+
+    @staticmethod
+    def _perfil_del_marco(marco, codigo, perfiles: List[PerfilPeticion]) -> Optional[PerfilPeticion]:
+        locales = marco.f_locals
+        if _CODIGOS_CONTEXTO[codigo] == "context":
+            contexto = locales.get("context")
+        else:
+            contexto = getattr(locales.get("self"), "_context", None)
+        if not isinstance(contexto, Context):
+            return None
+        perfil = contexto.get(_perfil_actual)
+        return perfil if perfil in perfiles else None
+
+    def _anotar_global(self, codigos: list):
+        if not codigos or codigos[0].co_filename in _ARCHIVOS_ESPERA:
+            return
+        # Desde el primer marco de app/ (más cerca de la raíz) hasta la hoja: sin uvicorn/starlette/anyio
+        for posicion in range(len(codigos) - 1, -1, -1):
+            if codigos[posicion].co_filename.startswith(_CARPETA_APP):
+                break
+        else:
+            return
+        with self._lock:
+            self.pilas_globales[tuple(reversed(codigos[: posicion + 1]))] += 1
+            self.muestras_globales += 1
+            if len(self.pilas_globales) > MAX_PILAS_GLOBALES:
+                self.pilas_globales = Counter(dict(self.pilas_globales.most_common(MAX_PILAS_GLOBALES // 2)))
+
+    # ---------- Resultados ----------
+
+    def _etiqueta(self, codigo) -> str:
+        etiqueta = self._etiquetas.get(codigo)
+        if etiqueta is None:
+            archivo = codigo.co_filename
+            if archivo.startswith(_CARPETA_BACKEND):
+                corto = os.path.relpath(archivo, _CARPETA_BACKEND)
+            elif "site-packages" + os.sep in archivo:
+                corto = archivo.rsplit("site-packages" + os.sep, 1)[1]
+            else:
+                corto = os.path.basename(archivo)
+            etiqueta = self._etiquetas[codigo] = f"{codigo.co_qualname} ({corto.replace(os.sep, '/')})"
+        return etiqueta
+
+    def _con_etiquetas(self, pilas: Counter) -> Dict[Tuple[str, ...], int]:
+        etiquetadas: Counter = Counter()
+        for pila, muestras in list(pilas.items()):
+            etiquetadas[tuple(self._etiqueta(c) for c in pila)] += muestras
+        return etiquetadas
+
+    def funciones_calientes(self, limite: int = 30) -> List[Dict]:
+        """Funciones de app/ por muestras: propias (la más interna de app/ en la pila) e inclusivas"""
+        with self._lock:
+            pilas = list(self.pilas_globales.items())
+            total = self.muestras_globales
+        propias: Counter = Counter()
+        inclusivas: Counter = Counter()
+        for pila, muestras in pilas:
+            de_app = [e for e in (self._etiqueta(c) for c in pila) if _es_de_app(e)]
+            propias[de_app[-1]] += muestras
+            for etiqueta in set(de_app):
+                inclusivas[etiqueta] += muestras
+        return [
+            {
+                "funcion": etiqueta,
+                "inclusivas": muestras,
+                "propias": propias.get(etiqueta, 0),
+                "porcentaje": round(100 * muestras / total, 1) if total else 0.0,
+            }
+            for etiqueta, muestras in inclusivas.most_common(limite)
+        ]
+
+    def estado(self) -> Dict:
+        transcurrido = time.perf_counter() - self._desde if self._desde else 0.0
+        return {
+            "global_activo": self.global_activo,
+            "hz_objetivo": settings.PERFILADOR_GLOBAL_HZ,
+            "desde": self._fecha_desde,
+            "muestras": self.muestras_totales,
+            "muestras_con_app": self.muestras_globales,
+            "pilas_distintas": len(self.pilas_globales),
+            "sobrecarga_pct": round(100 * self._segundos_muestreo / transcurrido, 3) if transcurrido else 0.0,
+            "sobrecarga_maxima_pct": round(100 * settings.PERFILADOR_SOBRECARGA_MAXIMA, 3),
+            "perfiles_en_curso": len(self._activos),
+            "perfiles_guardados": len(self._guardados),
+        }
+
+    def grafico_global(self, formato: str = "svg") -> str:
+        with self._lock:
+            pilas = Counter(self.pilas_globales)
+        return self._exportar(pilas, formato, f"Perfil global desde {self._fecha_desde:%Y-%m-%d %H:%M}")
+
+    def perfiles(self) -> List[Dict]:
+        with self._lock:
+            return [p.resumen() for p in reversed(self._guardados)]
+
+    def perfil(self, id_perfil: int) -> Optional[PerfilPeticion]:
+        with self._lock:
+            return next((p for p in self._guardados if p.id == id_perfil), None)
+
+    def grafico_perfil(self, perfil: PerfilPeticion, formato: str = "svg") -> str:
+        titulo = f"{perfil.metodo} {perfil.ruta}: {perfil.duracion_ms} ms, {perfil.muestras} muestras"
+        return self._exportar(perfil.pilas, formato, titulo)
+
+    def _exportar(self, pilas: Counter, formato: str, titulo: str) -> str:
+        etiquetadas = self._con_etiquetas(pilas)
+        if formato == "plegado":
+            return plegadas(etiquetadas)
+        if formato == "svg":
+            return grafico_svg(etiquetadas, titulo, resaltar=_es_de_app)
+        raise ValueError(f"Formato desconocido: {formato} (svg o plegado)")
+
+
+# Instancia global
+perfilador = Perfilador()
+
+
+# ---------- Perfil de una petición ----------
+
+
+def _verificar_admin(request: Request):
+    """Misma verificación que Depends(verificar_admin), fuera del sistema de dependencias"""
+    from ..database import SessionLocal
+    from .security import get_usuario_actual, verificar_admin
+
+    esquema, _, token = request.headers.get("Authorization", "").partition(" ")
+    if esquema.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Perfilar una petición requiere un token de administrador")
+    with SessionLocal() as db:
+        verificar_admin(get_usuario_actual(token=token, db=db, request=request))
+
+
+def instalar(app: FastAPI):
+    """Arranca el modo global y registra el middleware que perfila las peticiones marcadas"""
+    if settings.PERFILADOR_GLOBAL:
+        app.add_event_handler("startup", perfilador.iniciar_global)
+    if not settings.PERFILADOR_PETICIONES:
+        return
+
+    @app.middleware("http")
+    async def perfilar_peticion(request: Request, call_next):
+        modo = (request.headers.get(CABECERA) or request.query_params.get(PARAMETRO) or "").lower()
+        if modo in ("", "0", "false", "no"):
+            return await call_next(request)
+        try:
+            await run_in_threadpool(_verificar_admin, request)
+        except HTTPException as e:
+            return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+
+        perfil = perfilador.iniciar_perfil(request.method, request.url.path)
+        marca = _perfil_actual.set(perfil)
+        try:
+            respuesta = await call_next(request)
+        finally:
+            _perfil_actual.reset(marca)
+            perfilador.terminar_perfil(perfil)
+        logger.info(f"🔬 {request.method} {request.url.path} perfilada: {perfil.muestras} muestras")
+        if modo == "svg":
+            return Response(perfilador.grafico_perfil(perfil), media_type="image/svg+xml")
+        respuesta.headers["X-Perfil"] = f"/admin/perfilador/perfiles/{perfil.id}"
+        return respuesta
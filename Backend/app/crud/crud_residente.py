@@ -6,6 +6,7 @@ from sqlalchemy.exc import IntegrityError
 
 from ..utils.db_helpers import guardar_y_refrescar
 from ..utils.auditoria_helpers import registrar_auditoria
+from ..services.busqueda_service import busqueda_service
 from .. import models, schemas
 
 
@@ -1019,18 +1020,15 @@ def obtener_residentes_por_torre(db: Session, nombre_torre: str, skip: int = 0,
 
 
 def buscar_residente(db: Session, termino: str, limite: int = 50):
-    termino_busqueda = f"%{termino}%"
-    return (
-        db.query(models.Residente)
-        .filter(
-            models.Residente.nombre.ilike(termino_busqueda)
-            | models.Residente.cedula.ilike(termino_busqueda)
-            | models.Residente.correo.ilike(termino_busqueda)
-        )
-        .order_by(models.Residente.nombre.asc())
-        .limit(limite)
-        .all()
-    )
+    # Ordenado por similitud (pg_trgm o índice local), con prefijo de cédula
+    try:
+        ids = busqueda_service.buscar_ids(db, termino, "residentes", limite)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not ids:
+        return []
+    residentes = {r.id: r for r in db.query(models.Residente).filter(models.Residente.id.in_(ids)).all()}
+    return [residentes[i] for i in ids if i in residentes]
 
 
 def contar_residentes(db: Session, solo_activos: bool = True):
@@ -1110,7 +1108,7 @@ def busqueda_avanzada(
     if nombre:
         query = query.filter(models.Residente.nombre.ilike(f"%{nombre}%"))
     if cedula:
-        query = query.filter(models.Residente.cedula.ilike(f"%{cedula}%"))
+        query = query.filter(models.Residente.cedula.like(f"{cedula.strip()}%"))  # Prefijo (usa índice)
     if tipo_residente:
         query = query.filter(models.Residente.tipo_residente == tipo_residente)
     if estado_operativo:
@@ -1,6 +1,8 @@
+import json
 from fastapi import HTTPException
 from sqlalchemy.orm import Session, joinedload
 from .. import models
+from ..services.topologia_service import topologia_service
 
 
 # ================
@@ -16,68 +18,35 @@ def obtener_torre_por_slug(db: Session, slug: str):
     return torre
 
 
-def obtener_torre_detallada_por_slug(db: Session, slug: str):
+def obtener_torre_detallada_json(db: Session, slug: str) -> bytes:
+    # JSON de TorreCompletaOut ya serializado en el snapshot de topología
     nombre_formal = slug.replace("-", " ").title()  # "santa-fe" -> "Santa Fe"
+    contenido = topologia_service.asegurar(db).torre_detalle_json.get(nombre_formal)
+    if contenido is None:
+        raise HTTPException(status_code=404, detail=f"Torre '{nombre_formal}' no encontrada")
+    return contenido
 
-    torre = (
-        db.query(models.Torre)
-        .options(
-            joinedload(models.Torre.pisos)
-            .joinedload(models.Piso.apartamentos)
-            .joinedload(models.Apartamento.tipo_apartamento)
-        )
-        .filter(models.Torre.nombre == nombre_formal)
-        .first()
-    )
 
-    if not torre:
-        raise HTTPException(status_code=404, detail=f"Torre '{nombre_formal}' no encontrada")
+def obtener_torre_detallada_etag(db: Session, slug: str):
+    # None si la torre no existe: el 404 lo da obtener_torre_detallada_json
+    nombre_formal = slug.replace("-", " ").title()
+    return topologia_service.asegurar(db).torre_detalle_etag.get(nombre_formal)
 
-    pisos_data = []
-    for piso in torre.pisos:
-        apartamentos_data = [
-            {
-                "id": apt.id,
-                "numero": apt.numero,
-                "id_piso": apt.id_piso,
-                "tipo_apartamento": apt.tipo_apartamento if apt.tipo_apartamento else None,
-            }
-            for apt in piso.apartamentos
-        ]
-        pisos_data.append(
-            {
-                "id": piso.id,
-                "numero": piso.numero,
-                "apartamentos": apartamentos_data,
-            }
-        )
 
-    return {
-        "id": torre.id,
-        "nombre": torre.nombre,
-        "cantidad_pisos": len(torre.pisos),
-        "cantidad_apartamentos": sum(len(p.apartamentos) for p in torre.pisos),
-        "pisos": pisos_data,
-    }
+def obtener_torre_detallada_por_slug(db: Session, slug: str):
+    return json.loads(obtener_torre_detallada_json(db, slug))
 
 
-def obtener_torres(db: Session):
-    torres = db.query(models.Torre).options(joinedload(models.Torre.pisos).joinedload(models.Piso.apartamentos)).all()
-    resultado = []
+def obtener_torres_json(db: Session) -> bytes:
+    return topologia_service.asegurar(db).torres_json
 
-    for torre in torres:
-        cantidad_pisos = len(torre.pisos)
-        cantidad_apartamentos = sum(len(piso.apartamentos) for piso in torre.pisos)
-        resultado.append(
-            {
-                "id": torre.id,
-                "nombre": torre.nombre,
-                "cantidad_pisos": cantidad_pisos,
-                "cantidad_apartamentos": cantidad_apartamentos,
-            }
-        )
 
-    return resultado
+def obtener_torres_etag(db: Session) -> str:
+    return topologia_service.asegurar(db).torres_etag
+
+
+def obtener_torres(db: Session):
+    return [dict(torre) for torre in topologia_service.asegurar(db).torres]
 
 
 # ===============
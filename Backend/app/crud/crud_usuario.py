@@ -6,6 +6,7 @@ from ..core.security import encriptar_contrasena
 from ..utils.validaciones import validar_usuario, validar_contrasena
 from ..utils.db_helpers import guardar_y_refrescar
 from ..utils.auditoria_helpers import registrar_auditoria
+from ..services.busqueda_service import busqueda_service
 
 
 # =================
@@ -63,12 +64,16 @@ def listar_usuarios_activos(db: Session, skip: int = 0, limit: int = 100):
     )
 
 
-def buscar_usuarios(db: Session, q: str):
-    return (
-        db.query(models.Usuario)
-        .filter((models.Usuario.nombre.ilike(f"%{q}%")) | (models.Usuario.email.ilike(f"%{q}%")))
-        .all()
-    )
+def buscar_usuarios(db: Session, q: str, limite: int = 50):
+    # Ordenado por similitud sobre nombre y email (pg_trgm o índice local)
+    try:
+        ids = busqueda_service.buscar_ids(db, q, "usuarios", limite)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not ids:
+        return []
+    usuarios = {u.id: u for u in db.query(models.Usuario).filter(models.Usuario.id.in_(ids)).all()}
+    return [usuarios[i] for i in ids if i in usuarios]
 
 
 def obtener_usuario_por_nombre(db: Session, nombre_usuario: int):
@@ -6,6 +6,7 @@ import logging
 from datetime import datetime, timedelta
 
 from ... import models, schemas
+from ...services.busqueda_service import busqueda_service
 
 logger = logging.getLogger(__name__)
 
@@ -204,19 +205,10 @@ def buscar_residente(db: Session, termino: str, limite: int = 50) -> List[models
         if not termino or len(termino.strip()) < 2:
             raise HTTPException(status_code=400, detail="Término de búsqueda debe tener al menos 2 caracteres")
 
-        termino_busqueda = f"%{termino.strip()}%"
-
-        residentes = (
-            db.query(models.Residente)
-            .filter(
-                models.Residente.nombre.ilike(termino_busqueda)
-                | models.Residente.cedula.ilike(termino_busqueda)
-                | models.Residente.correo.ilike(termino_busqueda)
-            )
-            .order_by(models.Residente.nombre.asc())
-            .limit(limite)
-            .all()
-        )
+        # Ordenado por similitud (pg_trgm o índice local), con prefijo de cédula
+        ids = busqueda_service.buscar_ids(db, termino, "residentes", limite)
+        por_id = {r.id: r for r in db.query(models.Residente).filter(models.Residente.id.in_(ids)).all()} if ids else {}
+        residentes = [por_id[i] for i in ids if i in por_id]
 
         logger.info(f"🔍 Búsqueda de residentes: '{termino}' -> {len(residentes)} resultados")
         return residentes
@@ -245,7 +237,7 @@ def busqueda_avanzada(
         if nombre:
             query = query.filter(models.Residente.nombre.ilike(f"%{nombre}%"))
         if cedula:
-            query = query.filter(models.Residente.cedula.ilike(f"%{cedula}%"))
+            query = query.filter(models.Residente.cedula.like(f"{cedula.strip()}%"))  # Prefijo (usa índice)
         if tipo_residente:
             query = query.filter(models.Residente.tipo_residente == tipo_residente)
         if estado_operativo:
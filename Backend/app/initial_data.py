@@ -1,10 +1,82 @@
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 from decimal import Decimal
+from typing import Dict, List, Tuple
 from .models import Torre, Piso, TipoApartamento, Apartamento, Rol
 from . import models  # Para los roles si los necesitas
 
+# Subir al cambiar los datos iniciales: el arranque vuelve a ejecutar inicializar_db (ver core/arranque.py)
+DATOS_INICIALES_VERSION = 1
 
-def inicializar_db(db: Session, limpiar: bool = False):
+ROLES = [
+    {"nombre": "Administrador", "descripcion": "Acceso completo al sistema"},
+    {"nombre": "Residente", "descripcion": "Acceso limitado a funcionalidades de residente"},
+]
+
+TIPOS_APARTAMENTO = [
+    {"nombre": "1 hab/1 baño", "habitaciones": 1, "banos": 1, "porcentaje_aporte": Decimal("0.27")},
+    {"nombre": "2 hab/2 baños", "habitaciones": 2, "banos": 2, "porcentaje_aporte": Decimal("0.45")},
+    {"nombre": "3 hab/2 baños", "habitaciones": 3, "banos": 2, "porcentaje_aporte": Decimal("0.60")},
+]
+
+TORRES = ["Santa Fe", "Mochima", "Tigrillo"]
+PISOS_POR_TORRE = 14  # Planta baja=0 hasta piso 13
+
+
+def apartamentos_de_piso(piso_num: int) -> List[Tuple[str, int]]:
+    """(numero, habitaciones) de cada apartamento del piso"""
+    if piso_num == 0:
+        habitaciones = [3, 3]
+    elif 1 <= piso_num <= 6 or 10 <= piso_num <= 12:
+        habitaciones = [2, 1, 2, 2, 1, 2]
+    elif 7 <= piso_num <= 9:
+        habitaciones = [3, 3, 3, 3]
+    elif piso_num == 13:
+        habitaciones = [2, 2, 2, 2]
+    else:
+        habitaciones = []
+    return [(f"{piso_num}-{i+1}", h) for i, h in enumerate(habitaciones)]
+
+
+def insertar_topologia(db: Session, torres: List[str], pisos_por_torre: int = PISOS_POR_TORRE) -> Dict:
+    """
+    Inserta los tipos que falten, las torres, sus pisos y apartamentos con un
+    executemany por tabla (los ids vuelven con RETURNING, en el orden de las filas).
+    """
+    tipo_por_habitaciones = dict(db.execute(select(TipoApartamento.habitaciones, TipoApartamento.id)).all())
+    faltantes = [t for t in TIPOS_APARTAMENTO if t["habitaciones"] not in tipo_por_habitaciones]
+    if faltantes:
+        ids = db.scalars(
+            insert(TipoApartamento).returning(TipoApartamento.id, sort_by_parameter_order=True), faltantes
+        ).all()
+        tipo_por_habitaciones.update({t["habitaciones"]: i for t, i in zip(faltantes, ids)})
+
+    torre_ids = db.scalars(
+        insert(Torre).returning(Torre.id, sort_by_parameter_order=True), [{"nombre": n} for n in torres]
+    ).all()
+
+    pisos = [{"id_torre": torre_id, "numero": n} for torre_id in torre_ids for n in range(pisos_por_torre)]
+    piso_ids = db.scalars(insert(Piso).returning(Piso.id, sort_by_parameter_order=True), pisos).all()
+
+    apartamentos = [
+        {
+            "id_piso": piso_id,
+            "id_tipo_apartamento": tipo_por_habitaciones[habitaciones],
+            "numero": numero,
+            "estado": "Disponible",
+        }
+        for piso, piso_id in zip(pisos, piso_ids)
+        for numero, habitaciones in apartamentos_de_piso(piso["numero"])
+    ]
+    if apartamentos:
+        db.execute(insert(Apartamento), apartamentos)
+
+    # Los INSERT masivos no pasan por los eventos del ORM: se avisa a la topología en memoria
+    db.info["topologia_sucia"] = True
+    return {"torres": len(torre_ids), "pisos": len(piso_ids), "apartamentos": len(apartamentos)}
+
+
+def inicializar_db(db: Session, limpiar: bool = False, resumen: bool = True):
 
     if limpiar:
         db.query(Apartamento).delete()
@@ -19,82 +91,27 @@ def inicializar_db(db: Session, limpiar: bool = False):
     # ---- 1. ROLES ----
     if db.query(Rol).count() == 0:
         print("👥 Inicializando roles...")
-        roles = [
-            Rol(nombre="Administrador", descripcion="Acceso completo al sistema"),
-            Rol(nombre="Residente", descripcion="Acceso limitado a funcionalidades de residente"),
-        ]
-        db.add_all(roles)
-        db.flush()  # Usar flush en lugar de commit para mantener la transacción
-        print(f"✅ Roles creados: {[r.nombre for r in roles]}")
+        db.execute(insert(Rol), ROLES)
+        print(f"✅ Roles creados: {[r['nombre'] for r in ROLES]}")
         initialized = True
 
     # ---- 2. ESTRUCTURA DEL CONDOMINIO ----
     if db.query(Torre).count() == 0:
         print("🏢 Inicializando estructura del condominio...")
-
-        # ---- Tipos de apartamentos ----
-        tipos = [
-            {"nombre": "1 hab/1 baño", "habitaciones": 1, "banos": 1, "porcentaje_aporte": Decimal("0.27")},
-            {"nombre": "2 hab/2 baños", "habitaciones": 2, "banos": 2, "porcentaje_aporte": Decimal("0.45")},
-            {"nombre": "3 hab/2 baños", "habitaciones": 3, "banos": 2, "porcentaje_aporte": Decimal("0.60")},
-        ]
-
-        tipo_objetos = {}
-        for t in tipos:
-            tipo = TipoApartamento(**t)
-            db.add(tipo)
-            db.flush()
-            tipo_objetos[t["habitaciones"]] = tipo.id
-
-        # ---- Torres ----
-        torres = ["Santa Fe", "Mochima", "Tigrillo"]
-        torre_objetos = {}
-        for nombre in torres:
-            torre = Torre(nombre=nombre)
-            db.add(torre)
-            db.flush()
-            torre_objetos[nombre] = torre.id
-
-        # ---- Pisos y Apartamentos ----
-        total_apartamentos = 0
-        for torre_nombre, torre_id in torre_objetos.items():
-            for piso_num in range(0, 14):  # Planta baja=0 hasta piso 13
-                piso = Piso(numero=piso_num, id_torre=torre_id)
-                db.add(piso)
-                db.flush()
-
-                # Definir apartamentos según piso
-                if piso_num == 0:
-                    apt_list = [{"numero": f"{piso_num}-{i+1}", "habitaciones": 3} for i in range(2)]
-                elif 1 <= piso_num <= 6 or 10 <= piso_num <= 12:
-                    secuencia = [2, 1, 2, 2, 1, 2]
-                    apt_list = [{"numero": f"{piso_num}-{i+1}", "habitaciones": h} for i, h in enumerate(secuencia)]
-                elif 7 <= piso_num <= 9:
-                    apt_list = [{"numero": f"{piso_num}-{i+1}", "habitaciones": 3} for i in range(4)]
-                elif piso_num == 13:
-                    apt_list = [{"numero": f"{piso_num}-{i+1}", "habitaciones": 2} for i in range(4)]
-                else:
-                    apt_list = []
-
-                for apt in apt_list:
-                    a = Apartamento(
-                        numero=apt["numero"],
-                        id_piso=piso.id,
-                        id_tipo_apartamento=tipo_objetos[apt["habitaciones"]],
-                        estado="Disponible",
-                    )
-                    db.add(a)
-                    total_apartamentos += 1
-
+        creados = insertar_topologia(db, TORRES)
         initialized = True
         print(
-            f"Estructura creada: {len(torres)} torres, {db.query(Piso).count()} pisos, {total_apartamentos} apartamentos"
+            f"Estructura creada: {creados['torres']} torres, {creados['pisos']} pisos, "
+            f"{creados['apartamentos']} apartamentos"
         )
 
     if initialized:
         db.commit()
         print("Base de datos inicializada completamente")
 
+    if not resumen:
+        return None
+
     return {
         "roles": db.query(Rol).count(),
         "torres": db.query(Torre).count(),
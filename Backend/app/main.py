@@ -1,5 +1,10 @@
+import logging
+import time
+
+_INICIO_IMPORTACION = time.perf_counter()
+
 from fastapi import FastAPI
-from .database import engine, Base, SessionLocal
+from .database import engine
 from .routers import (
     auth,
     financiero,
@@ -14,6 +19,9 @@ from .routers.admin import (
     torres,
     usuarios as admin_usuarios,
     residentes as admin_residentes,
+    busqueda as admin_busqueda,
+    consultas_lentas,
+    perfiles as admin_perfiles,
     # gastos as admin_gastos,
     # pagos as admin_pagos,
 )
@@ -28,15 +36,28 @@ from .routers.services import (
     gastos_service,
     cargos_service,
     pagos_service,
+    exportacion_service,
+    estado_cuenta_service,
+    jobs_service,
 )  # test_gastos_service
-from . import initial_data
+from .core.arranque import preparar_base
+from .core import cache_http, instrumentacion_sql, logs, metricas, perfilador
+from .services.programador_service import programador_service
+from .services.consultas_lentas_service import consultas_lentas_service
+from .core.config import settings
 
 # from . import initial_data
 from fastapi.middleware.cors import CORSMiddleware
 
+# Logging: cola hacia un hilo que escribe, formato texto o JSON (LOG_FORMATO) y nivel LOG_NIVEL
+logs.configurar()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Sistema de Gestión de Residencias")
 
+# Compresión brotli/gzip de las respuestas grandes: primero, para quedar por dentro de los demás middlewares
+cache_http.instalar(app)
+
 # Permitir peticiones desde el frontend
 app.add_middleware(
     CORSMiddleware,
@@ -44,15 +65,49 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Perfil", "ETag"],
 )
 
-Base.metadata.create_all(bind=engine)
+# Consultas, tiempo en BD y sentencias repetidas (N+1) por petición, en Server-Timing y en el log
+instrumentacion_sql.instalar(app, engine)
+# Latencias por ruta, pool de conexiones, jobs, proveedores de tasa y caches en GET /metrics
+metricas.instalar(app, engine)
+# Sentencias sobre SQL_LENTA_UMBRAL_MS, con origen y plan, en GET /admin/consultas-lentas
+consultas_lentas_service.instalar(engine)
+# Perfilador por muestreo: global de bajo costo y por petición con X-Perfilar (administradores)
+perfilador.instalar(app)
 
 
 @app.on_event("startup")
 def startup_event():
-    with SessionLocal() as db:
-        initial_data.inicializar_db(db)
+    # Esquema (Alembic) y datos iniciales: una consulta de verificación si la base ya está al día
+    inicio = time.perf_counter()
+    base = preparar_base(engine)
+    if settings.JOBS_PROGRAMADOR_ACTIVO:
+        programador_service.iniciar(engine)
+    else:
+        programador_service.configurar(engine)  # Sin hilo, pero /jobs/{nombre}/ejecutar sigue disponible
+
+    app.state.arranque = {
+        "importacion_ms": round((inicio - _INICIO_IMPORTACION) * 1000, 1),
+        "base_ms": base["ms"],
+        "total_ms": round((time.perf_counter() - _INICIO_IMPORTACION) * 1000, 1),
+        "revision": base["revision"],
+        "acciones": base["acciones"],
+    }
+    arranque = app.state.arranque
+    logger.info(
+        "🚀 Arranque en %.0f ms (importación %.0f ms, base %.0f ms: %s)",
+        arranque["total_ms"],
+        arranque["importacion_ms"],
+        arranque["base_ms"],
+        ", ".join(base["acciones"]) or f"esquema {base['revision']}",
+    )
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    programador_service.detener()
 
 
 # Incluir routers
@@ -62,12 +117,16 @@ app.include_router(admin_usuarios.router)
 app.include_router(perfil_usuario.router)
 app.include_router(admin_residentes.router)
 app.include_router(perfil_residente.router)
+app.include_router(admin_busqueda.router)
 app.include_router(torres.router)
 app.include_router(financiero.router)
 app.include_router(distribucion_service.router)
 app.include_router(gastos_service.router)
 app.include_router(cargos_service.router)
 app.include_router(pagos_service.router)
+app.include_router(exportacion_service.router)
+app.include_router(estado_cuenta_service.router)
+app.include_router(jobs_service.router)
 # app.include_router(test_gastos_service.router)
 # app.include_router(admin_gastos.router)
 # app.include_router(residente_gastos.router)
@@ -77,6 +136,8 @@ app.include_router(pagos_service.router)
 # app.include_router(reservas.router)
 # app.include_router(notificaciones.router)
 app.include_router(auditoria.router)
+app.include_router(consultas_lentas.router)
+app.include_router(admin_perfiles.router)
 # app.include_router(reporte_financiero.router)
 
 
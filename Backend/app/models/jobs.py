@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index, UniqueConstraint, func
+from ..database import Base
+
+# ============================
+# ---- Historial de jobs ----
+# ============================
+
+
+class JobRun(Base):
+    """Una ejecución de un job programado (o lanzado a mano por un administrador)"""
+
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job = Column(String(60), nullable=False)
+    programado_para = Column(DateTime, nullable=False)  # Turno del cron que cubre esta ejecución
+    origen = Column(String(20), nullable=False, default="programado")  # programado / recuperacion / manual
+    estado = Column(String(20), nullable=False, default="en_curso")  # en_curso / completado / error / interrumpido
+    inicio = Column(DateTime, nullable=False, default=func.now())
+    fin = Column(DateTime, nullable=True)
+    duracion_ms = Column(Integer, nullable=True)
+    resultado = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    worker = Column(String(100), nullable=True)  # host:pid del proceso que lo ejecutó
+
+    __table_args__ = (
+        # Un turno se ejecuta una sola vez aunque haya varios workers
+        UniqueConstraint("job", "programado_para", name="uq_job_run_turno"),
+        Index("ix_job_runs_job_inicio", "job", "inicio"),
+    )
@@ -67,9 +67,14 @@ class Pago(Base):
     concepto = Column(String(100), nullable=False)
     metodo = Column(Enum(MetodoPagoEnum), nullable=False)
     comprobante = Column(String(255), nullable=True)
+    referencia = Column(String(50), nullable=True)  # Nro. de referencia bancaria (solo dígitos) para conciliación
     estado = Column(Enum(EstadoPagoEnum), default=EstadoPagoEnum.PENDIENTE, nullable=False)
     verificado = Column(Boolean, default=False, nullable=False)
 
+    # Cola de validación multi-administrador: quién reclamó el pago y hasta cuándo (lease)
+    reclamado_por = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
+    reclamado_hasta = Column(DateTime, nullable=True)
+
     fecha_creacion = Column(DateTime, default=func.now(), nullable=False)
     fecha_actualizacion = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -84,4 +89,6 @@ class Pago(Base):
         Index("idx_estado_pago", "estado"),
         Index("idx_moneda_metodo", "moneda", "metodo"),
         Index("idx_pago_cargo", "id_cargo"),  # 🆕 NUEVO índice
+        Index("idx_pago_referencia", "referencia"),
+        Index("idx_pago_cola_validacion", "estado", "fecha_creacion", "id"),  # Cola + paginación keyset
     )
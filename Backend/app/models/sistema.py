@@ -0,0 +1,53 @@
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, func
+from ..database import Base
+
+# ===================================
+# ---- Versión de datos iniciales ----
+# ===================================
+
+
+class VersionSistema(Base):
+    """Una sola fila (id=1): versión de los datos iniciales ya cargados en esta base"""
+
+    __tablename__ = "version_sistema"
+
+    id = Column(Integer, primary_key=True)
+    datos_iniciales = Column(Integer, nullable=False, default=0)
+    actualizado_en = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
+
+
+# ===================================
+# ---- Consultas lentas ----
+# ===================================
+
+
+class ConsultaLenta(Base):
+    """Sentencia que superó SQL_LENTA_UMBRAL_MS, con su origen y el plan capturado (ver consultas_lentas_service)"""
+
+    __tablename__ = "consultas_lentas"
+
+    id = Column(Integer, primary_key=True, index=True)
+    fecha = Column(DateTime, default=func.now(), nullable=False, index=True)
+    duracion_ms = Column(Float, nullable=False)
+    sentencia = Column(Text, nullable=False)
+    huella = Column(Text, nullable=False)  # Sentencia normalizada: agrupa la misma consulta con otros parámetros
+    parametros = Column(Text, nullable=True)  # JSON, con los valores sensibles ocultos
+    origen = Column(String(300), nullable=True)  # archivo:función:línea dentro de app/
+    ruta = Column(String(300), nullable=True)  # Plantilla de la ruta HTTP, si la hubo
+    plan = Column(Text, nullable=True)
+    error_plan = Column(Text, nullable=True)
+
+
+# ===================================
+# ---- Versiones de caches ----
+# ===================================
+
+
+class VersionCache(Base):
+    """Una fila por cache en memoria, incrementada por cada transacción que cambia sus datos"""
+
+    __tablename__ = "versiones_cache"
+
+    nombre = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    actualizado_en = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
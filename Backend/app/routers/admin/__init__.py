@@ -3,3 +3,6 @@ from .roles import *
 from .torres import *
 from .usuarios import *
 from .residentes import *
+from .busqueda import *
+from .consultas_lentas import *
+from .perfiles import *
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from ... import schemas
+from ...database import get_db
+from ...core.security import verificar_admin
+from ...services.busqueda_service import busqueda_service
+
+router = APIRouter(prefix="/busqueda", tags=["Búsqueda (Administración)"])
+
+
+@router.get("/", response_model=schemas.BusquedaOut)
+def buscar(
+    q: str = Query(..., min_length=2, description="Nombre, cédula (prefijo), correo o número de apartamento"),
+    entidades: Optional[List[str]] = Query(None, description="residentes, usuarios, apartamentos"),
+    limite: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    admin=Depends(verificar_admin),
+):
+    try:
+        return busqueda_service.buscar(db, q, entidades=entidades, limite=limite)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+from ... import schemas
+from ...database import get_db
+from ...core.security import verificar_admin
+from ...services.consultas_lentas_service import consultas_lentas_service
+
+router = APIRouter(
+    prefix="/admin/consultas-lentas",
+    tags=["Consultas lentas (Administración)"],
+    dependencies=[Depends(verificar_admin)],
+)
+
+
+@router.get("/", response_model=List[schemas.ConsultaLentaOut], summary="Últimas consultas lentas")
+def listar_consultas_lentas(
+    limite: int = Query(50, ge=1, le=500),
+    desde: Optional[datetime] = Query(None),
+    origen: Optional[str] = Query(None, description="Parte del origen, p. ej. 'deudas_service'"),
+    minimo_ms: Optional[float] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+):
+    try:
+        return consultas_lentas_service.listar(db, limite, desde, origen, minimo_ms)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo consultas lentas: {str(e)}")
+
+
+@router.get(
+    "/resumen", response_model=List[schemas.ResumenConsultaLentaOut], summary="Sentencias más costosas por patrón"
+)
+def resumen_consultas_lentas(
+    dias: int = Query(7, ge=1, le=365),
+    limite: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+):
+    try:
+        return consultas_lentas_service.resumen(db, dias, limite)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error resumiendo consultas lentas: {str(e)}")
+
+
+@router.get("/{id_consulta}", response_model=schemas.ConsultaLentaDetalleOut, summary="Consulta lenta con su plan")
+def obtener_consulta_lenta(id_consulta: int, db: Session = Depends(get_db)):
+    consulta = consultas_lentas_service.obtener(db, id_consulta)
+    if not consulta:
+        raise HTTPException(status_code=404, detail="Consulta lenta no encontrada")
+    return consulta
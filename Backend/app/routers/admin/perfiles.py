@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+from typing import Literal
+from ...core.security import verificar_admin
+from ...core.perfilador import perfilador
+
+router = APIRouter(
+    prefix="/admin/perfilador",
+    tags=["Perfilador (Administración)"],
+    dependencies=[Depends(verificar_admin)],
+)
+
+Formato = Literal["svg", "plegado"]
+
+
+def _grafico(contenido: str, formato: str) -> Response:
+    if formato == "svg":
+        return Response(contenido, media_type="image/svg+xml")
+    return PlainTextResponse(contenido)
+
+
+@router.get("/", summary="Estado del perfilador global y funciones más calientes")
+def estado_perfilador(limite: int = Query(30, ge=1, le=200)):
+    return {**perfilador.estado(), "funciones": perfilador.funciones_calientes(limite)}
+
+
+@router.get("/grafico", summary="Gráfico de llamas del perfil global (SVG o formato plegado)")
+def grafico_global(formato: Formato = Query("svg")):
+    return _grafico(perfilador.grafico_global(formato), formato)
+
+
+@router.post("/global", summary="Activar o detener el muestreo global")
+def cambiar_global(activo: bool = Query(...)):
+    if activo:
+        perfilador.iniciar_global()
+    else:
+        perfilador.detener_global()
+    return perfilador.estado()
+
+
+@router.post("/reiniciar", summary="Descartar las muestras globales acumuladas")
+def reiniciar_perfilador():
+    perfilador.reiniciar()
+    return perfilador.estado()
+
+
+@router.get("/perfiles", summary="Peticiones perfiladas con X-Perfilar (las más recientes primero)")
+def listar_perfiles():
+    return perfilador.perfiles()
+
+
+@router.get("/perfiles/{id_perfil}", summary="Gráfico de llamas de una petición perfilada")
+def obtener_perfil(id_perfil: int, formato: Formato = Query("svg")):
+    perfil = perfilador.perfil(id_perfil)
+    if not perfil:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado (sólo se guardan los últimos)")
+    return _grafico(perfilador.grafico_perfil(perfil, formato), formato)
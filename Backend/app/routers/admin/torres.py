@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
 from ... import crud, schemas, models
+from ...core import cache_http
 from ...database import get_db
 from ...core.security import verificar_admin
 
@@ -12,13 +13,19 @@ router = APIRouter(prefix="/torres", tags=["Torres (Administración)"])
 
 
 @router.get("/", response_model=list[schemas.TorreOut])
-def obtener_torres(db: Session = Depends(get_db), admin=Depends(verificar_admin)):
-    return crud.obtener_torres(db)
+def obtener_torres(request: Request, db: Session = Depends(get_db), admin=Depends(verificar_admin)):
+    cabeceras = cache_http.condicional(request, crud.obtener_torres_etag(db))
+    return Response(content=crud.obtener_torres_json(db), media_type="application/json", headers=cabeceras)
 
 
 @router.get("/{slug_torre}", response_model=schemas.TorreCompletaOut)
-def obtener_torre_detallada(slug_torre: str, db: Session = Depends(get_db), admin=Depends(verificar_admin)):
-    return crud.obtener_torre_detallada_por_slug(db, slug_torre)
+def obtener_torre_detallada(
+    slug_torre: str, request: Request, db: Session = Depends(get_db), admin=Depends(verificar_admin)
+):
+    cabeceras = cache_http.condicional(request, crud.obtener_torre_detallada_etag(db, slug_torre))
+    return Response(
+        content=crud.obtener_torre_detallada_json(db, slug_torre), media_type="application/json", headers=cabeceras
+    )
 
 
 # =================
@@ -76,7 +83,7 @@ def obtener_apartamentos_por_torre(slug_torre: str, db: Session = Depends(get_db
 @router.get("/estadisticas/generales")
 def estadisticas_generales_torres(db: Session = Depends(get_db), admin=Depends(verificar_admin)):
     torres = crud.obtener_torres(db)
-    total_apartamentos = sum(t.cantidad_apartamentos for t in torres)
+    total_apartamentos = sum(t["cantidad_apartamentos"] for t in torres)
     apartamentos_ocupados = db.query(models.Apartamento).filter(models.Apartamento.estado == "Ocupado").count()
 
     return {
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends
+import io
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..services import DeudasService, TasaCambioService
 from datetime import date
 from decimal import Decimal
-from typing import Optional
+from typing import Literal, Optional
+from ..core.security import verificar_admin
+from ..services.tasas_historicas_service import tasas_historicas_service
+from ..services.proveedores_tasa_service import proveedores_tasa_service
+from ..services.reportes_financieros_service import reportes_financieros_service
 
 
 router = APIRouter(prefix="/financiero", tags=["Financieros"])
@@ -24,7 +29,7 @@ def obtener_historial_deudas(apartamento_id: int, db: Session = Depends(get_db))
 
 @router.get("/deudas/total/{apartamento_id}")
 def obtener_deuda_total(apartamento_id: int, db: Session = Depends(get_db)):
-    return deudas_service.obtener_deuda_total(db, apartamento_id)
+    return deudas_service.obtener_deuda_total_apartamento(db, apartamento_id)
 
 
 @router.get("/tasas/actual")
@@ -36,6 +41,70 @@ def get_tasa_actual(db: Session = Depends(get_db)):
 def convertir_monto(
     monto_usd: Optional[Decimal] = None,
     monto_ves: Optional[Decimal] = None,
+    fecha: Optional[date] = Query(None, description="Convertir con la tasa vigente en esa fecha (histórico local)"),
     db: Session = Depends(get_db),
 ):
-    return tasa_cambio_service.convertir_monto(db, monto_usd, monto_ves)
+    if fecha is None:
+        return tasa_cambio_service.convertir_monto(db, monto_usd, monto_ves)
+    try:
+        return tasas_historicas_service.convertir(db, fecha, monto_usd, monto_ves)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/tasas/proveedores")
+def get_estado_proveedores_tasa(admin=Depends(verificar_admin)):
+    """Circuito de cada proveedor de la tasa (fallos, consultas evitadas) y última tasa guardada en disco"""
+    return proveedores_tasa_service.estado()
+
+
+@router.get("/tasas/historica")
+def get_tasa_historica(fecha: date, db: Session = Depends(get_db)):
+    """Tasa vigente en la fecha (la del día hábil anterior si ese día no hubo publicación)"""
+    try:
+        tasa, fecha_tasa = tasas_historicas_service.tasa_en(db, fecha)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"fecha": fecha, "fecha_tasa": fecha_tasa, "tasa_usd_ves": tasa}
+
+
+@router.post("/tasas/historicas/importar")
+def importar_tasas_historicas(
+    archivo: UploadFile = File(..., description="Histórico de tasas en CSV (fecha;tasa) o JSON"),
+    formato: Optional[Literal["csv", "json"]] = Query(None, description="Por defecto según la extensión"),
+    encoding: str = Query("utf-8-sig"),
+    db: Session = Depends(get_db),
+    admin=Depends(verificar_admin),
+):
+    """
+    Carga masiva del histórico de tasas del BCV desde un archivo local. Las fechas
+    ya registradas se actualizan; las filas inválidas se reportan sin detener la carga.
+    """
+    formato = formato or ("json" if (archivo.filename or "").lower().endswith(".json") else "csv")
+    flujo = io.TextIOWrapper(archivo.file, encoding=encoding, errors="replace", newline="")
+    try:
+        return tasas_historicas_service.importar_archivo(db, flujo, formato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importando tasas históricas: {str(e)}")
+
+
+@router.get("/pagos/revalorizacion")
+def revalorizar_pagos(
+    desde: date,
+    hasta: date,
+    fecha_valoracion: Optional[date] = Query(None, description="Por defecto hoy"),
+    db: Session = Depends(get_db),
+    admin=Depends(verificar_admin),
+):
+    """
+    Valor en USD de los bolívares cobrados (pagos validados) a la tasa del día de
+    cada pago y a la tasa de la fecha de valoración, con subtotales por mes.
+    """
+    try:
+        return reportes_financieros_service.revalorizar_pagos(db, desde, hasta, fecha_valoracion)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error revalorizando pagos: {str(e)}")
@@ -1,9 +1,10 @@
 # routes/cargos.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from ...database import get_db
+from ...core import cache_http
 from ...services.cargos_service import cargos_service
 from ...schemas.financiero import CargoResponse
 
@@ -43,12 +44,17 @@ def generar_cargos_desde_gasto(gasto_id: int, db: Session = Depends(get_db)):
 )
 def obtener_cargos_apartamento(
     apartamento_id: int,
+    request: Request,
+    response: Response,
     incluir_pagados: bool = Query(False, description="Incluir cargos ya pagados"),
     db: Session = Depends(get_db),
 ):
     """
-    Obtiene todos los cargos de un apartamento específico
+    Obtiene todos los cargos de un apartamento específico.
+    Con If-None-Match responde 304 si los cargos no cambiaron (ETag)
     """
+    version = cargos_service.version_cargos_apartamento(db, apartamento_id, incluir_pagados)
+    cache_http.condicional(request, version, response)
     try:
         cargos = cargos_service.obtener_cargos_por_apartamento(db, apartamento_id, incluir_pagados)
         return cargos
@@ -61,10 +67,13 @@ def obtener_cargos_apartamento(
     response_model=List[CargoResponse],
     summary="Obtener cargos pendientes de un apartamento",
 )
-def obtener_cargos_pendientes(apartamento_id: int, db: Session = Depends(get_db)):
+def obtener_cargos_pendientes(apartamento_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """
-    Obtiene solo los cargos pendientes/parciales/vencidos de un apartamento
+    Obtiene solo los cargos pendientes/parciales/vencidos de un apartamento.
+    Con If-None-Match responde 304 si los cargos no cambiaron (ETag)
     """
+    version = cargos_service.version_cargos_apartamento(db, apartamento_id, incluir_pagados=False)
+    cache_http.condicional(request, version, response)
     try:
         cargos = cargos_service.obtener_cargos_pendientes(db, apartamento_id)
         return cargos
@@ -0,0 +1,69 @@
+# routes/estados_cuenta.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from ... import crud
+from ...database import get_db
+from ...core.security import verificar_admin, verificar_residente
+from ...services.estado_cuenta_pdf_service import estado_cuenta_pdf_service
+
+router = APIRouter(prefix="/estados-cuenta", tags=["estados de cuenta"])
+
+PATRON_PERIODO = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+def _respuesta_pdf(db: Session, apartamento_id: int, periodo: str) -> FileResponse:
+    try:
+        ruta = estado_cuenta_pdf_service.generar_pdf(db, apartamento_id, periodo)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generando estado de cuenta: {str(e)}")
+    return FileResponse(
+        ruta, media_type="application/pdf", filename=f"estado_cuenta_{periodo}_apto_{apartamento_id}.pdf"
+    )
+
+
+@router.get("/mi-estado-cuenta/pdf", summary="Estado de cuenta del residente en PDF")
+def mi_estado_cuenta_pdf(
+    periodo: str = Query(..., pattern=PATRON_PERIODO, description="YYYY-MM"),
+    db: Session = Depends(get_db),
+    usuario=Depends(verificar_residente),
+):
+    residente = crud.obtener_residente_asociado(db, usuario.id)
+    if not residente or not residente.id_apartamento:
+        raise HTTPException(status_code=404, detail="El residente no tiene apartamento asignado")
+    return _respuesta_pdf(db, residente.id_apartamento, periodo)
+
+
+@router.get("/{apartamento_id}/pdf", summary="Estado de cuenta de un apartamento en PDF (administrador)")
+def estado_cuenta_pdf(
+    apartamento_id: int,
+    periodo: str = Query(..., pattern=PATRON_PERIODO, description="YYYY-MM"),
+    db: Session = Depends(get_db),
+    admin=Depends(verificar_admin),
+):
+    return _respuesta_pdf(db, apartamento_id, periodo)
+
+
+@router.post("/pdf/lote", summary="Generar estados de cuenta en PDF de una torre o del condominio")
+def generar_estados_cuenta_lote(
+    periodo: str = Query(..., pattern=PATRON_PERIODO, description="YYYY-MM"),
+    torre_id: Optional[int] = Query(None, description="Sin torre: todo el condominio"),
+    db: Session = Depends(get_db),
+    admin=Depends(verificar_admin),
+):
+    """
+    Renderiza en paralelo (pool de procesos) los estados de cuenta del período y los
+    guarda en la carpeta de salida. Los que no cambiaron desde la última vez se
+    reutilizan sin volver a renderizarlos.
+    """
+    try:
+        return estado_cuenta_pdf_service.generar_lote(db, periodo, torre_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generando estados de cuenta: {str(e)}")
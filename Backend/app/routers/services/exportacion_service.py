@@ -0,0 +1,66 @@
+# routes/exportaciones.py
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from ...database import SessionLocal
+from ...core.security import verificar_admin
+from ...schemas.financiero import ExportacionFilter
+from ...services.exportacion_service import exportacion_service
+
+router = APIRouter(prefix="/exportar", tags=["exportaciones"])
+
+TIPOS_CONTENIDO = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+@router.get("/{entidad}", summary="Exportar gastos, cargos o pagos (CSV / XLSX)")
+def exportar(
+    entidad: Literal["gastos", "cargos", "pagos"],
+    formato: Literal["csv", "xlsx"] = Query("csv"),
+    periodo: Optional[str] = Query(None, description="YYYY-MM"),
+    fecha_inicio: Optional[date] = Query(None),
+    fecha_fin: Optional[date] = Query(None),
+    estado: Optional[str] = Query(None, description="Ej: Pendiente, Validado, Pagado..."),
+    tipo_gasto: Optional[str] = Query(None, description="Solo gastos: Fijo / Variable"),
+    responsable: Optional[str] = Query(None, description="Solo gastos"),
+    id_apartamento: Optional[int] = Query(None, description="Solo cargos y pagos"),
+    separador: Literal[";", ","] = Query(";", description="Separador del CSV"),
+    admin=Depends(verificar_admin),
+):
+    """
+    Descarga en streaming: las filas se leen con un cursor del servidor y se envían
+    por bloques, así que exportaciones de varios años no cargan todo en memoria
+    y la descarga empieza de inmediato.
+    """
+    filtro = ExportacionFilter(
+        periodo=periodo,
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin,
+        estado=estado,
+        tipo_gasto=tipo_gasto,
+        responsable=responsable,
+        id_apartamento=id_apartamento,
+    )
+    try:
+        encabezados, consulta = exportacion_service.preparar_consulta(entidad, filtro)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def contenido():
+        # Sesión propia: vive mientras se transmite el archivo, no sólo durante el endpoint
+        with SessionLocal() as db:
+            yield from exportacion_service.exportar(
+                db, encabezados, consulta, formato, nombre_hoja=entidad.capitalize(), separador=separador
+            )
+
+    nombre = f"{entidad}_{periodo or date.today().isoformat()}.{formato}"
+    return StreamingResponse(
+        contenido(),
+        media_type=TIPOS_CONTENIDO[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
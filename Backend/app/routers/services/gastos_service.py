@@ -1,5 +1,5 @@
 # routers/gastos.py (MODIFICADO para usar tu schema)
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date
@@ -8,6 +8,7 @@ import logging
 
 
 from ...database import get_db
+from ...core import cache_http
 from ...schemas.financiero import (
     GastoCompletoCreate,
     GastoResponse,
@@ -157,6 +158,8 @@ def obtener_gasto_por_id(gasto_id: int, db: Session = Depends(get_db)):
 
 @router.get("/filtrar/", response_model=List[GastoResponse])
 def filtrar_gastos(
+    request: Request,
+    response: Response,
     tipo_gasto: Optional[str] = Query(None, description="Filtrar por tipo: 'Fijo' o 'Variable'"),
     fecha_inicio: Optional[date] = Query(None, description="Fecha inicial (YYYY-MM-DD)"),
     fecha_fin: Optional[date] = Query(None, description="Fecha final (YYYY-MM-DD)"),
@@ -169,11 +172,11 @@ def filtrar_gastos(
     - Filtrar por rango de fechas
     - Filtrar por responsable
     - Combinar múltiples filtros
+    - ETag: con If-None-Match responde 304 si los gastos no cambiaron
     """
+    filtro = GastoFilter(tipo_gasto=tipo_gasto, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, responsable=responsable)
+    cache_http.condicional(request, gastos_service.version_gastos_por_filtro(db, filtro), response)
     try:
-        filtro = GastoFilter(
-            tipo_gasto=tipo_gasto, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, responsable=responsable
-        )
         gastos = gastos_service.obtener_gastos_por_filtro(db, filtro)
 
         return gastos
@@ -0,0 +1,75 @@
+# routes/jobs.py
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ...database import get_db
+from ...core.security import verificar_admin
+from ...services.jobs_service import jobs_service
+from ...services.programador_service import programador_service
+from ...schemas.jobs import JobRunOut, TendenciaJobOut
+
+router = APIRouter(prefix="/jobs", tags=["jobs programados"])
+
+
+@router.get("/estado", summary="Jobs programados, próxima y última ejecución")
+def estado_jobs(db: Session = Depends(get_db), admin=Depends(verificar_admin)):
+    try:
+        return jobs_service.obtener_estado_jobs(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo estado de jobs: {str(e)}")
+
+
+@router.get("/historial", response_model=List[JobRunOut], summary="Historial de ejecuciones")
+def historial_jobs(
+    job: Optional[str] = Query(None, description="Filtrar por job"),
+    estado: Optional[Literal["en_curso", "completado", "error", "interrumpido"]] = Query(None),
+    limite: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    admin=Depends(verificar_admin),
+):
+    try:
+        return programador_service.historial(db, job, estado, limite)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo historial de jobs: {str(e)}")
+
+
+@router.get("/tendencias", response_model=List[TendenciaJobOut], summary="Duración de los jobs por día")
+def tendencias_jobs(
+    job: Optional[str] = Query(None, description="Filtrar por job"),
+    dias: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_db),
+    admin=Depends(verificar_admin),
+):
+    try:
+        return programador_service.tendencias(db, job, dias)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo tendencias de jobs: {str(e)}")
+
+
+@router.post("/ejecutar-hoy", summary="Ejecutar todos los jobs que tocan hoy")
+def ejecutar_jobs_de_hoy(db: Session = Depends(get_db), admin=Depends(verificar_admin)):
+    """
+    Corre a la vez los jobs independientes que tocan hoy según su calendario;
+    los dependientes esperan a los suyos. Informa el tiempo de reloj frente a
+    la suma del tiempo de cada job.
+    """
+    try:
+        return jobs_service.ejecutar_todos_jobs_diarios(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error ejecutando jobs: {str(e)}")
+
+
+@router.post("/{nombre}/ejecutar", summary="Ejecutar un job ahora")
+def ejecutar_job(nombre: str, admin=Depends(verificar_admin)):
+    """
+    Ejecuta el job fuera de su calendario. Queda en el historial como 'manual' y
+    no reemplaza al turno programado. Falla si otro worker lo está ejecutando.
+    """
+    try:
+        return programador_service.ejecutar_ahora(nombre)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error ejecutando job: {str(e)}")
@@ -1,14 +1,29 @@
 # routes/pagos.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import io
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Literal
 from datetime import datetime
 from decimal import Decimal
 
 from ...models import Pago
 from ...database import get_db
 from ...services.pagos_service import pagos_service
-from ...schemas.pagos import PagoCargoCreate, PagoCreate, PagoUpdate, PagoOut, PagoValidacion, ValidarPagoRequest
+from ...services.conciliacion_service import conciliacion_service
+from ...core.security import verificar_admin
+from ...schemas.pagos import (
+    PagoCargoCreate,
+    PagoCreate,
+    PagoUpdate,
+    PagoOut,
+    PagoValidacion,
+    ValidarPagoRequest,
+    ValidarPagosLoteRequest,
+    ResultadoValidacionLoteOut,
+    ColaValidacionOut,
+    LiberarPagosRequest,
+    ReporteConciliacionOut,
+)
 
 router = APIRouter(prefix="/pagos", tags=["pagos"])
 
@@ -68,6 +83,74 @@ def crear_pago(datos: PagoCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error creando pago: {str(e)}")
 
 
+@router.post(
+    "/conciliacion/importar",
+    response_model=ReporteConciliacionOut,
+    summary="Importar extracto bancario / Pago Móvil y conciliar (administrador)",
+)
+def importar_extracto(
+    archivo: UploadFile = File(..., description="Extracto en CSV u OFX"),
+    formato: Optional[Literal["csv", "ofx"]] = Query(None, description="Por defecto según la extensión"),
+    moneda: Literal["USD", "VES"] = Query("VES", description="Moneda de las líneas que no la indiquen"),
+    metodo: Literal["Transferencia", "Efectivo", "Pago Móvil"] = Query("Transferencia"),
+    simular: bool = Query(False, description="Concilia y reporta sin guardar cambios"),
+    decimal: Optional[Literal[",", "."]] = Query(
+        None, description='Separador decimal de los montos ("1.234,56" -> ","); por defecto se deduce de cada monto'
+    ),
+    encoding: str = Query("utf-8-sig"),
+    db: Session = Depends(get_db),
+    admin=Depends(verificar_admin),
+):
+    """
+    Procesa el archivo en streaming (memoria constante) y concilia cada línea:
+
+    1. **Referencia** de un pago pendiente registrado por el residente → se valida
+    2. **Apartamento** (columna, cédula o número en la descripción) → pago aplicado al cargo más antiguo
+    3. **Monto exacto** igual al saldo de un único cargo abierto → pago aplicado a ese cargo
+
+    Devuelve el reporte de conciliación con ejemplos de líneas no conciliadas.
+    """
+    formato = formato or ("ofx" if (archivo.filename or "").lower().endswith((".ofx", ".qfx")) else "csv")
+    flujo = io.TextIOWrapper(archivo.file, encoding=encoding, errors="replace", newline="")
+    try:
+        return conciliacion_service.importar_extracto(
+            db,
+            flujo,
+            formato=formato,
+            moneda_defecto=moneda,
+            metodo=metodo,
+            simular=simular,
+            separador_decimal=decimal,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importando extracto: {str(e)}")
+    finally:
+        flujo.detach()
+
+
+@router.post("/validar-lote", response_model=ResultadoValidacionLoteOut, summary="Validar pagos en lote (administrador)")
+def validar_pagos_lote(
+    datos: ValidarPagosLoteRequest,
+    db: Session = Depends(get_db),
+    admin=Depends(verificar_admin),
+):
+    """
+    Aprueba y/o rechaza una lista de pagos pendientes en una sola transacción
+
+    - **aprobar**: IDs a validar (el sistema decide si es pago COMPLETO o PARCIAL)
+    - **rechazar**: IDs a rechazar (se revierten los saldos de sus cargos)
+    - Los pagos inexistentes o ya procesados se devuelven en **omitidos**
+    """
+    try:
+        return pagos_service.validar_pagos_lote(db, admin.id, datos.aprobar, datos.rechazar, datos.observaciones)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error validando lote de pagos: {str(e)}")
+
+
 @router.put("/{pago_id}/validar", response_model=PagoOut, summary="Validar pago (administrador)")
 def validar_pago(
     pago_id: int,
@@ -147,19 +230,70 @@ def obtener_pagos_residente(residente_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/pendientes-validacion", response_model=List[PagoOut], summary="Obtener pagos pendientes de validación")
-def obtener_pagos_pendientes_validacion(db: Session = Depends(get_db)):
+def obtener_pagos_pendientes_validacion(
+    response: Response,
+    limite: Optional[int] = Query(None, ge=1, le=500, description="Tamaño de página (sin límite por defecto)"),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en X-Siguiente-Cursor"),
+    db: Session = Depends(get_db),
+):
     """
-    Obtiene todos los pagos que esperan validación del administrador
+    Obtiene los pagos que esperan validación del administrador (más antiguos primero)
 
     **Útil para el dashboard del administrador**
+
+    Con **limite**, la paginación es keyset: la cabecera `X-Siguiente-Cursor` trae el cursor
+    de la página siguiente (no se usa OFFSET, así que el costo no crece con la página).
     """
     try:
-        pagos = pagos_service.obtener_pagos_pendientes_validacion(db)
+        despues_de = None
+        if cursor:
+            fecha, _, ultimo_id = cursor.rpartition("_")
+            despues_de = (datetime.fromisoformat(fecha), int(ultimo_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    try:
+        pagos = pagos_service.obtener_pagos_pendientes_validacion(db, limite=limite, despues_de=despues_de)
+        if limite and len(pagos) == limite:
+            ultimo = pagos[-1]
+            response.headers["X-Siguiente-Cursor"] = f"{ultimo.fecha_creacion.isoformat()}_{ultimo.id}"
         return pagos
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/cola-validacion/reclamar", response_model=ColaValidacionOut, summary="Reclamar pagos para validar")
+def reclamar_pagos_cola(
+    cantidad: int = Query(20, ge=1, le=200, description="Pagos a reclamar"),
+    lease_segundos: Optional[int] = Query(None, ge=30, le=3600, description="Duración del reclamo"),
+    db: Session = Depends(get_db),
+    admin=Depends(verificar_admin),
+):
+    """
+    Entrega al administrador los siguientes pagos pendientes que nadie más tenga reclamados
+
+    Varios administradores pueden trabajar la cola a la vez sin recibir los mismos pagos.
+    Si el reclamo vence sin validarlos, los pagos vuelven a estar disponibles.
+    """
+    try:
+        return pagos_service.reclamar_pagos_pendientes(db, admin.id, cantidad, lease_segundos)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reclamando pagos: {str(e)}")
+
+
+@router.post("/cola-validacion/liberar", summary="Devolver pagos reclamados a la cola")
+def liberar_pagos_cola(
+    datos: LiberarPagosRequest,
+    db: Session = Depends(get_db),
+    admin=Depends(verificar_admin),
+):
+    try:
+        liberados = pagos_service.liberar_pagos_reclamados(db, admin.id, datos.pagos_ids)
+        return {"liberados": liberados}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error liberando pagos: {str(e)}")
+
+
 @router.get("/vencidos", response_model=List[PagoOut], summary="Obtener pagos vencidos")
 def obtener_pagos_vencidos(db: Session = Depends(get_db)):
     """
@@ -11,3 +11,5 @@ from .reservas import *
 from .notificaciones import *
 from .auditoria import *
 from .reporte_financiero import *
+from .busqueda import *
+from .consultas_lentas import *
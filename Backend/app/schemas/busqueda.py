@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+
+
+# ==========================
+# ---- Búsqueda unificada ----
+# ==========================
+
+
+class ResultadoBusquedaOut(BaseModel):
+    tipo: Literal["residentes", "usuarios", "apartamentos"]
+    id: int
+    etiqueta: str
+    detalle: Optional[str] = None
+    puntaje: float
+
+
+class BusquedaOut(BaseModel):
+    termino: str
+    motor: Literal["pg_trgm", "indice_local"]
+    completo: bool  # False si se cortó por presupuesto de latencia
+    duracion_ms: float
+    resultados: List[ResultadoBusquedaOut]
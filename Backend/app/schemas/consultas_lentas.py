@@ -0,0 +1,40 @@
+# schemas/consultas_lentas.py
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+
+class ConsultaLentaOut(BaseModel):
+    """Sentencia que superó el umbral de consulta lenta"""
+
+    id: int
+    fecha: datetime
+    duracion_ms: float
+    sentencia: str
+    parametros: Optional[str] = None
+    origen: Optional[str] = None
+    ruta: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ConsultaLentaDetalleOut(ConsultaLentaOut):
+    """Con el plan de ejecución capturado (o el error al capturarlo)"""
+
+    huella: str
+    plan: Optional[str] = None
+    error_plan: Optional[str] = None
+
+
+class ResumenConsultaLentaOut(BaseModel):
+    """Un patrón de sentencia (huella) y su costo acumulado"""
+
+    huella: str
+    veces: int
+    total_ms: float
+    promedio_ms: float
+    maximo_ms: float
+    ultima: datetime
+    origen: Optional[str] = None
+    ultimo_id: int
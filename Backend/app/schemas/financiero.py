@@ -344,6 +344,18 @@ class CargoFilter(BaseModel):
     fecha_vencimiento_fin: Optional[date] = None
 
 
+class ExportacionFilter(BaseModel):
+    """Filtros comunes de las exportaciones de gastos, cargos y pagos"""
+
+    periodo: Optional[str] = None  # "YYYY-MM"
+    fecha_inicio: Optional[date] = None
+    fecha_fin: Optional[date] = None
+    estado: Optional[str] = None
+    tipo_gasto: Optional[str] = None  # Solo gastos
+    responsable: Optional[str] = None  # Solo gastos
+    id_apartamento: Optional[int] = None  # Cargos y pagos
+
+
 class DistribucionFilter(BaseModel):
     id_gasto: Optional[int] = None
     id_apartamento: Optional[int] = None
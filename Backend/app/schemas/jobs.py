@@ -0,0 +1,35 @@
+# schemas/jobs.py
+from pydantic import BaseModel
+from typing import Optional, Any
+from datetime import datetime
+
+
+class JobRunOut(BaseModel):
+    """Una ejecución registrada de un job"""
+
+    id: int
+    job: str
+    programado_para: datetime
+    origen: str
+    estado: str
+    inicio: datetime
+    fin: Optional[datetime] = None
+    duracion_ms: Optional[int] = None
+    resultado: Optional[Any] = None
+    error: Optional[str] = None
+    worker: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TendenciaJobOut(BaseModel):
+    """Duración de las ejecuciones de un job en un día"""
+
+    job: str
+    dia: str
+    ejecuciones: int
+    errores: int
+    promedio_ms: float
+    minimo_ms: Optional[int] = None
+    maximo_ms: Optional[int] = None
@@ -110,6 +110,9 @@ class PagoUpdate(PagoBase):
 class PagoOut(PagoBase):
     id: int
     id_residente: int
+    referencia: Optional[str] = None
+    reclamado_por: Optional[int] = None
+    reclamado_hasta: Optional[datetime] = None
     fecha_creacion: Optional[datetime] = None
     fecha_actualizacion: Optional[datetime] = None
     # 🆕 AGREGAR relaciones para respuesta completa
@@ -144,6 +147,44 @@ class ValidarPagoRequest(BaseModel):
     observaciones: Optional[str] = None
 
 
+class ValidarPagosLoteRequest(BaseModel):
+    """Para que el administrador apruebe y/o rechace varios pagos en una sola transacción"""
+
+    aprobar: list[int] = []
+    rechazar: list[int] = []
+    observaciones: Optional[str] = None
+
+    @model_validator(mode="after")
+    def validar_listas(self):
+        if not self.aprobar and not self.rechazar:
+            raise ValueError("Debe indicar al menos un pago para aprobar o rechazar")
+        if len(self.aprobar) + len(self.rechazar) > 5000:
+            raise ValueError("Máximo 5000 pagos por lote")
+        repetidos = set(self.aprobar) & set(self.rechazar)
+        if repetidos:
+            raise ValueError(f"Pagos en ambas listas: {sorted(repetidos)}")
+        return self
+
+
+class ResultadoValidacionLoteOut(BaseModel):
+    aprobados: list[int]
+    rechazados: list[int]
+    omitidos: list[dict] = []  # {"id_pago": ..., "motivo": ...}
+    cargos_afectados: int
+    duracion_ms: float
+
+
+class ColaValidacionOut(BaseModel):
+    """Pagos reclamados por un administrador en la cola de validación"""
+
+    pagos: list[PagoOut]
+    reclamado_hasta: datetime
+
+
+class LiberarPagosRequest(BaseModel):
+    pagos_ids: Optional[list[int]] = None  # None = liberar todos los reclamados por el administrador
+
+
 class ResidenteSimple(BaseModel):
     """Schema simple para residente en respuestas"""
 
@@ -154,3 +195,29 @@ class ResidenteSimple(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# ==============================
+# ---- CONCILIACIÓN BANCARIA ----
+# ==============================
+
+
+class ReporteConciliacionOut(BaseModel):
+    formato: Literal["csv", "ofx"]
+    simulacion: bool
+    lineas_leidas: int
+    lineas_invalidas: int
+    lineas_ignoradas: int
+    conciliadas_nuevas: int
+    conciliadas_existentes: int
+    duplicadas: int
+    no_conciliadas: int
+    monto_conciliado_usd: Decimal
+    monto_no_conciliado_usd: Decimal
+    cargos_afectados: int
+    duracion_ms: float
+    muestras_no_conciliadas: list[dict] = []
+    muestras_invalidas: list[dict] = []
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,379 @@
+# services/busqueda_service.py
+from sqlalchemy.orm import Session
+from sqlalchemy import text, event, inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from typing import List, Dict, Optional, Iterable, Tuple, Union
+from bisect import bisect_left
+import threading
+import unicodedata
+import logging
+import time
+import re
+
+from ..core.config import settings
+from ..core.metricas import registrar_cache
+from ..models.residentes import Residente
+from ..models.usuarios import Usuario
+from ..models.torres import Apartamento, Piso, Torre
+from .versiones_cache_service import VersionCompartida
+
+logger = logging.getLogger(__name__)
+
+ENTIDADES = ("residentes", "usuarios", "apartamentos")
+UMBRAL_SIMILITUD = 0.3  # Mismo valor por defecto que pg_trgm.similarity_threshold
+
+
+def normalizar(valor: Optional[str]) -> str:
+    """Minúsculas y sin acentos ("José" -> "jose")"""
+    if not valor:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", valor.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def trigramas(valor: str) -> set:
+    """Trigramas al estilo pg_trgm: cada palabra se rellena con dos espacios delante y uno detrás"""
+    resultado = set()
+    for palabra in re.findall(r"[a-z0-9]+", normalizar(valor)):
+        relleno = f"  {palabra} "
+        for i in range(len(relleno) - 2):
+            resultado.add(relleno[i : i + 3])
+    return resultado
+
+
+def similitud(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    comunes = len(a & b)
+    return comunes / (len(a) + len(b) - comunes)
+
+
+# ================================
+# ---- Índice local (SQLite) ----
+# ================================
+
+
+class IndiceTrigramas:
+    """
+    Índice n-grama en memoria para cuando la base no tiene pg_trgm (modo dev con SQLite).
+    Se construye con una consulta por entidad y se invalida cuando cambian los modelos indexados,
+    en este proceso o (por la versión compartida) en otro worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vigente = False
+        self.compartida = VersionCompartida("busqueda")
+        self._documentos: List[Dict] = []
+        self._trigramas_doc: List[Dict[str, set]] = []
+        self._postings: Dict[str, set] = {}
+        self._cedulas: List[Tuple[str, int]] = []  # (cedula normalizada, idx documento), ordenado
+        self.construcciones = 0
+
+    def invalidar(self):
+        self._vigente = False
+
+    def asegurar(self, db: Session):
+        if self._vigente and self.compartida.cambio(db):
+            logger.info("🔍 Índice de búsqueda local modificado por otro worker")
+            self.invalidar()
+        registrar_cache("indice_busqueda", self._vigente)
+        if self._vigente:
+            return
+        with self._lock:
+            if not self._vigente:
+                self.compartida.leer(db)  # Antes de construir: un cambio durante la carga se verá en la próxima
+                self._construir(db)
+
+    def _construir(self, db: Session):
+        documentos = []
+        for r in db.query(Residente.id, Residente.nombre, Residente.cedula, Residente.correo).all():
+            documentos.append(
+                {
+                    "tipo": "residentes",
+                    "id": r.id,
+                    "etiqueta": r.nombre,
+                    "detalle": f"C.I. {r.cedula}" + (f" - {r.correo}" if r.correo else ""),
+                    "campos": {"nombre": r.nombre, "correo": r.correo},
+                    "cedula": normalizar(r.cedula),
+                }
+            )
+        for u in db.query(Usuario.id, Usuario.nombre, Usuario.email).all():
+            documentos.append(
+                {
+                    "tipo": "usuarios",
+                    "id": u.id,
+                    "etiqueta": u.nombre,
+                    "detalle": u.email,
+                    "campos": {"nombre": u.nombre, "email": u.email},
+                }
+            )
+        apartamentos = (
+            db.query(Apartamento.id, Apartamento.numero, Torre.nombre.label("torre"))
+            .join(Piso, Apartamento.id_piso == Piso.id)
+            .join(Torre, Piso.id_torre == Torre.id)
+            .all()
+        )
+        for a in apartamentos:
+            documentos.append(
+                {
+                    "tipo": "apartamentos",
+                    "id": a.id,
+                    "etiqueta": f"{a.torre} {a.numero}",
+                    "detalle": f"Torre {a.torre}",
+                    "campos": {"numero": a.numero, "torre": a.torre},
+                    "numero": normalizar(a.numero),
+                }
+            )
+
+        trigramas_doc = []
+        postings: Dict[str, set] = {}
+        cedulas = []
+        for idx, doc in enumerate(documentos):
+            por_campo = {campo: trigramas(valor) for campo, valor in doc["campos"].items() if valor}
+            trigramas_doc.append(por_campo)
+            for tris in por_campo.values():
+                for t in tris:
+                    postings.setdefault(t, set()).add(idx)
+            if doc.get("cedula"):
+                cedulas.append((doc["cedula"], idx))
+            if doc.get("numero"):
+                cedulas.append((doc["numero"], idx))
+        cedulas.sort()
+
+        self._documentos = documentos
+        self._trigramas_doc = trigramas_doc
+        self._postings = postings
+        self._cedulas = cedulas
+        self._vigente = True
+        self.construcciones += 1
+        logger.info(f"🔍 Índice de búsqueda local construido: {len(documentos)} documentos")
+
+    def buscar(
+        self, termino: str, entidades: Iterable[str], limite: int, presupuesto_s: float
+    ) -> Tuple[List[Dict], bool]:
+        inicio = time.perf_counter()
+        entidades = set(entidades)
+        consulta = trigramas(termino)
+        normalizado = normalizar(termino)
+        puntajes: Dict[int, float] = {}
+
+        # 1. Prefijo exacto (cédula / número de apartamento) por búsqueda binaria
+        if normalizado:
+            pos = bisect_left(self._cedulas, (normalizado, -1))
+            while pos < len(self._cedulas) and self._cedulas[pos][0].startswith(normalizado):
+                puntajes[self._cedulas[pos][1]] = 1.0
+                pos += 1
+
+        # 2. Candidatos por trigramas compartidos
+        candidatos = set()
+        for t in consulta:
+            candidatos |= self._postings.get(t, set())
+
+        completo = True
+        for n, idx in enumerate(candidatos):
+            if n % 256 == 0 and time.perf_counter() - inicio > presupuesto_s:
+                completo = False
+                break
+            doc = self._documentos[idx]
+            if doc["tipo"] not in entidades:
+                continue
+            mejor = max((similitud(consulta, tris) for tris in self._trigramas_doc[idx].values()), default=0.0)
+            if mejor < UMBRAL_SIMILITUD:
+                # Equivalente a ILIKE '%termino%'
+                if any(normalizado in normalizar(v) for v in doc["campos"].values() if v):
+                    mejor = max(mejor, UMBRAL_SIMILITUD)
+                else:
+                    continue
+            puntajes[idx] = max(puntajes.get(idx, 0.0), mejor)
+
+        ordenados = sorted(
+            (idx for idx in puntajes if self._documentos[idx]["tipo"] in entidades),
+            key=lambda i: (-puntajes[i], self._documentos[i]["etiqueta"]),
+        )[:limite]
+
+        resultados = []
+        for idx in ordenados:
+            doc = self._documentos[idx]
+            resultados.append(
+                {
+                    "tipo": doc["tipo"],
+                    "id": doc["id"],
+                    "etiqueta": doc["etiqueta"],
+                    "detalle": doc["detalle"],
+                    "puntaje": round(puntajes[idx], 4),
+                }
+            )
+        return resultados, completo
+
+
+# ==========================
+# ---- Servicio unificado ----
+# ==========================
+
+
+class BusquedaService:
+
+    def __init__(self):
+        self.indice_local = IndiceTrigramas()
+        self._pg_trgm: Dict[str, bool] = {}  # url del engine -> pg_trgm disponible
+
+    def _usa_pg_trgm(self, db: Union[Session, Connection]) -> bool:
+        engine = db.engine if isinstance(db, Connection) else db.get_bind()
+        clave = str(engine.url)
+        if clave not in self._pg_trgm:
+            if engine.dialect.name != "postgresql":
+                self._pg_trgm[clave] = False
+            else:
+                instalada = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar()
+                self._pg_trgm[clave] = bool(instalada)
+        return self._pg_trgm[clave]
+
+    def buscar(
+        self,
+        db: Session,
+        termino: str,
+        entidades: Optional[Iterable[str]] = None,
+        limite: int = 20,
+        presupuesto_ms: Optional[int] = None,
+    ) -> Dict:
+        """
+        Búsqueda unificada sobre residentes, usuarios y apartamentos ordenada por similitud.
+        Los términos numéricos también buscan por prefijo de cédula / número de apartamento.
+        """
+        termino = (termino or "").strip()
+        if len(termino) < 2:
+            raise ValueError("El término de búsqueda debe tener al menos 2 caracteres")
+
+        entidades = [e for e in (entidades or ENTIDADES) if e in ENTIDADES]
+        presupuesto_ms = presupuesto_ms or settings.BUSQUEDA_PRESUPUESTO_MS
+        inicio = time.perf_counter()
+
+        if self._usa_pg_trgm(db):
+            resultados, completo = self._buscar_pg_trgm(db, termino, entidades, limite, presupuesto_ms)
+            motor = "pg_trgm"
+        else:
+            self.indice_local.asegurar(db)
+            resultados, completo = self.indice_local.buscar(termino, entidades, limite, presupuesto_ms / 1000)
+            motor = "indice_local"
+
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        if not completo:
+            logger.warning(f"⏱️ Búsqueda '{termino}' cortada por presupuesto ({presupuesto_ms} ms)")
+
+        return {
+            "termino": termino,
+            "motor": motor,
+            "completo": completo,
+            "duracion_ms": round(duracion_ms, 2),
+            "resultados": resultados,
+        }
+
+    def _buscar_pg_trgm(
+        self, db: Session, termino: str, entidades: List[str], limite: int, presupuesto_ms: int
+    ) -> Tuple[List[Dict], bool]:
+        params = {"q": termino, "prefijo": f"{termino}%", "contiene": f"%{termino}%", "limite": limite}
+        consultas = {
+            "residentes": """
+                SELECT 'residentes' AS tipo, id, nombre AS etiqueta,
+                       'C.I. ' || cedula || COALESCE(' - ' || correo, '') AS detalle,
+                       GREATEST(similarity(nombre, :q), similarity(COALESCE(correo, ''), :q),
+                                CASE WHEN cedula LIKE :prefijo THEN 1.0 ELSE 0 END,
+                                CASE WHEN nombre ILIKE :contiene THEN 0.3 ELSE 0 END) AS puntaje
+                FROM residentes
+                WHERE nombre % :q OR correo % :q OR cedula LIKE :prefijo OR nombre ILIKE :contiene
+                ORDER BY puntaje DESC, nombre LIMIT :limite
+            """,
+            "usuarios": """
+                SELECT 'usuarios' AS tipo, id, nombre AS etiqueta, email AS detalle,
+                       GREATEST(similarity(nombre, :q), similarity(email, :q),
+                                CASE WHEN nombre ILIKE :contiene OR email ILIKE :contiene THEN 0.3 ELSE 0 END) AS puntaje
+                FROM usuarios
+                WHERE nombre % :q OR email % :q OR nombre ILIKE :contiene OR email ILIKE :contiene
+                ORDER BY puntaje DESC, nombre LIMIT :limite
+            """,
+            "apartamentos": """
+                SELECT 'apartamentos' AS tipo, a.id, t.nombre || ' ' || a.numero AS etiqueta,
+                       'Torre ' || t.nombre AS detalle,
+                       GREATEST(CASE WHEN a.numero LIKE :prefijo THEN 1.0 ELSE 0 END,
+                                similarity(t.nombre || ' ' || a.numero, :q)) AS puntaje
+                FROM apartamentos a
+                JOIN pisos p ON a.id_piso = p.id
+                JOIN torres t ON p.id_torre = t.id
+                WHERE a.numero LIKE :prefijo OR (t.nombre || ' ' || a.numero) % :q
+                ORDER BY puntaje DESC, etiqueta LIMIT :limite
+            """,
+        }
+
+        resultados = []
+        completo = True
+        # Presupuesto de latencia: Postgres cancela la sentencia si se pasa del límite.
+        # El SAVEPOINT acota el statement_timeout y deja intacta la transacción del llamador.
+        savepoint = db.begin_nested()
+        try:
+            db.execute(text("SELECT set_config('statement_timeout', :ms, true)"), {"ms": str(presupuesto_ms)})
+            for entidad in entidades:
+                filas = db.execute(text(consultas[entidad]), params).mappings().all()
+                resultados.extend({**fila, "puntaje": round(float(fila["puntaje"]), 4)} for fila in filas)
+        except OperationalError as e:
+            if "statement timeout" not in str(e) and "canceling statement" not in str(e):
+                savepoint.rollback()
+                raise
+            completo = False
+        finally:
+            if savepoint.is_active:
+                savepoint.rollback()
+
+        resultados.sort(key=lambda r: (-r["puntaje"], r["etiqueta"]))
+        return resultados[:limite], completo
+
+    def buscar_ids(self, db: Session, termino: str, entidad: str, limite: int = 50) -> List[int]:
+        """IDs ordenados por relevancia de una sola entidad (para los CRUD existentes)"""
+        respuesta = self.buscar(db, termino, entidades=[entidad], limite=limite)
+        return [r["id"] for r in respuesta["resultados"]]
+
+
+# Instancia global
+busqueda_service = BusquedaService()
+
+
+# Columnas que forman los documentos del índice local (la torre entra en la etiqueta de cada apartamento)
+COLUMNAS_INDEXADAS = {
+    Residente: ("nombre", "cedula", "correo"),
+    Usuario: ("nombre", "email"),
+    Apartamento: ("numero", "id_piso"),
+    Piso: ("id_torre",),
+    Torre: ("nombre",),
+}
+
+
+def _invalidar_indice_local(mapper, connection, target):
+    busqueda_service.indice_local.invalidar()
+    if busqueda_service._usa_pg_trgm(connection):
+        return  # Con pg_trgm ningún worker usa el índice local: no hay versión que avisar
+    # Una vez por transacción: la versión compartida avisa a los demás workers cuando confirma
+    session = Session.object_session(target)
+    if session is None or not session.info.get("busqueda_sucia"):
+        busqueda_service.indice_local.compartida.incrementar(connection)
+    if session is not None:
+        session.info["busqueda_sucia"] = True
+
+
+def _invalidar_si_cambio(mapper, connection, target):
+    # after_update también se dispara para objetos "dirty" sin cambios netos
+    estado = inspect(target)
+    if any(estado.attrs[col].history.has_changes() for col in COLUMNAS_INDEXADAS[mapper.class_]):
+        _invalidar_indice_local(mapper, connection, target)
+
+
+for _modelo in COLUMNAS_INDEXADAS:
+    event.listen(_modelo, "after_insert", _invalidar_indice_local)
+    event.listen(_modelo, "after_update", _invalidar_si_cambio)
+    event.listen(_modelo, "after_delete", _invalidar_indice_local)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _limpiar_marca_busqueda(session):
+    session.info.pop("busqueda_sucia", None)
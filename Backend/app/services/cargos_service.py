@@ -1,15 +1,19 @@
 # services/cargos_service.py
+from sqlalchemy import case, cast, extract, func, literal, select, update
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from decimal import Decimal
 import logging
 from datetime import date, datetime, timedelta
 
+from ..core.logs import muestreado
 from ..models.financiero import Cargo, DistribucionGasto, EstadoCargoEnum, Gasto
 from ..models.torres import Apartamento
 from ..schemas.financiero import CargoCreate, CargoResponse
+from ..services.topologia_service import topologia_service
 
 logger = logging.getLogger(__name__)
+logger_filas = muestreado(logger)  # Un mensaje por cargo: se registra uno de cada LOG_MUESTREO
 
 
 class CargosService:
@@ -51,8 +55,11 @@ class CargosService:
             db.add(cargo)
             db.flush()
 
-            logger.info(
-                f"✅ Cargo {cargo.id} creado para apartamento {distribucion.id_apartamento} - ${cargo.monto_usd} USD"
+            logger_filas.info(
+                "✅ Cargo %s creado para apartamento %s - $%s USD",
+                cargo.id,
+                distribucion.id_apartamento,
+                cargo.monto_usd,
             )
             return cargo
 
@@ -92,7 +99,9 @@ class CargosService:
                     cargo = self.crear_cargo_por_distribucion(db, distribucion)
                     cargos_creados.append(cargo)
                 else:
-                    logger.info(f"⚠️ Cargo ya existe para apto {distribucion.id_apartamento} y gasto {gasto_id}")
+                    logger_filas.info(
+                        "⚠️ Cargo ya existe para apto %s y gasto %s", distribucion.id_apartamento, gasto_id
+                    )
 
             db.commit()
             logger.info(f"✅ {len(cargos_creados)} cargos generados para gasto {gasto_id}")
@@ -121,13 +130,42 @@ class CargosService:
                 .all()
             )
 
-            logger.info(f"✅ Encontrados {len(cargos)} cargos pendientes para apartamento {apartamento_id}")
+            logger.debug("✅ Encontrados %s cargos pendientes para apartamento %s", len(cargos), apartamento_id)
             return cargos
 
         except Exception as e:
             logger.error(f"Error obteniendo cargos pendientes para apto {apartamento_id}: {str(e)}")
             raise
 
+    def version_cargos_apartamento(self, db: Session, apartamento_id: int, incluir_pagados: bool = False) -> tuple:
+        """
+        Versión de lo que devuelven obtener_cargos_por_apartamento y obtener_cargos_pendientes
+        (para el ETag), con agregados en lugar de cargar los cargos: suma de ids (altas y bajas)
+        y de fecha_actualizacion (cualquier fila modificada) de los cargos y de sus gastos, más
+        las distribuciones de esos gastos, la ocupación del apartamento y la topología que
+        anida la respuesta.
+        """
+        filtros = [Cargo.id_apartamento == apartamento_id]
+        if not incluir_pagados:
+            filtros.append(Cargo.estado != EstadoCargoEnum.PAGADO)
+        # correlate(None): la subconsulta lee cargos por su cuenta, no la fila de la consulta externa
+        ids_gastos = select(Cargo.id_gasto).where(*filtros).correlate(None)
+        fila = db.execute(
+            select(
+                func.count(Cargo.id),
+                func.sum(Cargo.id),
+                func.sum(extract("epoch", Cargo.fecha_actualizacion)),
+                select(func.sum(extract("epoch", Gasto.fecha_actualizacion)))
+                .where(Gasto.id.in_(ids_gastos))
+                .scalar_subquery(),
+                select(func.sum(DistribucionGasto.id))
+                .where(DistribucionGasto.id_gasto.in_(ids_gastos))
+                .scalar_subquery(),
+            ).where(*filtros)
+        ).one()
+        ocupacion = topologia_service.version_ocupacion(db, Apartamento.id == apartamento_id)
+        return tuple(fila), ocupacion, topologia_service.asegurar(db).etag
+
     def obtener_cargos_por_apartamento(
         self, db: Session, apartamento_id: int, incluir_pagados: bool = False
     ) -> List[Cargo]:
@@ -150,7 +188,7 @@ class CargosService:
 
             cargos = query.order_by(Cargo.fecha_vencimiento.asc()).all()
 
-            logger.info(f"✅ Encontrados {len(cargos)} cargos para apartamento {apartamento_id}")
+            logger.debug("✅ Encontrados %s cargos para apartamento %s", len(cargos), apartamento_id)
             return cargos
 
         except Exception as e:
@@ -166,25 +204,8 @@ class CargosService:
             if not cargo:
                 raise ValueError(f"Cargo {cargo_id} no encontrado")
 
-            estado_anterior = cargo.estado
-
-            # Determinar nuevo estado
-            if cargo.saldo_pendiente_usd == 0:
-                cargo.estado = EstadoCargoEnum.PAGADO
-            elif cargo.saldo_pendiente_usd < cargo.monto_usd:
-                cargo.estado = EstadoCargoEnum.PARCIAL
-            elif cargo.fecha_vencimiento < date.today():
-                cargo.estado = EstadoCargoEnum.VENCIDO
-            else:
-                cargo.estado = EstadoCargoEnum.PENDIENTE
-
-            cargo.fecha_actualizacion = datetime.now()
-
+            self.aplicar_estado_cargo(cargo)
             db.commit()
-
-            if estado_anterior != cargo.estado:
-                logger.info(f"🔄 Cargo {cargo_id} cambió de {estado_anterior} a {cargo.estado}")
-
             return cargo
 
         except Exception as e:
@@ -192,6 +213,58 @@ class CargosService:
             logger.error(f"Error actualizando estado del cargo {cargo_id}: {str(e)}")
             raise
 
+    def aplicar_estado_cargo(self, cargo: Cargo) -> Cargo:
+        """
+        Recalcula el estado del cargo SIN hacer commit (para usar dentro de una transacción mayor)
+        """
+        estado_anterior = cargo.estado
+
+        if cargo.saldo_pendiente_usd == 0:
+            cargo.estado = EstadoCargoEnum.PAGADO
+        elif cargo.saldo_pendiente_usd < cargo.monto_usd:
+            cargo.estado = EstadoCargoEnum.PARCIAL
+        elif cargo.fecha_vencimiento < date.today():
+            cargo.estado = EstadoCargoEnum.VENCIDO
+        else:
+            cargo.estado = EstadoCargoEnum.PENDIENTE
+
+        cargo.fecha_actualizacion = datetime.now()
+
+        if estado_anterior != cargo.estado:
+            logger_filas.info("🔄 Cargo %s cambió de %s a %s", cargo.id, estado_anterior, cargo.estado)
+
+        return cargo
+
+    def expresion_estado_cargo(self):
+        """
+        Misma regla que aplicar_estado_cargo expresada como CASE SQL (para UPDATE por lotes)
+        """
+        estado = lambda valor: literal(valor, Cargo.estado.type)  # noqa: E731
+        # CAST explícito: en PostgreSQL el CASE de parámetros resulta en texto, no en el tipo ENUM
+        return cast(
+            case(
+                (Cargo.saldo_pendiente_usd <= 0, estado(EstadoCargoEnum.PAGADO)),
+                (Cargo.saldo_pendiente_usd < Cargo.monto_usd, estado(EstadoCargoEnum.PARCIAL)),
+                (Cargo.fecha_vencimiento < date.today(), estado(EstadoCargoEnum.VENCIDO)),
+                else_=estado(EstadoCargoEnum.PENDIENTE),
+            ),
+            Cargo.estado.type,
+        )
+
+    def recalcular_estados_cargos(self, db: Session, cargos_ids: List[int]) -> int:
+        """
+        Recalcula el estado de varios cargos con un solo UPDATE (sin commit)
+        """
+        if not cargos_ids:
+            return 0
+        resultado = db.execute(
+            update(Cargo)
+            .where(Cargo.id.in_(cargos_ids))
+            .values(estado=self.expresion_estado_cargo(), fecha_actualizacion=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        return resultado.rowcount
+
     def verificar_vencimientos_automatico(self, db: Session) -> int:
         """
         Job diario: Verifica y actualiza cargos vencidos
@@ -215,7 +288,7 @@ class CargosService:
                 cargo.fecha_actualizacion = datetime.now()
                 cargos_actualizados += 1
 
-                logger.info(f"⚠️ Cargo {cargo.id} marcado como VENCIDO (era {estado_anterior})")
+                logger_filas.info("⚠️ Cargo %s marcado como VENCIDO (era %s)", cargo.id, estado_anterior)
 
             if cargos_actualizados > 0:
                 db.commit()
@@ -243,7 +316,7 @@ class CargosService:
                 .all()
             )
 
-            logger.info(f"✅ Encontrados {len(cargos)} cargos vencidos")
+            logger.debug("✅ Encontrados %s cargos vencidos", len(cargos))
             return cargos
 
         except Exception as e:
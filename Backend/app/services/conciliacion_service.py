@@ -0,0 +1,656 @@
+# services/conciliacion_service.py
+import csv
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+from sqlalchemy import bindparam, case, insert, select, update
+from sqlalchemy.orm import Session
+
+from ..models.financiero import Cargo, EstadoCargoEnum
+from ..models.pagos import Pago, EstadoPagoEnum, MetodoPagoEnum
+from ..models.residentes import Residente
+from ..models.torres import Apartamento
+from ..utils.parseo import parsear_fecha, parsear_monto
+
+logger = logging.getLogger(__name__)
+
+LOTE_IMPORTACION = 1000  # Líneas procesadas (y pagos insertados) por lote
+MAX_MUESTRAS = 20  # Ejemplos de líneas no conciliadas / inválidas incluidos en el reporte
+CENTAVO = Decimal("0.01")
+ESTADOS_ABIERTOS = (EstadoCargoEnum.PENDIENTE, EstadoCargoEnum.PARCIAL, EstadoCargoEnum.VENCIDO)
+
+ALIAS_COLUMNAS = {
+    "fecha": ("fecha", "date", "fecha_operacion", "fecha_valor"),
+    "referencia": ("referencia", "ref", "nro_referencia", "numero_referencia", "reference"),
+    "monto": ("monto", "importe", "amount", "credito", "abono"),
+    "moneda": ("moneda", "currency", "divisa"),
+    "descripcion": ("descripcion", "concepto", "detalle", "memo"),
+    "apartamento": ("apartamento", "apto"),
+    "cedula": ("cedula", "ci", "rif", "documento"),
+}
+
+PATRON_APARTAMENTO = re.compile(r"\b(\d{1,3}-\d{1,3})\b")
+PATRON_CEDULA = re.compile(r"\b([VEJ])[-\s]?(\d{6,9})\b", re.IGNORECASE)
+PATRON_ETIQUETA_OFX = re.compile(r"<(/?)([A-Z0-9.]+)>([^<\r\n]*)")
+
+
+@dataclass
+class LineaExtracto:
+    numero_linea: int
+    fecha: date
+    referencia: Optional[str]
+    monto: Decimal
+    moneda: str
+    descripcion: str = ""
+    apartamento: Optional[str] = None
+    cedula: Optional[str] = None
+
+
+@dataclass
+class ReporteConciliacion:
+    formato: str
+    simulacion: bool
+    lineas_leidas: int = 0
+    lineas_invalidas: int = 0
+    lineas_ignoradas: int = 0  # Débitos o montos en cero
+    conciliadas_nuevas: int = 0  # Pago creado y aplicado a un cargo
+    conciliadas_existentes: int = 0  # Pago pendiente del residente validado por referencia
+    duplicadas: int = 0
+    no_conciliadas: int = 0
+    monto_conciliado_usd: Decimal = Decimal("0.00")
+    monto_no_conciliado_usd: Decimal = Decimal("0.00")
+    cargos_afectados: int = 0
+    duracion_ms: float = 0.0
+    muestras_no_conciliadas: List[Dict] = field(default_factory=list)
+    muestras_invalidas: List[Dict] = field(default_factory=list)
+
+    def agregar_muestra(self, lista: List[Dict], muestra: Dict):
+        if len(lista) < MAX_MUESTRAS:
+            lista.append(muestra)
+
+
+# ==================
+# ---- Parseo ----
+# ==================
+
+
+def normalizar_referencia(referencia: Optional[str]) -> Optional[str]:
+    """Deja solo los dígitos, sin ceros a la izquierda ("Ref: 000123-45" -> "12345")"""
+    if not referencia:
+        return None
+    digitos = re.sub(r"\D", "", str(referencia)).lstrip("0")
+    return digitos[-50:] or None
+
+
+def _normalizar_cedula(letra: str, numero: str) -> str:
+    return f"{letra.upper()}{numero}"
+
+
+def _normalizar_moneda(texto: Optional[str], moneda_defecto: str) -> str:
+    moneda = (texto or moneda_defecto).strip().upper().rstrip(".")
+    return "VES" if moneda in ("BS", "BSS", "BSD", "VEF", "VES") else moneda
+
+
+def leer_csv(
+    flujo: TextIO, moneda_defecto: str, separador_decimal: Optional[str] = None
+) -> Iterator[Tuple[int, Optional[LineaExtracto], Optional[str]]]:
+    """
+    Genera (numero_linea, linea | None, error | None) leyendo el archivo fila a fila.
+    Detecta el separador (, ; tab) a partir del encabezado.
+    """
+    encabezado = flujo.readline()
+    if not encabezado:
+        return
+    try:
+        dialecto = csv.Sniffer().sniff(encabezado, delimiters=",;\t|")
+    except csv.Error:
+        dialecto = csv.excel
+
+    columnas = [c.strip().lower() for c in next(csv.reader([encabezado], dialecto))]
+    posiciones = {}
+    for campo, alias in ALIAS_COLUMNAS.items():
+        for nombre in alias:
+            if nombre in columnas:
+                posiciones[campo] = columnas.index(nombre)
+                break
+    faltantes = {"fecha", "monto"} - posiciones.keys()
+    if faltantes:
+        raise ValueError(f"Columnas requeridas no encontradas en el CSV: {', '.join(sorted(faltantes))}")
+
+    def valor(fila, campo):
+        pos = posiciones.get(campo)
+        return fila[pos].strip() if pos is not None and pos < len(fila) else None
+
+    for numero, fila in enumerate(csv.reader(flujo, dialecto), start=2):
+        if not any(c.strip() for c in fila):
+            continue
+        try:
+            yield numero, LineaExtracto(
+                numero_linea=numero,
+                fecha=parsear_fecha(valor(fila, "fecha")),
+                referencia=valor(fila, "referencia"),
+                monto=parsear_monto(valor(fila, "monto"), separador_decimal),
+                moneda=_normalizar_moneda(valor(fila, "moneda"), moneda_defecto),
+                descripcion=valor(fila, "descripcion") or "",
+                apartamento=valor(fila, "apartamento"),
+                cedula=valor(fila, "cedula"),
+            ), None
+        except ValueError as e:
+            yield numero, None, str(e)
+
+
+def leer_ofx(
+    flujo: TextIO, moneda_defecto: str, separador_decimal: Optional[str] = None
+) -> Iterator[Tuple[int, Optional[LineaExtracto], Optional[str]]]:
+    """
+    Lector OFX incremental (SGML 1.x o XML 2.x): emite cada <STMTTRN> al cerrarse,
+    sin cargar el documento completo.
+    """
+    moneda = moneda_defecto
+    actual: Optional[Dict[str, str]] = None
+    inicio = 0
+
+    def emitir(datos: Dict[str, str], numero: int):
+        try:
+            return (
+                numero,
+                LineaExtracto(
+                    numero_linea=numero,
+                    fecha=parsear_fecha(datos.get("DTPOSTED", "")),
+                    referencia=datos.get("CHECKNUM") or datos.get("REFNUM") or datos.get("FITID"),
+                    monto=parsear_monto(datos.get("TRNAMT", ""), separador_decimal),
+                    moneda=_normalizar_moneda(datos.get("CURRENCY"), moneda),
+                    descripcion=" ".join(v for v in (datos.get("NAME"), datos.get("MEMO")) if v),
+                ),
+                None,
+            )
+        except ValueError as e:
+            return numero, None, str(e)
+
+    for numero, texto in enumerate(flujo, start=1):
+        for cierre, etiqueta, contenido in PATRON_ETIQUETA_OFX.findall(texto):
+            contenido = contenido.strip()
+            if etiqueta == "CURDEF" and contenido:
+                moneda = _normalizar_moneda(contenido, moneda_defecto)
+            elif etiqueta == "STMTTRN":
+                if actual is not None:  # Cierre explícito o nueva transacción (SGML sin cierres)
+                    yield emitir(actual, inicio)
+                actual = None if cierre else {}
+                inicio = numero
+            elif actual is not None and not cierre and contenido:
+                actual[etiqueta] = contenido
+            elif etiqueta == "BANKTRANLIST" and cierre and actual is not None:
+                yield emitir(actual, inicio)
+                actual = None
+    if actual:
+        yield emitir(actual, inicio)
+
+
+@dataclass
+class Asignacion:
+    """Cargo elegido para una línea del extracto (o motivo por el que no hubo)"""
+
+    linea: LineaExtracto
+    monto_usd: Decimal
+    monto_ves: Decimal
+    tasa: Decimal
+    cargo_id: Optional[int] = None
+    residente_id: Optional[int] = None
+    saldo_usd: Optional[Decimal] = None  # Saldo del cargo antes de aplicar esta línea
+    saldo_ves: Optional[Decimal] = None
+    motivo: Optional[str] = None
+
+
+# ================================
+# ---- Índices de conciliación ----
+# ================================
+
+
+class IndiceCargos:
+    """
+    Índices hash en memoria de los cargos con saldo pendiente (su tamaño depende de
+    los cargos abiertos, no del tamaño del extracto).
+    """
+
+    def __init__(self):
+        self.saldo_usd: Dict[int, Decimal] = {}
+        self.saldo_ves: Dict[int, Decimal] = {}
+        self.apartamento_de: Dict[int, int] = {}
+        self.por_apartamento: Dict[int, List[int]] = {}  # Ordenados por vencimiento
+        self.por_monto: Dict[Tuple[str, Decimal], Set[int]] = {}  # (moneda, saldo exacto) -> cargos
+        self.apto_por_numero: Dict[str, int] = {}
+        self.apto_por_cedula: Dict[str, int] = {}
+        self.residente_de_apto: Dict[int, int] = {}
+
+    @classmethod
+    def construir(cls, db: Session) -> "IndiceCargos":
+        """Lectura sin bloqueos: cada lote bloquea después sólo los cargos que eligió"""
+        indice = cls()
+
+        consulta = (
+            select(Cargo.id, Cargo.id_apartamento, Cargo.saldo_pendiente_usd, Cargo.saldo_pendiente_ves)
+            .where(Cargo.estado.in_(ESTADOS_ABIERTOS), Cargo.saldo_pendiente_usd > 0)
+            .order_by(Cargo.fecha_vencimiento, Cargo.id)
+        )
+        for cargo_id, apto_id, saldo_usd, saldo_ves in db.execute(consulta):
+            indice.saldo_usd[cargo_id] = Decimal(saldo_usd)
+            indice.saldo_ves[cargo_id] = Decimal(saldo_ves)
+            indice.apartamento_de[cargo_id] = apto_id
+            indice.por_apartamento.setdefault(apto_id, []).append(cargo_id)
+            indice._indexar_monto(cargo_id)
+
+        for apto_id, numero in db.execute(select(Apartamento.id, Apartamento.numero)):
+            indice.apto_por_numero[numero.strip().upper()] = apto_id
+
+        residentes = db.execute(
+            select(Residente.id, Residente.id_apartamento, Residente.cedula)
+            .where(Residente.id_apartamento.isnot(None))
+            .order_by(Residente.reside_actualmente.desc(), Residente.id)
+        )
+        for residente_id, apto_id, cedula in residentes:
+            indice.residente_de_apto.setdefault(apto_id, residente_id)
+            m = PATRON_CEDULA.search(cedula or "")
+            if m:
+                indice.apto_por_cedula[_normalizar_cedula(*m.groups())] = apto_id
+
+        logger.info(
+            f"📇 Índice de conciliación: {len(indice.saldo_usd)} cargos abiertos, "
+            f"{len(indice.apto_por_numero)} apartamentos, {len(indice.apto_por_cedula)} cédulas"
+        )
+        return indice
+
+    def _indexar_monto(self, cargo_id: int):
+        self.por_monto.setdefault(("USD", self.saldo_usd[cargo_id]), set()).add(cargo_id)
+        self.por_monto.setdefault(("VES", self.saldo_ves[cargo_id]), set()).add(cargo_id)
+
+    def _desindexar_monto(self, cargo_id: int):
+        for clave in (("USD", self.saldo_usd[cargo_id]), ("VES", self.saldo_ves[cargo_id])):
+            candidatos = self.por_monto.get(clave)
+            if candidatos:
+                candidatos.discard(cargo_id)
+                if not candidatos:
+                    del self.por_monto[clave]
+
+    def identificar_apartamento(self, linea: LineaExtracto) -> Optional[int]:
+        if linea.apartamento:
+            apto = self.apto_por_numero.get(linea.apartamento.strip().upper())
+            if apto:
+                return apto
+        for texto in (linea.cedula, linea.descripcion):
+            m = PATRON_CEDULA.search(texto or "")
+            if m and _normalizar_cedula(*m.groups()) in self.apto_por_cedula:
+                return self.apto_por_cedula[_normalizar_cedula(*m.groups())]
+        for numero in PATRON_APARTAMENTO.findall(linea.descripcion or ""):
+            if numero in self.apto_por_numero:
+                return self.apto_por_numero[numero]
+        return None
+
+    def elegir_cargo(self, apto_id: Optional[int], moneda: str, monto: Decimal, monto_usd: Decimal):
+        """Devuelve (cargo_id | None, motivo si no hay)."""
+        if apto_id is not None:
+            abiertos = [c for c in self.por_apartamento.get(apto_id, ()) if self.saldo_usd[c] > 0]
+            if not abiertos:
+                return None, "Apartamento sin cargos pendientes"
+            saldo = self.saldo_usd if moneda == "USD" else self.saldo_ves
+            exacto = next((c for c in abiertos if saldo[c] == monto), None)
+            if exacto:
+                return exacto, None
+            cabe = next((c for c in abiertos if self.saldo_usd[c] >= monto_usd), None)
+            if cabe:
+                return cabe, None
+            return None, "Monto excede el saldo de cada cargo pendiente del apartamento"
+
+        candidatos = self.por_monto.get((moneda, monto))
+        if not candidatos:
+            return None, "Sin apartamento identificable ni cargo con ese saldo exacto"
+        if len(candidatos) > 1:
+            return None, f"Ambigua: {len(candidatos)} cargos con saldo {monto} {moneda}"
+        return next(iter(candidatos)), None
+
+    def descontar(self, cargo_id: int, monto_usd: Decimal, monto_ves: Decimal):
+        self.fijar_saldo(
+            cargo_id,
+            max(self.saldo_usd[cargo_id] - monto_usd, Decimal("0.00")),
+            max(self.saldo_ves[cargo_id] - monto_ves, Decimal("0.00")),
+        )
+
+    def fijar_saldo(self, cargo_id: int, saldo_usd: Decimal, saldo_ves: Decimal):
+        self._desindexar_monto(cargo_id)
+        self.saldo_usd[cargo_id] = saldo_usd
+        self.saldo_ves[cargo_id] = saldo_ves
+        if saldo_usd > 0:
+            self._indexar_monto(cargo_id)
+
+
+# ==================
+# ---- Servicio ----
+# ==================
+
+
+class ConciliacionService:
+
+    def importar_extracto(
+        self,
+        db: Session,
+        flujo: TextIO,
+        formato: str = "csv",
+        moneda_defecto: str = "VES",
+        metodo: str = "Transferencia",
+        simular: bool = False,
+        lote: int = LOTE_IMPORTACION,
+        separador_decimal: Optional[str] = None,
+    ) -> ReporteConciliacion:
+        """
+        Importa un extracto bancario / Pago Móvil en streaming y lo concilia contra
+        los pagos pendientes (por referencia) y los cargos abiertos (apartamento/monto).
+        Todo ocurre en una transacción; con simular=True se revierte al final.
+        separador_decimal ("," o ".") fija el estilo de los montos del archivo; sin él se deduce de cada monto.
+        """
+        inicio = time.perf_counter()
+        lector = {"csv": leer_csv, "ofx": leer_ofx}.get(formato)
+        if not lector:
+            raise ValueError(f"Formato no soportado: {formato}")
+        if separador_decimal not in (None, ",", "."):
+            raise ValueError(f"Separador decimal no válido: '{separador_decimal}'")
+        metodo_pago = MetodoPagoEnum(metodo)
+
+        reporte = ReporteConciliacion(formato=formato, simulacion=simular)
+        try:
+            # La tasa actual se resuelve antes del primer lote y sin commit: obtener_tasa_actual puede guardar
+            # la del día, lo que confirmaría los lotes ya escritos, soltaría sus bloqueos y rompería simular
+            contexto = {"tasa_actual": self._tasa_actual(db), "reportes": {}, "bloquear": not simular}
+            indice = IndiceCargos.construir(db)
+
+            lineas = lector(flujo, moneda_defecto.upper(), separador_decimal)
+            while True:
+                bloque = list(islice(lineas, lote))
+                if not bloque:
+                    break
+                self._procesar_lote(db, bloque, indice, contexto, metodo_pago, reporte)
+
+            if simular:
+                db.rollback()
+            else:
+                db.commit()
+
+            reporte.duracion_ms = round((time.perf_counter() - inicio) * 1000, 1)
+            logger.info(
+                f"🏦 Extracto {formato} {'simulado' if simular else 'importado'}: {reporte.lineas_leidas} líneas, "
+                f"{reporte.conciliadas_nuevas} pagos nuevos, {reporte.conciliadas_existentes} validados, "
+                f"{reporte.duplicadas} duplicadas, {reporte.no_conciliadas} sin conciliar ({reporte.duracion_ms} ms)"
+            )
+            return reporte
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error importando extracto: {str(e)}")
+            raise
+
+    def _procesar_lote(self, db: Session, bloque, indice: IndiceCargos, contexto, metodo_pago, reporte):
+        from .reportes_financieros_service import reportes_financieros_service
+
+        lineas: List[LineaExtracto] = []
+        for numero, linea, error in bloque:
+            reporte.lineas_leidas += 1
+            if error:
+                reporte.lineas_invalidas += 1
+                reporte.agregar_muestra(reporte.muestras_invalidas, {"linea": numero, "error": error})
+            elif linea.monto <= 0:
+                reporte.lineas_ignoradas += 1
+            else:
+                linea.referencia = normalizar_referencia(linea.referencia)
+                lineas.append(linea)
+
+        # Índice hash por referencia SOLO de este lote (memoria acotada): pagos ya registrados con esas referencias
+        referencias = {l.referencia for l in lineas if l.referencia}
+        existentes: Dict[str, List[Tuple]] = {}
+        if referencias:
+            for fila in db.execute(
+                select(Pago.id, Pago.referencia, Pago.estado, Pago.monto_pagado_usd, Pago.monto_pagado_ves).where(
+                    Pago.referencia.in_(referencias), Pago.estado != EstadoPagoEnum.RECHAZADO
+                )
+            ):
+                existentes.setdefault(fila.referencia, []).append(fila)
+
+        pagos_a_validar: List[int] = []
+        pendientes: List[Tuple[LineaExtracto, Decimal, Decimal, Decimal]] = []
+        vistas: Set[str] = set()
+
+        for linea in lineas:
+            if linea.referencia and linea.referencia in vistas:
+                reporte.duplicadas += 1
+                continue
+            if linea.referencia:
+                vistas.add(linea.referencia)
+
+            # 1. Referencia de un pago que el residente ya registró
+            registrados = existentes.get(linea.referencia, []) if linea.referencia else []
+            if len(registrados) > 1:
+                self._no_conciliada(
+                    reporte,
+                    linea,
+                    f"Ambigua: {len(registrados)} pagos registrados con la referencia {linea.referencia}",
+                )
+                continue
+            if registrados:
+                existente = registrados[0]
+                if existente.estado != EstadoPagoEnum.PENDIENTE:
+                    reporte.duplicadas += 1
+                    continue
+                monto_registrado = existente.monto_pagado_usd if linea.moneda == "USD" else existente.monto_pagado_ves
+                if abs(Decimal(monto_registrado) - linea.monto) <= CENTAVO:
+                    pagos_a_validar.append(existente.id)
+                    reporte.conciliadas_existentes += 1
+                    reporte.monto_conciliado_usd += Decimal(existente.monto_pagado_usd)
+                else:
+                    self._no_conciliada(
+                        reporte, linea, f"Referencia registrada por el residente con monto {monto_registrado}"
+                    )
+                continue
+
+            # 2. Cargo abierto por apartamento o por monto exacto
+            pendientes.append((linea, *self._convertir(db, linea, contexto)))
+
+        nuevos: List[Dict] = []
+        descuentos: Dict[int, List[Decimal]] = {}
+        ingresos_por_reporte: Dict[int, List[Decimal]] = {}
+
+        for asignacion in self._asignar_cargos(db, pendientes, indice, contexto["bloquear"]):
+            linea = asignacion.linea
+            if asignacion.cargo_id is None:
+                self._no_conciliada(reporte, linea, asignacion.motivo, asignacion.monto_usd)
+                continue
+
+            periodo = f"{linea.fecha.year}-{linea.fecha.month:02d}"
+            reporte_id = contexto["reportes"].get(periodo)
+            if reporte_id is None:
+                reporte_id = reportes_financieros_service.obtener_o_crear_reporte_id(db, periodo)
+                contexto["reportes"][periodo] = reporte_id
+
+            ahora = datetime.now()
+            nuevos.append(
+                {
+                    "id_residente": asignacion.residente_id,
+                    "id_apartamento": indice.apartamento_de[asignacion.cargo_id],
+                    "id_reporte_financiero": reporte_id,
+                    "id_cargo": asignacion.cargo_id,
+                    "monto_pagado_usd": asignacion.monto_usd,
+                    "monto_pagado_ves": asignacion.monto_ves,
+                    "tasa_cambio_pago": asignacion.tasa,
+                    "monto": linea.monto,
+                    "moneda": linea.moneda,
+                    "saldo_pendiente_al_pagar_usd": asignacion.saldo_usd,
+                    "saldo_pendiente_al_pagar_ves": asignacion.saldo_ves,
+                    "concepto": f"Conciliación extracto {linea.fecha.isoformat()}"[:100],
+                    "metodo": metodo_pago,
+                    "comprobante": f"🏦 EXTRACTO - línea {linea.numero_linea} - {linea.descripcion}"[:255],
+                    "referencia": linea.referencia,
+                    "estado": EstadoPagoEnum.VALIDADO,
+                    "verificado": True,
+                    "fecha_creacion": ahora,
+                    "fecha_actualizacion": ahora,
+                }
+            )
+            acumulado = descuentos.setdefault(asignacion.cargo_id, [Decimal("0.00"), Decimal("0.00")])
+            acumulado[0] += asignacion.monto_usd
+            acumulado[1] += asignacion.monto_ves
+            ingresos = ingresos_por_reporte.setdefault(reporte_id, [Decimal("0.00"), Decimal("0.00")])
+            ingresos[0] += asignacion.monto_usd
+            ingresos[1] += asignacion.monto_ves
+            reporte.conciliadas_nuevas += 1
+            reporte.monto_conciliado_usd += asignacion.monto_usd
+
+        self._escribir_lote(db, nuevos, descuentos, pagos_a_validar, ingresos_por_reporte)
+        reporte.cargos_afectados += len(descuentos)
+
+    def _asignar_cargos(self, db: Session, pendientes, indice: IndiceCargos, bloquear: bool) -> List[Asignacion]:
+        """
+        Elige en el índice el cargo de cada línea y bloquea sólo los cargos elegidos (FOR UPDATE
+        en orden de id). Si otra transacción cambió alguno de esos saldos desde que se leyó, el
+        índice toma el saldo bloqueado y el lote se vuelve a asignar.
+        """
+        while True:
+            leidos: Dict[int, Tuple[Decimal, Decimal]] = {}  # Saldo de cada cargo elegido antes de este lote
+            asignaciones: List[Asignacion] = []
+            for linea, monto_usd, monto_ves, tasa in pendientes:
+                asignacion = Asignacion(linea, monto_usd, monto_ves, tasa)
+                asignaciones.append(asignacion)
+                cargo_id, asignacion.motivo = indice.elegir_cargo(
+                    indice.identificar_apartamento(linea), linea.moneda, linea.monto, monto_usd
+                )
+                if cargo_id is None:
+                    continue
+                asignacion.residente_id = indice.residente_de_apto.get(indice.apartamento_de[cargo_id])
+                if asignacion.residente_id is None:
+                    asignacion.motivo = "Apartamento sin residente asociado"
+                    continue
+
+                asignacion.cargo_id = cargo_id
+                asignacion.saldo_usd, asignacion.saldo_ves = indice.saldo_usd[cargo_id], indice.saldo_ves[cargo_id]
+                leidos.setdefault(cargo_id, (asignacion.saldo_usd, asignacion.saldo_ves))
+                indice.descontar(cargo_id, monto_usd, monto_ves)
+
+            if not bloquear or not leidos:
+                return asignaciones
+
+            bloqueados = {
+                cargo_id: (Decimal(saldo_usd), Decimal(saldo_ves))
+                for cargo_id, saldo_usd, saldo_ves in db.execute(
+                    select(Cargo.id, Cargo.saldo_pendiente_usd, Cargo.saldo_pendiente_ves)
+                    .where(Cargo.id.in_(leidos.keys()), Cargo.estado.in_(ESTADOS_ABIERTOS))
+                    .order_by(Cargo.id)
+                    .with_for_update()
+                )
+            }
+            sin_saldo = (Decimal("0.00"), Decimal("0.00"))  # Pagado o eliminado por otra transacción
+            cambiados = {c for c, saldo in leidos.items() if bloqueados.get(c, sin_saldo) != saldo}
+            if not cambiados:
+                return asignaciones
+
+            logger.warning(f"🔁 {len(cambiados)} cargos cambiaron durante la importación; reasignando el lote")
+            for cargo_id, saldo in leidos.items():
+                indice.fijar_saldo(cargo_id, *(bloqueados.get(cargo_id, sin_saldo) if cargo_id in cambiados else saldo))
+
+    def _convertir(self, db: Session, linea: LineaExtracto, contexto) -> Tuple[Decimal, Decimal, Decimal]:
+        """(monto USD, monto VES, tasa usada)"""
+        if linea.moneda == "USD":
+            tasa = self._tasa(db, contexto, linea.fecha)
+            return linea.monto, (linea.monto * tasa).quantize(CENTAVO, ROUND_HALF_UP), tasa
+        if linea.moneda == "VES":
+            tasa = self._tasa(db, contexto, linea.fecha)
+            return (linea.monto / tasa).quantize(CENTAVO, ROUND_HALF_UP), linea.monto, tasa
+        raise ValueError(f"Moneda no válida en línea {linea.numero_linea}: {linea.moneda}")
+
+    def _tasa(self, db: Session, contexto, fecha: date) -> Decimal:
+        """Tasa del día del movimiento (histórico local); sin histórico para esa fecha, la actual"""
+        if fecha < date.today():
+            from .tasas_historicas_service import tasas_historicas_service
+
+            try:
+                return tasas_historicas_service.tasa_en(db, fecha)[0]
+            except ValueError:
+                pass
+        if contexto["tasa_actual"] is None:
+            raise ValueError("No hay tasa de cambio disponible")
+        return contexto["tasa_actual"]
+
+    def _tasa_actual(self, db: Session) -> Optional[Decimal]:
+        """Tasa de hoy sin escribir en la base; None si no hay (sólo falla si alguna línea la necesita)"""
+        from .tasa_cambio_service import tasa_cambio_service
+
+        try:
+            return Decimal(tasa_cambio_service.obtener_tasa_vigente(db).tasa_usd_ves)
+        except Exception as e:
+            logger.warning(f"⚠️ Sin tasa actual para el extracto: {str(e)[:120]}")
+            return None
+
+    def _no_conciliada(self, reporte, linea: LineaExtracto, motivo: str, monto_usd: Decimal = None):
+        reporte.no_conciliadas += 1
+        if monto_usd is not None:
+            reporte.monto_no_conciliado_usd += monto_usd
+        reporte.agregar_muestra(
+            reporte.muestras_no_conciliadas,
+            {
+                "linea": linea.numero_linea,
+                "fecha": linea.fecha.isoformat(),
+                "referencia": linea.referencia,
+                "monto": str(linea.monto),
+                "moneda": linea.moneda,
+                "descripcion": linea.descripcion[:120],
+                "motivo": motivo,
+            },
+        )
+
+    def _escribir_lote(self, db: Session, nuevos, descuentos, pagos_a_validar, ingresos_por_reporte):
+        """Escrituras del lote en bloque: executemany de pagos y saldos, un UPDATE de estados"""
+        from .cargos_service import cargos_service
+        from .reportes_financieros_service import reportes_financieros_service
+
+        if nuevos:
+            db.execute(insert(Pago), nuevos)
+
+        if descuentos:
+            cargos = Cargo.__table__
+            db.execute(
+                update(cargos)
+                .where(cargos.c.id == bindparam("b_id"))
+                .values(
+                    saldo_pendiente_usd=case(
+                        (
+                            cargos.c.saldo_pendiente_usd > bindparam("b_usd"),
+                            cargos.c.saldo_pendiente_usd - bindparam("b_usd"),
+                        ),
+                        else_=0,
+                    ),
+                    saldo_pendiente_ves=case(
+                        (
+                            cargos.c.saldo_pendiente_ves > bindparam("b_ves"),
+                            cargos.c.saldo_pendiente_ves - bindparam("b_ves"),
+                        ),
+                        else_=0,
+                    ),
+                ),
+                [{"b_id": cargo_id, "b_usd": usd, "b_ves": ves} for cargo_id, (usd, ves) in descuentos.items()],
+            )
+            cargos_service.recalcular_estados_cargos(db, list(descuentos.keys()))
+
+        if pagos_a_validar:
+            db.execute(
+                update(Pago)
+                .where(Pago.id.in_(pagos_a_validar))
+                .values(estado=EstadoPagoEnum.VALIDADO, verificado=True, fecha_actualizacion=datetime.now())
+                .execution_options(synchronize_session=False)
+            )
+
+        for reporte_id, (usd, ves) in ingresos_por_reporte.items():
+            reportes_financieros_service.acumular_totales(db, reporte_id, ingresos_usd=usd, ingresos_ves=ves)
+
+
+# Instancia global
+conciliacion_service = ConciliacionService()
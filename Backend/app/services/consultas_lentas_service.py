@@ -0,0 +1,284 @@
+# services/consultas_lentas_service.py
+"""
+Registro de consultas lentas con su plan de ejecución.
+
+Los eventos before/after_cursor_execute del engine miden cada sentencia; las
+que tardan más de SQL_LENTA_UMBRAL_MS se anotan en el log con sus parámetros
+y la función de app/ que la lanzó (archivo:función:línea), y se encolan. Un
+hilo aparte, con su propia conexión, captura el plan y guarda la fila en
+consultas_lentas (GET /admin/consultas-lentas):
+
+- PostgreSQL: EXPLAIN (ANALYZE, BUFFERS) para los SELECT sin efectos (se
+  vuelve a ejecutar, dentro de una transacción que se revierte y con
+  statement_timeout); EXPLAIN sin ANALYZE para el resto, que no puede
+  ejecutarse dos veces
+- otros motores: EXPLAIN QUERY PLAN
+
+La petición o el job que lanzó la sentencia no espera el EXPLAIN. Cada patrón
+de sentencia (huella, ver core/instrumentacion_sql.py) se explica como mucho
+una vez cada SQL_LENTA_EXPLAIN_MINUTOS; las demás apariciones se guardan sin
+plan. Si la cola se llena se descartan registros en vez de frenar a nadie.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import event, select, delete, func, insert
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import threading
+import logging
+import queue
+import json
+import time
+import sys
+import os
+import re
+
+from ..core.config import settings
+from ..core.instrumentacion_sql import huella, ruta_actual
+from ..core.metricas import metricas
+from ..models.sistema import ConsultaLenta
+
+logger = logging.getLogger(__name__)
+
+TAMANO_COLA = 200
+MAX_PARAMETROS = 2000  # Caracteres del JSON de parámetros que se guardan
+MAX_HUELLAS_RECORDADAS = 5000
+
+# SELECT que no conviene volver a ejecutar: bloquean filas, toman locks de sesión o avanzan secuencias
+_CON_EFECTOS = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+)?UPDATE\b|\bFOR\s+(?:KEY\s+)?SHARE\b|pg_advisory|nextval|setval|set_config", re.I
+)
+_SENSIBLES = ("password", "contrasena", "clave", "token", "secret")
+
+_CARPETA_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONSULTAS_LENTAS = metricas.contador(
+    "sql_consultas_lentas_total", "Sentencias que superaron SQL_LENTA_UMBRAL_MS", ("resultado",)
+)
+
+
+def _origen() -> Optional[str]:
+    """Primer marco de app/ en la pila (None si la lanzó FastAPI, p. ej. una carga perezosa al serializar)"""
+    marco = sys._getframe(1)
+    while marco is not None:
+        archivo = marco.f_code.co_filename
+        if archivo.startswith(_CARPETA_APP) and archivo != __file__:
+            relativo = os.path.relpath(archivo, _CARPETA_APP).replace(os.sep, "/")
+            return f"{relativo}:{marco.f_code.co_name}:{marco.f_lineno}"[:300]
+        marco = marco.f_back
+    return None
+
+
+def _ocultar(parametros):
+    if isinstance(parametros, dict):
+        return {k: "***" if any(s in str(k).lower() for s in _SENSIBLES) else v for k, v in parametros.items()}
+    return parametros
+
+
+def _parametros_json(parametros, executemany: bool) -> Optional[str]:
+    if not parametros:
+        return None
+    if executemany:
+        lotes = list(parametros)
+        valor = {"filas": len(lotes), "primeras": [_ocultar(p) for p in lotes[:3]]}
+    else:
+        valor = _ocultar(parametros)
+    texto = json.dumps(valor, default=str, ensure_ascii=False)
+    return texto if len(texto) <= MAX_PARAMETROS else texto[: MAX_PARAMETROS - 3] + "..."
+
+
+def se_puede_analizar(sentencia: str) -> bool:
+    """EXPLAIN ANALYZE ejecuta la sentencia: sólo para SELECT sin bloqueos ni efectos"""
+    return sentencia.lstrip().upper().startswith("SELECT") and not _CON_EFECTOS.search(sentencia)
+
+
+class ConsultasLentasService:
+    def __init__(self):
+        self.engine = None
+        self.umbral_segundos = 0.0
+        self._cola: "queue.Queue[Tuple[Dict, object, bool]]" = queue.Queue(maxsize=TAMANO_COLA)
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._ultimo_explain: Dict[str, float] = {}  # huella -> time.monotonic() del último EXPLAIN
+
+    def instalar(self, engine):
+        """Registra los eventos que miden cada sentencia del engine"""
+        if settings.SQL_LENTA_UMBRAL_MS <= 0:
+            return
+        self.engine = engine
+        self.umbral_segundos = settings.SQL_LENTA_UMBRAL_MS / 1000
+        event.listen(engine, "before_cursor_execute", self._antes)
+        event.listen(engine, "after_cursor_execute", self._despues)
+        logger.info(f"🐢 Registro de consultas lentas activo (umbral {settings.SQL_LENTA_UMBRAL_MS} ms)")
+
+    # ---------- Eventos ----------
+
+    # El inicio va en el contexto de ejecución y no en conn.info: una sentencia que falla no llega a
+    # after_cursor_execute y su contexto se descarta con ella, sin dejar entradas en la conexión del pool
+
+    @staticmethod
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._inicio_consulta_lenta = time.perf_counter()
+
+    def _despues(self, conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, "_inicio_consulta_lenta", None)
+        if inicio is None:
+            return
+        segundos = time.perf_counter() - inicio
+        # La conexión del hilo de EXPLAIN no se registra a sí misma
+        if segundos >= self.umbral_segundos and conn.get_execution_options().get("registrar_lentas", True):
+            self._registrar(statement, parameters, executemany, segundos)
+
+    def _registrar(self, sentencia: str, parametros, executemany: bool, segundos: float):
+        clave = huella(sentencia)
+        registro = {
+            "fecha": datetime.now(),
+            "duracion_ms": round(segundos * 1000, 1),
+            "sentencia": sentencia,
+            "huella": clave,
+            "parametros": _parametros_json(parametros, executemany),
+            "origen": _origen(),
+            "ruta": ruta_actual(),
+        }
+        logger.warning(
+            f"🐢 Consulta lenta ({registro['duracion_ms']:.0f} ms) en {registro['origen'] or 'origen desconocido'}: "
+            f"{clave[:300]} | parámetros: {(registro['parametros'] or '-')[:300]}"
+        )
+        explicar = settings.SQL_LENTA_EXPLAIN and not executemany and self._toca_explicar(clave)
+        try:
+            self._cola.put_nowait((registro, parametros if explicar else None, explicar))
+        except queue.Full:
+            CONSULTAS_LENTAS.inc("descartada")
+            return
+        CONSULTAS_LENTAS.inc("registrada")
+        self._asegurar_hilo()
+
+    def _toca_explicar(self, clave: str) -> bool:
+        ahora = time.monotonic()
+        with self._lock:
+            ultimo = self._ultimo_explain.get(clave)
+            if ultimo is not None and ahora - ultimo < settings.SQL_LENTA_EXPLAIN_MINUTOS * 60:
+                return False
+            if len(self._ultimo_explain) >= MAX_HUELLAS_RECORDADAS:
+                self._ultimo_explain.clear()
+            self._ultimo_explain[clave] = ahora
+            return True
+
+    # ---------- Hilo de EXPLAIN y guardado ----------
+
+    def _asegurar_hilo(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._procesar, name="consultas-lentas", daemon=True)
+                self._hilo.start()
+
+    def _procesar(self):
+        while True:
+            registro, parametros, explicar = self._cola.get()
+            try:
+                with self.engine.connect() as conexion:
+                    conexion.execution_options(registrar_lentas=False)
+                    if explicar:
+                        registro["plan"], registro["error_plan"] = self._explicar(
+                            conexion, registro["sentencia"], parametros
+                        )
+                    conexion.execute(insert(ConsultaLenta).values(**registro))
+                    conexion.commit()
+            except Exception as e:
+                logger.error(f"❌ No se pudo guardar la consulta lenta: {e}")
+            finally:
+                self._cola.task_done()
+
+    def _explicar(self, conexion, sentencia: str, parametros) -> Tuple[Optional[str], Optional[str]]:
+        """(plan, error): el EXPLAIN corre en una transacción que siempre se revierte"""
+        postgres = conexion.dialect.name == "postgresql"
+        if postgres:
+            prefijo = "EXPLAIN (ANALYZE, BUFFERS) " if se_puede_analizar(sentencia) else "EXPLAIN "
+        else:
+            prefijo = "EXPLAIN QUERY PLAN "
+        try:
+            with conexion.begin() as transaccion:
+                if postgres:
+                    timeout_ms = settings.SQL_LENTA_EXPLAIN_TIMEOUT_SEGUNDOS * 1000
+                    conexion.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+                filas = conexion.exec_driver_sql(prefijo + sentencia, parametros).all()
+                transaccion.rollback()
+        except Exception as e:
+            return None, str(e)[:1000]
+        # PostgreSQL devuelve una línea por fila; SQLite (id, padre, _, detalle)
+        return "\n".join(str(fila[-1]) for fila in filas), None
+
+    def esperar(self, timeout: float = 10.0) -> bool:
+        """Espera a que se guarden los registros encolados (pruebas y benchmarks)"""
+        limite = time.monotonic() + timeout
+        while self._cola.unfinished_tasks:
+            if time.monotonic() > limite:
+                return False
+            time.sleep(0.05)
+        return True
+
+    # ---------- Consulta ----------
+
+    def listar(
+        self,
+        db: Session,
+        limite: int = 50,
+        desde: Optional[datetime] = None,
+        origen: Optional[str] = None,
+        minimo_ms: Optional[float] = None,
+    ) -> List[ConsultaLenta]:
+        consulta = select(ConsultaLenta).order_by(ConsultaLenta.fecha.desc(), ConsultaLenta.id.desc()).limit(limite)
+        if desde:
+            consulta = consulta.where(ConsultaLenta.fecha >= desde)
+        if origen:
+            consulta = consulta.where(ConsultaLenta.origen.ilike(f"%{origen}%"))
+        if minimo_ms is not None:
+            consulta = consulta.where(ConsultaLenta.duracion_ms >= minimo_ms)
+        return list(db.scalars(consulta))
+
+    def obtener(self, db: Session, id_consulta: int) -> Optional[ConsultaLenta]:
+        return db.get(ConsultaLenta, id_consulta)
+
+    def resumen(self, db: Session, dias: int = 7, limite: int = 20) -> List[Dict]:
+        """Patrones de sentencia más costosos de los últimos días (tiempo total = veces x promedio)"""
+        total_ms = func.sum(ConsultaLenta.duracion_ms)
+        consulta = (
+            select(
+                ConsultaLenta.huella,
+                func.count(ConsultaLenta.id).label("veces"),
+                total_ms.label("total_ms"),
+                func.avg(ConsultaLenta.duracion_ms).label("promedio_ms"),
+                func.max(ConsultaLenta.duracion_ms).label("maximo_ms"),
+                func.max(ConsultaLenta.fecha).label("ultima"),
+                func.max(ConsultaLenta.origen).label("origen"),
+                func.max(ConsultaLenta.id).label("ultimo_id"),
+            )
+            .where(ConsultaLenta.fecha >= datetime.now() - timedelta(days=dias))
+            .group_by(ConsultaLenta.huella)
+            .order_by(total_ms.desc())
+            .limit(limite)
+        )
+        return [
+            {
+                **fila._asdict(),
+                "total_ms": round(float(fila.total_ms), 1),
+                "promedio_ms": round(float(fila.promedio_ms), 1),
+            }
+            for fila in db.execute(consulta)
+        ]
+
+    def depurar(self, db: Session, dias: Optional[int] = None) -> int:
+        """Borra los registros más viejos que SQL_LENTA_RETENCION_DIAS"""
+        dias = settings.SQL_LENTA_RETENCION_DIAS if dias is None else dias
+        borradas = db.execute(
+            delete(ConsultaLenta).where(ConsultaLenta.fecha < datetime.now() - timedelta(days=dias))
+        ).rowcount
+        db.commit()
+        return borradas
+
+
+# Instancia global
+consultas_lentas_service = ConsultasLentasService()
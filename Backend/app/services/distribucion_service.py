@@ -6,6 +6,7 @@ import logging
 from ..models.financiero import DistribucionGasto, Gasto
 from ..models.torres import Apartamento, TipoApartamento
 from ..services.tasa_cambio_service import tasa_cambio_service
+from ..services.topologia_service import topologia_service
 
 logger = logging.getLogger(__name__)
 
@@ -111,17 +112,7 @@ class DistribucionService:
         """
         Obtiene apartamentos con información de sus tipos y porcentajes.
         """
-        apartamentos = (
-            db.query(
-                Apartamento.id,
-                Apartamento.numero,
-                TipoApartamento.nombre.label("tipo_nombre"),
-                TipoApartamento.porcentaje_aporte,
-            )
-            .join(TipoApartamento, Apartamento.id_tipo_apartamento == TipoApartamento.id)
-            .filter(Apartamento.id.in_(apartamentos_ids))
-            .all()
-        )
+        apartamentos = topologia_service.apartamentos(db, apartamentos_ids)
 
         return [
             {
@@ -0,0 +1,166 @@
+# services/estado_cuenta_pdf_service.py
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.metricas import registrar_cache
+from ..utils.pdf_estado_cuenta import renderizar_estado_cuenta, renderizar_lote
+from .estado_cuenta_service import estado_cuenta_service
+from .topologia_service import topologia_service
+
+logger = logging.getLogger(__name__)
+
+# Por debajo de esta cantidad de PDFs por proceso, arrancar el proceso cuesta más que renderizar
+MIN_PDFS_POR_PROCESO = 20
+
+
+class EstadoCuentaPdfService:
+    """
+    Estados de cuenta mensuales en PDF para un apartamento, una torre o todo el condominio.
+
+    - Los datos se consultan en el proceso principal (estado_cuenta_service) y se
+      serializan a JSON; el dibujo del PDF, que es lo que consume CPU, se reparte
+      en un pool de procesos.
+    - Caché por (apartamento, período, huella de los datos): el nombre del archivo
+      lleva la huella, así que un estado de cuenta sin cambios nunca se vuelve a
+      renderizar y uno que cambió reemplaza a su versión anterior.
+    """
+
+    def datos_estado_cuenta(self, db: Session, apartamento_id: int, periodo: str) -> Tuple[dict, str]:
+        """Devuelve (datos serializables, huella). La fecha de generación no entra en la huella."""
+        datos = estado_cuenta_service.generar_estado_cuenta_detallado(db, apartamento_id, periodo)
+        datos = json.loads(json.dumps(datos, default=_json_por_defecto))
+        contenido = {**datos, "encabezado": {k: v for k, v in datos["encabezado"].items() if k != "fecha_generacion"}}
+        huella = hashlib.sha256(json.dumps(contenido, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        return datos, huella
+
+    def ruta_pdf(self, apartamento_id: int, periodo: str, huella: str, directorio: Optional[str] = None) -> Path:
+        return Path(directorio or settings.ESTADOS_CUENTA_DIR) / periodo / f"apto_{apartamento_id}_{huella}.pdf"
+
+    def generar_pdf(self, db: Session, apartamento_id: int, periodo: str, directorio: Optional[str] = None) -> Path:
+        """Estado de cuenta de un apartamento (en este proceso); reutiliza el PDF si los datos no cambiaron"""
+        datos, huella = self.datos_estado_cuenta(db, apartamento_id, periodo)
+        ruta = self.ruta_pdf(apartamento_id, periodo, huella, directorio)
+        if not ruta.exists():
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            renderizar_estado_cuenta(str(ruta), datos)
+            self._eliminar_versiones_anteriores(ruta)
+            logger.info(f"📄 Estado de cuenta renderizado: {ruta}")
+        return ruta
+
+    def generar_lote(
+        self,
+        db: Session,
+        periodo: str,
+        torre_id: Optional[int] = None,
+        procesos: Optional[int] = None,
+        directorio: Optional[str] = None,
+    ) -> dict:
+        """
+        Genera los PDF de una torre (o de todo el condominio) para el período.
+        Un apartamento con error no detiene el lote: se reporta en `errores`.
+        """
+        inicio = time.perf_counter()
+        apartamentos = topologia_service.ids_por_torre(db, torre_id) if torre_id else topologia_service.ids_todos(db)
+        if torre_id and not apartamentos:
+            raise ValueError(f"Torre {torre_id} no encontrada o sin apartamentos")
+
+        tareas, en_cache, errores = [], 0, []
+        for apartamento_id in apartamentos:
+            try:
+                datos, huella = self.datos_estado_cuenta(db, apartamento_id, periodo)
+            except Exception as e:
+                errores.append({"id_apartamento": apartamento_id, "error": str(e)})
+                continue
+            ruta = self.ruta_pdf(apartamento_id, periodo, huella, directorio)
+            if ruta.exists():
+                en_cache += 1
+            else:
+                tareas.append((apartamento_id, ruta, datos))
+        t_datos = time.perf_counter() - inicio
+        registrar_cache("estados_cuenta_pdf", True, en_cache)
+        registrar_cache("estados_cuenta_pdf", False, len(tareas))
+
+        if tareas:
+            tareas[0][1].parent.mkdir(parents=True, exist_ok=True)
+        renderizados, errores_render = self._renderizar(tareas, procesos)
+        errores += errores_render
+
+        resultado = {
+            "periodo": periodo,
+            "torre_id": torre_id,
+            "apartamentos": len(apartamentos),
+            "renderizados": renderizados,
+            "en_cache": en_cache,
+            "errores": errores,
+            "directorio": str(Path(directorio or settings.ESTADOS_CUENTA_DIR) / periodo),
+            "duracion_datos_ms": round(t_datos * 1000, 1),
+            "duracion_total_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        }
+        logger.info(
+            f"📄 Estados de cuenta {periodo}: {renderizados} renderizados, {en_cache} en caché, "
+            f"{len(errores)} errores ({resultado['duracion_total_ms']} ms)"
+        )
+        return resultado
+
+    def _renderizar(self, tareas: List[tuple], procesos: Optional[int]) -> Tuple[int, List[dict]]:
+        procesos = procesos or settings.ESTADOS_CUENTA_PROCESOS or os.cpu_count() or 1
+        procesos = min(procesos, -(-len(tareas) // MIN_PDFS_POR_PROCESO))
+        por_ruta = {str(ruta): (apartamento_id, ruta) for apartamento_id, ruta, _ in tareas}
+        trabajos = [(str(ruta), datos) for _, ruta, datos in tareas]
+
+        if procesos <= 1:
+            resultados = renderizar_lote(trabajos)
+        else:
+            # Bloques de ~4 por proceso: reparte la carga sin pagar IPC por cada PDF.
+            # "spawn": los procesos hijos no heredan conexiones a la BD ni hilos del servidor
+            tamano = -(-len(trabajos) // (procesos * 4))
+            bloques = [trabajos[i : i + tamano] for i in range(0, len(trabajos), tamano)]
+            resultados = []
+            with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn")) as pool:
+                for futuro in as_completed([pool.submit(renderizar_lote, bloque) for bloque in bloques]):
+                    resultados += futuro.result()
+
+        renderizados, errores = 0, []
+        for ruta, error in resultados:
+            apartamento_id, ruta = por_ruta[ruta]
+            if error:
+                errores.append({"id_apartamento": apartamento_id, "error": error})
+            else:
+                self._eliminar_versiones_anteriores(ruta)
+                renderizados += 1
+        return renderizados, errores
+
+    @staticmethod
+    def _eliminar_versiones_anteriores(ruta: Path):
+        """Borra los PDF del mismo apartamento y período con otra huella (datos ya desactualizados)"""
+        prefijo = ruta.name.rsplit("_", 1)[0]
+        for anterior in ruta.parent.glob(f"{prefijo}_*.pdf"):
+            if anterior != ruta:
+                anterior.unlink(missing_ok=True)
+
+
+def _json_por_defecto(valor):
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Enum):
+        return valor.value
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+# Instancia global
+estado_cuenta_pdf_service = EstadoCuentaPdfService()
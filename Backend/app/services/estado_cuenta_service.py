@@ -8,8 +8,10 @@ from sqlalchemy import func
 from sqlalchemy.orm import joinedload
 from ..models.torres import Piso
 
-from ..models.financiero import Gasto, Pago, DistribucionGasto, Cargo
-from ..models.torres import Apartamento, Residente
+from ..models.financiero import Gasto, DistribucionGasto, Cargo
+from ..models.pagos import Pago
+from ..models.residentes import Residente
+from ..models.torres import Apartamento
 from ..schemas.financiero import ReporteFinancieroResponse
 
 logger = logging.getLogger(__name__)
@@ -266,7 +268,7 @@ class EstadoCuentaService:
         # Estado de cuenta
         estado = "AL DÍA"
         if saldo_actual > 0:
-            if saldo_actual > total_cargos * 0.5:  # Si debe más del 50% de los cargos mensuales
+            if saldo_actual > total_cargos * Decimal("0.5"):  # Si debe más del 50% de los cargos mensuales
                 estado = "MOROSO"
             else:
                 estado = "PENDIENTE"
@@ -0,0 +1,433 @@
+# services/exportacion_service.py
+import csv
+import io
+import logging
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterable, Iterator, List, Tuple
+from xml.sax.saxutils import escape
+
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from ..models.financiero import Cargo, EstadoCargoEnum, EstadoGastoEnum, Gasto, ReporteFinanciero, TipoGastoEnum
+from ..models.pagos import EstadoPagoEnum, Pago
+from ..models.residentes import Residente
+from ..models.torres import Apartamento
+from ..schemas.financiero import ExportacionFilter
+
+logger = logging.getLogger(__name__)
+
+LOTE_EXPORTACION = 1000  # Filas por viaje al cursor del servidor y por bloque enviado al cliente
+MAX_FILAS_HOJA = 1_048_575  # Límite de Excel (1.048.576 filas) menos el encabezado
+
+ENTIDADES = ("gastos", "cargos", "pagos")
+
+# Caracteres de control que XML 1.0 no admite (rompen el archivo al abrirlo en Excel)
+_CONTROL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+
+
+class ExportacionService:
+    """
+    Exportaciones de gastos, cargos y pagos en CSV o XLSX, en streaming:
+    las filas salen de un cursor del servidor (yield_per) y se escriben al cliente
+    por bloques, así que la memoria no crece con el tamaño del período exportado
+    y la descarga empieza antes de que termine la consulta.
+    """
+
+    def preparar_consulta(self, entidad: str, filtro: ExportacionFilter) -> Tuple[List[str], Select]:
+        """
+        Valida los filtros y devuelve (encabezados, consulta). Se llama antes de empezar a
+        transmitir para que un filtro inválido responda 400 y no un archivo cortado.
+        """
+        if entidad == "gastos":
+            return self._consulta_gastos(filtro)
+        if entidad == "cargos":
+            return self._consulta_cargos(filtro)
+        if entidad == "pagos":
+            return self._consulta_pagos(filtro)
+        raise ValueError(f"Entidad no exportable: {entidad}. Opciones: {', '.join(ENTIDADES)}")
+
+    def filas(self, db: Session, consulta: Select) -> Iterator[tuple]:
+        """Recorre la consulta con un cursor del servidor, LOTE_EXPORTACION filas por viaje"""
+        resultado = db.execute(consulta.execution_options(yield_per=LOTE_EXPORTACION))
+        for particion in resultado.partitions():
+            yield from particion
+
+    def exportar(
+        self,
+        db: Session,
+        encabezados: List[str],
+        consulta: Select,
+        formato: str,
+        nombre_hoja: str = "Datos",
+        separador: str = ";",
+    ) -> Iterator[bytes]:
+        """Genera el archivo por bloques de bytes listos para un StreamingResponse"""
+        inicio = datetime.now()
+        total = 0
+
+        def contar(filas: Iterable[tuple]):
+            nonlocal total
+            for fila in filas:
+                total += 1
+                yield fila
+
+        if formato == "csv":
+            yield from csv_por_bloques(encabezados, contar(self.filas(db, consulta)), separador)
+        elif formato == "xlsx":
+            yield from xlsx_por_bloques(encabezados, contar(self.filas(db, consulta)), nombre_hoja)
+        else:
+            raise ValueError(f"Formato no soportado: {formato}")
+
+        logger.info(
+            f"📤 Exportación {nombre_hoja}.{formato}: {total} filas en {(datetime.now() - inicio).total_seconds():.1f}s"
+        )
+
+    # ======================
+    # ---- Consultas (columnas planas, sin grafos ORM) ----
+    # ======================
+
+    def _consulta_gastos(self, filtro: ExportacionFilter):
+        encabezados = [
+            "ID",
+            "Período",
+            "Fecha",
+            "Tipo",
+            "Descripción",
+            "Responsable",
+            "Monto USD",
+            "Monto VES",
+            "Tasa",
+            "Estado",
+        ]
+        consulta = select(
+            Gasto.id,
+            Gasto.periodo,
+            Gasto.fecha_gasto,
+            Gasto.tipo_gasto,
+            Gasto.descripcion,
+            Gasto.responsable,
+            Gasto.monto_total_usd,
+            Gasto.monto_total_ves,
+            Gasto.tasa_cambio,
+            Gasto.estado,
+        )
+        if filtro.periodo:
+            consulta = consulta.where(Gasto.periodo == _validar_periodo(filtro.periodo))
+        if filtro.fecha_inicio:
+            consulta = consulta.where(Gasto.fecha_gasto >= filtro.fecha_inicio)
+        if filtro.fecha_fin:
+            consulta = consulta.where(Gasto.fecha_gasto <= filtro.fecha_fin)
+        if filtro.estado:
+            consulta = consulta.where(Gasto.estado == _enum(EstadoGastoEnum, filtro.estado))
+        if filtro.tipo_gasto:
+            consulta = consulta.where(Gasto.tipo_gasto == _enum(TipoGastoEnum, filtro.tipo_gasto))
+        if filtro.responsable:
+            consulta = consulta.where(Gasto.responsable.ilike(f"%{filtro.responsable}%"))
+        return encabezados, consulta.order_by(Gasto.fecha_gasto, Gasto.id)
+
+    def _consulta_cargos(self, filtro: ExportacionFilter):
+        encabezados = [
+            "ID",
+            "Apartamento",
+            "Período",
+            "Gasto",
+            "Descripción",
+            "Monto USD",
+            "Monto VES",
+            "Saldo USD",
+            "Saldo VES",
+            "Vencimiento",
+            "Estado",
+        ]
+        consulta = (
+            select(
+                Cargo.id,
+                Apartamento.numero,
+                Gasto.periodo,
+                Gasto.descripcion,
+                Cargo.descripcion,
+                Cargo.monto_usd,
+                Cargo.monto_ves,
+                Cargo.saldo_pendiente_usd,
+                Cargo.saldo_pendiente_ves,
+                Cargo.fecha_vencimiento,
+                Cargo.estado,
+            )
+            .join(Apartamento, Apartamento.id == Cargo.id_apartamento)
+            .join(Gasto, Gasto.id == Cargo.id_gasto)
+        )
+        if filtro.periodo:
+            consulta = consulta.where(Gasto.periodo == _validar_periodo(filtro.periodo))
+        if filtro.fecha_inicio:
+            consulta = consulta.where(Cargo.fecha_vencimiento >= filtro.fecha_inicio)
+        if filtro.fecha_fin:
+            consulta = consulta.where(Cargo.fecha_vencimiento <= filtro.fecha_fin)
+        if filtro.estado:
+            consulta = consulta.where(Cargo.estado == _enum(EstadoCargoEnum, filtro.estado))
+        if filtro.id_apartamento:
+            consulta = consulta.where(Cargo.id_apartamento == filtro.id_apartamento)
+        return encabezados, consulta.order_by(Cargo.id)
+
+    def _consulta_pagos(self, filtro: ExportacionFilter):
+        encabezados = [
+            "ID",
+            "Fecha",
+            "Período",
+            "Apartamento",
+            "Residente",
+            "Cédula",
+            "Cargo",
+            "Concepto",
+            "Método",
+            "Referencia",
+            "Monto USD",
+            "Monto VES",
+            "Tasa",
+            "Estado",
+        ]
+        consulta = (
+            select(
+                Pago.id,
+                Pago.fecha_creacion,
+                ReporteFinanciero.periodo,
+                Apartamento.numero,
+                Residente.nombre,
+                Residente.cedula,
+                Pago.id_cargo,
+                Pago.concepto,
+                Pago.metodo,
+                Pago.referencia,
+                Pago.monto_pagado_usd,
+                Pago.monto_pagado_ves,
+                Pago.tasa_cambio_pago,
+                Pago.estado,
+            )
+            .outerjoin(ReporteFinanciero, ReporteFinanciero.id == Pago.id_reporte_financiero)
+            .outerjoin(Apartamento, Apartamento.id == Pago.id_apartamento)
+            .outerjoin(Residente, Residente.id == Pago.id_residente)
+        )
+        if filtro.periodo:
+            consulta = consulta.where(ReporteFinanciero.periodo == _validar_periodo(filtro.periodo))
+        if filtro.fecha_inicio:
+            consulta = consulta.where(Pago.fecha_creacion >= filtro.fecha_inicio)
+        if filtro.fecha_fin:
+            consulta = consulta.where(Pago.fecha_creacion < _dia_siguiente(filtro.fecha_fin))
+        if filtro.estado:
+            consulta = consulta.where(Pago.estado == _enum(EstadoPagoEnum, filtro.estado))
+        if filtro.id_apartamento:
+            consulta = consulta.where(Pago.id_apartamento == filtro.id_apartamento)
+        return encabezados, consulta.order_by(Pago.fecha_creacion, Pago.id)
+
+
+# ======================
+# ---- Escritores por bloques ----
+# ======================
+
+
+def csv_por_bloques(encabezados: List[str], filas: Iterable[tuple], separador: str = ";") -> Iterator[bytes]:
+    """CSV UTF-8 con BOM (Excel lo abre con acentos correctos), un bloque cada LOTE_EXPORTACION filas"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=separador, lineterminator="\r\n")
+    buffer.write("\ufeff")
+    escritor.writerow(encabezados)
+    pendientes = 0
+    for fila in filas:
+        escritor.writerow([_texto(valor) for valor in fila])
+        pendientes += 1
+        if pendientes == LOTE_EXPORTACION:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _Sumidero:
+    """Destino no posicionable para ZipFile: acumula lo comprimido hasta que se envía"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos) -> int:
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def xlsx_por_bloques(encabezados: List[str], filas: Iterable[tuple], nombre_hoja: str = "Datos") -> Iterator[bytes]:
+    """
+    XLSX mínimo (SpreadsheetML) escrito fila a fila dentro de un ZIP en streaming.
+    Las hojas van primero y el libro al final, así que si se supera el límite de
+    filas de Excel se abre otra hoja sin tener que volver atrás en el archivo.
+    """
+    sumidero = _Sumidero()
+    hojas = 0
+    filas = iter(filas)
+    with zipfile.ZipFile(sumidero, "w", compression=zipfile.ZIP_DEFLATED) as archivo:
+        agotado = False
+        while not agotado:
+            hojas += 1
+            with archivo.open(f"xl/worksheets/sheet{hojas}.xml", "w") as hoja:
+                hoja.write(
+                    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                    b'<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" state="frozen"/>'
+                    b"</sheetView></sheetViews><sheetData>"
+                )
+                hoja.write(_fila_xlsx(encabezados, estilo=1).encode("utf-8"))
+                escritas, bloque = 0, []
+                while escritas < MAX_FILAS_HOJA:
+                    fila = next(filas, None)
+                    if fila is None:
+                        agotado = True
+                        break
+                    bloque.append(_fila_xlsx(fila))
+                    escritas += 1
+                    if len(bloque) == LOTE_EXPORTACION:
+                        hoja.write("".join(bloque).encode("utf-8"))
+                        bloque.clear()
+                        yield sumidero.vaciar()
+                hoja.write("".join(bloque).encode("utf-8"))
+                hoja.write(b"</sheetData></worksheet>")
+            yield sumidero.vaciar()
+
+        for nombre, contenido in _partes_libro(nombre_hoja, hojas).items():
+            archivo.writestr(nombre, contenido)
+    yield sumidero.vaciar()
+
+
+def _fila_xlsx(valores, estilo: int = 0) -> str:
+    celdas = []
+    for valor in valores:
+        if valor is None:
+            celdas.append("<c/>")
+        elif isinstance(valor, bool):
+            celdas.append(f'<c t="b"><v>{int(valor)}</v></c>')
+        elif isinstance(valor, (int, float, Decimal)):
+            celdas.append(f"<c><v>{valor}</v></c>")
+        elif isinstance(valor, datetime):
+            celdas.append(f'<c s="3"><v>{(valor - _EPOCA_EXCEL).total_seconds() / 86400:.6f}</v></c>')
+        elif isinstance(valor, date):
+            celdas.append(f'<c s="2"><v>{(valor - _EPOCA_EXCEL.date()).days}</v></c>')
+        else:
+            texto = escape(_CONTROL_XML.sub("", _texto(valor)))
+            celdas.append(f'<c t="inlineStr" s="{estilo}"><is><t xml:space="preserve">{texto}</t></is></c>')
+    return f"<row>{''.join(celdas)}</row>"
+
+
+def _partes_libro(nombre_hoja: str, hojas: int) -> dict:
+    nombres = [nombre_hoja if i == 1 else f"{nombre_hoja} {i}" for i in range(1, hojas + 1)]
+    tipos_hojas = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, hojas + 1)
+    )
+    return {
+        "[Content_Types].xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f"{tipos_hojas}</Types>"
+        ),
+        "_rels/.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        ),
+        "xl/workbook.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + "".join(
+                f'<sheet name="{escape(nombre)}" sheetId="{i}" r:id="rId{i}"/>'
+                for i, nombre in enumerate(nombres, start=1)
+            )
+            + "</sheets></workbook>"
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(
+                f'<Relationship Id="rId{i}" '
+                f'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                f'Target="worksheets/sheet{i}.xml"/>'
+                for i in range(1, hojas + 1)
+            )
+            + f'<Relationship Id="rId{hojas + 1}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+            'Target="styles.xml"/></Relationships>'
+        ),
+        # Estilos: 0 normal, 1 encabezado en negrita, 2 fecha, 3 fecha y hora
+        "xl/styles.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm"/></numFmts>'
+            '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+            '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+            '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+            '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+            "</styleSheet>"
+        ),
+    }
+
+
+# ======================
+# ---- Auxiliares ----
+# ======================
+
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if hasattr(valor, "value"):  # Enums del modelo
+        return str(valor.value)
+    if isinstance(valor, datetime):
+        return valor.strftime("%Y-%m-%d %H:%M:%S")
+    return str(valor)
+
+
+def _enum(tipo, valor: str):
+    """Acepta el valor ("Pendiente") o el nombre ("PENDIENTE") del enum"""
+    for miembro in tipo:
+        if valor in (miembro.value, miembro.name) or valor.lower() == miembro.value.lower():
+            return miembro
+    raise ValueError(f"Estado/tipo no válido: {valor}. Opciones: {', '.join(m.value for m in tipo)}")
+
+
+def _validar_periodo(periodo: str) -> str:
+    if not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", periodo):
+        raise ValueError(f"Período inválido: {periodo}. Use el formato YYYY-MM")
+    return periodo
+
+
+def _dia_siguiente(dia: date) -> date:
+    return date.fromordinal(dia.toordinal() + 1)
+
+
+# Instancia global
+exportacion_service = ExportacionService()
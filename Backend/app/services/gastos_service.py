@@ -1,4 +1,5 @@
 # services/gastos_service.py (CORREGIDO para tu modelo exacto)
+from sqlalchemy import extract, func, select
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from decimal import Decimal
@@ -10,7 +11,10 @@ from ..models.torres import Apartamento, Piso, Torre
 from ..schemas.financiero import GastoCompletoCreate, GastoFilter
 
 from ..services.tasa_cambio_service import tasa_cambio_service
+from ..services.tasas_historicas_service import tasas_historicas_service
 from ..services.distribucion_service import distribucion_service
+from ..services.topologia_service import topologia_service
+from ..services.reportes_financieros_service import reportes_financieros_service
 
 logger = logging.getLogger(__name__)
 
@@ -22,30 +26,34 @@ class GastosService:
         Versión SIMPLIFICADA usando los schemas actualizados
         """
         try:
-            # 1. Obtener tasa
-            tasa_cambio = tasa_cambio_service.obtener_tasa_actual(db)
-            if not tasa_cambio:
-                raise ValueError("No hay tasa de cambio disponible")
+            # 1. Obtener tasa: la vigente en la fecha del gasto si es retroactivo (histórico local, sin red)
+            if datos.fecha_gasto < date.today():
+                tasa_usd_ves, fecha_tasa = tasas_historicas_service.tasa_en(db, datos.fecha_gasto)
+            else:
+                tasa_cambio = tasa_cambio_service.obtener_tasa_actual(db)
+                if not tasa_cambio:
+                    raise ValueError("No hay tasa de cambio disponible")
+                tasa_usd_ves, fecha_tasa = tasa_cambio.tasa_usd_ves, tasa_cambio.fecha
 
             # 2. Calcular monto VES
-            monto_ves = datos.monto_usd * tasa_cambio.tasa_usd_ves
+            monto_ves = datos.monto_usd * tasa_usd_ves
             periodo = datos.fecha_gasto.strftime("%Y-%m")
 
             # 3. Obtener o crear reporte
-            reporte = self._obtener_o_crear_reporte(db, periodo)
+            reporte_id = self._obtener_o_crear_reporte(db, periodo)
 
             # 4. Crear gasto SIMPLIFICADO
             gasto = Gasto(
-                id_reporte_financiero=reporte.id,
+                id_reporte_financiero=reporte_id,
                 tipo_gasto=datos.tipo_gasto,
                 descripcion=datos.descripcion,
                 monto_total_usd=datos.monto_usd,
                 monto_total_ves=monto_ves,
-                tasa_cambio=tasa_cambio.tasa_usd_ves,
+                tasa_cambio=tasa_usd_ves,
                 criterio_seleccion=datos.criterio_seleccion.value,  # Convertir Enum a string
                 parametros_criterio=datos.obtener_parametros_json(),  # JSON con parámetros
                 fecha_gasto=datos.fecha_gasto,
-                fecha_tasa_bcv=tasa_cambio.fecha,
+                fecha_tasa_bcv=fecha_tasa,
                 responsable=datos.responsable,
                 estado=EstadoGastoEnum.PENDIENTE,
                 periodo=periodo,
@@ -69,6 +77,11 @@ class GastosService:
                     distribucion_service.guardar_distribuciones(db, distribuciones)
                     gasto.estado = EstadoGastoEnum.DISTRIBUIDO
 
+            # 6. Sumar el gasto al reporte (último paso antes del commit)
+            reportes_financieros_service.acumular_totales(
+                db, reporte_id, gastos_usd=gasto.monto_total_usd, gastos_ves=gasto.monto_total_ves
+            )
+
             db.commit()
             return self._obtener_gasto_con_relaciones(db, gasto.id)
 
@@ -87,7 +100,13 @@ class GastosService:
             if not gasto_original:
                 raise ValueError(f"Gasto {gasto_id} no encontrado")
 
-            # 2. Eliminar gasto existente (esto elimina distribuciones por CASCADE)
+            # 2. Eliminar gasto existente (esto elimina distribuciones por CASCADE) y descontarlo del reporte
+            reportes_financieros_service.acumular_totales(
+                db,
+                gasto_original.id_reporte_financiero,
+                gastos_usd=-gasto_original.monto_total_usd,
+                gastos_ves=-gasto_original.monto_total_ves,
+            )
             db.delete(gasto_original)
             db.commit()
 
@@ -115,26 +134,9 @@ class GastosService:
             .first()
         )
 
-    def _obtener_o_crear_reporte(self, db: Session, periodo: str):
-        """Obtiene o crea reporte financiero"""
-        from ..models.financiero import ReporteFinanciero
-
-        reporte = db.query(ReporteFinanciero).filter(ReporteFinanciero.periodo == periodo).first()
-        if not reporte:
-            reporte = ReporteFinanciero(
-                periodo=periodo,
-                generado_por="Sistema Automático",
-                total_ingresos_usd=0,
-                total_gastos_usd=0,
-                saldo_final_usd=0,
-                total_ingresos_ves=0,
-                total_gastos_ves=0,
-                saldo_final_ves=0,
-                estado="Abierto",
-            )
-            db.add(reporte)
-            db.flush()
-        return reporte
+    def _obtener_o_crear_reporte(self, db: Session, periodo: str) -> int:
+        """Obtiene o crea reporte financiero (id) sin carreras entre transacciones"""
+        return reportes_financieros_service.obtener_o_crear_reporte_id(db, periodo)
 
     def generar_cargos_automaticos(self, db: Session, gasto_id: int) -> bool:
         """
@@ -161,6 +163,42 @@ class GastosService:
             logger.error(f"Error generando cargos para gasto {gasto_id}: {str(e)}")
             raise
 
+    @staticmethod
+    def _condiciones_filtro(filtro: GastoFilter) -> list:
+        condiciones = []
+        if filtro.tipo_gasto:
+            condiciones.append(Gasto.tipo_gasto == filtro.tipo_gasto)
+        if filtro.fecha_inicio:
+            condiciones.append(Gasto.fecha_gasto >= filtro.fecha_inicio)
+        if filtro.fecha_fin:
+            condiciones.append(Gasto.fecha_gasto <= filtro.fecha_fin)
+        if filtro.responsable:
+            condiciones.append(Gasto.responsable.ilike(f"%{filtro.responsable}%"))
+        return condiciones
+
+    def version_gastos_por_filtro(self, db: Session, filtro: GastoFilter) -> tuple:
+        """
+        Versión de lo que devuelve obtener_gastos_por_filtro (para el ETag), con agregados:
+        suma de ids y de fecha_actualizacion de los gastos, ids de sus distribuciones, la
+        ocupación de los apartamentos de esas distribuciones y la topología que anida la respuesta.
+        """
+        condiciones = self._condiciones_filtro(filtro)
+        # correlate(None): la subconsulta lee gastos por su cuenta, no la fila de la consulta externa
+        ids_gastos = select(Gasto.id).where(*condiciones).correlate(None)
+        fila = db.execute(
+            select(
+                func.count(Gasto.id),
+                func.sum(Gasto.id),
+                func.sum(extract("epoch", Gasto.fecha_actualizacion)),
+                select(func.sum(DistribucionGasto.id))
+                .where(DistribucionGasto.id_gasto.in_(ids_gastos))
+                .scalar_subquery(),
+            ).where(*condiciones)
+        ).one()
+        apartamentos = select(DistribucionGasto.id_apartamento).where(DistribucionGasto.id_gasto.in_(ids_gastos))
+        ocupacion = topologia_service.version_ocupacion(db, Apartamento.id.in_(apartamentos))
+        return tuple(fila), ocupacion, topologia_service.asegurar(db).etag
+
     def obtener_gastos_por_filtro(self, db: Session, filtro: GastoFilter) -> List[Gasto]:
         """
         Obtiene gastos aplicando filtros con eager loading de relaciones
@@ -173,17 +211,7 @@ class GastosService:
             )
 
             # Aplicar filtros
-            if filtro.tipo_gasto:
-                query = query.filter(Gasto.tipo_gasto == filtro.tipo_gasto)
-
-            if filtro.fecha_inicio:
-                query = query.filter(Gasto.fecha_gasto >= filtro.fecha_inicio)
-
-            if filtro.fecha_fin:
-                query = query.filter(Gasto.fecha_gasto <= filtro.fecha_fin)
-
-            if filtro.responsable:
-                query = query.filter(Gasto.responsable.ilike(f"%{filtro.responsable}%"))
+            query = query.filter(*self._condiciones_filtro(filtro))
 
             # Ordenar por fecha de gasto (más reciente primero)
             query = query.order_by(Gasto.fecha_gasto.desc(), Gasto.id.desc())
@@ -228,26 +256,18 @@ class GastosService:
             logger.error(f"Error seleccionando apartamentos: {str(e)}")
             raise
 
+    # Selección servida desde el snapshot de topología (sin consultas)
     def _obtener_todos_apartamentos(self, db: Session) -> List[int]:
-        apartamentos = db.query(Apartamento.id).all()
-        return [apto.id for apto in apartamentos]
+        return topologia_service.ids_todos(db)
 
     def _obtener_apartamentos_por_torre(self, db: Session, torre_id: int) -> List[int]:
-        apartamentos = db.query(Apartamento.id).join(Piso).filter(Piso.id_torre == torre_id).all()
-        return [apto.id for apto in apartamentos]
+        return topologia_service.ids_por_torre(db, torre_id)
 
     def _obtener_apartamentos_por_piso(self, db: Session, torre_id: int, piso: int) -> List[int]:
-        apartamentos = (
-            db.query(Apartamento.id)
-            .join(Piso)  # ✅ JOIN con Piso
-            .filter(Piso.id_torre == torre_id, Piso.numero == piso)  # ✅ Torre específica  # ✅ Piso específico
-            .all()
-        )
-        return [apto.id for apto in apartamentos]
+        return topologia_service.ids_por_piso(db, torre_id, piso)
 
     def _obtener_apartamentos_especificos(self, db: Session, apartamentos_ids: List[int]) -> List[int]:
-        apartamentos = db.query(Apartamento.id).filter(Apartamento.id.in_(apartamentos_ids)).all()
-        return [apto.id for apto in apartamentos]
+        return topologia_service.ids_existentes(db, apartamentos_ids)
 
 
 # Instancia global
@@ -11,17 +11,18 @@ from ..models.financiero import (
     TasaCambio,
     Gasto,
     Cargo,
-    Pago,
     ReporteFinanciero,
     EstadoCargoEnum,
     EstadoGastoEnum,
-    EstadoPagoEnum,
 )
+from ..models.pagos import Pago, EstadoPagoEnum
 from ..models.torres import Apartamento
 from .tasa_cambio_service import tasa_cambio_service
 from .cargos_service import cargos_service
 from .reportes_financieros_service import reportes_financieros_service
 from .gastos_service import gastos_service
+from .programador_service import programador_service
+from .consultas_lentas_service import consultas_lentas_service
 
 logger = logging.getLogger(__name__)
 
@@ -53,6 +54,16 @@ class JobsService:
             # Obtener nueva tasa
             nueva_tasa = tasa_cambio_service.obtener_tasa_actual(db)
 
+            if nueva_tasa.id is None:
+                # Ningún proveedor respondió: se operó con la copia local, la tasa de hoy sigue pendiente
+                return {
+                    "job": "actualizacion_tasas",
+                    "estado": "error",
+                    "error": f"Sin proveedores disponibles; última tasa conocida del {nueva_tasa.fecha}",
+                    "tasa_actual": float(nueva_tasa.tasa_usd_ves),
+                    "mensaje": "Tasa del día no actualizada (se usa la copia local)",
+                }
+
             logger.info(f"✅ Job diario tasas COMPLETADO - Nueva tasa: {nueva_tasa.tasa_usd_ves}")
 
             return {
@@ -263,11 +274,15 @@ class JobsService:
 
             tareas_completadas.append("conteo_registros")
 
+            consultas_lentas_borradas = consultas_lentas_service.depurar(db)
+            tareas_completadas.append("depuracion_consultas_lentas")
+
             logger.info(f"✅ Job diario limpieza COMPLETADO")
             logger.info(f"   - Gastos: {total_gastos}")
             logger.info(f"   - Cargos: {total_cargos}")
             logger.info(f"   - Pagos: {total_pagos}")
             logger.info(f"   - Reportes: {total_reportes}")
+            logger.info(f"   - Consultas lentas depuradas: {consultas_lentas_borradas}")
 
             return {
                 "job": "limpieza_datos",
@@ -278,6 +293,7 @@ class JobsService:
                     "total_cargos": total_cargos,
                     "total_pagos": total_pagos,
                     "total_reportes": total_reportes,
+                    "consultas_lentas_borradas": consultas_lentas_borradas,
                 },
                 "mensaje": "Limpieza de datos completada",
             }
@@ -293,40 +309,50 @@ class JobsService:
 
     def ejecutar_todos_jobs_diarios(self, db: Session) -> Dict:
         """
-        Ejecuta todos los jobs diarios en secuencia
+        Ejecuta ahora todos los jobs que tocan hoy según su calendario (los
+        diarios, el mensual el día 1 y el semanal los lunes).
+
+        Los independientes corren a la vez, cada uno con su propia sesión y su
+        tiempo límite; los que dependen de otro (cargos después de tasas) esperan
+        a que termine bien. Todas las ejecuciones quedan en el historial.
         """
         try:
             logger.info("🏁 INICIANDO EJECUCIÓN COMPLETA DE JOBS DIARIOS")
+            if programador_service.Session is None:
+                programador_service.configurar(db.get_bind())
 
-            resultados = {}
-
-            # 1. Actualización de tasas
-            resultados["tasas"] = self.job_diario_actualizacion_tasas(db)
-
-            # 2. Verificación de vencimientos
-            resultados["vencimientos"] = self.job_diario_verificar_vencimientos(db)
-
-            # 3. Limpieza de datos
-            resultados["limpieza"] = self.job_diario_limpieza_datos(db)
-
-            # 4. Verificar si es primer día del mes para reportes mensuales
             hoy = date.today()
-            if hoy.day == 1:
-                logger.info("📅 Es primer día del mes - ejecutando job mensual")
-                periodo_anterior = (hoy.replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
-                resultados["reportes_mensuales"] = self.job_mensual_generar_reportes(db, periodo_anterior)
+            nombres = [
+                nombre for nombre, definicion in programador_service.jobs.items() if definicion.cron.coincide_fecha(hoy)
+            ]
+            informe = programador_service.ejecutar_grupo(nombres)
 
-            # 5. Verificar si es lunes para job semanal de cargos
-            if hoy.weekday() == 0:  # 0 = Lunes
-                logger.info("📅 Es lunes - ejecutando job semanal de cargos")
-                resultados["cargos_semanales"] = self.job_semanal_generar_cargos(db)
+            resultados = {}
+            for nombre, nodo in informe["jobs"].items():
+                ejecuciones = nodo.get("ejecuciones") or []
+                resultado = ejecuciones[0]["resultado"] if ejecuciones else None
+                resultados[nombre] = (
+                    resultado
+                    if isinstance(resultado, dict)
+                    else {"job": nombre, **{k: v for k, v in nodo.items() if k != "ejecuciones"}}
+                )
+                resultados[nombre]["estado"] = nodo["estado"]
+                resultados[nombre]["segundos"] = nodo["segundos"]
 
-            logger.info("🏁 EJECUCIÓN COMPLETA DE JOBS FINALIZADA")
+            logger.info(
+                f"🏁 EJECUCIÓN COMPLETA DE JOBS FINALIZADA en {informe['segundos_reloj']}s "
+                f"(suma de jobs {informe['segundos_suma_jobs']}s)"
+            )
 
             return {
                 "ejecucion_completa": True,
                 "fecha_ejecucion": datetime.now().isoformat(),
                 "resultados": resultados,
+                "tiempos": {
+                    "segundos_reloj": informe["segundos_reloj"],
+                    "segundos_suma_jobs": informe["segundos_suma_jobs"],
+                    "paralelismo": informe["paralelismo"],
+                },
                 "resumen": self._generar_resumen_ejecucion(resultados),
             }
 
@@ -343,54 +369,76 @@ class JobsService:
         """Genera un resumen de la ejecución de jobs"""
         total_jobs = len(resultados)
         jobs_completados = sum(1 for r in resultados.values() if r.get("estado") == "completado")
-        jobs_con_error = sum(1 for r in resultados.values() if r.get("estado") == "error")
+        jobs_con_error = sum(1 for r in resultados.values() if r.get("estado") in ("error", "timeout"))
+        jobs_omitidos = sum(1 for r in resultados.values() if r.get("estado") == "omitido")
 
         return {
             "total_jobs_ejecutados": total_jobs,
             "jobs_completados": jobs_completados,
             "jobs_con_error": jobs_con_error,
+            "jobs_omitidos": jobs_omitidos,
             "tasa_exito": (jobs_completados / total_jobs * 100) if total_jobs > 0 else 0,
         }
 
     def obtener_estado_jobs(self, db: Session) -> Dict:
         """
-        Obtiene el estado actual de los jobs (cuándo se ejecutaron por última vez)
+        Obtiene el estado de los jobs programados: calendario, próxima ejecución
+        y última ejecución registrada en el historial (job_runs)
         """
-        # En una implementación real, guardarías el historial de ejecuciones
-        # Por ahora retornamos un estado básico
+        jobs = programador_service.estado(db)
+        ultimas = [j["ultima_ejecucion"]["inicio"] for j in jobs if j["ultima_ejecucion"]]
 
         return {
-            "ultima_ejecucion_completa": datetime.now().isoformat(),
-            "jobs_configurados": {
-                "diario_actualizacion_tasas": {
-                    "descripcion": "Actualiza tasa BCV diariamente",
-                    "frecuencia": "diario",
-                    "hora_ejecucion": "09:00",
-                },
-                "diario_verificar_vencimientos": {
-                    "descripcion": "Verifica cargos vencidos",
-                    "frecuencia": "diario",
-                    "hora_ejecucion": "10:00",
-                },
-                "mensual_generar_reportes": {
-                    "descripcion": "Genera reportes del mes anterior",
-                    "frecuencia": "mensual",
-                    "dia_ejecucion": 1,  # Primer día del mes
-                    "hora_ejecucion": "08:00",
-                },
-                "semanal_generar_cargos": {
-                    "descripcion": "Genera cargos para gastos distribuidos",
-                    "frecuencia": "semanal",
-                    "dia_ejecucion": "lunes",
-                    "hora_ejecucion": "09:30",
-                },
-            },
-            "estado_sistema": "activo",
+            "ultima_ejecucion": max(ultimas).isoformat() if ultimas else None,
+            "jobs_configurados": {j["job"]: j for j in jobs},
+            "estado_sistema": "activo" if programador_service.worker else "detenido",
         }
 
+    def registrar_jobs_programados(self):
+        """Calendario de los jobs automáticos (hora local del servidor)"""
+        programador_service.registrar(
+            "actualizacion_tasas",
+            "0 9 * * *",
+            lambda db, turno: self.job_diario_actualizacion_tasas(db),
+            descripcion="Actualiza tasa BCV diariamente",
+            timeout_segundos=120,
+        )
+        programador_service.registrar(
+            "verificacion_vencimientos",
+            "0 10 * * *",
+            lambda db, turno: self.job_diario_verificar_vencimientos(db),
+            descripcion="Verifica cargos vencidos",
+        )
+        programador_service.registrar(
+            "limpieza_datos",
+            "0 3 * * *",
+            lambda db, turno: self.job_diario_limpieza_datos(db),
+            descripcion="Limpieza y conteo de registros",
+        )
+        # Cada turno perdido corresponde a un mes distinto: se recuperan todos
+        programador_service.registrar(
+            "generacion_reportes",
+            "0 8 1 * *",
+            lambda db, turno: self.job_mensual_generar_reportes(
+                db, (turno.date().replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
+            ),
+            descripcion="Genera y cierra el reporte del mes anterior",
+            recuperar="todos",
+            ventana_horas=24 * 7,
+            depende_de=("verificacion_vencimientos", "generacion_cargos"),
+        )
+        programador_service.registrar(
+            "generacion_cargos",
+            "30 9 * * 1",
+            lambda db, turno: self.job_semanal_generar_cargos(db),
+            descripcion="Genera cargos para gastos distribuidos (lunes)",
+            depende_de=("actualizacion_tasas",),
+        )
+
 
 # Instancia global
 jobs_service = JobsService()
+jobs_service.registrar_jobs_programados()
 
 """
 🎯 CARACTERÍSTICAS PRINCIPALES:
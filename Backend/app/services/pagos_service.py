@@ -1,16 +1,23 @@
 # services/pagos_service.py
+from sqlalchemy import and_, case, func, literal, or_, select, update
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from decimal import Decimal
 import logging
-from datetime import date, datetime
+import time
+from datetime import date, datetime, timedelta
 
 from ..models import Pago, Residente, EstadoPagoEnum, MetodoPagoEnum
 from ..models.financiero import Cargo, EstadoCargoEnum, Gasto, ReporteFinanciero
 from ..models.torres import Apartamento
+from ..core.config import settings
+from ..core.logs import muestreado
 from ..schemas.financiero import PagoCargoCreate, ValidarPagoRequest
+from ..services.reportes_financieros_service import reportes_financieros_service
+from ..services.conciliacion_service import normalizar_referencia
 
 logger = logging.getLogger(__name__)
+logger_filas = muestreado(logger)  # Un mensaje por pago aplicado: se registra uno de cada LOG_MUESTREO
 
 
 class PagosService:
@@ -20,28 +27,30 @@ class PagosService:
         Registra un pago realizado por un residente - SOPORTA USD Y VES
         """
         try:
-            # 1. Verificar que el cargo existe
-            cargo = db.query(Cargo).options(joinedload(Cargo.apartamento)).filter(Cargo.id == datos.id_cargo).first()
+            # 1. 🆕 OBTENER TASA DE CAMBIO ACTUAL, antes de bloquear nada: puede consultar a los
+            #    proveedores y hacer commit (guarda la tasa del día), lo que soltaría el bloqueo del cargo
+            from ..services.tasa_cambio_service import tasa_cambio_service
 
-            if not cargo:
-                raise ValueError(f"Cargo {datos.id_cargo} no encontrado")
+            tasa_cambio = tasa_cambio_service.obtener_tasa_actual(db)
+            if not tasa_cambio:
+                raise ValueError("No hay tasa de cambio disponible")
 
-            # 2. Verificar que el residente existe y pertenece al apartamento
+            # 2. Verificar que el residente existe y pertenece al apartamento del cargo
+            apartamento_cargo = select(Cargo.id_apartamento).where(Cargo.id == datos.id_cargo).scalar_subquery()
             residente = (
                 db.query(Residente)
-                .filter(Residente.id == datos.id_residente, Residente.id_apartamento == cargo.id_apartamento)
+                .filter(Residente.id == datos.id_residente, Residente.id_apartamento == apartamento_cargo)
                 .first()
             )
 
             if not residente:
+                if db.get(Cargo, datos.id_cargo) is None:
+                    raise ValueError(f"Cargo {datos.id_cargo} no encontrado")
                 raise ValueError(f"Residente {datos.id_residente} no pertenece al apartamento del cargo")
 
-            # 3. 🆕 OBTENER TASA DE CAMBIO ACTUAL
-            from ..services.tasa_cambio_service import tasa_cambio_service
-
-            tasa_cambio = tasa_cambio_service.obtener_tasa_actual(db)
-            if not tasa_cambio:
-                raise ValueError("No hay tasa de cambio disponible")
+            # 3. Obtener (o crear sin carreras) el reporte financiero del periodo actual
+            periodo_actual = datetime.now().strftime("%Y-%m")
+            reporte_id = reportes_financieros_service.obtener_o_crear_reporte_id(db, periodo_actual)
 
             # 4. 🆕 CALCULAR MONTOS SEGÚN LA MONEDA DE PAGO
             monto_pagado_usd = Decimal("0.00")
@@ -63,37 +72,24 @@ class PagosService:
             else:
                 raise ValueError(f"Moneda no válida: {datos.moneda_pago}")
 
-            # 5. Verificar que no excede el saldo pendiente
+            # 5. BLOQUEAR el cargo (SELECT ... FOR UPDATE) como última lectura antes de escribir, hasta el
+            #    commit: dos pagos simultáneos al mismo cargo se serializan y el segundo ve el saldo ya descontado
+            cargo = db.query(Cargo).filter(Cargo.id == datos.id_cargo).with_for_update().populate_existing().first()
+            if not cargo:
+                raise ValueError(f"Cargo {datos.id_cargo} no encontrado")
+
+            # 6. Verificar que no excede el saldo pendiente
             if monto_pagado_usd > cargo.saldo_pendiente_usd:
                 raise ValueError(
                     f"Monto pagado (${monto_pagado_usd} USD) excede saldo pendiente (${cargo.saldo_pendiente_usd} USD)"
                 )
 
-            # 6. Obtener reporte financiero del periodo actual
-            periodo_actual = datetime.now().strftime("%Y-%m")
-            reporte = db.query(ReporteFinanciero).filter(ReporteFinanciero.periodo == periodo_actual).first()
-
-            if not reporte:
-                reporte = ReporteFinanciero(
-                    periodo=periodo_actual,
-                    generado_por="Sistema Automático",
-                    total_ingresos_usd=0,
-                    total_gastos_usd=0,
-                    saldo_final_usd=0,
-                    total_ingresos_ves=0,
-                    total_gastos_ves=0,
-                    saldo_final_ves=0,
-                    estado="Abierto",
-                )
-                db.add(reporte)
-                db.flush()
-
             # 7. Crear registro de pago - VERSIÓN MEJORADA
             pago = Pago(
                 id_cargo=datos.id_cargo,
                 id_residente=datos.id_residente,
                 id_apartamento=cargo.id_apartamento,
-                id_reporte_financiero=reporte.id,
+                id_reporte_financiero=reporte_id,
                 id_gasto=cargo.id_gasto,
                 # Campos nuevos del flujo (calculados por el sistema)
                 monto_pagado_usd=monto_pagado_usd,
@@ -106,6 +102,7 @@ class PagosService:
                 concepto=datos.concepto,
                 metodo=MetodoPagoEnum(datos.metodo_pago),
                 comprobante=datos.comprobante_url,
+                referencia=normalizar_referencia(datos.referencia),
                 estado=EstadoPagoEnum.PENDIENTE,
                 verificado=False,
                 fecha_creacion=datetime.now(),
@@ -119,6 +116,11 @@ class PagosService:
             # 8. Aplicar pago al cargo (actualizar saldos)
             self._aplicar_pago_a_cargo(db, pago, cargo)
 
+            # 9. Sumar ingresos al reporte al final, para retener el bloqueo de la fila lo mínimo
+            reportes_financieros_service.acumular_totales(
+                db, reporte_id, ingresos_usd=monto_pagado_usd, ingresos_ves=monto_pagado_ves
+            )
+
             db.commit()
 
             logger.info(f"✅ Pago {pago.id} registrado por residente {datos.id_residente}")
@@ -147,22 +149,13 @@ class PagosService:
             if cargo.saldo_pendiente_ves < 0:
                 cargo.saldo_pendiente_ves = Decimal("0.00")
 
-            # Actualizar estado del cargo
+            # Actualizar estado del cargo (sin commit: todo el pago es una sola transacción)
             from ..services.cargos_service import cargos_service
 
-            cargos_service.actualizar_estado_cargo(db, cargo.id)
-
-            # Actualizar reporte financiero (ingresos)
-            reporte = db.query(ReporteFinanciero).filter(ReporteFinanciero.id == pago.id_reporte_financiero).first()
+            cargos_service.aplicar_estado_cargo(cargo)
 
-            if reporte:
-                reporte.total_ingresos_usd += pago.monto_pagado_usd
-                reporte.total_ingresos_ves += pago.monto_pagado_ves
-                reporte.saldo_final_usd = reporte.total_ingresos_usd - reporte.total_gastos_usd
-                reporte.saldo_final_ves = reporte.total_ingresos_ves - reporte.total_gastos_ves
-
-            logger.info(
-                f"🔄 Pago {pago.id} aplicado a cargo {cargo.id}. Saldo restante: ${cargo.saldo_pendiente_usd} USD"
+            logger_filas.info(
+                "🔄 Pago %s aplicado a cargo %s. Saldo restante: $%s USD", pago.id, cargo.id, cargo.saldo_pendiente_usd
             )
 
         except Exception as e:
@@ -175,19 +168,20 @@ class PagosService:
         El SISTEMA decide automáticamente si es pago completo o parcial
         """
         try:
-            pago = (
-                db.query(Pago)
-                .options(joinedload(Pago.cargo), joinedload(Pago.residente))
-                .filter(Pago.id == pago_id)
-                .first()
-            )
+            # Bloquear el pago (evita doble validación) y su cargo (el rechazo le devuelve saldo)
+            pago = db.query(Pago).filter(Pago.id == pago_id).with_for_update().populate_existing().first()
 
             if not pago:
                 raise ValueError(f"Pago {pago_id} no encontrado")
 
+            db.query(Cargo).filter(Cargo.id == pago.id_cargo).with_for_update().populate_existing().first()
+
             if pago.estado != EstadoPagoEnum.PENDIENTE:
                 raise ValueError(f"Pago {pago_id} ya fue procesado (estado: {pago.estado})")
 
+            if self._reclamado_por_otro(pago.reclamado_por, pago.reclamado_hasta, admin_id):
+                raise ValueError(f"Pago {pago_id} está reclamado por otro administrador hasta {pago.reclamado_hasta}")
+
             # 🎯 NUEVA LÓGICA: Sistema decide automáticamente
             if datos.accion == "aprobar":
                 pago.verificado = True
@@ -221,13 +215,24 @@ class PagosService:
 
                     from ..services.cargos_service import cargos_service
 
-                    cargos_service.actualizar_estado_cargo(db, pago.cargo.id)
+                    cargos_service.aplicar_estado_cargo(pago.cargo)
+
+                # Descontar el ingreso que se sumó al registrar el pago
+                if pago.id_reporte_financiero:
+                    reportes_financieros_service.acumular_totales(
+                        db,
+                        pago.id_reporte_financiero,
+                        ingresos_usd=-pago.monto_pagado_usd,
+                        ingresos_ves=-pago.monto_pagado_ves,
+                    )
 
                 logger.info(f"❌ Pago {pago_id} RECHAZADO por admin {admin_id}")
 
             else:
                 raise ValueError(f"Acción no válida: {datos.accion}")
 
+            pago.reclamado_por = None
+            pago.reclamado_hasta = None
             pago.fecha_actualizacion = datetime.now()
             db.commit()
             return pago
@@ -237,6 +242,172 @@ class PagosService:
             logger.error(f"Error validando pago {pago_id}: {str(e)}")
             raise
 
+    def validar_pagos_lote(
+        self,
+        db: Session,
+        admin_id: int,
+        aprobar: List[int],
+        rechazar: List[int],
+        observaciones: Optional[str] = None,
+    ) -> dict:
+        """
+        Aprueba y/o rechaza varios pagos en UNA transacción con UPDATEs por conjunto:
+        - estado/comprobante de los pagos en un UPDATE por acción
+        - saldos de los cargos de los rechazados revertidos en un solo UPDATE
+        - estados de esos cargos recalculados en un solo UPDATE
+        Los pagos inexistentes o ya procesados se omiten (no abortan el lote).
+        """
+        from ..services.cargos_service import cargos_service
+
+        inicio = time.perf_counter()
+        try:
+            # 1. Bloquear los pagos en orden de id (mismo orden en todos los lotes → sin deadlocks)
+            solicitados = {pago_id: "aprobar" for pago_id in aprobar}
+            solicitados.update({pago_id: "rechazado" for pago_id in rechazar})
+            filas = db.execute(
+                select(
+                    Pago.id,
+                    Pago.estado,
+                    Pago.id_cargo,
+                    Pago.id_reporte_financiero,
+                    Pago.monto_pagado_usd,
+                    Pago.monto_pagado_ves,
+                    Pago.reclamado_por,
+                    Pago.reclamado_hasta,
+                )
+                .where(Pago.id.in_(list(solicitados)))
+                .order_by(Pago.id)
+                .with_for_update()
+            ).all()
+
+            encontrados = {fila.id: fila for fila in filas}
+            omitidos = [
+                {"id_pago": pago_id, "motivo": "Pago no encontrado"}
+                for pago_id in sorted(solicitados)
+                if pago_id not in encontrados
+            ]
+            omitidos += [
+                {"id_pago": fila.id, "motivo": f"Ya fue procesado (estado: {fila.estado.value})"}
+                for fila in filas
+                if fila.estado != EstadoPagoEnum.PENDIENTE
+            ]
+            omitidos += [
+                {"id_pago": fila.id, "motivo": "Reclamado por otro administrador"}
+                for fila in filas
+                if fila.estado == EstadoPagoEnum.PENDIENTE
+                and self._reclamado_por_otro(fila.reclamado_por, fila.reclamado_hasta, admin_id)
+            ]
+            pendientes = [
+                fila
+                for fila in filas
+                if fila.estado == EstadoPagoEnum.PENDIENTE
+                and not self._reclamado_por_otro(fila.reclamado_por, fila.reclamado_hasta, admin_id)
+            ]
+            aprobados = [fila.id for fila in pendientes if solicitados[fila.id] == "aprobar"]
+            rechazados = [fila for fila in pendientes if solicitados[fila.id] == "rechazado"]
+            ahora = datetime.now()
+
+            # 2. Aprobar: el sistema decide COMPLETO/PARCIAL comparando con el saldo al momento de pagar
+            if aprobados:
+                saldo_cargo = select(Cargo.saldo_pendiente_usd).where(Cargo.id == Pago.id_cargo).scalar_subquery()
+                saldo_historico = func.coalesce(Pago.saldo_pendiente_al_pagar_usd, saldo_cargo)
+                comprobante = func.coalesce(Pago.comprobante, "Sin comprobante")
+                db.execute(
+                    update(Pago)
+                    .where(Pago.id.in_(aprobados))
+                    .values(
+                        estado=EstadoPagoEnum.VALIDADO,
+                        verificado=True,
+                        reclamado_por=None,
+                        reclamado_hasta=None,
+                        comprobante=func.substr(
+                            case(
+                                (Pago.id_cargo.is_(None), literal("✅ VALIDADO - ") + comprobante),
+                                (
+                                    Pago.monto_pagado_usd >= saldo_historico,
+                                    literal("✅ COMPLETO - ") + comprobante + f" - {observaciones or 'Validado'}",
+                                ),
+                                else_=literal("🟡 PARCIAL - ")
+                                + comprobante
+                                + f" - {observaciones or 'Pagó menos del total'}",
+                            ),
+                            1,
+                            255,
+                        ),
+                        fecha_actualizacion=ahora,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+
+            # 3. Rechazar: revertir saldos de los cargos y descontar los ingresos de los reportes
+            cargos_ids = sorted({fila.id_cargo for fila in rechazados if fila.id_cargo})
+            if rechazados:
+                ids_rechazados = [fila.id for fila in rechazados]
+                db.execute(
+                    update(Pago)
+                    .where(Pago.id.in_(ids_rechazados))
+                    .values(
+                        estado=EstadoPagoEnum.RECHAZADO,
+                        verificado=False,
+                        reclamado_por=None,
+                        reclamado_hasta=None,
+                        comprobante=f"❌ RECHAZADO - {observaciones or 'Pago rechazado'}"[:255],
+                        fecha_actualizacion=ahora,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+
+            if cargos_ids:
+                db.execute(select(Cargo.id).where(Cargo.id.in_(cargos_ids)).order_by(Cargo.id).with_for_update())
+
+                def devuelto(columna):
+                    return (
+                        select(func.coalesce(func.sum(columna), 0))
+                        .where(Pago.id_cargo == Cargo.id, Pago.id.in_(ids_rechazados))
+                        .scalar_subquery()
+                    )
+
+                db.execute(
+                    update(Cargo)
+                    .where(Cargo.id.in_(cargos_ids))
+                    .values(
+                        saldo_pendiente_usd=Cargo.saldo_pendiente_usd + devuelto(Pago.monto_pagado_usd),
+                        saldo_pendiente_ves=Cargo.saldo_pendiente_ves + devuelto(Pago.monto_pagado_ves),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                cargos_service.recalcular_estados_cargos(db, cargos_ids)
+
+            descuentos = {}
+            for fila in rechazados:
+                if fila.id_reporte_financiero:
+                    usd, ves = descuentos.get(fila.id_reporte_financiero, (Decimal("0"), Decimal("0")))
+                    descuentos[fila.id_reporte_financiero] = (
+                        usd + fila.monto_pagado_usd,
+                        ves + fila.monto_pagado_ves,
+                    )
+            for reporte_id, (usd, ves) in descuentos.items():
+                reportes_financieros_service.acumular_totales(db, reporte_id, ingresos_usd=-usd, ingresos_ves=-ves)
+
+            db.commit()
+
+            logger.info(
+                f"✅ Lote validado por admin {admin_id}: {len(aprobados)} aprobados, "
+                f"{len(rechazados)} rechazados, {len(omitidos)} omitidos"
+            )
+            return {
+                "aprobados": aprobados,
+                "rechazados": [fila.id for fila in rechazados],
+                "omitidos": omitidos,
+                "cargos_afectados": len(cargos_ids),
+                "duracion_ms": round((time.perf_counter() - inicio) * 1000, 1),
+            }
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error validando lote de pagos: {str(e)}")
+            raise
+
     def obtener_pagos_por_periodo(self, db: Session, periodo: str) -> List[Pago]:
         """
         Obtiene todos los pagos de un período específico
@@ -255,7 +426,7 @@ class PagosService:
                 .all()
             )
 
-            logger.info(f"✅ Encontrados {len(pagos)} pagos para período {periodo}")
+            logger.debug("✅ Encontrados %s pagos para período %s", len(pagos), periodo)
             return pagos
 
         except Exception as e:
@@ -275,33 +446,135 @@ class PagosService:
                 .all()
             )
 
-            logger.info(f"✅ Encontrados {len(pagos)} pagos para apartamento {apartamento_id}")
+            logger.debug("✅ Encontrados %s pagos para apartamento %s", len(pagos), apartamento_id)
             return pagos
 
         except Exception as e:
             logger.error(f"Error obteniendo pagos para apartamento {apartamento_id}: {str(e)}")
             raise
 
-    def obtener_pagos_pendientes_validacion(self, db: Session) -> List[Pago]:
+    def obtener_pagos_pendientes_validacion(
+        self, db: Session, limite: Optional[int] = None, despues_de: Optional[tuple] = None
+    ) -> List[Pago]:
         """
-        Obtiene todos los pagos pendientes de validación por administrador
+        Obtiene los pagos pendientes de validación por administrador (más antiguos primero)
+        Paginación keyset opcional: despues_de = (fecha_creacion, id) del último pago recibido
         """
         try:
-            pagos = (
+            query = (
                 db.query(Pago)
                 .options(joinedload(Pago.cargo).joinedload(Cargo.apartamento), joinedload(Pago.residente))
                 .filter(Pago.estado == EstadoPagoEnum.PENDIENTE)
-                .order_by(Pago.fecha_creacion.asc())
-                .all()
             )
+            if despues_de:
+                fecha, ultimo_id = despues_de
+                query = query.filter(
+                    or_(Pago.fecha_creacion > fecha, and_(Pago.fecha_creacion == fecha, Pago.id > ultimo_id))
+                )
+            query = query.order_by(Pago.fecha_creacion.asc(), Pago.id.asc())
+            if limite:
+                query = query.limit(limite)
+            pagos = query.all()
 
-            logger.info(f"✅ Encontrados {len(pagos)} pagos pendientes de validación")
+            logger.debug("✅ Encontrados %s pagos pendientes de validación", len(pagos))
             return pagos
 
         except Exception as e:
             logger.error(f"Error obteniendo pagos pendientes de validación: {str(e)}")
             raise
 
+    # ======================
+    # ---- Cola de validación (varios administradores) ----
+    # ======================
+
+    @staticmethod
+    def _reclamado_por_otro(reclamado_por: Optional[int], reclamado_hasta: Optional[datetime], admin_id: int) -> bool:
+        return (
+            reclamado_por is not None
+            and reclamado_por != admin_id
+            and reclamado_hasta is not None
+            and reclamado_hasta > datetime.now()
+        )
+
+    def reclamar_pagos_pendientes(
+        self, db: Session, admin_id: int, cantidad: int = 20, lease_segundos: Optional[int] = None
+    ) -> dict:
+        """
+        Reclama los siguientes `cantidad` pagos pendientes para un administrador.
+        SELECT ... FOR UPDATE SKIP LOCKED: dos administradores reclamando a la vez nunca
+        reciben el mismo pago ni se bloquean entre sí. El lease vence solo, así que los
+        pagos de un administrador que abandona vuelven a la cola sin intervención.
+        Los pagos que el administrador ya tenía reclamados se renuevan y se devuelven primero.
+        """
+        try:
+            ahora = datetime.now()
+            hasta = ahora + timedelta(seconds=lease_segundos or settings.COLA_VALIDACION_LEASE_SEGUNDOS)
+
+            ids = db.scalars(
+                select(Pago.id)
+                .where(
+                    Pago.estado == EstadoPagoEnum.PENDIENTE,
+                    or_(
+                        Pago.reclamado_hasta.is_(None),
+                        Pago.reclamado_hasta < ahora,
+                        Pago.reclamado_por == admin_id,
+                    ),
+                )
+                # Primero los que ya tenía este administrador (case y no un booleano: NULL iría primero en DESC)
+                .order_by(case((Pago.reclamado_por == admin_id, 0), else_=1), Pago.fecha_creacion.asc(), Pago.id.asc())
+                .limit(cantidad)
+                .with_for_update(skip_locked=True)
+            ).all()
+
+            if ids:
+                db.execute(
+                    update(Pago)
+                    .where(Pago.id.in_(ids))
+                    .values(reclamado_por=admin_id, reclamado_hasta=hasta)
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+
+            pagos = (
+                db.query(Pago)
+                .options(joinedload(Pago.cargo).joinedload(Cargo.apartamento), joinedload(Pago.residente))
+                .filter(Pago.id.in_(ids))
+                .all()
+                if ids
+                else []
+            )
+            posicion = {pago_id: i for i, pago_id in enumerate(ids)}
+            pagos.sort(key=lambda pago: posicion[pago.id])  # Mismo orden en que se reclamaron
+
+            logger.info(f"📥 Admin {admin_id} reclamó {len(pagos)} pagos hasta {hasta:%H:%M:%S}")
+            return {"pagos": pagos, "reclamado_hasta": hasta}
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error reclamando pagos pendientes: {str(e)}")
+            raise
+
+    def liberar_pagos_reclamados(self, db: Session, admin_id: int, pagos_ids: Optional[List[int]] = None) -> int:
+        """
+        Devuelve a la cola los pagos reclamados por el administrador (todos o los indicados)
+        """
+        try:
+            query = update(Pago).where(Pago.reclamado_por == admin_id, Pago.estado == EstadoPagoEnum.PENDIENTE)
+            if pagos_ids is not None:
+                query = query.where(Pago.id.in_(pagos_ids))
+            resultado = db.execute(
+                query.values(reclamado_por=None, reclamado_hasta=None).execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+            logger.info(f"📤 Admin {admin_id} liberó {resultado.rowcount} pagos")
+            return resultado.rowcount
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error liberando pagos reclamados: {str(e)}")
+            raise
+
     def obtener_pago_por_id(self, db: Session, pago_id: int) -> Optional[Pago]:
         """
         Obtiene un pago específico con todas sus relaciones
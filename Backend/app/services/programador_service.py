@@ -0,0 +1,567 @@
+# services/programador_service.py
+"""
+Programador de jobs persistente.
+
+Cada job se registra con una expresión cron. En cada ciclo el programador
+calcula los turnos vencidos desde la última ejecución guardada en job_runs
+(recuperando los que se perdieron mientras el servidor estuvo apagado) y los
+ejecuta, registrando inicio, fin, duración y resultado.
+
+Los jobs pueden declarar dependencias (p. ej. cargos después de tasas). En
+cada ciclo, y en las ejecuciones manuales de varios jobs, los independientes
+corren en paralelo en un pool de hilos, cada uno con su propia sesión y su
+tiempo límite; un job no se ejecuta mientras la última ejecución de una de
+sus dependencias no haya terminado bien (aunque haya fallado en otro ciclo).
+
+Con varios workers de uvicorn cada proceso corre su propio programador. La
+exclusión la dan dos mecanismos:
+- un advisory lock de PostgreSQL por job (pg_try_advisory_lock): mientras un
+  worker ejecuta un job, los demás lo saltan sin esperar;
+- la restricción única (job, programado_para) de job_runs: el turno se reclama
+  con INSERT ... ON CONFLICT DO NOTHING antes de ejecutarlo, así que un turno
+  nunca corre dos veces. En SQLite (sin advisory locks) es el único mecanismo.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, event, func, select, text, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..core.config import settings
+from ..core.metricas import JOB_DURACION
+from ..models.jobs import JobRun
+from ..utils.cron import ExpresionCron
+from ..utils.db_helpers import insert_para
+
+logger = logging.getLogger(__name__)
+
+# Tope de turnos recuperados de una vez para jobs con recuperar="todos"
+MAX_TURNOS_RECUPERACION = 100
+
+
+@dataclass
+class DefinicionJob:
+    nombre: str
+    cron: ExpresionCron
+    funcion: Callable[[Session, datetime], Dict]  # (db, turno) -> resultado
+    descripcion: str = ""
+    recuperar: str = "ultimo"  # "ultimo": sólo el turno perdido más reciente; "todos": cada turno perdido
+    ventana: timedelta = timedelta(hours=72)  # Hasta dónde mirar hacia atrás buscando turnos perdidos
+    depende_de: Tuple[str, ...] = ()  # Jobs cuya última ejecución debe haber terminado bien, si están en el grupo
+    timeout_segundos: int = 600
+
+
+class ProgramadorService:
+
+    def __init__(self):
+        self.jobs: Dict[str, DefinicionJob] = {}
+        self.engine = None
+        self.Session: Optional[sessionmaker] = None
+        self.worker = None
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+
+    # ---------- Registro y arranque ----------
+
+    def registrar(
+        self,
+        nombre: str,
+        cron: str,
+        funcion: Callable[[Session, datetime], Dict],
+        descripcion: str = "",
+        recuperar: str = "ultimo",
+        ventana_horas: Optional[int] = None,
+        depende_de: Iterable[str] = (),
+        timeout_segundos: Optional[int] = None,
+    ):
+        """Registra (o reemplaza) un job. La función recibe la sesión y el turno que cubre"""
+        if recuperar not in ("ultimo", "todos"):
+            raise ValueError("recuperar debe ser 'ultimo' o 'todos'")
+        if nombre in depende_de:
+            raise ValueError(f"El job '{nombre}' no puede depender de sí mismo")
+        self.jobs[nombre] = DefinicionJob(
+            nombre=nombre,
+            cron=ExpresionCron(cron),
+            funcion=funcion,
+            descripcion=descripcion,
+            recuperar=recuperar,
+            ventana=timedelta(hours=ventana_horas or settings.JOBS_VENTANA_RECUPERACION_HORAS),
+            depende_de=tuple(depende_de),
+            timeout_segundos=timeout_segundos or settings.JOBS_TIMEOUT_SEGUNDOS,
+        )
+
+    def configurar(self, engine):
+        """Asocia el motor de base de datos; se llama en cada worker (después del fork)"""
+        self.engine = engine
+        self.Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+
+    def iniciar(self, engine, intervalo_segundos: Optional[int] = None):
+        """Arranca el hilo del programador en este worker"""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self.configurar(engine)
+        intervalo = intervalo_segundos or settings.JOBS_INTERVALO_SEGUNDOS
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, args=(intervalo,), name="programador-jobs", daemon=True)
+        self._hilo.start()
+        logger.info(f"⏰ Programador de jobs iniciado en {self.worker} ({len(self.jobs)} jobs, cada {intervalo}s)")
+
+    def detener(self, timeout: float = 10):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+    def _bucle(self, intervalo: int):
+        while True:
+            try:
+                self.ejecutar_pendientes()
+            except Exception as e:
+                logger.error(f"❌ Error en el ciclo del programador: {str(e)}")
+            if self._detener.wait(intervalo):
+                return
+
+    # ---------- Ejecución ----------
+
+    def turnos_pendientes(self, db: Session, definicion: DefinicionJob, ahora: datetime) -> List[datetime]:
+        """Turnos del cron vencidos y sin ejecución registrada (las manuales no cuentan)"""
+        ultimo = db.scalar(
+            select(func.max(JobRun.programado_para)).where(JobRun.job == definicion.nombre, JobRun.origen != "manual")
+        )
+        desde = ahora - definicion.ventana
+        if ultimo and ultimo > desde:
+            desde = ultimo
+        tope = 1 if definicion.recuperar == "ultimo" else MAX_TURNOS_RECUPERACION
+        return list(deque(definicion.cron.entre(desde, ahora), maxlen=tope))
+
+    def ejecutar_pendientes(self, ahora: Optional[datetime] = None) -> List[Dict]:
+        """Un ciclo del programador: ejecuta los turnos vencidos de todos los jobs"""
+        ahora = ahora or datetime.now()
+        informe = self._ejecutar_dag(list(self.jobs), lambda definicion: self._ejecutar_vencidos(definicion, ahora))
+        return [e for nodo in informe["jobs"].values() for e in nodo.get("ejecuciones", [])]
+
+    def ejecutar_ahora(self, nombre: str) -> Dict:
+        """Ejecución manual de un job, fuera de su calendario; queda en el historial como 'manual'"""
+        definicion = self.jobs.get(nombre)
+        if not definicion:
+            raise ValueError(f"Job '{nombre}' no existe")
+        return self._ejecutar_manual(definicion)[0]
+
+    def ejecutar_grupo(self, nombres: List[str], max_concurrencia: Optional[int] = None) -> Dict:
+        """
+        Ejecución manual de varios jobs respetando sus dependencias: los
+        independientes corren a la vez. Devuelve el informe por job y el tiempo
+        de reloj frente a la suma de los tiempos de cada job.
+        """
+        faltantes = [n for n in nombres if n not in self.jobs]
+        if faltantes:
+            raise ValueError(f"Jobs inexistentes: {', '.join(faltantes)}")
+        return self._ejecutar_dag(nombres, self._ejecutar_manual, max_concurrencia)
+
+    def _ejecutar_vencidos(self, definicion: DefinicionJob, ahora: datetime) -> Optional[List[Dict]]:
+        """Ejecuciones de los turnos vencidos; None si otro worker tiene el job en curso"""
+        with self._bloqueo(definicion.nombre) as adquirido:
+            if not adquirido:
+                return None
+            with self.Session() as db:
+                self._marcar_interrumpidas(db, definicion.nombre)
+                turnos = self.turnos_pendientes(db, definicion, ahora)
+            ejecuciones = []
+            for turno in turnos:
+                origen = "programado" if ahora - turno <= self._tolerancia() else "recuperacion"
+                ejecucion = self._ejecutar_turno(definicion, turno, origen)
+                if ejecucion:
+                    ejecuciones.append(ejecucion)
+            return ejecuciones
+
+    def _ejecutar_manual(self, definicion: DefinicionJob) -> List[Dict]:
+        with self._bloqueo(definicion.nombre) as adquirido:
+            if not adquirido:
+                raise ValueError(f"El job '{definicion.nombre}' se está ejecutando en otro worker")
+            ejecucion = self._ejecutar_turno(definicion, datetime.now(), "manual")
+        if not ejecucion:
+            raise ValueError(f"El job '{definicion.nombre}' ya se ejecutó en este instante")
+        return [ejecucion]
+
+    def _ejecutar_dag(
+        self,
+        nombres: List[str],
+        tarea: Callable[[DefinicionJob], Optional[List[Dict]]],
+        max_concurrencia: Optional[int] = None,
+    ) -> Dict:
+        """
+        Corre `tarea` para cada job en cuanto sus dependencias (dentro del grupo)
+        terminaron bien. Un job que supera su tiempo límite se da por fallido y
+        sus dependientes se omiten; su hilo sigue hasta terminar (no se puede
+        interrumpir) pero conserva el lock, así que nadie más lo arranca.
+        """
+        dependencias = {n: {d for d in self.jobs[n].depende_de if d in nombres} for n in nombres}
+        self._validar_sin_ciclos(dependencias)
+
+        informe: Dict[str, Dict] = {}
+        en_curso = {}  # futuro -> nombre
+        # Cada job se cronometra desde que un hilo lo toma, no desde que entra en la cola del pool
+        inicios: Dict[str, float] = {}
+        fines: Dict[str, float] = {}
+
+        def cronometrado(definicion: DefinicionJob) -> Optional[List[Dict]]:
+            inicios[definicion.nombre] = time.perf_counter()
+            try:
+                return tarea(definicion)
+            finally:
+                fines[definicion.nombre] = time.perf_counter()
+
+        inicio_total = time.perf_counter()
+        pool = ThreadPoolExecutor(
+            max_workers=max_concurrencia or settings.JOBS_MAX_CONCURRENCIA, thread_name_prefix="job"
+        )
+        try:
+            while dependencias or en_curso:
+                # Lanzar todo lo que ya no espera a nadie (repetir: omitir un job puede liberar a otros)
+                cambio = True
+                while cambio:
+                    cambio = False
+                    for nombre, deps in list(dependencias.items()):
+                        if not deps <= informe.keys():
+                            continue
+                        del dependencias[nombre]
+                        cambio = True
+                        fallidas = [d for d in deps if informe[d]["estado"] not in ("completado", "sin_turnos")]
+                        fallidas += self._sin_completar([d for d in deps if informe[d]["estado"] == "sin_turnos"])
+                        if fallidas:
+                            informe[nombre] = {
+                                "estado": "omitido",
+                                "segundos": 0.0,
+                                "motivo": f"Dependencia sin completar: {', '.join(sorted(fallidas))}",
+                            }
+                            logger.warning(f"⚠️ Job {nombre} omitido: {informe[nombre]['motivo']}")
+                        else:
+                            en_curso[pool.submit(cronometrado, self.jobs[nombre])] = nombre
+
+                if not en_curso:
+                    continue
+
+                # Esperar hasta que termine alguno o venza el primer tiempo límite (los que aún
+                # esperan un hilo libre no tienen límite todavía: revisar cada medio segundo)
+                limites = [inicios[n] + self.jobs[n].timeout_segundos for n in en_curso.values() if n in inicios]
+                espera = min(limites, default=time.perf_counter() + 0.5) - time.perf_counter()
+                if len(limites) < len(en_curso):
+                    espera = min(espera, 0.5)
+                listos, _ = wait(en_curso, timeout=max(0, espera), return_when=FIRST_COMPLETED)
+                ahora = time.perf_counter()
+                for futuro in list(en_curso):
+                    nombre = en_curso[futuro]
+                    if futuro in listos:
+                        informe[nombre] = self._informe_nodo(futuro, fines[nombre] - inicios[nombre])
+                    elif nombre in inicios and ahora - inicios[nombre] >= self.jobs[nombre].timeout_segundos:
+                        informe[nombre] = {
+                            "estado": "timeout",
+                            "segundos": round(ahora - inicios[nombre], 3),
+                            "error": f"Superó el tiempo límite de {self.jobs[nombre].timeout_segundos}s",
+                        }
+                        logger.error(f"❌ Job {nombre} superó su tiempo límite")
+                    else:
+                        continue
+                    del en_curso[futuro]
+        finally:
+            pool.shutdown(wait=False)
+
+        reloj = time.perf_counter() - inicio_total
+        for nombre, inicio in inicios.items():
+            informe[nombre]["inicio_s"] = round(inicio - inicio_total, 3)  # Segundos desde que arrancó el grupo
+        suma = sum(nodo["segundos"] for nodo in informe.values())
+        return {
+            "jobs": {n: informe[n] for n in nombres},
+            "segundos_reloj": round(reloj, 3),
+            "segundos_suma_jobs": round(suma, 3),
+            "paralelismo": round(suma / reloj, 2) if reloj > 0 else 0,
+        }
+
+    def _sin_completar(self, nombres: List[str]) -> List[str]:
+        """
+        Jobs (de los que no tuvieron turnos en este ciclo) cuya última ejecución registrada no
+        terminó bien: su turno fallido ya está reclamado, pero los dependientes siguen esperando.
+        Un job sin ninguna ejecución todavía no bloquea a nadie.
+        """
+        if not nombres:
+            return []
+        with self.Session() as db:
+            ultimas = select(func.max(JobRun.id)).where(JobRun.job.in_(nombres)).group_by(JobRun.job)
+            return [
+                job
+                for job, estado in db.execute(select(JobRun.job, JobRun.estado).where(JobRun.id.in_(ultimas)))
+                if estado != "completado"
+            ]
+
+    @staticmethod
+    def _informe_nodo(futuro, segundos: float) -> Dict:
+        try:
+            ejecuciones = futuro.result()
+        except Exception as e:
+            logger.error(f"❌ Error ejecutando job: {str(e)}")
+            return {"estado": "error", "segundos": round(segundos, 3), "error": str(e)}
+        if ejecuciones is None:
+            # Otro worker lo tiene en curso: no cuenta como terminado para sus dependientes
+            return {"estado": "ocupado", "segundos": round(segundos, 3), "motivo": "En ejecución en otro worker"}
+        if not ejecuciones:
+            estado = "sin_turnos"
+        elif any(e["estado"] == "error" for e in ejecuciones):
+            estado = "error"
+        else:
+            estado = "completado"
+        informe = {"estado": estado, "segundos": round(segundos, 3), "ejecuciones": ejecuciones}
+        if any(e.get("tardio") for e in ejecuciones):
+            informe["tardio"] = True
+        return informe
+
+    @staticmethod
+    def _validar_sin_ciclos(dependencias: Dict[str, set]):
+        pendientes = {n: set(d) for n, d in dependencias.items()}
+        while pendientes:
+            libres = [n for n, d in pendientes.items() if not d]
+            if not libres:
+                raise ValueError(f"Dependencias circulares entre jobs: {', '.join(sorted(pendientes))}")
+            for n in libres:
+                del pendientes[n]
+            for d in pendientes.values():
+                d.difference_update(libres)
+
+    def _ejecutar_turno(self, definicion: DefinicionJob, turno: datetime, origen: str) -> Optional[Dict]:
+        with self.Session() as db:
+            run_id = self._reclamar_turno(db, definicion.nombre, turno, origen)
+        if run_id is None:
+            return None  # Otro worker ya lo ejecutó
+
+        logger.info(f"🔄 Job {definicion.nombre} ({origen}) turno {turno:%Y-%m-%d %H:%M}")
+        inicio = time.perf_counter()
+        resultado, error = None, None
+        with self.Session() as db:
+            try:
+                self._limitar_consultas(db, definicion.timeout_segundos)
+                resultado = definicion.funcion(db, turno)
+                if isinstance(resultado, dict) and resultado.get("estado") == "error":
+                    error = str(resultado.get("error") or resultado.get("mensaje") or "error")
+            except Exception as e:
+                error = str(e)
+                logger.error(f"❌ Job {definicion.nombre} falló: {error}")
+            db.rollback()
+            self._limitar_consultas(db, None)
+
+            duracion_ms = int((time.perf_counter() - inicio) * 1000)
+            # Terminó y confirmó su trabajo: pasarse del límite no lo convierte en error, sólo en tardío
+            tardio = not error and duracion_ms > definicion.timeout_segundos * 1000
+            estado = "error" if error else "completado"
+            db.execute(
+                update(JobRun)
+                .where(JobRun.id == run_id)
+                .values(
+                    estado=estado,
+                    fin=datetime.now(),
+                    duracion_ms=duracion_ms,
+                    resultado=_serializable(resultado),
+                    error=error,
+                )
+            )
+            db.commit()
+
+        JOB_DURACION.observar(duracion_ms / 1000, definicion.nombre, estado)
+        if tardio:
+            logger.warning(
+                f"⏱️ Job {definicion.nombre} completado después de su límite de {definicion.timeout_segundos}s"
+            )
+        logger.info(f"✅ Job {definicion.nombre} {estado} en {duracion_ms} ms")
+        return {
+            "id": run_id,
+            "job": definicion.nombre,
+            "programado_para": turno,
+            "origen": origen,
+            "estado": estado,
+            "duracion_ms": duracion_ms,
+            "tardio": tardio,
+            "resultado": _serializable(resultado),
+        }
+
+    def _limitar_consultas(self, db: Session, segundos: Optional[int]):
+        """
+        En PostgreSQL cancela las consultas del job que superen su tiempo límite (None = quitar límite).
+        El límite es local a cada transacción (set_config(..., true)) y se aplica al comenzar cada una:
+        el job puede hacer varios commits y la conexión vuelve al pool sin arrastrarlo.
+        """
+        anterior = db.info.pop("limitar_consultas", None)
+        if anterior is not None:
+            event.remove(db, "after_begin", anterior)
+        if not segundos or not self._es_postgres():
+            return
+
+        def limitar(_session, _transaccion, conexion):
+            conexion.execute(text("SELECT set_config('statement_timeout', :ms, true)"), {"ms": str(segundos * 1000)})
+
+        event.listen(db, "after_begin", limitar)
+        db.info["limitar_consultas"] = limitar
+        if db.in_transaction():
+            limitar(db, None, db.connection())
+
+    def _reclamar_turno(self, db: Session, nombre: str, turno: datetime, origen: str) -> Optional[int]:
+        """Inserta la ejecución 'en_curso'; None si el turno ya estaba reclamado"""
+        run_id = db.execute(
+            insert_para(db, JobRun)
+            .values(
+                job=nombre,
+                programado_para=turno,
+                origen=origen,
+                estado="en_curso",
+                inicio=datetime.now(),
+                worker=self.worker,
+            )
+            .on_conflict_do_nothing(index_elements=["job", "programado_para"])
+            .returning(JobRun.id)
+        ).scalar()
+        db.commit()
+        return run_id
+
+    def _marcar_interrumpidas(self, db: Session, nombre: str):
+        """
+        Con el advisory lock en mano nadie más está ejecutando el job: cualquier
+        ejecución 'en_curso' quedó huérfana (el worker murió a mitad).
+        """
+        if not self._es_postgres():
+            return
+        marcadas = db.execute(
+            update(JobRun)
+            .where(JobRun.job == nombre, JobRun.estado == "en_curso")
+            .values(estado="interrumpido", fin=datetime.now(), error="El worker terminó antes de completar el job")
+        ).rowcount
+        db.commit()
+        if marcadas:
+            logger.warning(f"⚠️ {marcadas} ejecuciones huérfanas de {nombre} marcadas como interrumpidas")
+
+    @contextmanager
+    def _bloqueo(self, nombre: str):
+        """Advisory lock de sesión por job; sin PostgreSQL siempre se concede"""
+        if self.Session is None:
+            raise RuntimeError("El programador no está configurado (falta configurar(engine))")
+        if not self._es_postgres():
+            yield True
+            return
+
+        clave = zlib.crc32(f"job:{nombre}".encode())
+        with self.engine.connect() as conexion:
+            adquirido = conexion.scalar(select(func.pg_try_advisory_lock(clave)))
+            conexion.commit()  # El lock es de sesión: no dejar la conexión "idle in transaction"
+            try:
+                yield adquirido
+            finally:
+                if adquirido:
+                    conexion.execute(select(func.pg_advisory_unlock(clave)))
+                    conexion.commit()
+
+    def _es_postgres(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    @staticmethod
+    def _tolerancia() -> timedelta:
+        """Retraso con el que un turno todavía cuenta como puntual y no como recuperación"""
+        return timedelta(seconds=max(2 * settings.JOBS_INTERVALO_SEGUNDOS, 300))
+
+    # ---------- Consultas ----------
+
+    def estado(self, db: Session, ahora: Optional[datetime] = None) -> List[Dict]:
+        """Jobs registrados con su calendario, próxima ejecución y última ejecución registrada"""
+        ahora = ahora or datetime.now()
+        ultimas_ids = select(func.max(JobRun.id)).group_by(JobRun.job)
+        ultimas = {r.job: r for r in db.scalars(select(JobRun).where(JobRun.id.in_(ultimas_ids)))}
+
+        estado = []
+        for definicion in self.jobs.values():
+            ultima = ultimas.get(definicion.nombre)
+            estado.append(
+                {
+                    "job": definicion.nombre,
+                    "descripcion": definicion.descripcion,
+                    "cron": definicion.cron.expresion,
+                    "recuperar": definicion.recuperar,
+                    "depende_de": list(definicion.depende_de),
+                    "timeout_segundos": definicion.timeout_segundos,
+                    "proxima_ejecucion": definicion.cron.siguiente(ahora),
+                    "ultima_ejecucion": (
+                        {
+                            "id": ultima.id,
+                            "programado_para": ultima.programado_para,
+                            "origen": ultima.origen,
+                            "estado": ultima.estado,
+                            "inicio": ultima.inicio,
+                            "duracion_ms": ultima.duracion_ms,
+                            "worker": ultima.worker,
+                        }
+                        if ultima
+                        else None
+                    ),
+                }
+            )
+        return estado
+
+    def historial(
+        self, db: Session, job: Optional[str] = None, estado: Optional[str] = None, limite: int = 50
+    ) -> List[JobRun]:
+        consulta = select(JobRun).order_by(JobRun.inicio.desc(), JobRun.id.desc()).limit(limite)
+        if job:
+            consulta = consulta.where(JobRun.job == job)
+        if estado:
+            consulta = consulta.where(JobRun.estado == estado)
+        return list(db.scalars(consulta))
+
+    def tendencias(self, db: Session, job: Optional[str] = None, dias: int = 30) -> List[Dict]:
+        """Duración de las ejecuciones por job y por día, para ver su evolución"""
+        dia = func.date(JobRun.inicio)
+        consulta = (
+            select(
+                JobRun.job,
+                dia.label("dia"),
+                func.count(JobRun.id).label("ejecuciones"),
+                func.sum(case((JobRun.estado == "error", 1), else_=0)).label("errores"),
+                func.avg(JobRun.duracion_ms).label("promedio_ms"),
+                func.min(JobRun.duracion_ms).label("minimo_ms"),
+                func.max(JobRun.duracion_ms).label("maximo_ms"),
+            )
+            .where(JobRun.inicio >= datetime.now() - timedelta(days=dias), JobRun.duracion_ms.isnot(None))
+            .group_by(JobRun.job, dia)
+            .order_by(JobRun.job, dia)
+        )
+        if job:
+            consulta = consulta.where(JobRun.job == job)
+        return [
+            {
+                "job": fila.job,
+                "dia": str(fila.dia),
+                "ejecuciones": fila.ejecuciones,
+                "errores": int(fila.errores or 0),
+                "promedio_ms": round(float(fila.promedio_ms), 1),
+                "minimo_ms": fila.minimo_ms,
+                "maximo_ms": fila.maximo_ms,
+            }
+            for fila in db.execute(consulta)
+        ]
+
+
+def _serializable(resultado):
+    """Resultado del job apto para la columna JSON (fechas y Decimal como texto)"""
+    if resultado is None:
+        return None
+    return json.loads(json.dumps(resultado, default=str))
+
+
+# Instancia global
+programador_service = ProgramadorService()
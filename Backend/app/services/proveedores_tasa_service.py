@@ -0,0 +1,293 @@
+# services/proveedores_tasa_service.py
+"""
+Registro único de proveedores de la tasa BCV (USD -> VES).
+
+- Fuentes configurables: por defecto DolarVzla y DolarAPI; TASAS_PROVEEDORES
+  (JSON) reemplaza la lista sin tocar código.
+- Un circuito por proveedor: después de TASAS_CIRCUITO_FALLOS fallos seguidos
+  el proveedor se salta sin hacer la petición (latencia cero) durante
+  TASAS_CIRCUITO_APERTURA_SEGUNDOS; pasado ese tiempo se deja pasar una sola
+  petición de prueba y, si responde, el circuito se cierra.
+- Cache en memoria de TASAS_CACHE_MINUTOS para no consultar la red en cada
+  conversión.
+- Copia en disco de la última tasa válida (TASAS_SNAPSHOT_ARCHIVO): si todos
+  los proveedores fallan o están abiertos (arranque sin red) se responde con
+  ella, marcada como `desde_snapshot`, mientras no supere
+  TASAS_SNAPSHOT_MAX_HORAS.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from ..core.config import settings
+from ..core.metricas import PROVEEDOR_DURACION, PROVEEDOR_SALTOS, metricas, registrar_cache
+
+logger = logging.getLogger(__name__)
+
+CERRADO, ABIERTO, SEMIABIERTO = "cerrado", "abierto", "semiabierto"
+
+PROVEEDORES_POR_DEFECTO = [
+    {
+        "nombre": "DolarVzla - Principal",
+        "url": "https://api.dolarvzla.com/public/exchange-rate",
+        "tasa_path": ["current", "usd"],
+        "fecha_path": ["current", "date"],
+        "prioridad": 1,
+    },
+    {
+        "nombre": "DolarAPI - Oficial",
+        "url": "https://ve.dolarapi.com/v1/dolares/oficial",
+        "tasa_path": ["promedio"],
+        "fecha_path": ["fechaActualizacion"],
+        "prioridad": 2,
+    },
+]
+
+
+@dataclass
+class ProveedorTasa:
+    nombre: str
+    url: str
+    tasa_path: List[str]
+    fecha_path: List[str]
+    prioridad: int = 1
+    timeout: float = 5.0
+
+    def consultar(self) -> Tuple[Decimal, date]:
+        resp = requests.get(self.url, timeout=self.timeout)
+        resp.raise_for_status()
+        data = resp.json()
+
+        tasa = data
+        for key in self.tasa_path:
+            tasa = tasa[key]
+        tasa = Decimal(str(tasa))
+        if tasa <= 0:
+            raise ValueError(f"Tasa inválida: {tasa}")
+
+        fecha = data
+        for key in self.fecha_path:
+            fecha = fecha[key]
+        return tasa, date.fromisoformat(str(fecha).split("T")[0])
+
+
+@dataclass
+class CircuitoProveedor:
+    fallos_consecutivos: int = 0
+    abierto_hasta: float = 0.0  # time.monotonic()
+    estado: str = CERRADO
+    exitos: int = 0
+    fallos: int = 0
+    saltos: int = 0  # Consultas evitadas con el circuito abierto
+    ultimo_error: Optional[str] = None
+    ultima_latencia_ms: Optional[float] = None
+
+    def permite(self, ahora: float) -> bool:
+        if self.estado == CERRADO:
+            return True
+        if self.estado == ABIERTO and ahora >= self.abierto_hasta:
+            self.estado = SEMIABIERTO  # Una única petición de prueba
+            return True
+        self.saltos += 1
+        return False
+
+    def exito(self, latencia_ms: float):
+        self.estado, self.fallos_consecutivos = CERRADO, 0
+        self.exitos += 1
+        self.ultima_latencia_ms = round(latencia_ms, 1)
+
+    def fallo(self, error: str, latencia_ms: float, ahora: float):
+        self.fallos += 1
+        self.fallos_consecutivos += 1
+        self.ultimo_error, self.ultima_latencia_ms = error, round(latencia_ms, 1)
+        if self.estado == SEMIABIERTO or self.fallos_consecutivos >= settings.TASAS_CIRCUITO_FALLOS:
+            self.estado = ABIERTO
+            self.abierto_hasta = ahora + settings.TASAS_CIRCUITO_APERTURA_SEGUNDOS
+
+
+@dataclass
+class CotizacionTasa:
+    tasa: Decimal
+    fecha_banco: date
+    fuente: str
+    obtenida_en: datetime = field(default_factory=datetime.now)
+    desde_snapshot: bool = False
+
+
+class ProveedoresTasaService:
+
+    def __init__(self, proveedores: Optional[List[ProveedorTasa]] = None, reloj: Callable[[], float] = time.monotonic):
+        self.proveedores: List[ProveedorTasa] = []
+        self.circuitos: Dict[str, CircuitoProveedor] = {}
+        self._reloj = reloj
+        self._cache: Optional[CotizacionTasa] = None
+        self._cache_en: Optional[float] = None
+        self._candado = threading.Lock()
+        for proveedor in proveedores if proveedores is not None else proveedores_configurados():
+            self.registrar(proveedor)
+
+    def registrar(self, proveedor: ProveedorTasa):
+        with self._candado:
+            self.proveedores = sorted(
+                [p for p in self.proveedores if p.nombre != proveedor.nombre] + [proveedor], key=lambda p: p.prioridad
+            )
+            self.circuitos.setdefault(proveedor.nombre, CircuitoProveedor())
+
+    # ---------- Obtención ----------
+
+    def obtener(self, usar_cache: bool = True) -> CotizacionTasa:
+        """
+        Tasa actual: cache en memoria, luego los proveedores en orden de prioridad
+        (saltando los de circuito abierto) y, si ninguno responde, la copia en disco.
+        """
+        if usar_cache:
+            vigente = self._cache_vigente()
+            registrar_cache("tasa_actual", vigente)
+            if vigente:
+                return self._cache
+
+        for proveedor in list(self.proveedores):
+            circuito = self.circuitos[proveedor.nombre]
+            with self._candado:
+                if not circuito.permite(self._reloj()):
+                    PROVEEDOR_SALTOS.inc(proveedor.nombre)
+                    continue
+
+            inicio = time.perf_counter()
+            try:
+                tasa, fecha_banco = proveedor.consultar()
+            except Exception as e:
+                latencia = (time.perf_counter() - inicio) * 1000
+                PROVEEDOR_DURACION.observar(latencia / 1000, proveedor.nombre, "fallo")
+                with self._candado:
+                    circuito.fallo(str(e)[:200], latencia, self._reloj())
+                logger.warning(f"❌ {proveedor.nombre} falló en {latencia:.0f} ms ({circuito.estado}): {str(e)[:80]}")
+                continue
+
+            latencia = (time.perf_counter() - inicio) * 1000
+            PROVEEDOR_DURACION.observar(latencia / 1000, proveedor.nombre, "exito")
+            with self._candado:
+                circuito.exito(latencia)
+            cotizacion = CotizacionTasa(tasa=tasa, fecha_banco=fecha_banco, fuente=proveedor.nombre)
+            self._guardar_en_cache(cotizacion)
+            self._escribir_snapshot(cotizacion)
+            return cotizacion
+
+        snapshot = self._leer_snapshot()
+        if snapshot is not None:
+            logger.warning(
+                f"⚠️ Ningún proveedor de tasas disponible: se usa la última tasa conocida "
+                f"{snapshot.tasa} del {snapshot.fecha_banco} ({snapshot.fuente})"
+            )
+            return snapshot
+
+        logger.error("Todas las APIs de tasas fallaron y no hay una tasa guardada en disco")
+        raise Exception("No se pudo obtener la tasa de cambio de ninguna fuente")
+
+    def estado(self) -> Dict:
+        """Estado de cada proveedor y de la última tasa conocida (diagnóstico)"""
+        ahora = self._reloj()
+        snapshot = self._leer_snapshot(sin_limite=True)
+        proveedores = []
+        for p in self.proveedores:
+            circuito = asdict(self.circuitos[p.nombre])
+            abierto_hasta = circuito.pop("abierto_hasta")
+            circuito["reintento_en_segundos"] = (
+                round(max(abierto_hasta - ahora, 0), 1) if circuito["estado"] == ABIERTO else None
+            )
+            proveedores.append({"nombre": p.nombre, "url": p.url, "prioridad": p.prioridad, **circuito})
+        return {
+            "proveedores": proveedores,
+            "cache": asdict(self._cache) if self._cache_vigente() else None,
+            "snapshot": asdict(snapshot) if snapshot else None,
+        }
+
+    def reiniciar_circuitos(self):
+        with self._candado:
+            self.circuitos = {p.nombre: CircuitoProveedor() for p in self.proveedores}
+
+    # ---------- Cache y copia en disco ----------
+
+    def _cache_vigente(self) -> bool:
+        return self._cache is not None and self._reloj() - self._cache_en < settings.TASAS_CACHE_MINUTOS * 60
+
+    def _guardar_en_cache(self, cotizacion: CotizacionTasa):
+        with self._candado:
+            self._cache, self._cache_en = cotizacion, self._reloj()
+
+    def _escribir_snapshot(self, cotizacion: CotizacionTasa):
+        """Escritura atómica (archivo temporal + rename): un corte nunca deja el JSON a medias"""
+        ruta = settings.TASAS_SNAPSHOT_ARCHIVO
+        try:
+            os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+            temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"  # Un temporal por hilo
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                json.dump(
+                    {
+                        "tasa": str(cotizacion.tasa),
+                        "fecha_banco": cotizacion.fecha_banco.isoformat(),
+                        "fuente": cotizacion.fuente,
+                        "obtenida_en": cotizacion.obtenida_en.isoformat(),
+                    },
+                    archivo,
+                )
+            os.replace(temporal, ruta)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la copia local de la tasa: {e}")
+
+    def _leer_snapshot(self, sin_limite: bool = False) -> Optional[CotizacionTasa]:
+        try:
+            with open(settings.TASAS_SNAPSHOT_ARCHIVO, encoding="utf-8") as archivo:
+                datos = json.load(archivo)
+            cotizacion = CotizacionTasa(
+                tasa=Decimal(datos["tasa"]),
+                fecha_banco=date.fromisoformat(datos["fecha_banco"]),
+                fuente=datos["fuente"],
+                obtenida_en=datetime.fromisoformat(datos["obtenida_en"]),
+                desde_snapshot=True,
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Copia local de la tasa ilegible: {e}")
+            return None
+
+        horas = (datetime.now() - cotizacion.obtenida_en).total_seconds() / 3600
+        if not sin_limite and horas > settings.TASAS_SNAPSHOT_MAX_HORAS:
+            logger.warning(f"La copia local de la tasa tiene {horas:.0f} h: demasiado antigua para usarla")
+            return None
+        return cotizacion
+
+
+def proveedores_configurados() -> List[ProveedorTasa]:
+    """Proveedores de TASAS_PROVEEDORES (lista JSON con los campos de ProveedorTasa) o los por defecto"""
+    definiciones = PROVEEDORES_POR_DEFECTO
+    if settings.TASAS_PROVEEDORES:
+        try:
+            definiciones = json.loads(settings.TASAS_PROVEEDORES)
+        except ValueError as e:
+            raise ValueError(f"TASAS_PROVEEDORES no es un JSON válido: {e}")
+    return [
+        ProveedorTasa(**{"timeout": settings.TASAS_PROVEEDOR_TIMEOUT_SEGUNDOS, **definicion})
+        for definicion in definiciones
+    ]
+
+
+# Instancia global
+proveedores_tasa_service = ProveedoresTasaService()
+
+metricas.medidor(
+    "tasa_proveedor_circuito_abierto",
+    "1 si el circuito del proveedor está abierto",
+    lambda: [((n,), int(c.estado == ABIERTO)) for n, c in list(proveedores_tasa_service.circuitos.items())],
+    ("proveedor",),
+)
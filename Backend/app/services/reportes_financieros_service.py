@@ -4,13 +4,17 @@ from typing import List, Dict, Optional
 from decimal import Decimal
 from datetime import datetime, date, timedelta
 import logging
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, select, true, update
+import numpy as np
 
 from ..models.financiero import ReporteFinanciero, Gasto, EstadoGastoEnum, EstadoCargoEnum
-from ..models.pagos import Pago
+from ..models.pagos import Pago, EstadoPagoEnum
 from ..models.torres import Apartamento
 from ..models.residentes import Residente
 from ..schemas.financiero import ReporteFinancieroResponse
+from ..utils.db_helpers import insert_para
+from ..utils.serie_tasas import a_centavos, a_dia, a_dias
+from .tasas_historicas_service import tasas_historicas_service
 
 logger = logging.getLogger(__name__)
 
@@ -19,106 +23,160 @@ class ReportesFinancierosService:
 
     def generar_reporte_mensual(self, db: Session, periodo: str, generado_por: str = "Sistema") -> ReporteFinanciero:
         """
-        Genera o actualiza el reporte financiero mensual consolidando TODOS los datos
+        Genera o actualiza el reporte financiero mensual consolidando TODOS los datos.
+        Los totales se agregan en SQL y el reporte se inserta/actualiza con un único upsert.
         """
         try:
             logger.info(f"🔄 Generando reporte financiero para período {periodo}")
 
-            # Verificar si ya existe un reporte para este período
-            reporte_existente = db.query(ReporteFinanciero).filter(ReporteFinanciero.periodo == periodo).first()
+            totales = self._calcular_totales_periodo(db, periodo)
 
-            if reporte_existente:
-                logger.info(f"📊 Reporte existente encontrado, actualizando...")
-                return self._actualizar_reporte_existente(db, reporte_existente, periodo)
-            else:
-                logger.info(f"🆕 Creando nuevo reporte para {periodo}")
-                return self._crear_nuevo_reporte(db, periodo, generado_por)
+            valores = {
+                "periodo": periodo,
+                "generado_por": generado_por,
+                "total_ingresos_usd": totales["total_ingresos_usd"],
+                "total_gastos_usd": totales["total_gastos_usd"],
+                "saldo_final_usd": totales["total_ingresos_usd"] - totales["total_gastos_usd"],
+                "total_ingresos_ves": totales["total_ingresos_ves"],
+                "total_gastos_ves": totales["total_gastos_ves"],
+                "saldo_final_ves": totales["total_ingresos_ves"] - totales["total_gastos_ves"],
+                "tasa_cambio_promedio": totales["tasa_cambio_promedio"] or Decimal("0.00"),
+                "estado": "Abierto",
+                "fecha_generacion": datetime.now(),
+            }
+
+            # Al actualizar se conservan generado_por, estado y (sin gastos) la tasa previa
+            actualizar = {
+                campo: valores[campo]
+                for campo in (
+                    "total_ingresos_usd",
+                    "total_gastos_usd",
+                    "saldo_final_usd",
+                    "total_ingresos_ves",
+                    "total_gastos_ves",
+                    "saldo_final_ves",
+                    "fecha_generacion",
+                )
+            }
+            if totales["tasa_cambio_promedio"] is not None:
+                actualizar["tasa_cambio_promedio"] = totales["tasa_cambio_promedio"]
+
+            stmt = (
+                insert_para(db, ReporteFinanciero)
+                .values(**valores)
+                .on_conflict_do_update(index_elements=[ReporteFinanciero.periodo], set_=actualizar)
+                .returning(ReporteFinanciero)
+            )
+            reporte = db.scalars(stmt, execution_options={"populate_existing": True}).one()
+            db.commit()
+            db.refresh(reporte)
+
+            logger.info(f"✅ Reporte {periodo} generado")
+            logger.info(f"   - Ingresos: ${reporte.total_ingresos_usd} USD / {reporte.total_ingresos_ves} VES")
+            logger.info(f"   - Gastos: ${reporte.total_gastos_usd} USD / {reporte.total_gastos_ves} VES")
+            logger.info(f"   - Saldo: ${reporte.saldo_final_usd} USD")
+
+            return reporte
 
         except Exception as e:
+            db.rollback()
             logger.error(f"❌ Error generando reporte para {periodo}: {str(e)}")
             raise
 
-    def _crear_nuevo_reporte(self, db: Session, periodo: str, generado_por: str) -> ReporteFinanciero:
+    def _calcular_totales_periodo(self, db: Session, periodo: str) -> Dict:
         """
-        Crea un nuevo reporte financiero desde cero
+        SUM/AVG de gastos y pagos del período en una sola sentencia
         """
-        # Obtener todos los gastos del período
-        gastos_periodo = db.query(Gasto).filter(Gasto.periodo == periodo).all()
-
-        # Obtener todos los pagos del período
-        pagos_periodo = db.query(Pago).filter(Pago.reporte_financiero.has(periodo=periodo)).all()
-
-        # Calcular totales
-        total_gastos_usd = sum(g.monto_total_usd for g in gastos_periodo)
-        total_gastos_ves = sum(g.monto_total_ves for g in gastos_periodo)
-        total_ingresos_usd = sum(p.monto_pagado_usd for p in pagos_periodo)
-        total_ingresos_ves = sum(p.monto_pagado_ves for p in pagos_periodo)
-
-        # Calcular tasa de cambio promedio (promedio de tasas de gastos)
-        tasas_gastos = [g.tasa_cambio for g in gastos_periodo if g.tasa_cambio]
-        tasa_cambio_promedio = sum(tasas_gastos) / len(tasas_gastos) if tasas_gastos else Decimal("0.00")
-
-        # Crear nuevo reporte
-        nuevo_reporte = ReporteFinanciero(
-            periodo=periodo,
-            generado_por=generado_por,
-            total_ingresos_usd=total_ingresos_usd,
-            total_gastos_usd=total_gastos_usd,
-            saldo_final_usd=total_ingresos_usd - total_gastos_usd,
-            total_ingresos_ves=total_ingresos_ves,
-            total_gastos_ves=total_gastos_ves,
-            saldo_final_ves=total_ingresos_ves - total_gastos_ves,
-            tasa_cambio_promedio=tasa_cambio_promedio,
-            estado="Abierto",
-            fecha_generacion=datetime.now(),
+        gastos = (
+            select(
+                func.coalesce(func.sum(Gasto.monto_total_usd), 0).label("total_gastos_usd"),
+                func.coalesce(func.sum(Gasto.monto_total_ves), 0).label("total_gastos_ves"),
+                func.avg(func.nullif(Gasto.tasa_cambio, 0)).label("tasa_cambio_promedio"),
+            )
+            .where(Gasto.periodo == periodo)
+            .subquery()
+        )
+        pagos = (
+            select(
+                func.coalesce(func.sum(Pago.monto_pagado_usd), 0).label("total_ingresos_usd"),
+                func.coalesce(func.sum(Pago.monto_pagado_ves), 0).label("total_ingresos_ves"),
+            )
+            .join(ReporteFinanciero, Pago.id_reporte_financiero == ReporteFinanciero.id)
+            .where(ReporteFinanciero.periodo == periodo, Pago.estado != EstadoPagoEnum.RECHAZADO)
+            .subquery()
         )
 
-        db.add(nuevo_reporte)
-        db.commit()
-        db.refresh(nuevo_reporte)
+        # Ambas subconsultas devuelven exactamente una fila: el producto cruzado es intencional
+        fila = db.execute(select(gastos, pagos).select_from(gastos.join(pagos, true()))).mappings().one()
 
-        logger.info(f"✅ Nuevo reporte creado: {periodo}")
-        logger.info(f"   - Ingresos: ${total_ingresos_usd} USD / {total_ingresos_ves} VES")
-        logger.info(f"   - Gastos: ${total_gastos_usd} USD / {total_gastos_ves} VES")
-        logger.info(f"   - Saldo: ${nuevo_reporte.saldo_final_usd} USD")
+        tasa = fila["tasa_cambio_promedio"]
+        return {
+            "total_gastos_usd": Decimal(str(fila["total_gastos_usd"])),
+            "total_gastos_ves": Decimal(str(fila["total_gastos_ves"])),
+            "total_ingresos_usd": Decimal(str(fila["total_ingresos_usd"])),
+            "total_ingresos_ves": Decimal(str(fila["total_ingresos_ves"])),
+            "tasa_cambio_promedio": Decimal(str(tasa)).quantize(Decimal("0.0001")) if tasa is not None else None,
+        }
 
-        return nuevo_reporte
+    # ===========================================
+    # ---- Totales acumulados (sin contención) ----
+    # ===========================================
 
-    def _actualizar_reporte_existente(
-        self, db: Session, reporte: ReporteFinanciero, periodo: str
-    ) -> ReporteFinanciero:
+    def obtener_o_crear_reporte_id(self, db: Session, periodo: str, generado_por: str = "Sistema Automático") -> int:
         """
-        Actualiza un reporte existente con los datos más recientes
+        Devuelve el id del reporte del período creándolo si no existe.
+        ON CONFLICT DO NOTHING evita la carrera del get-or-create entre transacciones.
         """
-        # Recalcular todos los totales
-        gastos_periodo = db.query(Gasto).filter(Gasto.periodo == periodo).all()
-
-        pagos_periodo = db.query(Pago).filter(Pago.reporte_financiero.has(periodo=periodo)).all()
-
-        total_gastos_usd = sum(g.monto_total_usd for g in gastos_periodo)
-        total_gastos_ves = sum(g.monto_total_ves for g in gastos_periodo)
-        total_ingresos_usd = sum(p.monto_pagado_usd for p in pagos_periodo)
-        total_ingresos_ves = sum(p.monto_pagado_ves for p in pagos_periodo)
-
-        # Actualizar tasas promedio
-        tasas_gastos = [g.tasa_cambio for g in gastos_periodo if g.tasa_cambio]
-        tasa_cambio_promedio = sum(tasas_gastos) / len(tasas_gastos) if tasas_gastos else reporte.tasa_cambio_promedio
-
-        # Actualizar reporte
-        reporte.total_ingresos_usd = total_ingresos_usd
-        reporte.total_gastos_usd = total_gastos_usd
-        reporte.saldo_final_usd = total_ingresos_usd - total_gastos_usd
-        reporte.total_ingresos_ves = total_ingresos_ves
-        reporte.total_gastos_ves = total_gastos_ves
-        reporte.saldo_final_ves = total_ingresos_ves - total_gastos_ves
-        reporte.tasa_cambio_promedio = tasa_cambio_promedio
-        reporte.fecha_generacion = datetime.now()
-
-        db.commit()
-        db.refresh(reporte)
-
-        logger.info(f"✅ Reporte actualizado: {periodo}")
-        return reporte
+        db.execute(
+            insert_para(db, ReporteFinanciero)
+            .values(
+                periodo=periodo,
+                generado_por=generado_por,
+                total_ingresos_usd=0,
+                total_gastos_usd=0,
+                saldo_final_usd=0,
+                total_ingresos_ves=0,
+                total_gastos_ves=0,
+                saldo_final_ves=0,
+                estado="Abierto",
+                fecha_generacion=datetime.now(),
+            )
+            .on_conflict_do_nothing(index_elements=[ReporteFinanciero.periodo])
+        )
+        return db.scalar(select(ReporteFinanciero.id).where(ReporteFinanciero.periodo == periodo))
+
+    def acumular_totales(
+        self,
+        db: Session,
+        reporte_id: int,
+        ingresos_usd: Decimal = Decimal("0.00"),
+        ingresos_ves: Decimal = Decimal("0.00"),
+        gastos_usd: Decimal = Decimal("0.00"),
+        gastos_ves: Decimal = Decimal("0.00"),
+    ):
+        """
+        Suma deltas a los totales del reporte con un UPDATE atómico (total = total + delta).
+        Bloquea la fila sólo hasta el commit: llamarlo como último paso de la transacción.
+        """
+        r = ReporteFinanciero
+        ingresos_usd_nuevo = func.coalesce(r.total_ingresos_usd, 0) + ingresos_usd
+        ingresos_ves_nuevo = func.coalesce(r.total_ingresos_ves, 0) + ingresos_ves
+        gastos_usd_nuevo = func.coalesce(r.total_gastos_usd, 0) + gastos_usd
+        gastos_ves_nuevo = func.coalesce(r.total_gastos_ves, 0) + gastos_ves
+
+        db.execute(
+            update(r)
+            .where(r.id == reporte_id)
+            .values(
+                total_ingresos_usd=ingresos_usd_nuevo,
+                total_ingresos_ves=ingresos_ves_nuevo,
+                total_gastos_usd=gastos_usd_nuevo,
+                total_gastos_ves=gastos_ves_nuevo,
+                saldo_final_usd=ingresos_usd_nuevo - gastos_usd_nuevo,
+                saldo_final_ves=ingresos_ves_nuevo - gastos_ves_nuevo,
+            )
+            .execution_options(synchronize_session=False)
+        )
 
     def obtener_estado_cuenta_apartamento(self, db: Session, apartamento_id: int, periodo: str) -> Dict:
         """
@@ -446,6 +504,68 @@ class ReportesFinancierosService:
             logger.error(f"Error listando reportes: {str(e)}")
             raise
 
+    def revalorizar_pagos(
+        self, db: Session, desde: date, hasta: date, fecha_valoracion: Optional[date] = None
+    ) -> Dict:
+        """
+        Revalorización de los bolívares cobrados entre dos fechas: su valor en USD a
+        la tasa BCV del día de cada pago y a la tasa de `fecha_valoracion` (hoy por
+        defecto). La diferencia es la pérdida (o ganancia) cambiaria de los VES
+        cobrados. Toda la conversión es una operación vectorizada sobre la serie de
+        tasas, sin consultas por pago.
+        """
+        fecha_valoracion = fecha_valoracion or date.today()
+        if desde > hasta:
+            raise ValueError("La fecha 'desde' no puede ser posterior a 'hasta'")
+
+        filas = db.execute(
+            select(Pago.fecha_creacion, Pago.monto_pagado_ves, Pago.monto_pagado_usd).where(
+                Pago.estado == EstadoPagoEnum.VALIDADO,
+                Pago.fecha_creacion >= desde,
+                Pago.fecha_creacion < hasta + timedelta(days=1),
+            )
+        ).all()
+
+        fechas = a_dias([f for f, _, _ in filas])
+        ves = a_centavos([v for _, v, _ in filas])
+        usd_registrado = a_centavos([u for _, _, u in filas])
+        usd_al_pagar, _ = tasas_historicas_service.convertir_lote(db, ves, fechas, "USD")
+        usd_valoracion, tasas = tasas_historicas_service.convertir_lote(
+            db, ves, np.full(len(filas), a_dia(fecha_valoracion), dtype=np.int32), "USD"
+        )
+
+        # Subtotales por mes: índice de mes de cada pago y sumas enteras con np.add.at
+        meses, grupo = np.unique(fechas.astype("datetime64[D]").astype("datetime64[M]"), return_inverse=True)
+        columnas = {"ves": ves, "usd_al_pagar": usd_al_pagar, "usd_valoracion": usd_valoracion}
+        sumas = {nombre: np.zeros(len(meses), dtype=np.int64) for nombre in columnas}
+        for nombre, valores in columnas.items():
+            np.add.at(sumas[nombre], grupo, valores)
+
+        def monto(centavos) -> Decimal:
+            return Decimal(int(centavos)).scaleb(-2)
+
+        def bloque(ves_c, al_pagar_c, valoracion_c) -> Dict:
+            return {
+                "total_ves": monto(ves_c),
+                "usd_al_pagar": monto(al_pagar_c),
+                "usd_valoracion": monto(valoracion_c),
+                "diferencia_usd": monto(valoracion_c - al_pagar_c),
+            }
+
+        return {
+            "desde": desde,
+            "hasta": hasta,
+            "fecha_valoracion": fecha_valoracion,
+            "tasa_valoracion": Decimal(int(tasas[0])).scaleb(-4) if len(tasas) else None,
+            "pagos": len(filas),
+            **bloque(ves.sum(), usd_al_pagar.sum(), usd_valoracion.sum()),
+            "usd_registrado": monto(usd_registrado.sum()),
+            "por_mes": [
+                {"periodo": str(mes), **bloque(sumas["ves"][i], sumas["usd_al_pagar"][i], sumas["usd_valoracion"][i])}
+                for i, mes in enumerate(meses)
+            ],
+        }
+
 
 # Instancia global
 reportes_financieros_service = ReportesFinancierosService()
@@ -3,64 +3,19 @@ from sqlalchemy.orm import Session
 from datetime import date, datetime, timedelta, time
 from decimal import Decimal
 from typing import Optional, Tuple
-import requests
 import logging
 from ..models.financiero import TasaCambio
+from .proveedores_tasa_service import proveedores_tasa_service
+from .tasas_historicas_service import tasas_historicas_service
 
 
 logger = logging.getLogger(__name__)
 
 
 def obtener_tasa_bcv() -> tuple[Decimal, str]:  # ← Solo tasa y fecha banco
-    apis = [
-        {
-            "nombre": "DolarVzla - Principal",
-            "url": "https://api.dolarvzla.com/public/exchange-rate",
-            "tasa_path": ["current", "usd"],
-            "fecha_path": ["current", "date"],
-            "prioridad": 1,
-        },
-        {
-            "nombre": "DolarAPI - Oficial",
-            "url": "https://ve.dolarapi.com/v1/dolares/oficial",
-            "tasa_path": ["promedio"],
-            "fecha_path": ["fechaActualizacion"],
-            "prioridad": 2,
-        },
-    ]
-
-    #  Ordenar por prioridad
-    apis_ordenadas = sorted(apis, key=lambda x: x["prioridad"])
-
-    #  Intentar cada API en orden
-    for api in apis_ordenadas:
-        try:
-            print(f"Consultando {api['nombre']}...")
-            resp = requests.get(api["url"], timeout=5)
-            resp.raise_for_status()
-            data = resp.json()
-
-            #  Extraer tasa (manejar diferentes estructuras JSON)
-            tasa = data
-            for key in api["tasa_path"]:
-                tasa = tasa[key]
-            tasa = round(Decimal(str(tasa)), 2)
-
-            #  Extraer fecha
-            fecha_data = data
-            for key in api["fecha_path"]:
-                fecha_data = fecha_data[key]
-            fecha_banco = fecha_data.split("T")[0] if "T" in str(fecha_data) else str(fecha_data)
-
-            return tasa, fecha_banco
-
-        except Exception as e:
-            logger.warning(f"❌ {api['nombre']} falló: {str(e)[:50]}...")
-            continue  # Intentar siguiente API
-
-    # ❌ Si todas las APIs fallan
-    logger.error("Todas las APIs de tasas fallaron")
-    raise Exception("No se pudo obtener la tasa de cambio de ninguna fuente")
+    """Tasa y fecha del banco desde el registro de proveedores (ver proveedores_tasa_service)"""
+    cotizacion = proveedores_tasa_service.obtener()
+    return round(cotizacion.tasa, 2), cotizacion.fecha_banco.isoformat()
 
 
 class TasaCambioService:
@@ -88,6 +43,21 @@ class TasaCambioService:
             logger.info(f"📅 No hay tasa para hoy, obteniendo nueva...")
             return self._obtener_tasa_externa_y_guardar(db, hoy)
 
+    def obtener_tasa_vigente(self, db: Session) -> TasaCambio:
+        """
+        Como obtener_tasa_actual, pero sin escribir ni hacer commit: para usar dentro
+        de una transacción que no debe cortarse (filas bloqueadas, importaciones,
+        simulaciones). Usa la tasa de hoy guardada; si no hay, consulta a los
+        proveedores y la devuelve sin guardarla.
+        """
+        hoy = date.today()
+        tasa_hoy = db.query(TasaCambio).filter(TasaCambio.fecha == hoy, TasaCambio.fuente == "BCV").first()
+        if tasa_hoy:
+            return tasa_hoy
+        cotizacion = proveedores_tasa_service.obtener()
+        fecha = cotizacion.fecha_banco if cotizacion.desde_snapshot else hoy
+        return TasaCambio(fecha=fecha, tasa_usd_ves=round(cotizacion.tasa, 2), fuente="BCV", es_historica=False)
+
     def actualizar_tasas_automaticamente(self, db: Session) -> TasaCambio:
         """
         Job diario: Siempre obtiene nueva tasa
@@ -140,7 +110,15 @@ class TasaCambioService:
         Obtiene tasa de API externa y guarda en BD.
         """
         try:
-            tasa_valor, fecha_banco = obtener_tasa_bcv()
+            cotizacion = proveedores_tasa_service.obtener()
+            tasa_valor = round(cotizacion.tasa, 2)
+
+            if cotizacion.desde_snapshot:
+                # Sin red: la última tasa conocida sirve para operar, pero no se guarda como la de hoy
+                logger.warning(f"Tasa de {cotizacion.fecha_banco} (copia local) usada para {fecha}, no se guarda")
+                return TasaCambio(
+                    fecha=cotizacion.fecha_banco, tasa_usd_ves=tasa_valor, fuente="BCV", es_historica=False
+                )
 
             # Usar el approach de buscar y actualizar/crear
             tasa_existente = db.query(TasaCambio).filter(TasaCambio.fecha == fecha, TasaCambio.fuente == "BCV").first()
@@ -151,6 +129,7 @@ class TasaCambioService:
                 tasa_existente.fecha_creacion = datetime.now()
                 db.commit()
                 db.refresh(tasa_existente)
+                tasas_historicas_service.registrar(fecha, tasa_existente.tasa_usd_ves)
                 logger.info(f"Tasa ACTUALIZADA para {fecha}: {tasa_valor}")
                 return tasa_existente
             else:
@@ -159,6 +138,7 @@ class TasaCambioService:
                 db.add(nueva_tasa)
                 db.commit()
                 db.refresh(nueva_tasa)
+                tasas_historicas_service.registrar(fecha, nueva_tasa.tasa_usd_ves)
                 logger.info(f"Tasa CREADA para {fecha}: {tasa_valor}")
                 return nueva_tasa
 
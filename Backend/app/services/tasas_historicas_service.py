@@ -0,0 +1,332 @@
+# services/tasas_historicas_service.py
+"""
+Tasas de cambio históricas (USD -> VES) sin consultar la red.
+
+- Carga masiva desde un archivo local (CSV o JSON) hacia tasas_cambio, por
+  lotes y con upsert: recargar el mismo archivo no duplica nada.
+- Búsqueda por fecha en una serie en memoria (utils/serie_tasas: arreglos
+  NumPy de días y tasas en punto fijo), O(log n) por fecha y vectorizada
+  para lotes. Para fines de semana y feriados (el BCV no publica) se usa la
+  tasa del día hábil anterior más cercano.
+
+La serie se arma desde la base la primera vez que se usa y cada
+TASAS_HISTORICAS_RECARGA_SEGUNDOS se refresca de forma incremental (otros
+workers pueden haber guardado o importado tasas). Si piden una fecha posterior a la última indexada se
+consulta esa única fila en la base antes de responder, así la tasa del día
+guardada por el job se ve de inmediato.
+"""
+
+import csv
+import json
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import islice
+from typing import Dict, Iterator, Optional, TextIO, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.metricas import registrar_cache
+from ..models.financiero import TasaCambio
+from ..utils.db_helpers import insert_para
+from ..utils.parseo import parsear_fecha, parsear_monto
+from ..utils.serie_tasas import SerieTasas, a_dias, a_fecha
+
+logger = logging.getLogger(__name__)
+
+FUENTE = "BCV"
+LOTE_IMPORTACION = 2000  # Filas por INSERT ... ON CONFLICT
+MAX_MUESTRAS = 20  # Filas inválidas incluidas en el resumen
+CENTAVO = Decimal("0.01")
+DIAS_REFRESCO = 31  # Ventana del refresco incremental
+
+ALIAS_FECHA = ("fecha", "date", "dia", "día")
+ALIAS_TASA = ("tasa", "tasa_usd_ves", "usd", "valor", "promedio", "rate")
+
+
+class TasasHistoricasService:
+
+    def __init__(self):
+        # Serie inmutable: se reemplaza completa, un lector concurrente siempre ve una versión coherente
+        self._serie = SerieTasas.vacia()
+        self._cargado_en: Optional[float] = None
+        self._refrescado_en: Optional[float] = None
+        # Fechas pasadas ya buscadas en la base más allá del índice (evita repetir la consulta línea a línea)
+        self._consultado_hasta: Optional[date] = None
+        self._candado = threading.Lock()
+
+    # ---------- Búsqueda ----------
+
+    def tasa_en(self, db: Session, fecha: date) -> Tuple[Decimal, date]:
+        """
+        Tasa vigente en `fecha`: la publicada ese día o, si no hubo publicación,
+        la del día hábil anterior más cercano. Devuelve (tasa, fecha_de_la_tasa).
+        """
+        self._asegurar_indice(db)
+        ultima = self._serie.ultima_fecha
+        if (ultima is None or fecha > ultima) and not self._ya_consultado(fecha):
+            self._completar_hasta(db, fecha)
+
+        encontrada = self._serie.tasa_en(fecha)
+        if encontrada is None:
+            raise ValueError(f"No hay tasa histórica registrada para {fecha} (importe el histórico del BCV)")
+
+        tasa, fecha_tasa = encontrada
+        if (fecha - fecha_tasa).days > settings.TASAS_HISTORICAS_MAX_DIAS_HUECO:
+            raise ValueError(
+                f"No hay tasa histórica cercana a {fecha}: la más próxima es del {fecha_tasa} "
+                f"(importe el histórico del BCV para ese período)"
+            )
+        return tasa, fecha_tasa
+
+    def convertir(
+        self,
+        db: Session,
+        fecha: date,
+        monto_usd: Optional[Decimal] = None,
+        monto_ves: Optional[Decimal] = None,
+    ) -> Dict:
+        """Convierte entre USD y VES con la tasa vigente en la fecha indicada"""
+        if monto_usd is None and monto_ves is None:
+            raise ValueError("Debe proporcionar monto_usd o monto_ves")
+        tasa, fecha_tasa = self.tasa_en(db, fecha)
+        if monto_usd is None:
+            monto_usd = Decimal(monto_ves) / tasa
+        if monto_ves is None:
+            monto_ves = Decimal(monto_usd) * tasa
+        return {
+            "fecha": fecha,
+            "fecha_tasa": fecha_tasa,
+            "tasa_usd_ves": tasa,
+            "monto_usd": Decimal(monto_usd).quantize(CENTAVO, ROUND_HALF_UP),
+            "monto_ves": Decimal(monto_ves).quantize(CENTAVO, ROUND_HALF_UP),
+        }
+
+    def serie(self, db: Session, hasta: Optional[date] = None) -> SerieTasas:
+        """
+        Serie completa para conversiones por lote (ver utils/serie_tasas). Si se
+        indica `hasta`, garantiza que incluya la última tasa registrada hasta esa fecha.
+        """
+        self._asegurar_indice(db)
+        ultima = self._serie.ultima_fecha
+        if hasta is not None and (ultima is None or hasta > ultima) and not self._ya_consultado(hasta):
+            self._completar_hasta(db, hasta)
+        return self._serie
+
+    def convertir_lote(self, db: Session, centavos, fechas, destino: str = "VES"):
+        """
+        Convierte muchos montos (centavos, int64) cada uno con la tasa de su fecha
+        en una sola operación vectorizada. Devuelve (centavos convertidos, tasas en
+        punto fijo). Falla si alguna fecha no tiene tasa cercana.
+        """
+        dias = a_dias(fechas)
+        hasta = a_fecha(dias.max()) if len(dias) else None
+        serie = self.serie(db, hasta)
+        maximo = settings.TASAS_HISTORICAS_MAX_DIAS_HUECO
+        tasas, _ = serie.tasas_en(dias, maximo)
+        return serie.convertir(centavos, dias, destino, maximo), tasas
+
+    def registrar(self, fecha: date, tasa: Decimal):
+        """Agrega (o corrige) una tasa en el índice de este worker sin recargarlo completo"""
+        with self._candado:
+            if self._cargado_en is None:
+                return  # Aún no hay índice: se armará completo al primer uso
+            self._serie = self._serie.combinar([(fecha, tasa)])
+
+    def invalidar(self):
+        with self._candado:
+            self._cargado_en = None
+
+    def _asegurar_indice(self, db: Session):
+        if self._cargado_en is None:
+            registrar_cache("tasas_historicas", False)
+            self._cargar(db)
+        elif time.monotonic() - self._refrescado_en > settings.TASAS_HISTORICAS_RECARGA_SEGUNDOS:
+            registrar_cache("tasas_historicas", False)
+            self._refrescar(db)
+        else:
+            registrar_cache("tasas_historicas", True)
+
+    def _cargar(self, db: Session):
+        filas = db.execute(
+            select(TasaCambio.fecha, TasaCambio.tasa_usd_ves)
+            .where(TasaCambio.fuente == FUENTE)
+            .order_by(TasaCambio.fecha)
+        ).all()
+        serie = SerieTasas.desde_filas(filas)
+        with self._candado:
+            self._serie = serie
+            self._cargado_en = self._refrescado_en = time.monotonic()
+            self._consultado_hasta = None
+        logger.info(f"📈 Índice de tasas históricas cargado: {len(serie)} fechas")
+
+    def _refrescar(self, db: Session):
+        """
+        Actualización incremental: sólo las tasas de los últimos días (las que guarda
+        el job o corrige el BCV). Si la cantidad de fechas en la base no coincide con
+        la serie, otro worker importó un histórico y se recarga completa.
+        """
+        ultima = self._serie.ultima_fecha
+        desde = ultima - timedelta(days=DIAS_REFRESCO) if ultima else date.min
+        filas = db.execute(
+            select(TasaCambio.fecha, TasaCambio.tasa_usd_ves).where(
+                TasaCambio.fuente == FUENTE, TasaCambio.fecha >= desde
+            )
+        ).all()
+        total = db.scalar(select(func.count(TasaCambio.id)).where(TasaCambio.fuente == FUENTE))
+        with self._candado:
+            serie = self._serie.combinar(filas)
+            if len(serie) != total:
+                self._cargado_en = None
+            else:
+                self._serie = serie
+                self._refrescado_en = time.monotonic()
+        if self._cargado_en is None:
+            self._cargar(db)
+
+    def _completar_hasta(self, db: Session, fecha: date):
+        """Fecha posterior al índice: traer de la base la última tasa hasta esa fecha"""
+        fila = db.execute(
+            select(TasaCambio.fecha, TasaCambio.tasa_usd_ves)
+            .where(TasaCambio.fuente == FUENTE, TasaCambio.fecha <= fecha)
+            .order_by(TasaCambio.fecha.desc())
+            .limit(1)
+        ).first()
+        with self._candado:
+            if fila and self._serie.tasa_en(fila[0]) != (Decimal(fila[1]), fila[0]):
+                self._serie = self._serie.combinar([tuple(fila)])
+            if fecha < date.today():
+                self._consultado_hasta = max(fecha, self._consultado_hasta or fecha)
+
+    def _ya_consultado(self, fecha: date) -> bool:
+        # Una fecha pasada no recibe tasas nuevas salvo por importación (que invalida el índice)
+        return fecha < date.today() and self._consultado_hasta is not None and fecha <= self._consultado_hasta
+
+    # ---------- Carga masiva ----------
+
+    def importar_archivo(self, db: Session, flujo: TextIO, formato: str = "csv") -> Dict:
+        """
+        Carga un histórico de tasas (CSV con columnas fecha/tasa, o JSON como
+        lista de {"fecha", "tasa"} u objeto {"AAAA-MM-DD": tasa}). Las fechas ya
+        existentes se actualizan. Devuelve un resumen de la importación.
+        """
+        if formato not in ("csv", "json"):
+            raise ValueError("Formato no soportado (use csv o json)")
+        filas = leer_csv(flujo) if formato == "csv" else leer_json(flujo)
+
+        resumen = {"leidas": 0, "guardadas": 0, "invalidas": 0, "desde": None, "hasta": None, "errores": []}
+        inicio = time.perf_counter()
+        while True:
+            bloque = list(islice(filas, LOTE_IMPORTACION))
+            if not bloque:
+                break
+            validas = {}
+            for numero, fecha, tasa, error in bloque:
+                resumen["leidas"] += 1
+                if error:
+                    resumen["invalidas"] += 1
+                    if len(resumen["errores"]) < MAX_MUESTRAS:
+                        resumen["errores"].append({"linea": numero, "error": error})
+                    continue
+                validas[fecha] = tasa  # Si una fecha se repite en el archivo gana la última
+            if validas:
+                self._guardar_lote(db, validas)
+                resumen["guardadas"] += len(validas)
+                menor, mayor = min(validas), max(validas)
+                resumen["desde"] = min(filter(None, (resumen["desde"], menor)))
+                resumen["hasta"] = max(filter(None, (resumen["hasta"], mayor)))
+        db.commit()
+        self.invalidar()
+
+        resumen["segundos"] = round(time.perf_counter() - inicio, 3)
+        logger.info(
+            f"✅ Histórico de tasas importado: {resumen['guardadas']} fechas "
+            f"({resumen['desde']} a {resumen['hasta']}), {resumen['invalidas']} inválidas"
+        )
+        return resumen
+
+    def _guardar_lote(self, db: Session, tasas: Dict[date, Decimal]):
+        # executemany sobre una sentencia fija (compilada una vez) en vez de un VALUES gigante por lote
+        consulta = insert_para(db, TasaCambio)
+        db.execute(
+            consulta.on_conflict_do_update(
+                index_elements=["fecha", "fuente"],
+                set_={"tasa_usd_ves": consulta.excluded.tasa_usd_ves},
+            ),
+            [{"fecha": f, "tasa_usd_ves": t, "fuente": FUENTE, "es_historica": True} for f, t in tasas.items()],
+        )
+
+
+def _parsear_tasa(texto) -> Decimal:
+    tasa = texto if isinstance(texto, Decimal) else parsear_monto(str(texto))
+    if tasa <= 0:
+        raise ValueError(f"Tasa inválida: '{texto}'")
+    return tasa.quantize(Decimal("0.0001"), ROUND_HALF_UP)
+
+
+def leer_csv(flujo: TextIO) -> Iterator[Tuple[int, Optional[date], Optional[Decimal], Optional[str]]]:
+    """
+    Genera (numero_linea, fecha, tasa, error) fila a fila. Detecta el separador;
+    sin encabezado reconocible asume fecha en la primera columna y tasa en la segunda.
+    """
+    primera = flujo.readline()
+    if not primera:
+        return
+    try:
+        dialecto = csv.Sniffer().sniff(primera, delimiters=",;\t|")
+    except csv.Error:
+        dialecto = csv.excel
+
+    columnas = [c.strip().lower() for c in next(csv.reader([primera], dialecto))]
+    pos_fecha = next((columnas.index(a) for a in ALIAS_FECHA if a in columnas), None)
+    pos_tasa = next((columnas.index(a) for a in ALIAS_TASA if a in columnas), None)
+    lineas: Iterator = csv.reader(flujo, dialecto)
+    if pos_fecha is None or pos_tasa is None:
+        pos_fecha, pos_tasa = 0, 1
+        lineas = _encadenar(next(csv.reader([primera], dialecto)), lineas)
+        inicio = 1
+    else:
+        inicio = 2
+
+    for numero, fila in enumerate(lineas, start=inicio):
+        if not any(c.strip() for c in fila):
+            continue
+        try:
+            if len(fila) <= max(pos_fecha, pos_tasa):
+                raise ValueError("Faltan columnas")
+            yield numero, parsear_fecha(fila[pos_fecha]), _parsear_tasa(fila[pos_tasa]), None
+        except ValueError as e:
+            yield numero, None, None, str(e)
+
+
+def leer_json(flujo: TextIO) -> Iterator[Tuple[int, Optional[date], Optional[Decimal], Optional[str]]]:
+    datos = json.load(flujo, parse_float=Decimal)
+    if isinstance(datos, dict):
+        datos = [{"fecha": f, "tasa": t} for f, t in datos.items()]
+    if not isinstance(datos, list):
+        raise ValueError("El JSON debe ser una lista de {fecha, tasa} o un objeto {fecha: tasa}")
+
+    for numero, registro in enumerate(datos, start=1):
+        try:
+            if not isinstance(registro, dict):
+                raise ValueError("Registro inválido")
+            fecha = next((registro[a] for a in ALIAS_FECHA if a in registro), None)
+            tasa = next((registro[a] for a in ALIAS_TASA if a in registro), None)
+            if fecha is None or tasa is None:
+                raise ValueError("Faltan fecha o tasa")
+            yield numero, parsear_fecha(str(fecha)), _parsear_tasa(tasa), None
+        except ValueError as e:
+            yield numero, None, None, str(e)
+
+
+def _encadenar(primera, resto):
+    yield primera
+    yield from resto
+
+
+# Instancia global
+tasas_historicas_service = TasasHistoricasService()
@@ -0,0 +1,306 @@
+# services/topologia_service.py
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from ..core.cache_http import etiqueta
+from ..core.metricas import registrar_cache
+from ..models.residentes import Residente
+from ..models.torres import Torre, Piso, Apartamento, TipoApartamento
+from .versiones_cache_service import VersionCompartida
+
+logger = logging.getLogger(__name__)
+
+
+# Columnas de Apartamento que forman parte de la topología (estado NO, cambia a diario)
+COLUMNAS_APARTAMENTO_ESTRUCTURALES = ("id_piso", "id_tipo_apartamento", "numero")
+
+
+@dataclass(frozen=True)
+class ApartamentoTopologia:
+    id: int
+    numero: str
+    id_piso: int
+    numero_piso: int
+    id_torre: int
+    id_tipo_apartamento: int
+    tipo_nombre: str
+    porcentaje_aporte: Decimal
+
+
+@dataclass(frozen=True)
+class SnapshotTopologia:
+    """
+    Foto inmutable de torres → pisos → apartamentos.
+    Todo lo que expone es de solo lectura (tuplas y MappingProxyType).
+    """
+
+    version: int
+    apartamentos: Mapping[int, ApartamentoTopologia]
+    ids_todos: Tuple[int, ...]
+    ids_por_torre: Mapping[int, Tuple[int, ...]]
+    ids_por_piso: Mapping[Tuple[int, int], Tuple[int, ...]]  # (id_torre, numero_piso) -> ids
+    torres: Tuple[dict, ...]
+    torres_json: bytes
+    torre_detalle_json: Mapping[str, bytes]  # nombre de torre -> JSON de TorreCompletaOut
+    torres_etag: str
+    torre_detalle_etag: Mapping[str, str]
+    etag: str  # Toda la topología (incluye tipos de apartamento)
+
+    @property
+    def total_apartamentos(self) -> int:
+        return len(self.ids_todos)
+
+
+def _a_json(datos) -> bytes:
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class TopologiaService:
+    """
+    Índice de la estructura del edificio cargado una sola vez y reemplazado
+    completo cuando cambia (torres, pisos, apartamentos o tipos).
+    Las lecturas no tocan la base de datos mientras el snapshot sea válido,
+    salvo la verificación periódica de la versión compartida entre workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[SnapshotTopologia] = None
+        self._version = 0
+        self.compartida = VersionCompartida("topologia")
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidar(self):
+        with self._lock:
+            if self._snapshot is not None:
+                logger.info(f"🏢 Topología v{self._snapshot.version} invalidada")
+            self._snapshot = None
+
+    def asegurar(self, db: Session) -> SnapshotTopologia:
+        snapshot = self._snapshot
+        if snapshot is not None and self.compartida.cambio(db):
+            logger.info("🏢 Topología modificada por otro worker")
+            self.invalidar()
+            snapshot = None
+        registrar_cache("topologia", snapshot is not None)
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None:
+                self.compartida.leer(db)  # Antes de construir: un cambio durante la carga se verá en la próxima
+                self._snapshot = self._construir(db, self._version + 1)
+                self._version = self._snapshot.version
+            return self._snapshot
+
+    def _construir(self, db: Session, version: int) -> SnapshotTopologia:
+        try:
+            tipos = {t.id: t for t in db.query(TipoApartamento).all()}
+            torres = db.query(Torre.id, Torre.nombre).order_by(Torre.id).all()
+            pisos = db.query(Piso.id, Piso.id_torre, Piso.numero).order_by(Piso.id_torre, Piso.numero, Piso.id).all()
+            filas = (
+                db.query(Apartamento.id, Apartamento.numero, Apartamento.id_piso, Apartamento.id_tipo_apartamento)
+                .order_by(Apartamento.id_piso, Apartamento.id)
+                .all()
+            )
+        except Exception as e:
+            logger.error(f"Error construyendo topología: {str(e)}")
+            raise
+
+        tipos_json = {
+            t.id: {
+                "id": t.id,
+                "nombre": t.nombre,
+                "habitaciones": t.habitaciones,
+                "banos": t.banos,
+                "descripcion": None,
+                "porcentaje_aporte": float(t.porcentaje_aporte),
+            }
+            for t in tipos.values()
+        }
+
+        pisos_por_id = {p.id: p for p in pisos}
+        apartamentos: Dict[int, ApartamentoTopologia] = {}
+        aptos_por_piso: Dict[int, List[ApartamentoTopologia]] = {p.id: [] for p in pisos}
+
+        for fila in filas:
+            piso = pisos_por_id.get(fila.id_piso)
+            tipo = tipos.get(fila.id_tipo_apartamento)
+            if piso is None or tipo is None:
+                continue
+            apt = ApartamentoTopologia(
+                id=fila.id,
+                numero=fila.numero,
+                id_piso=piso.id,
+                numero_piso=piso.numero,
+                id_torre=piso.id_torre,
+                id_tipo_apartamento=tipo.id,
+                tipo_nombre=tipo.nombre,
+                porcentaje_aporte=Decimal(str(tipo.porcentaje_aporte)),
+            )
+            apartamentos[apt.id] = apt
+            aptos_por_piso[piso.id].append(apt)
+
+        ids_por_torre: Dict[int, Tuple[int, ...]] = {}
+        ids_por_piso: Dict[Tuple[int, int], Tuple[int, ...]] = {}
+        resumen_torres = []
+        detalle_json: Dict[str, bytes] = {}
+
+        for torre in torres:
+            pisos_torre = [p for p in pisos if p.id_torre == torre.id]
+            ids_torre: List[int] = []
+            pisos_data = []
+
+            for piso in pisos_torre:
+                aptos = aptos_por_piso[piso.id]
+                ids_piso = tuple(a.id for a in aptos)
+                ids_por_piso[(torre.id, piso.numero)] = ids_por_piso.get((torre.id, piso.numero), ()) + ids_piso
+                ids_torre.extend(ids_piso)
+                pisos_data.append(
+                    {
+                        "id": piso.id,
+                        "numero": piso.numero,
+                        "descripcion": None,
+                        "apartamentos": [
+                            {
+                                "id": a.id,
+                                "numero": a.numero,
+                                "id_piso": a.id_piso,
+                                "tipo_apartamento": tipos_json[a.id_tipo_apartamento],
+                            }
+                            for a in aptos
+                        ],
+                    }
+                )
+
+            ids_por_torre[torre.id] = tuple(ids_torre)
+            resumen = {
+                "id": torre.id,
+                "nombre": torre.nombre,
+                "cantidad_pisos": len(pisos_torre),
+                "cantidad_apartamentos": len(ids_torre),
+            }
+            resumen_torres.append(resumen)
+            detalle_json[torre.nombre] = _a_json({**resumen, "descripcion": None, "pisos": pisos_data})
+
+        torres_json = _a_json(resumen_torres)
+        snapshot = SnapshotTopologia(
+            version=version,
+            apartamentos=MappingProxyType(apartamentos),
+            ids_todos=tuple(apartamentos.keys()),
+            ids_por_torre=MappingProxyType(ids_por_torre),
+            ids_por_piso=MappingProxyType(ids_por_piso),
+            torres=tuple(MappingProxyType(r) for r in resumen_torres),
+            torres_json=torres_json,
+            torre_detalle_json=MappingProxyType(detalle_json),
+            torres_etag=etiqueta(torres_json),
+            torre_detalle_etag=MappingProxyType(
+                {nombre: etiqueta(contenido) for nombre, contenido in detalle_json.items()}
+            ),
+            etag=etiqueta(torres_json, *(detalle_json[nombre] for nombre in sorted(detalle_json))),
+        )
+        logger.info(
+            f"🏢 Topología v{version} cargada: {len(torres)} torres, {len(pisos)} pisos, {len(apartamentos)} apartamentos"
+        )
+        return snapshot
+
+    # ==================
+    # ---- Consultas ----
+    # ==================
+
+    def ids_todos(self, db: Session) -> List[int]:
+        return list(self.asegurar(db).ids_todos)
+
+    def ids_por_torre(self, db: Session, torre_id: int) -> List[int]:
+        return list(self.asegurar(db).ids_por_torre.get(torre_id, ()))
+
+    def ids_por_piso(self, db: Session, torre_id: int, numero_piso: int) -> List[int]:
+        return list(self.asegurar(db).ids_por_piso.get((torre_id, numero_piso), ()))
+
+    def ids_existentes(self, db: Session, apartamentos_ids: List[int]) -> List[int]:
+        apartamentos = self.asegurar(db).apartamentos
+        return [apt_id for apt_id in apartamentos_ids if apt_id in apartamentos]
+
+    def apartamentos(self, db: Session, apartamentos_ids: List[int]) -> List[ApartamentoTopologia]:
+        apartamentos = self.asegurar(db).apartamentos
+        return [apartamentos[apt_id] for apt_id in apartamentos_ids if apt_id in apartamentos]
+
+    def version_ocupacion(self, db: Session, condicion) -> str:
+        """
+        Huella del estado de los apartamentos que cumplen `condicion` (los de la
+        respuesta) y de sus residentes, que no entran en el snapshot (cambian a diario)
+        pero sí en las respuestas que anidan ApartamentoOut. Lee sólo esas columnas,
+        sin armar objetos del ORM.
+        """
+        filas = db.execute(
+            select(
+                Apartamento.id,
+                Apartamento.estado,
+                Residente.id,
+                Residente.nombre,
+                Residente.cedula,
+                Residente.tipo_residente,
+                Residente.correo,
+                Residente.telefono,
+            )
+            .outerjoin(Residente, Residente.id_apartamento == Apartamento.id)
+            .where(condicion)
+            .order_by(Apartamento.id, Residente.id)
+        ).all()
+        return etiqueta(*map(tuple, filas))
+
+
+# Instancia global
+topologia_service = TopologiaService()
+
+
+# ==============================
+# ---- Invalidación por ORM ----
+# ==============================
+# Se marca la sesión en flush y se invalida sólo cuando la transacción confirma,
+# así un rollback no descarta el snapshot y otro hilo no ve cambios a medias.
+# En la misma transacción se incrementa la versión compartida, para los demás workers.
+
+
+def _marcar_sesion(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is None or not session.info.get("topologia_sucia"):
+        topologia_service.compartida.incrementar(connection)
+    if session is not None:
+        session.info["topologia_sucia"] = True
+
+
+def _marcar_si_cambio(mapper, connection, target):
+    # after_update también se dispara para objetos "dirty" sin cambios netos
+    estado = inspect(target)
+    columnas = COLUMNAS_APARTAMENTO_ESTRUCTURALES if mapper.class_ is Apartamento else mapper.columns.keys()
+    if any(estado.attrs[col].history.has_changes() for col in columnas):
+        _marcar_sesion(mapper, connection, target)
+
+
+for _modelo in (Torre, Piso, Apartamento, TipoApartamento):
+    event.listen(_modelo, "after_insert", _marcar_sesion)
+    event.listen(_modelo, "after_update", _marcar_si_cambio)
+    event.listen(_modelo, "after_delete", _marcar_sesion)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_tras_commit(session):
+    if session.info.pop("topologia_sucia", False):
+        topologia_service.invalidar()
+
+
+@event.listens_for(Session, "after_rollback")
+def _limpiar_tras_rollback(session):
+    session.info.pop("topologia_sucia", None)
@@ -0,0 +1,57 @@
+# services/versiones_cache_service.py
+"""
+Versión de los caches en memoria compartida entre workers.
+
+Cada proceso descarta su cache (topología, índice de búsqueda) cuando él
+mismo confirma un cambio, pero los demás workers no se enteran. Por eso la
+transacción que cambia los datos incrementa también la fila del cache en
+versiones_cache (se confirma o se revierte con ella) y, antes de servir desde
+memoria, cada proceso compara esa versión con la que leyó al construir su
+copia. La lectura ocurre como mucho una vez cada CACHE_VERIFICACION_SEGUNDOS.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.sistema import VersionCache
+from ..utils.db_helpers import insert_para
+
+
+class VersionCompartida:
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self._lock = threading.Lock()
+        self._conocida: Optional[int] = None
+        self._verificada_en = float("-inf")
+
+    def incrementar(self, conexion: Connection):
+        """Dentro de la transacción que cambia los datos (p. ej. desde un evento de flush)"""
+        conexion.execute(
+            insert_para(conexion, VersionCache)
+            .values(nombre=self.nombre, version=1)
+            .on_conflict_do_update(
+                index_elements=["nombre"],
+                set_={"version": VersionCache.__table__.c.version + 1, "actualizado_en": func.now()},
+            )
+        )
+
+    def leer(self, db: Session) -> int:
+        """Lee la versión actual y la toma como la del cache (llamar antes de construirlo)"""
+        version = db.scalar(select(VersionCache.version).where(VersionCache.nombre == self.nombre)) or 0
+        with self._lock:
+            self._conocida, self._verificada_en = version, time.monotonic()
+        return version
+
+    def cambio(self, db: Session) -> bool:
+        """True si otro proceso confirmó cambios desde la última lectura"""
+        if time.monotonic() - self._verificada_en < settings.CACHE_VERIFICACION_SEGUNDOS:
+            return False
+        anterior = self._conocida
+        return self.leer(db) != anterior
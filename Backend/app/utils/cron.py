@@ -0,0 +1,100 @@
+# utils/cron.py
+"""
+Expresiones cron de 5 campos (minuto hora día-mes mes día-semana).
+
+Soporta "*", listas (1,15), rangos (1-5), pasos (*/10, 0-30/5) y el día de la
+semana 0-7 (0 y 7 = domingo). Como en cron, si día del mes y día de la semana
+están restringidos a la vez, basta con que coincida uno de los dos.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Iterator
+
+# (mínimo, máximo) de cada campo
+_RANGOS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+# Límite de búsqueda: una expresión imposible (p. ej. 31 de febrero) no debe colgar el programador
+_MAX_ITERACIONES = 100000
+
+
+class ExpresionCron:
+    def __init__(self, expresion: str):
+        partes = expresion.split()
+        if len(partes) != 5:
+            raise ValueError(f"Expresión cron inválida '{expresion}': se esperan 5 campos")
+
+        self.expresion = expresion
+        campos = [_parsear_campo(parte, minimo, maximo) for parte, (minimo, maximo) in zip(partes, _RANGOS)]
+        self.minutos, self.horas, self.dias, self.meses, dias_semana = campos
+        # cron usa 0 = domingo; datetime.weekday() usa 0 = lunes
+        self.dias_semana = {(d - 1) % 7 for d in dias_semana}
+        self._dia_libre = partes[2] == "*"
+        self._semana_libre = partes[4] == "*"
+
+    def __repr__(self) -> str:
+        return f"ExpresionCron('{self.expresion}')"
+
+    def _coincide_dia(self, momento: datetime) -> bool:
+        en_dia = momento.day in self.dias
+        en_semana = momento.weekday() in self.dias_semana
+        if self._dia_libre or self._semana_libre:
+            return en_dia and en_semana
+        return en_dia or en_semana
+
+    def coincide(self, momento: datetime) -> bool:
+        return (
+            momento.minute in self.minutos
+            and momento.hour in self.horas
+            and momento.month in self.meses
+            and self._coincide_dia(momento)
+        )
+
+    def coincide_fecha(self, fecha: date) -> bool:
+        """True si la expresión tiene algún turno en ese día"""
+        return fecha.month in self.meses and self._coincide_dia(datetime.combine(fecha, time()))
+
+    def siguiente(self, despues_de: datetime) -> datetime:
+        """Primer instante que coincide estrictamente posterior a `despues_de` (precisión de minuto)"""
+        momento = despues_de.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(_MAX_ITERACIONES):
+            if momento.month not in self.meses:
+                anio, mes = (momento.year + 1, 1) if momento.month == 12 else (momento.year, momento.month + 1)
+                momento = momento.replace(year=anio, month=mes, day=1, hour=0, minute=0)
+            elif not self._coincide_dia(momento):
+                momento = momento.replace(hour=0, minute=0) + timedelta(days=1)
+            elif momento.hour not in self.horas:
+                momento = momento.replace(minute=0) + timedelta(hours=1)
+            elif momento.minute not in self.minutos:
+                momento += timedelta(minutes=1)
+            else:
+                return momento
+        raise ValueError(f"La expresión cron '{self.expresion}' no tiene ejecuciones próximas")
+
+    def entre(self, desde: datetime, hasta: datetime) -> Iterator[datetime]:
+        """Instantes que coinciden en el intervalo (desde, hasta]"""
+        momento = self.siguiente(desde)
+        while momento <= hasta:
+            yield momento
+            momento = self.siguiente(momento)
+
+
+def _parsear_campo(texto: str, minimo: int, maximo: int) -> set:
+    valores = set()
+    for parte in texto.split(","):
+        rango, _, paso = parte.partition("/")
+        try:
+            paso = int(paso) if paso else 1
+            if rango == "*":
+                inicio, fin = minimo, maximo
+            elif "-" in rango:
+                inicio, fin = (int(v) for v in rango.split("-", 1))
+            else:
+                inicio = int(rango)
+                fin = maximo if paso > 1 else inicio
+        except ValueError:
+            raise ValueError(f"Campo cron inválido: '{texto}'")
+
+        if paso < 1 or inicio < minimo or fin > maximo or inicio > fin:
+            raise ValueError(f"Campo cron fuera de rango: '{texto}' (permitido {minimo}-{maximo})")
+        valores.update(range(inicio, fin + 1, paso))
+    return valores
@@ -1,3 +1,8 @@
+import io
+from typing import Dict, List, Union
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import Session
 
 
@@ -5,3 +10,83 @@ from sqlalchemy.orm import Session
 def guardar_y_refrescar(db: Session, obj):
     db.commit()
     db.refresh(obj)
+
+
+# INSERT con soporte de ON CONFLICT según el motor de la sesión o conexión (PostgreSQL o SQLite)
+def insert_para(db: Union[Session, Connection], modelo):
+    bind = db if isinstance(db, Connection) else db.get_bind()
+    if bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(modelo)
+
+
+# Carga masiva de filas (dicts con las mismas claves) en la transacción de la sesión.
+# PostgreSQL: COPY, sin armar un INSERT ... VALUES por lote en el cliente; los ids se reservan
+# antes en la secuencia de la tabla. Otros motores: executemany por lotes con RETURNING.
+# COPY sólo aplica los DEFAULT del servidor: los `default=` del modelo que falten en las filas
+# (constantes o func.now()) se calculan una vez y se agregan como columnas.
+# Con devolver_ids devuelve los ids en el orden de las filas.
+def insertar_masivo(db: Session, modelo, filas: List[Dict], devolver_ids: bool = False, lote: int = 5000) -> List[int]:
+    if not filas:
+        return []
+    tabla = modelo.__table__
+    conexion = db.connection()
+
+    if conexion.dialect.name != "postgresql":
+        consulta = (
+            tabla.insert().returning(tabla.c.id, sort_by_parameter_order=True) if devolver_ids else tabla.insert()
+        )
+        ids = []
+        for inicio in range(0, len(filas), lote):
+            resultado = conexion.execute(consulta, filas[inicio : inicio + lote])
+            if devolver_ids:
+                ids.extend(resultado.scalars())
+        return ids
+
+    ids = []
+    if devolver_ids:
+        ids = (
+            conexion.execute(
+                text("SELECT nextval(pg_get_serial_sequence(:tabla, 'id')) FROM generate_series(1, :n)"),
+                {"tabla": tabla.name, "n": len(filas)},
+            )
+            .scalars()
+            .all()
+        )
+    columnas = list(filas[0])
+    por_defecto = _defaults_del_modelo(conexion, tabla, columnas)
+    todas = columnas + list(por_defecto)
+    # Mismas conversiones que un INSERT (p. ej. los Enum se guardan por nombre)
+    procesadores = [tabla.c[c].type.bind_processor(conexion.dialect) for c in todas]
+    sentencia = f"COPY {tabla.name} ({', '.join((['id'] if ids else []) + todas)}) FROM STDIN"
+    cursor = conexion.connection.cursor()
+    for inicio in range(0, len(filas), lote):
+        buffer = io.StringIO()
+        for posicion in range(inicio, min(inicio + lote, len(filas))):
+            crudos = [filas[posicion][c] for c in columnas] + list(por_defecto.values())
+            valores = [(p(v) if p else v) for p, v in zip(procesadores, crudos)]
+            buffer.write("\t".join(map(_valor_copy, ([ids[posicion]] if ids else []) + valores)) + "\n")
+        buffer.seek(0)
+        cursor.copy_expert(sentencia, buffer)
+    return ids
+
+
+def _defaults_del_modelo(conexion, tabla, columnas: List[str]) -> Dict:
+    valores = {}
+    for columna in tabla.columns:
+        default = columna.default
+        if columna.name in columnas or columna.primary_key or default is None:
+            continue
+        if default.is_scalar:
+            valores[columna.name] = default.arg
+        elif default.is_clause_element:
+            valores[columna.name] = conexion.scalar(select(default.arg))
+    return valores
+
+
+def _valor_copy(valor) -> str:
+    if valor is None:
+        return "\\N"
+    return str(valor).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
@@ -0,0 +1,100 @@
+# utils/grafico_llamas.py
+"""
+Gráficos de llamas a partir de pilas muestreadas.
+
+Las pilas llegan como {(marco raíz, ..., marco hoja): muestras}, con cada
+marco ya convertido en texto. Se exportan en el formato "plegado" de
+flamegraph.pl (una línea "a;b;c 12" por pila, que también leen speedscope e
+Inferno) o como un SVG autocontenido: la raíz arriba, el ancho de cada
+rectángulo proporcional a sus muestras y el detalle en el tooltip.
+"""
+
+from html import escape
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+ANCHO = 1200
+ALTO_FILA = 17
+MARGEN = 10
+ANCHO_CARACTER = 6.5  # Aproximado para la fuente de 11px
+ANCHO_MINIMO = 0.3  # Marcos más angostos (en px) no se dibujan
+
+
+def plegadas(pilas: Dict[Tuple[str, ...], int]) -> str:
+    """Formato de flamegraph.pl: "raiz;...;hoja muestras" por línea"""
+    lineas = sorted(f"{';'.join(pila)} {muestras}" for pila, muestras in pilas.items() if pila)
+    return "\n".join(lineas) + "\n"
+
+
+class _Nodo:
+    __slots__ = ("nombre", "muestras", "hijos")
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.muestras = 0
+        self.hijos: Dict[str, "_Nodo"] = {}
+
+
+def _arbol(pilas: Dict[Tuple[str, ...], int]) -> _Nodo:
+    raiz = _Nodo("todas")
+    for pila, muestras in pilas.items():
+        raiz.muestras += muestras
+        nodo = raiz
+        for nombre in pila:
+            nodo = nodo.hijos.setdefault(nombre, _Nodo(nombre))
+            nodo.muestras += muestras
+    return raiz
+
+
+def _profundidad(nodo: _Nodo) -> int:
+    return 1 + max((_profundidad(h) for h in nodo.hijos.values()), default=0)
+
+
+def _color(nombre: str, resaltar: Optional[Callable[[str], bool]]) -> str:
+    # Color estable por nombre; los marcos resaltados (el código propio) en tonos cálidos
+    tono = sum(ord(c) for c in nombre) % 40
+    if resaltar is not None and resaltar(nombre):
+        return f"rgb(230,{110 + tono * 2},40)"
+    return f"rgb({150 + tono},{170 + tono},{200 + tono // 2})"
+
+
+def grafico_svg(
+    pilas: Dict[Tuple[str, ...], int],
+    titulo: str = "Gráfico de llamas",
+    resaltar: Optional[Callable[[str], bool]] = None,
+    unidad: str = "muestras",
+) -> str:
+    """SVG con la raíz arriba; `resaltar(nombre)` decide qué marcos van en color cálido"""
+    raiz = _arbol(pilas)
+    profundidad = _profundidad(raiz)
+    alto = MARGEN * 2 + 24 + profundidad * ALTO_FILA
+    escala = (ANCHO - 2 * MARGEN) / max(raiz.muestras, 1)
+
+    partes = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{ANCHO}" height="{alto}" '
+        f'viewBox="0 0 {ANCHO} {alto}" font-family="Verdana, sans-serif" font-size="11">',
+        f'<rect width="100%" height="100%" fill="#fafafa"/>',
+        f'<text x="{ANCHO / 2}" y="{MARGEN + 12}" text-anchor="middle" font-size="14">{escape(titulo)}</text>',
+    ]
+
+    def dibujar(nodos: Iterable[_Nodo], x: float, nivel: int):
+        y = MARGEN + 24 + nivel * ALTO_FILA
+        for nodo in sorted(nodos, key=lambda n: n.nombre):
+            ancho = nodo.muestras * escala
+            if ancho >= ANCHO_MINIMO:
+                porcentaje = 100 * nodo.muestras / raiz.muestras
+                detalle = escape(f"{nodo.nombre} ({nodo.muestras} {unidad}, {porcentaje:.1f}%)")
+                partes.append(
+                    f'<g><title>{detalle}</title><rect x="{x:.1f}" y="{y}" width="{ancho:.1f}" '
+                    f'height="{ALTO_FILA - 1}" rx="2" fill="{_color(nodo.nombre, resaltar)}"/>'
+                )
+                caben = int((ancho - 4) / ANCHO_CARACTER)
+                if caben >= 3:
+                    texto = nodo.nombre if len(nodo.nombre) <= caben else nodo.nombre[: caben - 2] + ".."
+                    partes.append(f'<text x="{x + 2:.1f}" y="{y + 12}">{escape(texto)}</text>')
+                partes.append("</g>")
+                dibujar(nodo.hijos.values(), x, nivel + 1)
+            x += ancho
+
+    dibujar([raiz], MARGEN, 0)
+    partes.append("</svg>")
+    return "\n".join(partes)
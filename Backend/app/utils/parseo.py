@@ -0,0 +1,54 @@
+# utils/parseo.py
+"""
+Lectura de montos y fechas escritos como los publican los bancos y el BCV
+(extractos CSV/OFX, histórico de tasas): separadores decimales de ambos
+estilos, símbolos de moneda y varios formatos de fecha.
+"""
+
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+FORMATOS_FECHA = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%Y%m%d")
+
+
+def parsear_monto(texto: str, separador_decimal: Optional[str] = None) -> Decimal:
+    """
+    Acepta "1.234,56", "1,234.56", "1.234.567", "1234.56", "Bs. 1234,56" ...
+    Con separador_decimal ("," o ".") el otro signo es siempre de miles ("1.234" con "," -> 1234);
+    sin él se deduce de cada monto.
+    """
+    limpio = re.sub(r"[^\d,.\-]", "", texto or "")
+    decimal = separador_decimal or _deducir_separador_decimal(limpio)
+    miles = "." if decimal == "," else ","
+    if decimal in limpio and miles in limpio[limpio.index(decimal) :]:
+        raise ValueError(f"Monto inválido: '{texto}'")
+    try:
+        return Decimal(limpio.replace(miles, "").replace(decimal, "."))
+    except InvalidOperation:
+        raise ValueError(f"Monto inválido: '{texto}'")
+
+
+def _deducir_separador_decimal(limpio: str) -> str:
+    if "," in limpio and "." in limpio:
+        return "," if limpio.rfind(",") > limpio.rfind(".") else "."
+    if limpio.count(".") > 1:  # "1.234.567": sólo puede ser de miles
+        return ","
+    if limpio.count(",") > 1:
+        return "."
+    return "," if "," in limpio else "."
+
+
+def parsear_fecha(texto: str) -> date:
+    texto = (texto or "").strip()
+    # Fecha con hora ("2025-01-31 10:00"), y OFX: AAAAMMDD[HHMMSS[.XXX][zona]] sólo con su propio formato,
+    # para que "29/02/2023" no termine leyéndose como "29/02/20"
+    intentos = [(candidato, formato) for candidato in (texto, texto[:10]) for formato in FORMATOS_FECHA]
+    intentos.append((texto[:8], "%Y%m%d"))
+    for candidato, formato in intentos:
+        try:
+            return datetime.strptime(candidato, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha inválida: '{texto}'")
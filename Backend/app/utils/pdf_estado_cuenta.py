@@ -0,0 +1,176 @@
+# utils/pdf_estado_cuenta.py
+"""
+Renderizado del estado de cuenta en PDF (ReportLab).
+
+Módulo sin dependencias de la base de datos ni de la app: se importa en los
+procesos del pool de renderizado, que reciben los datos ya serializados
+(dict JSON: montos como texto, fechas ISO) y sólo dibujan el documento.
+"""
+
+import os
+import threading
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+ESTILO_TABLA = TableStyle(
+    [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1F4E79")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#F2F2F2")]),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]
+)
+
+
+def renderizar_estado_cuenta(ruta: str, datos: dict) -> str:
+    """
+    Escribe el PDF en `ruta` (primero a un temporal y luego rename atómico, así un
+    lector nunca ve un archivo a medias). Devuelve la ruta.
+    """
+    estilos = getSampleStyleSheet()
+    encabezado = datos["encabezado"]
+    info = datos["informacion_apartamento"]
+    apartamento = info["apartamento"]
+    residente = info.get("residente_actual") or {}
+    resumen = datos["resumen_ejecutivo"]
+    detalle = datos["detalle_periodo_actual"]
+
+    elementos = [
+        Paragraph("Estado de Cuenta", estilos["Title"]),
+        Paragraph(
+            f"Período <b>{encabezado['periodo_consulta']}</b> · generado el {encabezado['fecha_generacion'][:10]}",
+            estilos["Normal"],
+        ),
+        Spacer(1, 0.4 * cm),
+        _tabla(
+            [
+                ["Torre", "Piso", "Apartamento", "Tipo", "Residente", "Cédula"],
+                [
+                    apartamento["torre"],
+                    apartamento["piso"],
+                    apartamento["numero"],
+                    apartamento["tipo"],
+                    residente.get("nombre", "Sin residente"),
+                    residente.get("cedula", "-"),
+                ],
+            ]
+        ),
+        Spacer(1, 0.4 * cm),
+        _tabla(
+            [
+                ["Saldo anterior", "Cargos del mes", "Pagos del mes", "Saldo actual", "Estado"],
+                [
+                    _monto(detalle["saldo_anterior_usd"]),
+                    _monto(detalle["total_cargos_usd"]),
+                    _monto(detalle["total_pagos_usd"]),
+                    _monto(detalle["saldo_actual_usd"]),
+                    resumen["estado_cuenta"],
+                ],
+            ]
+        ),
+        Spacer(1, 0.5 * cm),
+        Paragraph("Cargos del período", estilos["Heading3"]),
+        _tabla(
+            [["Fecha", "Descripción", "Tipo", "Monto USD", "Monto VES"]]
+            + [
+                [
+                    c["fecha_gasto"],
+                    Paragraph(escape(c["descripcion"]), estilos["BodyText"]),
+                    c["tipo_gasto"],
+                    _monto(c["monto_asignado_usd"]),
+                    _monto(c["monto_asignado_ves"]),
+                ]
+                for c in detalle["detalle_cargos"]
+            ]
+            + ([] if detalle["detalle_cargos"] else [["-", "Sin cargos en el período", "", "", ""]]),
+            anchos=[2.2 * cm, 8 * cm, 2 * cm, 2.6 * cm, 3 * cm],
+        ),
+        Spacer(1, 0.5 * cm),
+        Paragraph("Pagos del período", estilos["Heading3"]),
+        _tabla(
+            [["Fecha", "Concepto", "Método", "Estado", "Monto USD", "Monto VES"]]
+            + [
+                [
+                    p["fecha_pago"] or "-",
+                    Paragraph(escape(p["concepto"]), estilos["BodyText"]),
+                    p["metodo_pago"],
+                    p["estado"],
+                    _monto(p["monto_usd"]),
+                    _monto(p["monto_ves"]),
+                ]
+                for p in detalle["detalle_pagos"]
+            ]
+            + ([] if detalle["detalle_pagos"] else [["-", "Sin pagos en el período", "", "", "", ""]]),
+            anchos=[2.2 * cm, 6 * cm, 2.6 * cm, 2 * cm, 2.4 * cm, 2.6 * cm],
+        ),
+    ]
+
+    if datos.get("historico_movimientos"):
+        elementos += [
+            Spacer(1, 0.5 * cm),
+            Paragraph("Últimos meses", estilos["Heading3"]),
+            _tabla(
+                [["Período", "Cargos USD", "Pagos USD", "Saldo USD"]]
+                + [
+                    [
+                        h["periodo"],
+                        _monto(h["total_cargos_usd"]),
+                        _monto(h["total_pagos_usd"]),
+                        _monto(h["saldo_final_usd"]),
+                    ]
+                    for h in datos["historico_movimientos"]
+                ]
+            ),
+        ]
+
+    elementos += [Spacer(1, 0.5 * cm), Paragraph("Observaciones", estilos["Heading3"])]
+    elementos += [Paragraph(f"• {escape(texto)}", estilos["BodyText"]) for texto in datos.get("recomendaciones", [])]
+
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"  # Un temporal por hilo
+    documento = SimpleDocTemplate(
+        temporal,
+        pagesize=letter,
+        title=f"Estado de cuenta {apartamento['numero']} {encabezado['periodo_consulta']}",
+        leftMargin=1.5 * cm,
+        rightMargin=1.5 * cm,
+        topMargin=1.5 * cm,
+        bottomMargin=1.5 * cm,
+    )
+    documento.build(elementos)
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def renderizar_lote(tareas: list) -> list:
+    """
+    Renderiza varios estados de cuenta [(ruta, datos), ...] en el mismo proceso.
+    Unidad de trabajo del pool: enviar bloques en vez de PDFs sueltos reduce el
+    costo de comunicación entre procesos. Devuelve [(ruta, error o None), ...].
+    """
+    resultados = []
+    for ruta, datos in tareas:
+        try:
+            renderizar_estado_cuenta(ruta, datos)
+            resultados.append((ruta, None))
+        except Exception as e:
+            resultados.append((ruta, str(e)))
+    return resultados
+
+
+def _tabla(filas, anchos=None) -> Table:
+    tabla = Table([[("" if v is None else v) for v in fila] for fila in filas], colWidths=anchos, repeatRows=1)
+    tabla.setStyle(ESTILO_TABLA)
+    return tabla
+
+
+def _monto(valor) -> str:
+    return f"{Decimal(str(valor or 0)):,.2f}"
@@ -0,0 +1,169 @@
+# utils/serie_tasas.py
+"""
+Serie de tasas de cambio compacta para conversiones por lote (NumPy).
+
+Las fechas se guardan como días desde 1970-01-01 (int32, igual que
+datetime64[D]) y las tasas en punto fijo con 4 decimales (int64, como
+Numeric(10, 4) de tasas_cambio). Los montos entran y salen en centavos
+(int64), así la conversión es aritmética entera y redondea igual que
+Decimal con ROUND_HALF_UP.
+
+La serie es inmutable: combinar() devuelve una nueva, de modo que un hilo que
+está leyendo nunca ve los arreglos a medio actualizar.
+"""
+
+from bisect import bisect_right
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+EPOCA = date(1970, 1, 1)
+_ORDINAL_EPOCA = EPOCA.toordinal()
+ESCALA = 10_000  # Tasa en punto fijo: 4 decimales
+# Margen para los productos intermedios (monto * tasa * 2) dentro de int64
+_MAXIMO_PRODUCTO = 2**62
+
+
+def a_dia(fecha: date) -> int:
+    """Día de una fecha (o de un datetime, sin la hora)"""
+    return fecha.toordinal() - _ORDINAL_EPOCA
+
+
+def a_fecha(dia: int) -> date:
+    return EPOCA + timedelta(days=int(dia))
+
+
+def a_dias(fechas) -> np.ndarray:
+    """Fechas (lista de date/datetime, datetime64 o días ya convertidos) -> días int32"""
+    if isinstance(fechas, np.ndarray):
+        if np.issubdtype(fechas.dtype, np.datetime64):
+            return fechas.astype("datetime64[D]").astype(np.int32)
+        if np.issubdtype(fechas.dtype, np.integer):
+            return fechas.astype(np.int32, copy=False)
+    return np.fromiter((a_dia(f) for f in fechas), dtype=np.int32, count=len(fechas))
+
+
+def a_centavos(montos) -> np.ndarray:
+    """Montos (Decimal, float o int en unidades) -> centavos int64 redondeados con ROUND_HALF_UP"""
+    if isinstance(montos, np.ndarray) and np.issubdtype(montos.dtype, np.floating):
+        centavos = np.floor(np.abs(montos) * 100 + 0.5)  # Mitades lejos de cero, como _dividir_redondeando
+        return np.where(montos < 0, -centavos, centavos).astype(np.int64)
+    return np.fromiter(
+        (int((Decimal(m) * 100).to_integral_value(rounding=ROUND_HALF_UP)) for m in montos),
+        dtype=np.int64,
+        count=len(montos),
+    )
+
+
+def _dividir_redondeando(numerador: np.ndarray, divisor) -> np.ndarray:
+    """numerador / divisor con ROUND_HALF_UP (lejos de cero), divisor > 0"""
+    cociente = (2 * np.abs(numerador) + divisor) // (2 * divisor)
+    return np.where(numerador < 0, -cociente, cociente)
+
+
+class SerieTasas:
+    __slots__ = ("dias", "tasas", "_dias_lista", "_tasas_decimal")
+
+    def __init__(self, dias: np.ndarray, tasas: np.ndarray):
+        # Ordenados por día y sin repetidos (lo garantizan desde_filas y combinar)
+        self.dias = dias
+        self.tasas = tasas
+        # Copia en listas para la búsqueda de una sola fecha: bisect sobre listas evita
+        # el costo fijo de llamar a NumPy y de convertir sus escalares en cada consulta
+        self._dias_lista = dias.tolist()
+        self._tasas_decimal = [Decimal(t).scaleb(-4) for t in tasas.tolist()]
+
+    @classmethod
+    def vacia(cls) -> "SerieTasas":
+        return cls(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64))
+
+    @classmethod
+    def desde_filas(cls, filas: Iterable[Tuple[date, Decimal]]) -> "SerieTasas":
+        return cls.vacia().combinar(filas)
+
+    def __len__(self) -> int:
+        return len(self._dias_lista)
+
+    def __repr__(self) -> str:
+        if not len(self):
+            return "SerieTasas(vacía)"
+        return f"SerieTasas({len(self)} fechas, {self.primera_fecha} a {self.ultima_fecha})"
+
+    @property
+    def primera_fecha(self) -> Optional[date]:
+        return a_fecha(self._dias_lista[0]) if len(self) else None
+
+    @property
+    def ultima_fecha(self) -> Optional[date]:
+        return a_fecha(self._dias_lista[-1]) if len(self) else None
+
+    def combinar(self, filas: Iterable[Tuple[date, Decimal]]) -> "SerieTasas":
+        """Nueva serie con las filas agregadas; una fecha ya presente toma la tasa nueva"""
+        filas = list(filas)
+        if not filas:
+            return self
+        dias = np.fromiter((a_dia(f) for f, _ in filas), dtype=np.int32, count=len(filas))
+        tasas = np.fromiter(
+            (int((Decimal(t) * ESCALA).to_integral_value(rounding=ROUND_HALF_UP)) for _, t in filas),
+            dtype=np.int64,
+            count=len(filas),
+        )
+        # Nuevas primero: np.unique se queda con la primera aparición de cada día
+        todos_dias = np.concatenate((dias[::-1], self.dias))
+        todas_tasas = np.concatenate((tasas[::-1], self.tasas))
+        dias_unicos, primera = np.unique(todos_dias, return_index=True)
+        return SerieTasas(dias_unicos.astype(np.int32), todas_tasas[primera])
+
+    def tasa_en(self, fecha: date) -> Optional[Tuple[Decimal, date]]:
+        """(tasa, fecha_de_la_tasa) vigente en la fecha, o None si es anterior a la serie"""
+        posicion = bisect_right(self._dias_lista, a_dia(fecha)) - 1
+        if posicion < 0:
+            return None
+        return self._tasas_decimal[posicion], a_fecha(self._dias_lista[posicion])
+
+    def tasas_en(self, fechas, max_hueco: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Tasas en punto fijo (int64) y día de cada tasa (int32) para todas las fechas:
+        la del mismo día o la del día hábil anterior más cercano.
+        """
+        dias = a_dias(fechas)
+        posiciones = np.searchsorted(self.dias, dias, side="right") - 1
+        sin_tasa = posiciones < 0
+        if max_hueco is not None and len(self):
+            sin_tasa |= dias - self.dias[np.maximum(posiciones, 0)] > max_hueco
+        if sin_tasa.any():
+            primera = a_fecha(dias[np.argmax(sin_tasa)])
+            raise ValueError(
+                f"No hay tasa histórica para {int(sin_tasa.sum())} fecha(s), la primera {primera} "
+                f"(importe el histórico del BCV para ese período)"
+            )
+        return self.tasas[posiciones], self.dias[posiciones]
+
+    def convertir(self, centavos, fechas, destino: str = "VES", max_hueco: Optional[int] = None) -> np.ndarray:
+        """
+        Convierte montos en centavos con la tasa de cada fecha: USD -> VES
+        (destino="VES") o VES -> USD (destino="USD"). Devuelve centavos int64.
+        """
+        if destino not in ("VES", "USD"):
+            raise ValueError("Moneda de destino inválida (use VES o USD)")
+        centavos = np.asarray(centavos, dtype=np.int64)
+        tasas, _ = self.tasas_en(fechas, max_hueco)
+        if not len(centavos):
+            return centavos
+
+        mayor = float(np.abs(centavos).max())
+        if mayor * (float(tasas.max()) if destino == "VES" else ESCALA) * 2 >= _MAXIMO_PRODUCTO:
+            raise ValueError("Montos demasiado grandes para la conversión en punto fijo")
+        if destino == "VES":
+            return _dividir_redondeando(centavos * tasas, ESCALA)
+        return _dividir_redondeando(centavos * ESCALA, tasas)
+
+    def promedio(self, desde: date, hasta: date) -> Optional[Decimal]:
+        """Promedio de las tasas publicadas entre dos fechas (inclusive)"""
+        inicio = int(np.searchsorted(self.dias, a_dia(desde), side="left"))
+        fin = int(np.searchsorted(self.dias, a_dia(hasta), side="right"))
+        if fin <= inicio:
+            return None
+        return (Decimal(int(self.tasas[inicio:fin].sum())) / (fin - inicio)).scaleb(-4).quantize(Decimal("0.0001"))
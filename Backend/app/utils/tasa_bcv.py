@@ -1,56 +1,38 @@
-import requests
 from decimal import Decimal
-from datetime import datetime, timedelta, date
+from datetime import datetime, date
 from typing import Tuple
 import logging
 
-logger = logging.getLogger(__name__)
-
-
-# Cache global
-_cache_tasa = {"valor": None, "ultima_actualizacion": None}
-
-
-def obtener_tasa_bcv(cache_duracion_horas: int = 12) -> tuple[Decimal, datetime]:
-    global _cache_tasa
-    ahora = datetime.now()
+from ..services.proveedores_tasa_service import proveedores_tasa_service
 
-    if (
-        _cache_tasa["valor"] is not None
-        and _cache_tasa["ultima_actualizacion"] is not None
-        and ahora - _cache_tasa["ultima_actualizacion"] < timedelta(hours=cache_duracion_horas)
-    ):
-        return _cache_tasa["valor"], _cache_tasa["ultima_actualizacion"]
-
-    try:
-        url = "https://ve.dolarapi.com/v1/dolares/oficial"
-        resp = requests.get(url, timeout=5)
-        data = resp.json()
-        tasa = Decimal(str(data["promedio"]))
-
-        # Actualizar cache
-        _cache_tasa["valor"] = tasa
-        _cache_tasa["ultima_actualizacion"] = ahora
+logger = logging.getLogger(__name__)
 
-        return tasa, ahora
 
-    except Exception as e:
-        print(f"Error obteniendo tasa BCV: {e}")
-        return Decimal("40.00"), ahora
+def obtener_tasa_bcv() -> tuple[Decimal, datetime]:
+    """
+    Tasa BCV actual desde el registro único de proveedores (cache en memoria,
+    circuito por proveedor y última tasa conocida en disco si no hay red).
+    """
+    cotizacion = proveedores_tasa_service.obtener()
+    return cotizacion.tasa, cotizacion.obtenida_en
 
 
 def obtener_tasa_historica_bcv(fecha: date) -> Tuple[Decimal, datetime]:
     """
-    Obtiene la tasa BCV para una fecha histórica específica
-    IMPORTANTE: Esta función debe ser implementada con una API real de BCV
-    Por ahora, usamos un placeholder que devuelve la tasa actual
+    Obtiene la tasa BCV vigente en una fecha histórica (la del día hábil anterior
+    si ese día no hubo publicación), desde el histórico local en tasas_cambio.
+    No consulta la red: el histórico se carga con la importación de tasas.
     """
-    try:
-        # TODO: Implementar con API de BCV histórica
-        # Por ahora, devolvemos la tasa actual como placeholder
-        # ⚠️ ESTO ES TEMPORAL - DEBES IMPLEMENTAR LA LÓGICA REAL
+    if fecha >= date.today():
         return obtener_tasa_bcv()
+
+    from ..database import SessionLocal
+    from ..services.tasas_historicas_service import tasas_historicas_service
+
+    try:
+        with SessionLocal() as db:
+            tasa, fecha_tasa = tasas_historicas_service.tasa_en(db, fecha)
+        return tasa, datetime.combine(fecha_tasa, datetime.min.time())
     except Exception as e:
         logger.error(f"Error obteniendo tasa histórica para {fecha}: {e}")
-        # Fallback a tasa actual
-        return obtener_tasa_bcv()
+        raise
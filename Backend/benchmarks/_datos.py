@@ -0,0 +1,161 @@
+# benchmarks/_datos.py
+"""
+Utilidades compartidas por los benchmarks: base de pruebas y datos sintéticos mínimos.
+"""
+
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app import models  # noqa: F401  (registra todas las tablas)
+from app.models.financiero import Gasto, Cargo, ReporteFinanciero, TipoGastoEnum, EstadoGastoEnum
+from app.models.pagos import Pago, MetodoPagoEnum, EstadoPagoEnum
+from app.models.roles import Rol
+from app.models.usuarios import Usuario
+from app.models.residentes import Residente
+from app.models.torres import Torre, Piso, Apartamento, TipoApartamento
+
+
+def crear_base(db_url: str = None, nombre: str = "bench.db", **kwargs):
+    """Crea el esquema en la URL dada (o en un SQLite temporal) y devuelve (engine, Session)."""
+    db_url = db_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), nombre)
+    engine = create_engine(db_url, **kwargs)
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+def sembrar_estructura(db, n_apartamentos: int):
+    """Un tipo, una torre, un piso y n apartamentos con un residente cada uno (ids 1..n)."""
+    db.execute(
+        insert(TipoApartamento),
+        [{"id": 1, "nombre": "Tipo A", "habitaciones": 3, "banos": 2, "porcentaje_aporte": Decimal("0.50")}],
+    )
+    db.execute(insert(Torre), [{"id": 1, "nombre": "Torre Bench"}])
+    db.execute(insert(Piso), [{"id": 1, "id_torre": 1, "numero": 1}])
+    db.execute(
+        insert(Apartamento),
+        [{"id": i, "id_piso": 1, "id_tipo_apartamento": 1, "numero": f"1-{i}"} for i in range(1, n_apartamentos + 1)],
+    )
+    db.execute(
+        insert(Residente),
+        [
+            {
+                "id": i,
+                "id_apartamento": i,
+                "tipo_residente": "Propietario",
+                "nombre": f"Residente {i}",
+                "cedula": f"V{10000000 + i}",
+                "fecha_registro": date(2024, 1, 1),
+            }
+            for i in range(1, n_apartamentos + 1)
+        ],
+    )
+
+
+def sembrar_gasto_con_cargos(db, periodo: str, n_apartamentos: int, monto_cargo_usd=Decimal("100.00")):
+    """Reporte del período, un gasto y un cargo por apartamento (cargo i -> apartamento i)."""
+    db.execute(
+        insert(ReporteFinanciero),
+        [{"id": 1, "periodo": periodo, "generado_por": "Benchmark", "estado": "Abierto"}],
+    )
+    anio, mes = map(int, periodo.split("-"))
+    db.execute(
+        insert(Gasto),
+        [
+            {
+                "id": 1,
+                "id_reporte_financiero": 1,
+                "tipo_gasto": TipoGastoEnum.FIJO,
+                "descripcion": "Gasto benchmark",
+                "monto_total_usd": monto_cargo_usd * n_apartamentos,
+                "monto_total_ves": monto_cargo_usd * n_apartamentos * 36,
+                "tasa_cambio": Decimal("36.0000"),
+                "fecha_gasto": date(anio, mes, 1),
+                "fecha_tasa_bcv": date(anio, mes, 1),
+                "responsable": "Benchmark",
+                "estado": EstadoGastoEnum.DISTRIBUIDO,
+                "periodo": periodo,
+            }
+        ],
+    )
+    db.execute(
+        insert(Cargo),
+        [
+            {
+                "id": i,
+                "id_apartamento": i,
+                "id_gasto": 1,
+                "descripcion": "Cargo benchmark",
+                "monto_usd": monto_cargo_usd,
+                "monto_ves": monto_cargo_usd * 36,
+                "saldo_pendiente_usd": monto_cargo_usd,
+                "saldo_pendiente_ves": monto_cargo_usd * 36,
+                "fecha_vencimiento": date.today() + timedelta(days=30),
+            }
+            for i in range(1, n_apartamentos + 1)
+        ],
+    )
+
+
+def sembrar_pagos_pendientes(db, cargos_ids, montos=(Decimal("30.00"), Decimal("20.00"))):
+    """
+    Pagos PENDIENTES por cada cargo (cargo i -> residente/apartamento i, reporte 1, cargos de $100),
+    descontados del saldo del cargo como lo haría registrar_pago_residente.
+    """
+    ahora, pagos = datetime.now(), []
+    for cargo_id in cargos_ids:
+        saldo = Decimal("100.00")
+        for monto in montos:
+            pagos.append(
+                {
+                    "id_residente": cargo_id,
+                    "id_apartamento": cargo_id,
+                    "id_reporte_financiero": 1,
+                    "id_cargo": cargo_id,
+                    "id_gasto": 1,
+                    "monto_pagado_usd": monto,
+                    "monto_pagado_ves": monto * 36,
+                    "tasa_cambio_pago": Decimal("36.0000"),
+                    "concepto": "Pago benchmark",
+                    "metodo": MetodoPagoEnum.TRANSFERENCIA,
+                    "estado": EstadoPagoEnum.PENDIENTE,
+                    "verificado": False,
+                    "saldo_pendiente_al_pagar_usd": saldo,
+                    "saldo_pendiente_al_pagar_ves": saldo * 36,
+                    "fecha_creacion": ahora,
+                }
+            )
+            saldo -= monto
+    db.execute(insert(Pago), pagos)
+    restante = Decimal("100.00") - sum(montos)
+    db.query(Cargo).filter(Cargo.id.in_(list(cargos_ids))).update(
+        {Cargo.saldo_pendiente_usd: restante, Cargo.saldo_pendiente_ves: restante * 36}, synchronize_session=False
+    )
+
+
+def sembrar_admins(db, n: int):
+    """Roles básicos y n usuarios administradores (ids 1..n)."""
+    db.execute(insert(Rol), [{"id": 1, "nombre": "Administrador"}, {"id": 2, "nombre": "Residente"}])
+    db.execute(
+        insert(Usuario),
+        [
+            {"id": i, "id_rol": 1, "nombre": f"admin{i}", "email": f"admin{i}@bench.local", "password": "x"}
+            for i in range(1, n + 1)
+        ],
+    )
+
+
+def fijar_tasa(tasa=Decimal("36.0000")):
+    """Evita consultar el BCV durante las mediciones: obtener_tasa_actual/vigente devuelven una tasa fija."""
+    from app.services.tasa_cambio_service import tasa_cambio_service
+
+    fija = SimpleNamespace(tasa_usd_ves=tasa, fecha=date.today())
+    tasa_cambio_service.obtener_tasa_actual = lambda db: fija
+    tasa_cambio_service.obtener_tasa_vigente = lambda db: fija
+    return fija
@@ -0,0 +1,137 @@
+# benchmarks/bench_proveedores_tasa.py
+"""
+Benchmark del registro de proveedores de la tasa BCV.
+
+Levanta un servidor HTTP local con dos proveedores simulados: el principal
+no responde dentro del tiempo límite (como una API caída) y el secundario
+responde bien. Mide la latencia de obtener la tasa, sin cache, en tres
+escenarios:
+
+1. Sin circuito (comportamiento anterior): cada consulta espera el tiempo
+   límite del principal antes de pasar al secundario.
+2. Con circuito: después de TASAS_CIRCUITO_FALLOS fallos el principal se
+   salta; al vencer la apertura se prueba una vez y, si ya responde, se
+   vuelve a usar.
+3. Arranque sin red: ningún proveedor alcanzable y una copia local de la
+   última tasa; se responde con ella.
+
+Uso (desde Backend/):
+    python -m benchmarks.bench_proveedores_tasa
+    python -m benchmarks.bench_proveedores_tasa --consultas 50 --timeout 2
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.core.config import settings
+from app.services.proveedores_tasa_service import ProveedorTasa, ProveedoresTasaService
+
+
+class Simulador(BaseHTTPRequestHandler):
+    principal_caido = True
+    espera = 0.0
+
+    def do_GET(self):
+        if self.path == "/principal" and Simulador.principal_caido:
+            time.sleep(Simulador.espera)
+        cuerpo = json.dumps({"promedio": 36.5 if self.path == "/secundario" else 36.4, "fecha": "2025-01-06"})
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(cuerpo.encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # El cliente ya abandonó por tiempo límite
+
+    def log_message(self, *args):
+        pass
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def proveedores(base: str, timeout: float):
+    return [
+        ProveedorTasa("Principal", f"{base}/principal", ["promedio"], ["fecha"], prioridad=1, timeout=timeout),
+        ProveedorTasa("Secundario", f"{base}/secundario", ["promedio"], ["fecha"], prioridad=2, timeout=timeout),
+    ]
+
+
+def medir(servicio: ProveedoresTasaService, consultas: int):
+    latencias, fuentes = [], []
+    for _ in range(consultas):
+        inicio = time.perf_counter()
+        cotizacion = servicio.obtener(usar_cache=False)
+        latencias.append(time.perf_counter() - inicio)
+        fuentes.append("copia local" if cotizacion.desde_snapshot else cotizacion.fuente)
+    return latencias, fuentes
+
+
+def fila(nombre: str, latencias: list, fuentes: list):
+    ordenadas = sorted(latencias)
+    p50 = ordenadas[len(ordenadas) // 2] * 1000
+    print(
+        f"{nombre:<26}{sum(latencias):>8.2f}{p50:>10.1f}{max(latencias) * 1000:>10.0f}  "
+        f"{fuentes.count(fuentes[-1])}/{len(fuentes)} {fuentes[-1]}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Proveedores de tasa con y sin circuito")
+    parser.add_argument("--consultas", type=int, default=30)
+    parser.add_argument("--timeout", type=float, default=1.0, help="Tiempo límite por proveedor (producción: 5s)")
+    args = parser.parse_args()
+    logging.getLogger("app.services.proveedores_tasa_service").setLevel(logging.CRITICAL)  # Fallos esperados
+
+    Simulador.espera = args.timeout * 1.5
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto_libre()), Simulador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_port}"
+    settings.TASAS_SNAPSHOT_ARCHIVO = os.path.join(tempfile.mkdtemp(), "tasa_bcv.json")
+
+    print(f"{args.consultas} consultas sin cache, principal caído, tiempo límite {args.timeout}s\n")
+    print(f"{'Escenario':<26}{'total s':>8}{'p50 ms':>10}{'max ms':>10}  respondió")
+
+    settings.TASAS_CIRCUITO_FALLOS = 10**9
+    sin_circuito, fuentes = medir(ProveedoresTasaService(proveedores(base, args.timeout)), args.consultas)
+    fila("sin circuito", sin_circuito, fuentes)
+
+    settings.TASAS_CIRCUITO_FALLOS, settings.TASAS_CIRCUITO_APERTURA_SEGUNDOS = 3, 2
+    servicio = ProveedoresTasaService(proveedores(base, args.timeout))
+    con_circuito, fuentes = medir(servicio, args.consultas)
+    fila("con circuito", con_circuito, fuentes)
+    saltos = servicio.circuitos["Principal"].saltos
+
+    # El principal se recupera: al vencer la apertura una consulta de prueba cierra el circuito
+    Simulador.principal_caido = False
+    time.sleep(settings.TASAS_CIRCUITO_APERTURA_SEGUNDOS)
+    recuperado, fuentes = medir(servicio, 5)
+    fila("principal recuperado", recuperado, fuentes)
+    assert fuentes[-1] == "Principal" and servicio.circuitos["Principal"].estado == "cerrado"
+
+    # Arranque en frío sin red: puertos cerrados y la copia local que dejó la última consulta exitosa
+    sin_red = proveedores(f"http://127.0.0.1:{puerto_libre()}", args.timeout)
+    frio, fuentes = medir(ProveedoresTasaService(sin_red), args.consultas)
+    fila("arranque sin red", frio, fuentes)
+    assert fuentes[-1] == "copia local"
+    servidor.shutdown()
+
+    ahorro = sum(sin_circuito) / sum(con_circuito)
+    print(
+        f"\n✅ Con el circuito abierto el principal se saltó {saltos} veces: "
+        f"{ahorro:.0f}x menos tiempo total; sin red se respondió con la copia local"
+    )
+
+
+if __name__ == "__main__":
+    main()
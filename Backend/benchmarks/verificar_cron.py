@@ -0,0 +1,117 @@
+# benchmarks/verificar_cron.py
+"""
+Verificación determinista del parser cron de app/utils/cron.py.
+
+Sin base de datos ni reloj real: cada caso fija sus instantes y compara
+siguiente(), entre() y coincide_fecha() con el resultado esperado, incluidas
+la regla O entre día del mes y día de la semana, el domingo como 0 o 7 y las
+expresiones imposibles o inválidas, que deben fallar con ValueError.
+
+Uso (desde Backend/):
+    python -m benchmarks.verificar_cron
+"""
+
+from datetime import date, datetime
+
+from app.utils.cron import ExpresionCron
+
+# (expresión, después de, siguiente esperado)
+SIGUIENTES = [
+    ("0 8 1 * *", datetime(2025, 1, 15, 10, 0), datetime(2025, 2, 1, 8, 0)),
+    ("0 8 1 * *", datetime(2025, 2, 1, 8, 0), datetime(2025, 3, 1, 8, 0)),  # Estrictamente posterior
+    ("0 8 1 * *", datetime(2024, 12, 31, 23, 59, 59), datetime(2025, 1, 1, 8, 0)),  # Cambio de año
+    ("30 9 * * 1", datetime(2025, 1, 4, 12, 0), datetime(2025, 1, 6, 9, 30)),  # Sábado -> lunes
+    ("30 9 * * 1", datetime(2025, 1, 6, 9, 30), datetime(2025, 1, 13, 9, 30)),
+    ("*/15 * * * *", datetime(2025, 1, 6, 8, 7, 30), datetime(2025, 1, 6, 8, 15)),
+    ("*/15 * * * *", datetime(2025, 1, 6, 23, 50), datetime(2025, 1, 7, 0, 0)),
+    ("0 0 29 2 *", datetime(2025, 3, 1), datetime(2028, 2, 29, 0, 0)),  # Próximo año bisiesto
+    ("0 12 15 * 5", datetime(2025, 1, 1), datetime(2025, 1, 3, 12, 0)),  # Día 15 O viernes: viernes 3
+]
+
+# (expresión, desde, hasta, instantes esperados en (desde, hasta])
+INTERVALOS = [
+    (
+        "*/15 * * * *",
+        datetime(2025, 1, 6, 8, 0),
+        datetime(2025, 1, 6, 8, 45),
+        [datetime(2025, 1, 6, 8, 15), datetime(2025, 1, 6, 8, 30), datetime(2025, 1, 6, 8, 45)],
+    ),
+    (
+        "0 8 1 * *",
+        datetime(2025, 1, 1),
+        datetime(2025, 3, 31),
+        [datetime(2025, 1, 1, 8, 0), datetime(2025, 2, 1, 8, 0), datetime(2025, 3, 1, 8, 0)],
+    ),
+    (
+        "0-30/10 8-9 * * *",
+        datetime(2025, 1, 6, 7, 59),
+        datetime(2025, 1, 6, 8, 59),
+        [datetime(2025, 1, 6, 8, m) for m in (0, 10, 20, 30)],
+    ),
+    ("30 9 * * 1", datetime(2025, 1, 7), datetime(2025, 1, 12, 23, 59), []),
+]
+
+# (expresión, fecha, ¿tiene turno ese día?)
+FECHAS = [
+    ("0 8 1 * *", date(2025, 3, 1), True),
+    ("0 8 1 * *", date(2025, 3, 2), False),
+    ("30 9 * * 1", date(2025, 1, 6), True),  # Lunes
+    ("30 9 * * 1", date(2025, 1, 7), False),
+    ("0 0 * * 0", date(2025, 1, 5), True),  # Domingo como 0 ...
+    ("0 0 * * 7", date(2025, 1, 5), True),  # ... y como 7
+    ("0 12 1 * 1", date(2025, 1, 1), True),  # Miércoles 1: basta el día del mes
+    ("0 12 1 * 1", date(2025, 1, 13), True),  # Lunes 13: basta el día de la semana
+    ("0 12 1 * 1", date(2025, 1, 14), False),
+    ("0 0 1 6 *", date(2025, 1, 1), False),  # Fuera del mes
+]
+
+# Deben fallar con ValueError (al parsear o al buscar el siguiente turno)
+INVALIDAS = ["0 0 31 2 *", "0 0 30 2 *", "61 * * * *", "* * *", "*/0 * * * *", "5-1 * * * *", "a * * * *"]
+
+
+def main():
+    fallos = []
+
+    def verificar(descripcion: str, obtenido, esperado):
+        correcto = obtenido == esperado
+        print(f"{'✓' if correcto else '✗'} {descripcion}")
+        if not correcto:
+            fallos.append(f"{descripcion}: se obtuvo {obtenido}, se esperaba {esperado}")
+
+    for expresion, despues_de, esperado in SIGUIENTES:
+        verificar(
+            f"siguiente('{expresion}', {despues_de:%Y-%m-%d %H:%M:%S}) = {esperado:%Y-%m-%d %H:%M}",
+            ExpresionCron(expresion).siguiente(despues_de),
+            esperado,
+        )
+
+    for expresion, desde, hasta, esperados in INTERVALOS:
+        verificar(
+            f"entre('{expresion}', {desde:%Y-%m-%d %H:%M}, {hasta:%Y-%m-%d %H:%M}) -> {len(esperados)} turnos",
+            list(ExpresionCron(expresion).entre(desde, hasta)),
+            esperados,
+        )
+
+    for expresion, fecha, esperado in FECHAS:
+        verificar(
+            f"coincide_fecha('{expresion}', {fecha} {fecha:%a}) = {esperado}",
+            ExpresionCron(expresion).coincide_fecha(fecha),
+            esperado,
+        )
+
+    for expresion in INVALIDAS:
+        try:
+            ExpresionCron(expresion).siguiente(datetime(2025, 1, 1))
+            error = None
+        except ValueError as e:
+            error = str(e)
+        verificar(f"'{expresion}' rechazada ({error})", error is not None, True)
+
+    if fallos:
+        print("\n".join(["", *fallos]))
+        raise SystemExit(f"❌ {len(fallos)} casos del parser cron no dieron el resultado esperado")
+    print(f"\n✅ {len(SIGUIENTES) + len(INTERVALOS) + len(FECHAS) + len(INVALIDAS)} casos del parser cron correctos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# migrations/env.py
+"""
+Entorno de Alembic.
+
+La URL sale de app/database.py (variables de .env) y el metadata de los
+modelos, así `alembic revision --autogenerate` compara contra el código.
+Desde el arranque de la app (core/arranque.py) se recibe una conexión ya
+abierta en config.attributes["connection"] y no se toca la configuración de
+logging de la aplicación.
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.database import Base, engine
+from app import models  # noqa: F401  (registra todas las tablas)
+
+config = context.config
+conexion_externa = config.attributes.get("connection")
+
+if config.config_file_name is not None and conexion_externa is None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def incluir_objeto(objeto, nombre, tipo, reflejado, comparado_con):
+    # Los índices de la búsqueda (0003) no están en los modelos: que autogenerate no proponga borrarlos
+    if tipo == "index" and reflejado and comparado_con is None and nombre.endswith(("_trgm", "_prefijo")):
+        return False
+    return True
+
+
+def run_migrations_offline() -> None:
+    """Genera el SQL sin conectarse (alembic upgrade head --sql)"""
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        compare_type=True,
+        include_object=incluir_objeto,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _ejecutar(conexion) -> None:
+    context.configure(
+        connection=conexion, target_metadata=target_metadata, compare_type=True, include_object=incluir_objeto
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    if conexion_externa is not None:
+        _ejecutar(conexion_externa)
+        return
+    with engine.connect() as conexion:
+        _ejecutar(conexion)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
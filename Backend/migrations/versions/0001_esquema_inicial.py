@@ -0,0 +1,448 @@
+"""esquema inicial
+
+Tablas tal como las creaba Base.metadata.create_all antes de usar migraciones.
+Una base existente creada así se marca en esta revisión (core/arranque.py lo
+hace solo) en lugar de volver a crearla.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 23:40:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tipos ENUM de PostgreSQL creados junto con las tablas
+TIPOS_ENUM = [
+    "estado_apartamento_enum",
+    "estado_aprobacion_enum",
+    "estado_operativo_enum",
+    "estadocargoenum",
+    "estadogastoenum",
+    "estadopagoenum",
+    "metodopagoenum",
+    "monedaenum",
+    "tipo_residente_enum",
+    "tipogastoenum",
+]
+
+
+def upgrade() -> None:
+    """Aplica la migración."""
+    op.create_table(
+        "reportes_financieros",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("periodo", sa.String(length=10), nullable=False),
+        sa.Column("total_ingresos_usd", sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column("total_gastos_usd", sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column("saldo_final_usd", sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column("total_ingresos_ves", sa.Numeric(precision=15, scale=2), nullable=True),
+        sa.Column("total_gastos_ves", sa.Numeric(precision=15, scale=2), nullable=True),
+        sa.Column("saldo_final_ves", sa.Numeric(precision=15, scale=2), nullable=True),
+        sa.Column("tasa_cambio_promedio", sa.Numeric(precision=10, scale=4), nullable=True),
+        sa.Column("generado_por", sa.String(length=200), nullable=False),
+        sa.Column("fecha_generacion", sa.DateTime(), nullable=True),
+        sa.Column("fecha_cierre", sa.DateTime(), nullable=True),
+        sa.Column("estado", sa.String(length=20), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("periodo", name="uq_reporte_periodo"),
+    )
+    op.create_index(op.f("ix_reportes_financieros_id"), "reportes_financieros", ["id"], unique=False)
+    op.create_table(
+        "roles",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("nombre", sa.String(), nullable=False),
+        sa.Column("descripcion", sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("nombre"),
+    )
+    op.create_index(op.f("ix_roles_id"), "roles", ["id"], unique=False)
+    op.create_table(
+        "tasas_cambio",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("fecha", sa.Date(), nullable=False),
+        sa.Column("tasa_usd_ves", sa.Numeric(precision=10, scale=4), nullable=False),
+        sa.Column("fuente", sa.String(length=50), nullable=True),
+        sa.Column("es_historica", sa.Boolean(), nullable=True),
+        sa.Column("fecha_creacion", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("fecha", "fuente", name="uq_tasa_fecha_fuente"),
+    )
+    op.create_index(op.f("ix_tasas_cambio_fecha"), "tasas_cambio", ["fecha"], unique=False)
+    op.create_index(op.f("ix_tasas_cambio_id"), "tasas_cambio", ["id"], unique=False)
+    op.create_table(
+        "tipos_apartamentos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("nombre", sa.String(), nullable=False),
+        sa.Column("habitaciones", sa.Integer(), nullable=False),
+        sa.Column("banos", sa.Integer(), nullable=False),
+        sa.Column("porcentaje_aporte", sa.DECIMAL(precision=5, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_tipos_apartamentos_id"), "tipos_apartamentos", ["id"], unique=False)
+    op.create_table(
+        "torres",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("nombre", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("nombre"),
+    )
+    op.create_index(op.f("ix_torres_id"), "torres", ["id"], unique=False)
+    op.create_table(
+        "gastos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_reporte_financiero", sa.Integer(), nullable=False),
+        sa.Column("tipo_gasto", sa.Enum("FIJO", "VARIABLE", name="tipogastoenum"), nullable=False),
+        sa.Column("descripcion", sa.String(length=500), nullable=False),
+        sa.Column("monto_total_usd", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column("monto_total_ves", sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column("tasa_cambio", sa.Numeric(precision=10, scale=4), nullable=False),
+        sa.Column("criterio_seleccion", sa.String(length=50), nullable=True),
+        sa.Column("parametros_criterio", sa.Text(), nullable=True),
+        sa.Column("fecha_gasto", sa.Date(), nullable=False),
+        sa.Column("fecha_tasa_bcv", sa.Date(), nullable=False),
+        sa.Column("responsable", sa.String(length=200), nullable=False),
+        sa.Column("estado", sa.Enum("PENDIENTE", "DISTRIBUIDO", "CERRADO", name="estadogastoenum"), nullable=True),
+        sa.Column("fecha_creacion", sa.DateTime(), nullable=True),
+        sa.Column("fecha_actualizacion", sa.DateTime(), nullable=True),
+        sa.Column("periodo", sa.String(length=7), nullable=False),
+        sa.ForeignKeyConstraint(["id_reporte_financiero"], ["reportes_financieros.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_gastos_estado", "gastos", ["estado"], unique=False)
+    op.create_index(op.f("ix_gastos_fecha_gasto"), "gastos", ["fecha_gasto"], unique=False)
+    op.create_index(op.f("ix_gastos_id"), "gastos", ["id"], unique=False)
+    op.create_index(op.f("ix_gastos_periodo"), "gastos", ["periodo"], unique=False)
+    op.create_index("ix_gastos_tipo_fecha", "gastos", ["tipo_gasto", "fecha_gasto"], unique=False)
+    op.create_table(
+        "pisos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_torre", sa.Integer(), nullable=False),
+        sa.Column("numero", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["id_torre"],
+            ["torres.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_pisos_id"), "pisos", ["id"], unique=False)
+    op.create_table(
+        "usuarios",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_rol", sa.Integer(), nullable=True),
+        sa.Column("nombre", sa.String(length=50), nullable=False),
+        sa.Column("email", sa.String(length=255), nullable=False),
+        sa.Column("password", sa.String(length=255), nullable=False),
+        sa.Column("estado", sa.Enum("Activo", "Inactivo", "Bloqueado", name="estado_usuario"), nullable=True),
+        sa.Column("fecha_creacion", sa.DateTime(), nullable=False),
+        sa.Column("ultima_sesion", sa.DateTime(), nullable=True),
+        sa.Column("ultimo_ip", sa.String(length=45), nullable=True),
+        sa.Column("intentos_fallidos", sa.Integer(), nullable=True),
+        sa.Column("fecha_bloqueo", sa.DateTime(), nullable=True),
+        sa.CheckConstraint(
+            "fecha_bloqueo IS NULL OR fecha_bloqueo >= fecha_creacion", name="check_fecha_bloqueo_logica"
+        ),
+        sa.CheckConstraint("intentos_fallidos >= 0 AND intentos_fallidos <= 5", name="check_intentos_fallidos_rango"),
+        sa.CheckConstraint(
+            "ultima_sesion IS NULL OR ultima_sesion >= fecha_creacion", name="check_ultima_sesion_logica"
+        ),
+        sa.ForeignKeyConstraint(["id_rol"], ["roles.id"], ondelete="RESTRICT"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_usuario_estado_activo", "usuarios", ["estado", "ultima_sesion"], unique=False)
+    op.create_index("idx_usuario_estado_fecha", "usuarios", ["estado", "fecha_creacion"], unique=False)
+    op.create_index("idx_usuario_rol_estado", "usuarios", ["id_rol", "estado"], unique=False)
+    op.create_index(op.f("ix_usuarios_email"), "usuarios", ["email"], unique=True)
+    op.create_index(op.f("ix_usuarios_id"), "usuarios", ["id"], unique=False)
+    op.create_index(op.f("ix_usuarios_nombre"), "usuarios", ["nombre"], unique=True)
+    op.create_table(
+        "apartamentos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_piso", sa.Integer(), nullable=False),
+        sa.Column("id_tipo_apartamento", sa.Integer(), nullable=False),
+        sa.Column("numero", sa.String(), nullable=False),
+        sa.Column("estado", sa.Enum("Disponible", "Ocupado", name="estado_apartamento_enum"), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["id_piso"],
+            ["pisos.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["id_tipo_apartamento"],
+            ["tipos_apartamentos.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_apartamentos_id"), "apartamentos", ["id"], unique=False)
+    op.create_table(
+        "auditoria",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_usuario", sa.Integer(), nullable=False),
+        sa.Column("nombre_usuario", sa.String(length=100), nullable=True),
+        sa.Column("accion", sa.String(length=50), nullable=False),
+        sa.Column("tabla_afectada", sa.String(length=50), nullable=True),
+        sa.Column("fecha", sa.DateTime(), nullable=True),
+        sa.Column("detalle", sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["id_usuario"],
+            ["usuarios.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_auditoria_id"), "auditoria", ["id"], unique=False)
+    op.create_table(
+        "notificaciones",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_usuario", sa.Integer(), nullable=False),
+        sa.Column("mensaje", sa.String(), nullable=False),
+        sa.Column("fecha_envio", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "tipo",
+            sa.Enum("PAGO", "INCIDENCIA", "SISTEMA", "DOCUMENTO", "RESERVA", name="tiponotificacion"),
+            nullable=True,
+        ),
+        sa.Column("leido", sa.Boolean(), nullable=True),
+        sa.Column("url", sa.String(), nullable=True),
+        sa.Column("prioridad", sa.String(), nullable=True),
+        sa.Column("fecha_leido", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["id_usuario"],
+            ["usuarios.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_notificaciones_id"), "notificaciones", ["id"], unique=False)
+    op.create_table(
+        "cargos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_apartamento", sa.Integer(), nullable=False),
+        sa.Column("id_gasto", sa.Integer(), nullable=False),
+        sa.Column("descripcion", sa.String(length=500), nullable=False),
+        sa.Column("monto_usd", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column("monto_ves", sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column("saldo_pendiente_usd", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column("saldo_pendiente_ves", sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column("fecha_vencimiento", sa.Date(), nullable=False),
+        sa.Column(
+            "estado", sa.Enum("PENDIENTE", "PAGADO", "PARCIAL", "VENCIDO", name="estadocargoenum"), nullable=True
+        ),
+        sa.Column("fecha_creacion", sa.DateTime(), nullable=True),
+        sa.Column("fecha_actualizacion", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["id_apartamento"], ["apartamentos.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["id_gasto"], ["gastos.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_cargos_apartamento_estado", "cargos", ["id_apartamento", "estado"], unique=False)
+    op.create_index(op.f("ix_cargos_fecha_vencimiento"), "cargos", ["fecha_vencimiento"], unique=False)
+    op.create_index(op.f("ix_cargos_id"), "cargos", ["id"], unique=False)
+    op.create_index("ix_cargos_vencimiento", "cargos", ["fecha_vencimiento", "estado"], unique=False)
+    op.create_table(
+        "distribuciones_gasto",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_gasto", sa.Integer(), nullable=False),
+        sa.Column("id_apartamento", sa.Integer(), nullable=False),
+        sa.Column("monto_asignado_usd", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column("monto_asignado_ves", sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column("porcentaje_aplicado", sa.Numeric(precision=6, scale=4), nullable=False),
+        sa.Column("fecha_creacion", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["id_apartamento"], ["apartamentos.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["id_gasto"], ["gastos.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id_gasto", "id_apartamento", name="uq_distribucion_gasto_apartamento"),
+    )
+    op.create_index(
+        "ix_distribucion_apartamento", "distribuciones_gasto", ["id_apartamento", "fecha_creacion"], unique=False
+    )
+    op.create_index(op.f("ix_distribuciones_gasto_id"), "distribuciones_gasto", ["id"], unique=False)
+    op.create_table(
+        "residentes",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_apartamento", sa.Integer(), nullable=True),
+        sa.Column("id_usuario", sa.Integer(), nullable=True),
+        sa.Column("tipo_residente", sa.Enum("Propietario", "Inquilino", name="tipo_residente_enum"), nullable=False),
+        sa.Column("nombre", sa.String(), nullable=False),
+        sa.Column("cedula", sa.String(), nullable=False),
+        sa.Column("telefono", sa.String(), nullable=True),
+        sa.Column("correo", sa.String(), nullable=True),
+        sa.Column("fecha_registro", sa.Date(), nullable=False),
+        sa.Column(
+            "estado_aprobacion",
+            sa.Enum("Pendiente", "Aprobado", "Rechazado", "Corrección Requerida", name="estado_aprobacion_enum"),
+            nullable=False,
+        ),
+        sa.Column(
+            "estado_operativo",
+            sa.Enum("Activo", "Inactivo", "Suspendido", name="estado_operativo_enum"),
+            nullable=False,
+        ),
+        sa.Column("reside_actualmente", sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["id_apartamento"],
+            ["apartamentos.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["id_usuario"],
+            ["usuarios.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("cedula"),
+        sa.UniqueConstraint("id_usuario"),
+    )
+    op.create_index(op.f("ix_residentes_id"), "residentes", ["id"], unique=False)
+    op.create_table(
+        "incidencias",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_residente", sa.Integer(), nullable=False),
+        sa.Column("tipo", sa.String(length=50), nullable=False),
+        sa.Column("descripcion", sa.String(length=255), nullable=False),
+        sa.Column("fecha_reporte", sa.Date(), nullable=True),
+        sa.Column("estado", sa.String(length=20), nullable=True),
+        sa.Column("prioridad", sa.String(length=10), nullable=True),
+        sa.Column("respuesta_admin", sa.String(length=255), nullable=True),
+        sa.Column("id_usuario_admin", sa.Integer(), nullable=True),
+        sa.Column("fecha_atencion", sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["id_residente"],
+            ["residentes.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["id_usuario_admin"],
+            ["usuarios.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_incidencias_id"), "incidencias", ["id"], unique=False)
+    op.create_table(
+        "pagos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_residente", sa.Integer(), nullable=False),
+        sa.Column("id_apartamento", sa.Integer(), nullable=True),
+        sa.Column("id_reporte_financiero", sa.Integer(), nullable=True),
+        sa.Column("id_cargo", sa.Integer(), nullable=False),
+        sa.Column("id_gasto", sa.Integer(), nullable=True),
+        sa.Column("monto_pagado_usd", sa.DECIMAL(precision=12, scale=2), nullable=False),
+        sa.Column("monto_pagado_ves", sa.DECIMAL(precision=15, scale=2), nullable=False),
+        sa.Column("tasa_cambio_pago", sa.DECIMAL(precision=10, scale=4), nullable=False),
+        sa.Column("monto", sa.DECIMAL(precision=12, scale=2), nullable=True),
+        sa.Column("moneda", sa.Enum("USD", "VES", name="monedaenum"), nullable=True),
+        sa.Column("tipo_cambio_bcv", sa.DECIMAL(precision=12, scale=2), nullable=True),
+        sa.Column("saldo_pendiente_al_pagar_usd", sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column("saldo_pendiente_al_pagar_ves", sa.Numeric(precision=15, scale=2), nullable=True),
+        sa.Column("concepto", sa.String(length=100), nullable=False),
+        sa.Column("metodo", sa.Enum("TRANSFERENCIA", "EFECTIVO", "PAGO_MOVIL", name="metodopagoenum"), nullable=False),
+        sa.Column("comprobante", sa.String(length=255), nullable=True),
+        sa.Column("estado", sa.Enum("PENDIENTE", "VALIDADO", "RECHAZADO", name="estadopagoenum"), nullable=False),
+        sa.Column("verificado", sa.Boolean(), nullable=False),
+        sa.Column("fecha_creacion", sa.DateTime(), nullable=False),
+        sa.Column("fecha_actualizacion", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["id_apartamento"],
+            ["apartamentos.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["id_cargo"],
+            ["cargos.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["id_gasto"],
+            ["gastos.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["id_reporte_financiero"],
+            ["reportes_financieros.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["id_residente"],
+            ["residentes.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_estado_pago", "pagos", ["estado"], unique=False)
+    op.create_index("idx_moneda_metodo", "pagos", ["moneda", "metodo"], unique=False)
+    op.create_index("idx_pago_cargo", "pagos", ["id_cargo"], unique=False)
+    op.create_index("idx_residente_fecha", "pagos", ["id_residente"], unique=False)
+    op.create_index(op.f("ix_pagos_id"), "pagos", ["id"], unique=False)
+    op.create_table(
+        "reservas",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_residente", sa.Integer(), nullable=False),
+        sa.Column("area", sa.String(), nullable=False),
+        sa.Column("fecha_reserva", sa.Date(), nullable=False),
+        sa.Column("hora_inicio", sa.Time(), nullable=False),
+        sa.Column("hora_fin", sa.Time(), nullable=False),
+        sa.Column("estado", sa.Enum("Activa", "Cancelada", "Finalizada", name="estadoreserva"), nullable=False),
+        sa.Column("numero_personas", sa.Integer(), nullable=False),
+        sa.Column("notas", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["id_residente"],
+            ["residentes.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_reservas_id"), "reservas", ["id"], unique=False)
+
+
+def downgrade() -> None:
+    """Revierte la migración."""
+    op.drop_index(op.f("ix_reservas_id"), table_name="reservas")
+    op.drop_table("reservas")
+    op.drop_index(op.f("ix_pagos_id"), table_name="pagos")
+    op.drop_index("idx_residente_fecha", table_name="pagos")
+    op.drop_index("idx_pago_cargo", table_name="pagos")
+    op.drop_index("idx_moneda_metodo", table_name="pagos")
+    op.drop_index("idx_estado_pago", table_name="pagos")
+    op.drop_table("pagos")
+    op.drop_index(op.f("ix_incidencias_id"), table_name="incidencias")
+    op.drop_table("incidencias")
+    op.drop_index(op.f("ix_residentes_id"), table_name="residentes")
+    op.drop_table("residentes")
+    op.drop_index(op.f("ix_distribuciones_gasto_id"), table_name="distribuciones_gasto")
+    op.drop_index("ix_distribucion_apartamento", table_name="distribuciones_gasto")
+    op.drop_table("distribuciones_gasto")
+    op.drop_index("ix_cargos_vencimiento", table_name="cargos")
+    op.drop_index(op.f("ix_cargos_id"), table_name="cargos")
+    op.drop_index(op.f("ix_cargos_fecha_vencimiento"), table_name="cargos")
+    op.drop_index("ix_cargos_apartamento_estado", table_name="cargos")
+    op.drop_table("cargos")
+    op.drop_index(op.f("ix_notificaciones_id"), table_name="notificaciones")
+    op.drop_table("notificaciones")
+    op.drop_index(op.f("ix_auditoria_id"), table_name="auditoria")
+    op.drop_table("auditoria")
+    op.drop_index(op.f("ix_apartamentos_id"), table_name="apartamentos")
+    op.drop_table("apartamentos")
+    op.drop_index(op.f("ix_usuarios_nombre"), table_name="usuarios")
+    op.drop_index(op.f("ix_usuarios_id"), table_name="usuarios")
+    op.drop_index(op.f("ix_usuarios_email"), table_name="usuarios")
+    op.drop_index("idx_usuario_rol_estado", table_name="usuarios")
+    op.drop_index("idx_usuario_estado_fecha", table_name="usuarios")
+    op.drop_index("idx_usuario_estado_activo", table_name="usuarios")
+    op.drop_table("usuarios")
+    op.drop_index(op.f("ix_pisos_id"), table_name="pisos")
+    op.drop_table("pisos")
+    op.drop_index("ix_gastos_tipo_fecha", table_name="gastos")
+    op.drop_index(op.f("ix_gastos_periodo"), table_name="gastos")
+    op.drop_index(op.f("ix_gastos_id"), table_name="gastos")
+    op.drop_index(op.f("ix_gastos_fecha_gasto"), table_name="gastos")
+    op.drop_index("ix_gastos_estado", table_name="gastos")
+    op.drop_table("gastos")
+    op.drop_index(op.f("ix_torres_id"), table_name="torres")
+    op.drop_table("torres")
+    op.drop_index(op.f("ix_tipos_apartamentos_id"), table_name="tipos_apartamentos")
+    op.drop_table("tipos_apartamentos")
+    op.drop_index(op.f("ix_tasas_cambio_id"), table_name="tasas_cambio")
+    op.drop_index(op.f("ix_tasas_cambio_fecha"), table_name="tasas_cambio")
+    op.drop_table("tasas_cambio")
+    op.drop_index(op.f("ix_roles_id"), table_name="roles")
+    op.drop_table("roles")
+    op.drop_index(op.f("ix_reportes_financieros_id"), table_name="reportes_financieros")
+    op.drop_table("reportes_financieros")
+    for nombre in TIPOS_ENUM:
+        sa.Enum(name=nombre).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,66 @@
+"""referencia y cola de validación en pagos, historial de jobs
+
+- pagos.referencia (conciliación bancaria) e idx_pago_referencia
+- pagos.reclamado_por / reclamado_hasta (cola multi-administrador) e
+  idx_pago_cola_validacion para la cola y la paginación keyset
+- tabla job_runs del programador de jobs
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 23:41:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Aplica la migración."""
+    op.create_table(
+        "job_runs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("job", sa.String(length=60), nullable=False),
+        sa.Column("programado_para", sa.DateTime(), nullable=False),
+        sa.Column("origen", sa.String(length=20), nullable=False),
+        sa.Column("estado", sa.String(length=20), nullable=False),
+        sa.Column("inicio", sa.DateTime(), nullable=False),
+        sa.Column("fin", sa.DateTime(), nullable=True),
+        sa.Column("duracion_ms", sa.Integer(), nullable=True),
+        sa.Column("resultado", sa.JSON(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("worker", sa.String(length=100), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("job", "programado_para", name="uq_job_run_turno"),
+    )
+    op.create_index(op.f("ix_job_runs_id"), "job_runs", ["id"], unique=False)
+    op.create_index("ix_job_runs_job_inicio", "job_runs", ["job", "inicio"], unique=False)
+
+    op.add_column("pagos", sa.Column("referencia", sa.String(length=50), nullable=True))
+    op.add_column("pagos", sa.Column("reclamado_por", sa.Integer(), nullable=True))
+    op.add_column("pagos", sa.Column("reclamado_hasta", sa.DateTime(), nullable=True))
+    op.create_foreign_key("pagos_reclamado_por_fkey", "pagos", "usuarios", ["reclamado_por"], ["id"])
+    op.create_index("idx_pago_referencia", "pagos", ["referencia"], unique=False)
+    op.create_index("idx_pago_cola_validacion", "pagos", ["estado", "fecha_creacion", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Revierte la migración."""
+    op.drop_index("idx_pago_cola_validacion", table_name="pagos")
+    op.drop_index("idx_pago_referencia", table_name="pagos")
+    op.drop_constraint("pagos_reclamado_por_fkey", "pagos", type_="foreignkey")
+    op.drop_column("pagos", "reclamado_hasta")
+    op.drop_column("pagos", "reclamado_por")
+    op.drop_column("pagos", "referencia")
+
+    op.drop_index("ix_job_runs_job_inicio", table_name="job_runs")
+    op.drop_index(op.f("ix_job_runs_id"), table_name="job_runs")
+    op.drop_table("job_runs")
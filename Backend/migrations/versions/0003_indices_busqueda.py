@@ -0,0 +1,54 @@
+"""índices de la búsqueda unificada (pg_trgm)
+
+Antes se creaban en cada arranque. Si la extensión pg_trgm no está disponible
+en el servidor se omiten y la búsqueda usa el índice en memoria; las sentencias
+son idempotentes, así que pueden ejecutarse a mano si la extensión se instala
+más adelante.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 23:42:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (nombre, tabla, definición)
+INDICES = [
+    ("ix_residentes_nombre_trgm", "residentes", "USING gin (nombre gin_trgm_ops)"),
+    ("ix_residentes_correo_trgm", "residentes", "USING gin (correo gin_trgm_ops)"),
+    ("ix_residentes_cedula_prefijo", "residentes", "(cedula text_pattern_ops)"),
+    ("ix_usuarios_nombre_trgm", "usuarios", "USING gin (nombre gin_trgm_ops)"),
+    ("ix_usuarios_email_trgm", "usuarios", "USING gin (email gin_trgm_ops)"),
+    ("ix_apartamentos_numero_prefijo", "apartamentos", "(numero text_pattern_ops)"),
+]
+
+
+def upgrade() -> None:
+    """Aplica la migración."""
+    conexion = op.get_bind()
+    if conexion.dialect.name != "postgresql":
+        return
+    disponible = conexion.execute(sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).scalar()
+    if not disponible:
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for nombre, tabla, definicion in INDICES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} {definicion}")
+
+
+def downgrade() -> None:
+    """Revierte la migración."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for nombre, _, _ in INDICES:
+        op.execute(f"DROP INDEX IF EXISTS {nombre}")
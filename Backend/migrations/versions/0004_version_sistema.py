@@ -0,0 +1,38 @@
+"""marca de versión de los datos iniciales
+
+El arranque compara en una sola consulta alembic_version y
+version_sistema.datos_iniciales contra el código y, si coinciden, no migra
+ni revisa los datos iniciales.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 23:43:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Aplica la migración."""
+    op.create_table(
+        "version_sistema",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("datos_iniciales", sa.Integer(), nullable=False),
+        sa.Column("actualizado_en", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Revierte la migración."""
+    op.drop_table("version_sistema")
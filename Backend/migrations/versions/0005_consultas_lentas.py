@@ -0,0 +1,48 @@
+"""registro de consultas lentas
+
+Sentencias que superan SQL_LENTA_UMBRAL_MS, con sus parámetros, la función
+que las lanzó y el plan de ejecución capturado aparte.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:20:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Aplica la migración."""
+    op.create_table(
+        "consultas_lentas",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("fecha", sa.DateTime(), nullable=False),
+        sa.Column("duracion_ms", sa.Float(), nullable=False),
+        sa.Column("sentencia", sa.Text(), nullable=False),
+        sa.Column("huella", sa.Text(), nullable=False),
+        sa.Column("parametros", sa.Text(), nullable=True),
+        sa.Column("origen", sa.String(length=300), nullable=True),
+        sa.Column("ruta", sa.String(length=300), nullable=True),
+        sa.Column("plan", sa.Text(), nullable=True),
+        sa.Column("error_plan", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_consultas_lentas_id"), "consultas_lentas", ["id"], unique=False)
+    op.create_index(op.f("ix_consultas_lentas_fecha"), "consultas_lentas", ["fecha"], unique=False)
+
+
+def downgrade() -> None:
+    """Revierte la migración."""
+    op.drop_index(op.f("ix_consultas_lentas_fecha"), table_name="consultas_lentas")
+    op.drop_index(op.f("ix_consultas_lentas_id"), table_name="consultas_lentas")
+    op.drop_table("consultas_lentas")
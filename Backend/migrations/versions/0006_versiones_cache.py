@@ -0,0 +1,38 @@
+"""versiones de los caches en memoria
+
+Una fila por cache (topología, índice de búsqueda) que incrementa la
+transacción que cambia sus datos; los demás workers la comparan para
+descartar su copia en memoria.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 10:40:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Aplica la migración."""
+    op.create_table(
+        "versiones_cache",
+        sa.Column("nombre", sa.String(length=50), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("actualizado_en", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("nombre"),
+    )
+
+
+def downgrade() -> None:
+    """Revierte la migración."""
+    op.drop_table("versiones_cache")